@@ -0,0 +1,31 @@
+"""Add content_hash to tool_jobs for deduplicated output storage."""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "20261018_0001"
+down_revision = "20260420_0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "tool_jobs",
+        sa.Column("content_hash", sa.String(length=64), nullable=True),
+    )
+    op.create_index(
+        "ix_tool_jobs_user_content_hash",
+        "tool_jobs",
+        ["user_id", "content_hash"],
+    )
+    # Reference lookups when deleting or expiring a possibly shared object.
+    op.create_index("ix_tool_jobs_storage_path", "tool_jobs", ["storage_path"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_tool_jobs_storage_path", table_name="tool_jobs")
+    op.drop_index("ix_tool_jobs_user_content_hash", table_name="tool_jobs")
+    op.drop_column("tool_jobs", "content_hash")
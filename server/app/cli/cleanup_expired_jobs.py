@@ -22,7 +22,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.session import AsyncSessionFactory
 from app.services.jobs_service import JobsService
-from app.services.storage_service import StorageService
+from app.services.storage_service import StorageService, close_storage_client
 
 log = logging.getLogger(__name__)
 
@@ -48,8 +48,11 @@ async def main() -> int:
         level=logging.INFO,
         format="%(asctime)s %(levelname)s %(name)s %(message)s",
     )
-    async with AsyncSessionFactory() as session:
-        deleted = await run_cleanup(session)
+    try:
+        async with AsyncSessionFactory() as session:
+            deleted = await run_cleanup(session)
+    finally:
+        await close_storage_client()
     log.info("cleanup_expired_jobs: removed %d storage objects", deleted)
     return deleted
 
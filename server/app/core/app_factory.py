@@ -14,6 +14,9 @@ from app.tools import tool_pagination_routers, tool_routers
 from app.core.openapi_custom import attach_custom_openapi
 from app.core.rate_limit import limiter, _rate_limit_exceeded_handler
 from app.core.quota_guard import enforce_quota
+from app.services.executor import shutdown_tool_executor
+from app.services.job_recorder import start_job_recorder, stop_job_recorder
+from app.services.storage_service import close_storage_client, get_storage_client
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 
@@ -67,6 +70,13 @@ def create_app() -> FastAPI:
         app.include_router(router)
 
     attach_custom_openapi(app)
+    app.add_event_handler("shutdown", shutdown_tool_executor)
+    # Open the pooled Storage client on the serving loop; closed on shutdown.
+    app.add_event_handler("startup", get_storage_client)
+    # Recording drains into Storage, so it stops before the client closes.
+    app.add_event_handler("startup", start_job_recorder)
+    app.add_event_handler("shutdown", stop_job_recorder)
+    app.add_event_handler("shutdown", close_storage_client)
     return app
 
 
@@ -37,6 +37,42 @@ class Settings(BaseSettings):
     supabase_storage_bucket: str = Field(default="tool-outputs", alias="SUPABASE_STORAGE_BUCKET")
     file_encryption_key: str | None = Field(default=None, alias="FILE_ENCRYPTION_KEY")
 
+    # 0 means "min(4, cpu_count)".
+    tool_executor_workers: int = Field(default=0, alias="TOOL_EXECUTOR_WORKERS")
+    tool_executor_queue_depth: int = Field(default=16, alias="TOOL_EXECUTOR_QUEUE_DEPTH")
+    tool_executor_retry_after: int = Field(default=5, alias="TOOL_EXECUTOR_RETRY_AFTER")
+    tool_concurrency_anon: int = Field(default=2, alias="TOOL_CONCURRENCY_ANON")
+    tool_concurrency_free: int = Field(default=3, alias="TOOL_CONCURRENCY_FREE")
+    tool_concurrency_pro: int = Field(default=4, alias="TOOL_CONCURRENCY_PRO")
+
+    # Parsed-workbook cache shared by all tools; 0 disables it. Memory budget
+    # per process: this cache (64 MiB) + the inspect store's memory tier
+    # (up to 512 MiB, sheets beyond it stay on disk) + the working set of the
+    # tools running on the executor.
+    workbook_cache_max_bytes: int = Field(default=64 * 1024 * 1024, alias="WORKBOOK_CACHE_MAX_BYTES")
+    workbook_cache_ttl_seconds: int = Field(default=15 * 60, alias="WORKBOOK_CACHE_TTL_SECONDS")
+
+    # Upload-once file handles (POST /api/v1/tools/files); empty dir means
+    # "<tempdir>/xlsxworld-file-handles".
+    file_handle_dir: str | None = Field(default=None, alias="FILE_HANDLE_DIR")
+    file_handle_ttl_seconds: int = Field(default=30 * 60, alias="FILE_HANDLE_TTL_SECONDS")
+    file_handle_max_total_bytes: int = Field(default=2 * 1024 * 1024 * 1024, alias="FILE_HANDLE_MAX_TOTAL_BYTES")
+
+    # Background recording of signed-in users' outputs; 0 workers records
+    # inline in each request's background task instead. Empty dir means
+    # "<tempdir>/xlsxworld-job-recorder".
+    job_recorder_workers: int = Field(default=4, alias="JOB_RECORDER_WORKERS")
+    job_recorder_dir: str | None = Field(default=None, alias="JOB_RECORDER_DIR")
+    job_recorder_max_pending: int = Field(default=256, alias="JOB_RECORDER_MAX_PENDING")
+    job_recorder_batch_size: int = Field(default=50, alias="JOB_RECORDER_BATCH_SIZE")
+    job_recorder_batch_wait_ms: int = Field(default=500, alias="JOB_RECORDER_BATCH_WAIT_MS")
+    job_recorder_max_attempts: int = Field(default=5, alias="JOB_RECORDER_MAX_ATTEMPTS")
+
+    # Disk tier of the inspect token store, shared by the workers of one host;
+    # empty dir means "<tempdir>/xlsxworld-inspect", 0 bytes disables it.
+    inspect_spill_dir: str | None = Field(default=None, alias="INSPECT_SPILL_DIR")
+    inspect_spill_max_bytes: int = Field(default=2 * 1024 * 1024 * 1024, alias="INSPECT_SPILL_MAX_BYTES")
+
     @property
     def async_database_url(self) -> str:
         """Return SQLAlchemy-compatible async URL for asyncpg."""
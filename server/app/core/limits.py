@@ -22,10 +22,16 @@ ANON_DAILY_JOBS = 20
 FREE_MAX_UPLOAD_BYTES = 25 * 1024 * 1024
 FREE_DAILY_JOBS = 200
 
+# Live upload-once file handles (``POST /api/v1/tools/files``) per caller;
+# uploading one more evicts the caller's least recently used handle.
+ANON_MAX_FILE_HANDLES = 3
+FREE_MAX_FILE_HANDLES = 10
+
 # Phase 3 will flip the resolver to return these when the user is Pro.
 # They are defined here so the number lives in exactly one place.
 PRO_MAX_UPLOAD_BYTES = 100 * 1024 * 1024
 PRO_DAILY_JOBS = 2_000
+PRO_MAX_FILE_HANDLES = 25
 
 
 class Tier(str, enum.Enum):
@@ -39,22 +45,26 @@ class Limits:
     tier: Tier
     max_upload_bytes: int
     daily_jobs: int
+    max_file_handles: int = ANON_MAX_FILE_HANDLES
 
 
 _ANON_LIMITS = Limits(
     tier=Tier.ANON,
     max_upload_bytes=ANON_MAX_UPLOAD_BYTES,
     daily_jobs=ANON_DAILY_JOBS,
+    max_file_handles=ANON_MAX_FILE_HANDLES,
 )
 _FREE_LIMITS = Limits(
     tier=Tier.FREE,
     max_upload_bytes=FREE_MAX_UPLOAD_BYTES,
     daily_jobs=FREE_DAILY_JOBS,
+    max_file_handles=FREE_MAX_FILE_HANDLES,
 )
 _PRO_LIMITS = Limits(
     tier=Tier.PRO,
     max_upload_bytes=PRO_MAX_UPLOAD_BYTES,
     daily_jobs=PRO_DAILY_JOBS,
+    max_file_handles=PRO_MAX_FILE_HANDLES,
 )
 
 
@@ -64,7 +74,7 @@ def effective_limits(principal: AuthenticatedPrincipal | None) -> Limits:
     Phase 2 only knows anon vs free. Phase 3 will read a Pro entitlement
     off ``principal`` (or a companion object) and return ``_PRO_LIMITS``
     where appropriate. The call-sites don't care; they read ``.tier``,
-    ``.max_upload_bytes`` and ``.daily_jobs`` off the returned
+    ``.max_upload_bytes``, ``.daily_jobs`` and ``.max_file_handles`` off the returned
     dataclass.
     """
 
@@ -76,10 +86,13 @@ def effective_limits(principal: AuthenticatedPrincipal | None) -> Limits:
 
 __all__ = [
     "ANON_DAILY_JOBS",
+    "ANON_MAX_FILE_HANDLES",
     "ANON_MAX_UPLOAD_BYTES",
     "FREE_DAILY_JOBS",
+    "FREE_MAX_FILE_HANDLES",
     "FREE_MAX_UPLOAD_BYTES",
     "PRO_DAILY_JOBS",
+    "PRO_MAX_FILE_HANDLES",
     "PRO_MAX_UPLOAD_BYTES",
     "Limits",
     "Tier",
@@ -30,6 +30,9 @@ class ToolJob(UUIDPrimaryKeyMixin, TimestampMixin, Base):
     output_filename: Mapped[str] = mapped_column(Text, nullable=False)
     storage_path: Mapped[str | None] = mapped_column(Text, nullable=True)
     encryption_blob: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+    # Keyed digest of the output (see ``content_digest``); rows of one user
+    # with the same digest share one Storage object.
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
     mime_type: Mapped[str] = mapped_column(String(180), nullable=False)
     output_size_bytes: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     success: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
@@ -41,4 +44,6 @@ class ToolJob(UUIDPrimaryKeyMixin, TimestampMixin, Base):
 
     __table_args__ = (
         Index("ix_tool_jobs_user_created_at", "user_id", "created_at"),
+        Index("ix_tool_jobs_user_content_hash", "user_id", "content_hash"),
+        Index("ix_tool_jobs_storage_path", "storage_path"),
     )
@@ -13,7 +13,11 @@ from app.db.models.analytics import MetricEvent, UserActivityDaily
 from app.db.models.jobs import ToolJob
 from app.db.models.users import AppUser, UserRole
 from app.db.session import get_db_session
+from app.services.executor import get_tool_executor
+from app.services.file_handles import get_file_handle_store
+from app.services.job_recorder import get_job_recorder
 from app.services.quota_service import QuotaService, today_utc
+from app.services.workbook_cache import get_workbook_cache
 
 router = APIRouter(prefix="/api/v1/admin", tags=["admin"])
 
@@ -546,6 +550,51 @@ async def performance(
     ]
 
 
+@router.get(
+    "/executor",
+    summary="Tool executor status",
+    description="Live worker-pool occupancy, per-tier queue depth and rejection counters.",
+)
+async def executor_status(
+    _: AuthenticatedPrincipal = Depends(require_admin),
+) -> dict:
+    return get_tool_executor().stats()
+
+
+@router.get(
+    "/workbook-cache",
+    summary="Parsed-workbook cache status",
+    description="Occupancy of the shared parsed-workbook cache and its hit, miss and eviction counters.",
+)
+async def workbook_cache_status(
+    _: AuthenticatedPrincipal = Depends(require_admin),
+) -> dict:
+    return get_workbook_cache().stats()
+
+
+@router.get(
+    "/file-handles",
+    summary="Upload-once file handle status",
+    description="Live file handles, spool bytes and expiry/eviction counters.",
+)
+async def file_handles_status(
+    _: AuthenticatedPrincipal = Depends(require_admin),
+) -> dict:
+    return get_file_handle_store().stats()
+
+
+@router.get(
+    "/job-recorder",
+    summary="Job recording queue status",
+    description="Pending depth, recording lag, batch and retry counters, and dropped outputs.",
+)
+async def job_recorder_status(
+    _: AuthenticatedPrincipal = Depends(require_admin),
+) -> dict:
+    recorder = get_job_recorder()
+    return recorder.stats() if recorder is not None else {"running": False}
+
+
 @router.post(
     "/quota/reset",
     summary="Reset daily quota for a user or IP",
@@ -10,6 +10,7 @@ import uuid
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 
 from app.core.limits import effective_limits
 from app.core.quota_guard import quota_service_dep
@@ -81,12 +82,15 @@ async def download_job(
     if job.storage_path is None or job.expires_at < now:
         raise HTTPException(status_code=410, detail="This job has expired")
 
-    plaintext = await service.download_and_decrypt(job)
-    return Response(
-        content=plaintext,
+    # Decrypted as it streams from storage; neither copy is held in full.
+    plaintext = await service.open_download(job)
+    return StreamingResponse(
+        plaintext,
         media_type=job.mime_type,
         headers={
             "Content-Disposition": f'attachment; filename="{job.output_filename}"',
+            # The plaintext size, so clients can still show download progress.
+            "Content-Length": str(job.output_size_bytes),
         },
     )
 
@@ -18,22 +18,29 @@ loses formatting).
 """
 from __future__ import annotations
 
+from bisect import bisect_left, bisect_right
 from io import BytesIO
-from typing import Any
+from typing import Any, Iterable
 
 from fastapi import HTTPException
 from openpyxl import load_workbook
+from openpyxl.cell.cell import Cell, MergedCell
 from openpyxl.workbook import Workbook
+from openpyxl.worksheet.cell_range import CellRange, MultiCellRange
+from openpyxl.worksheet.worksheet import Worksheet
 
 from app.services.excel_reader import (
     _OPENPYXL_EXTENSIONS,
+    ExcelSource,
     _extract_extension,
     _sanitize_openxml_for_data_read,
     _validate_magic_bytes,
     ensure_supported_excel_filename,
+    source_stream,
 )
 
 __all__ = [
+    "delete_rows_bulk",
     "load_workbook_for_edit",
     "save_workbook_to_bytes",
     "supports_inplace_edit",
@@ -56,7 +63,7 @@ def supports_inplace_edit(filename: str | None) -> bool:
     return _extract_extension(filename) in _OPENPYXL_EXTENSIONS
 
 
-def load_workbook_for_edit(raw: bytes, filename: str | None) -> FormatPreservingLoad:
+def load_workbook_for_edit(source: ExcelSource, filename: str | None) -> FormatPreservingLoad:
     """Load an .xlsx/.xlsm/.xltx/.xltm/.xlam workbook for in-place editing.
 
     Always preserves: cell styles, column dimensions, row dimensions, named
@@ -72,7 +79,7 @@ def load_workbook_for_edit(raw: bytes, filename: str | None) -> FormatPreserving
     """
     extension = _extract_extension(filename)
     ensure_supported_excel_filename(filename)
-    _validate_magic_bytes(raw, extension)
+    _validate_magic_bytes(source, extension)
 
     if extension not in _OPENPYXL_EXTENSIONS:
         # Caller should check supports_inplace_edit() first.
@@ -85,7 +92,7 @@ def load_workbook_for_edit(raw: bytes, filename: str | None) -> FormatPreserving
 
     try:
         wb = load_workbook(
-            filename=BytesIO(raw),
+            filename=source_stream(source),
             data_only=False,
             keep_links=False,
             keep_vba=keep_vba,
@@ -94,7 +101,7 @@ def load_workbook_for_edit(raw: bytes, filename: str | None) -> FormatPreserving
     except Exception:
         # Drawings/charts/images couldn't be parsed. Strip them and retry so
         # the rest of the formatting (column widths, styles, etc.) is kept.
-        sanitized = _sanitize_openxml_for_data_read(raw)
+        sanitized = _sanitize_openxml_for_data_read(source)
         try:
             wb = load_workbook(
                 filename=BytesIO(sanitized),
@@ -120,6 +127,124 @@ def save_workbook_to_bytes(workbook: Workbook) -> bytes:
     return output.getvalue()
 
 
+def _shift_range(cell_range: CellRange, doomed: list[int]) -> CellRange | None:
+    """``cell_range`` after deleting ``doomed`` rows, or None if none survive."""
+    first = bisect_left(doomed, cell_range.min_row)
+    last = bisect_right(doomed, cell_range.max_row)
+    if last - first == cell_range.max_row - cell_range.min_row + 1:
+        return None
+    # Rows above the range shift it up; deleted rows inside only shrink it.
+    return CellRange(
+        min_col=cell_range.min_col,
+        min_row=cell_range.min_row - first,
+        max_col=cell_range.max_col,
+        max_row=cell_range.max_row - last,
+    )
+
+
+def _shift_multi_range(ranges: MultiCellRange, doomed: list[int]) -> MultiCellRange:
+    shifted = (_shift_range(cell_range, doomed) for cell_range in ranges.ranges)
+    return MultiCellRange([cell_range for cell_range in shifted if cell_range is not None])
+
+
+def _unmerge_placeholder(ws: Worksheet, row: int, column: int) -> Cell:
+    """Make sure the cell at ``(row, column)`` is a real cell, keeping its style."""
+    cell = ws._cells.get((row, column))
+    if isinstance(cell, MergedCell):
+        replacement = Cell(ws, row=row, column=column)
+        replacement._style = cell._style
+        ws._cells[(row, column)] = replacement
+        return replacement
+    return ws.cell(row=row, column=column)
+
+
+def delete_rows_bulk(ws: Worksheet, rows: Iterable[int]) -> int:
+    """Delete every row in ``rows`` from ``ws`` in a single pass.
+
+    ``ws.delete_rows`` shifts every cell below the deleted row on each call,
+    so deleting rows one at a time is quadratic. This rebuilds the cell map
+    once and, unlike ``ws.delete_rows``, also moves what the in-place tools
+    promise to keep with the rows: row dimensions, merged ranges,
+    conditional formatting, data validations and the auto-filter range.
+    Ranges that lose all their rows are dropped, ranges that lose some are
+    shrunk. Formulas are not rewritten, matching ``ws.delete_rows``.
+
+    Returns the number of distinct rows deleted.
+    """
+    doomed = sorted({row for row in rows if row >= 1})
+    if not doomed:
+        return 0
+    doomed_set = set(doomed)
+
+    # removed_before[r] is how many deleted rows sit above row r; every row
+    # past the last deleted one moves up by len(doomed).
+    removed_before = [0] * (doomed[-1] + 1)
+    count = 0
+    for row in range(1, doomed[-1] + 1):
+        removed_before[row] = count
+        if row in doomed_set:
+            count += 1
+
+    def new_row(row: int) -> int:
+        return row - (removed_before[row] if row < len(removed_before) else count)
+
+    cells: dict[tuple[int, int], Any] = {}
+    for (row, column), cell in ws._cells.items():
+        if row in doomed_set:
+            continue
+        target = new_row(row)
+        cell.row = target
+        cells[(target, column)] = cell
+        if cell.hyperlink is not None:
+            cell.hyperlink.ref = cell.coordinate
+    ws._cells = cells
+
+    dimensions = [
+        (new_row(index), dimension)
+        for index, dimension in ws.row_dimensions.items()
+        if index not in doomed_set
+    ]
+    ws.row_dimensions.clear()
+    for index, dimension in dimensions:
+        dimension.index = index
+        ws.row_dimensions[index] = dimension
+
+    # Ranges hash by their bounds, so the merged set is rebuilt after moving them.
+    kept_merges = []
+    for merged in ws.merged_cells.ranges:
+        shifted = _shift_range(merged, doomed)
+        if shifted is None:
+            continue
+        if shifted.min_row == shifted.max_row and shifted.min_col == shifted.max_col:
+            _unmerge_placeholder(ws, shifted.min_row, shifted.min_col)
+            continue
+        merged.min_row = shifted.min_row
+        merged.max_row = shifted.max_row
+        merged.start_cell = _unmerge_placeholder(ws, merged.min_row, merged.min_col)
+        kept_merges.append(merged)
+    ws.merged_cells.ranges = set(kept_merges)
+
+    formatting = ws.conditional_formatting
+    rules_by_range = list(formatting._cf_rules.items())
+    formatting._cf_rules.clear()
+    for conditional, rules in rules_by_range:
+        conditional.sqref = _shift_multi_range(conditional.sqref, doomed)
+        if conditional.sqref:
+            formatting._cf_rules.setdefault(conditional, []).extend(rules)
+
+    validations = ws.data_validations
+    for validation in validations.dataValidation:
+        validation.sqref = _shift_multi_range(validation.sqref, doomed)
+    validations.dataValidation = [v for v in validations.dataValidation if v.sqref]
+
+    if ws.auto_filter.ref:
+        shifted = _shift_range(CellRange(ws.auto_filter.ref), doomed)
+        ws.auto_filter.ref = shifted.coord if shifted is not None else None
+
+    ws._current_row = ws.max_row if ws._cells else 0
+    return len(doomed)
+
+
 def header_index_map(
     sheet: Any,
     *,
@@ -1,16 +1,37 @@
 from __future__ import annotations
 
+import copy
+import io
+import mmap
 from io import BytesIO
-from tempfile import NamedTemporaryFile
-from typing import Any
+from typing import Any, BinaryIO, Iterator, Literal, Union
+from warnings import warn
 import zipfile
 import xml.etree.ElementTree as ET
+from xml.etree.ElementTree import Element, SubElement
+from xml.parsers import expat
 
 import xlrd
 from fastapi import HTTPException
 from openpyxl import load_workbook
+from openpyxl.reader.excel import ExcelReader
+from openpyxl.styles.stylesheet import apply_stylesheet
+from openpyxl.utils import column_index_from_string
+from openpyxl.utils.datetime import from_excel, from_ISO8601
+from openpyxl.worksheet._read_only import ReadOnlyWorksheet
+from openpyxl.worksheet._reader import CELL_TAG, FORMULA_TAG, WorkSheetParser, _cast_number
+from openpyxl.xml.constants import SHARED_STRINGS, SHEET_MAIN_NS
 from pyxlsb import open_workbook as open_xlsb_workbook
 
+from app.services.ooxml_zip import copy_member_raw
+from app.services.workbook_cache import (
+    CacheKey,
+    ParsedWorkbook,
+    get_workbook_cache,
+    workbook_cache_key,
+)
+from app.services.workbook_inspection import inspect_workbook
+
 SUPPORTED_EXCEL_EXTENSIONS = (
     ".xlsx",
     ".xls",
@@ -45,57 +66,393 @@ def ensure_supported_excel_filename(filename: str | None):
         raise HTTPException(status_code=400, detail=f"Unsupported file type, expected one of: {expected}")
 
 
-_ZIP_MAGIC = b"PK\x03\x04"
-_OLE_MAGIC = b"\xd0\xcf\x11\xe0"
+# Tool routes hand readers either the upload bytes or the spooled upload
+# handle itself; readers accept both so large uploads are never copied into
+# an intermediate ``bytes`` just to be wrapped in ``BytesIO`` again.
+ExcelSource = Union[bytes, BinaryIO]
+
+
+def source_stream(source: ExcelSource) -> BinaryIO:
+    """Return a seekable binary stream over ``source``, rewound to the start."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return BytesIO(source)
+    source.seek(0)
+    return source
+
+
+def source_bytes(source: ExcelSource) -> bytes:
+    """Return the full contents of ``source`` (copies when it is a stream)."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+    source.seek(0)
+    return source.read()
+
+
+def _mapped_view(source: ExcelSource) -> bytes | mmap.mmap:
+    """Buffer view for readers that need one (xlrd).
+
+    Uploads that have rolled over to disk are memory-mapped instead of read
+    into a ``bytes`` object; small in-memory spools are simply read.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return source
+    # SpooledTemporaryFile.fileno() forces a rollover, so only map spools that
+    # are already backed by a real file.
+    if getattr(source, "_rolled", True):
+        try:
+            return mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+            pass
+    return source_bytes(source)
 
 
-def _validate_magic_bytes(raw: bytes, extension: str):
+def _validate_magic_bytes(source: ExcelSource, extension: str):
+    container = inspect_workbook(source).container
     if extension in _OPENPYXL_EXTENSIONS | _PYXLSB_EXTENSIONS:
-        if not raw[:4].startswith(_ZIP_MAGIC):
+        if container != "zip":
             raise HTTPException(status_code=400, detail="File content does not match expected format")
     elif extension in _XLRD_EXTENSIONS:
-        if not raw[:4].startswith(_OLE_MAGIC):
+        if container != "ole":
             raise HTTPException(status_code=400, detail="File content does not match expected format")
 
 
-def _read_openpyxl_values(raw: bytes) -> dict[str, list[list[Any]]]:
-    wb_data = load_workbook(
-        filename=BytesIO(raw),
-        read_only=True,
-        data_only=True,
-        keep_links=False,
-    )
-    data: dict[str, list[list[Any]]] = {}
-    has_none = False
-    for sheet in wb_data.worksheets:
-        rows = [list(row) for row in sheet.iter_rows(values_only=True)]
-        data[sheet.title] = rows
-        if not has_none and any(cell is None for row in rows for cell in row):
-            has_none = True
-    wb_data.close()
-
-    if not has_none:
-        return data
-
-    wb_formula = load_workbook(
-        filename=BytesIO(raw),
-        read_only=True,
-        data_only=False,
-        keep_links=False,
-    )
-    for sheet in wb_formula.worksheets:
-        if sheet.title not in data:
-            continue
-        data_rows = data[sheet.title]
-        for r, row in enumerate(sheet.iter_rows(values_only=True)):
-            if r >= len(data_rows):
+class _CachedValueOrFormulaParser(WorkSheetParser):
+    """Worksheet parser yielding each cell's cached value, or its formula.
+
+    Equivalent to reading with ``data_only=True`` and then back-filling the
+    ``None`` cells from a ``data_only=False`` pass, but both come from the
+    same ``<c>`` element, so every worksheet XML is parsed once.
+    """
+
+    def parse_cell(self, element):
+        cell = super().parse_cell(element)
+        formula = element.find(FORMULA_TAG)
+        if formula is None:
+            return cell
+        if cell["value"] is None:
+            cell["value"] = self.parse_formula(element)
+            cell["data_type"] = "f"
+        elif formula.get("t") == "shared" and formula.text is not None:
+            # Register the shared-formula master even though its cached value
+            # is used, so dependents without a cached value can be translated.
+            self.parse_formula(element)
+        return cell
+
+
+def _iter_sheet_rows(ws: ReadOnlyWorksheet) -> Iterator[list[Any]]:
+    """``ws.iter_rows(values_only=True)`` driven by the single-pass parser.
+
+    Mirrors ``ReadOnlyWorksheet._cells_by_row``: rows missing from the XML
+    are filled with empty rows and every row is padded to the sheet width.
+    """
+    wb = ws.parent
+    max_col = ws.max_column
+    max_row = ws.max_row
+    empty_row: list[Any] = [None] * max_col if max_col is not None else []
+    emitted = 0
+
+    with ws._get_source() as src:
+        parser = _CachedValueOrFormulaParser(
+            src,
+            ws._shared_strings,
+            data_only=True,
+            epoch=wb.epoch,
+            date_formats=wb._date_formats,
+            timedelta_formats=wb._timedelta_formats,
+        )
+        for idx, row in parser.parse():
+            if max_row is not None and idx > max_row:
                 break
-            for c, val in enumerate(row):
-                if c < len(data_rows[r]) and data_rows[r][c] is None and val is not None:
-                    data_rows[r][c] = val
-    wb_formula.close()
-
-    return data
+            if idx <= emitted:
+                continue
+            while emitted < idx - 1:
+                emitted += 1
+                yield list(empty_row)
+            emitted += 1
+            yield list(ws._get_row(row, 1, max_col, values_only=True))
+
+
+ReaderEngine = Literal["openpyxl", "iterparse"]
+READER_ENGINES: tuple[str, ...] = ("openpyxl", "iterparse")
+
+_NS = SHEET_MAIN_NS + "}"
+_SI_TAG = _NS + "si"
+_IS_TAG = _NS + "is"
+_T_TAG = _NS + "t"
+_RPH_TAG = _NS + "rPh"
+_ROW_TAG = _NS + "row"
+_C_TAG = _NS + "c"
+_V_TAG = _NS + "v"
+_F_TAG = _NS + "f"
+_ROW_DIGITS = "0123456789"
+_XML_READ_CHUNK = 64 * 1024
+
+
+class _StopParsing(Exception):
+    pass
+
+
+def _forbid_entities(*_args: Any) -> None:
+    raise ValueError("Entity declarations are not allowed in workbook XML")
+
+
+def _stream_xml(src: BinaryIO, start, end, characters) -> Iterator[None]:
+    """Drive a namespace-aware expat parser over ``src`` in fixed-size chunks.
+
+    Yields after every chunk so callers can drain what the handlers collected.
+    Entity declarations are rejected, matching the defusedxml parser openpyxl
+    uses. A handler may raise :class:`_StopParsing` to end the pass early.
+    """
+    parser = expat.ParserCreate(namespace_separator="}")
+    parser.buffer_text = True
+    parser.EntityDeclHandler = _forbid_entities
+    parser.UnparsedEntityDeclHandler = _forbid_entities
+    parser.ExternalEntityRefHandler = _forbid_entities
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = characters
+    try:
+        while chunk := src.read(_XML_READ_CHUNK):
+            parser.Parse(chunk, False)
+            yield
+        parser.Parse(b"", True)
+    except _StopParsing:
+        pass
+
+
+def _read_shared_strings(src: BinaryIO) -> list[str]:
+    """Pre-decode the shared-string table to plain text.
+
+    Same result as openpyxl's ``read_string_table`` (``Text.content``, rich
+    runs concatenated, phonetic runs dropped) without building an object per
+    entry.
+    """
+    strings: list[str] = []
+    parts: list[str] = []
+    capture: list[str] | None = None
+    in_entry = False
+    phonetic = 0
+
+    def start(name: str, _attrs: dict[str, str]) -> None:
+        nonlocal capture, in_entry, phonetic
+        if name == _T_TAG:
+            if in_entry and not phonetic:
+                capture = parts
+        elif name == _SI_TAG:
+            in_entry = True
+            parts.clear()
+        elif name == _RPH_TAG:
+            phonetic += 1
+
+    def end(name: str) -> None:
+        nonlocal capture, in_entry, phonetic
+        if name == _T_TAG:
+            capture = None
+        elif name == _SI_TAG:
+            in_entry = False
+            strings.append("".join(parts).replace("x005F_", ""))
+        elif name == _RPH_TAG:
+            phonetic -= 1
+
+    def characters(data: str) -> None:
+        if capture is not None:
+            capture.append(data)
+
+    for _ in _stream_xml(src, start, end, characters):
+        pass
+    return strings
+
+
+class _SheetValueCollector:
+    """expat handlers turning one worksheet's ``<sheetData>`` into value rows.
+
+    Produces exactly what :func:`_iter_sheet_rows` produces — cached value,
+    else formula text, rows filled and padded to the sheet dimension — but
+    decodes each ``<c>`` straight from the parser callbacks instead of going
+    through ElementTree elements and openpyxl cell dicts.
+    """
+
+    def __init__(self, ws: ReadOnlyWorksheet) -> None:
+        wb = ws.parent
+        self.strings = ws._shared_strings
+        # Style ids as they appear in ``s="…"``, so number cells skip ``int()``.
+        self.date_styles = {str(style_id) for style_id in wb._date_formats}
+        self.timedelta_styles = {str(style_id) for style_id in wb._timedelta_formats}
+        self.epoch = wb.epoch
+        self.max_col = ws.max_column
+        self.max_row = ws.max_row
+        self.empty_row: list[Any] = [None] * self.max_col if self.max_col is not None else []
+        # Only consulted for the formula fallback, which needs shared-formula state.
+        self.formulas = _CachedValueOrFormulaParser(None, self.strings)
+        self.column_cache: dict[str, int] = {}
+        # Completed rows not yet handed out; drained by ``_stream_sheet_rows``.
+        self.rows: list[list[Any]] = []
+        self.row_count = 0
+        self.row_counter = 0
+        self.skip_row = False
+        self.cells: list[tuple[int, Any]] = []
+        self.col = 0
+        self.ref: str | None = None
+        self.data_type = "n"
+        self.style_id: str | None = None
+        self.value: str | None = None
+        self.formula: dict[str, str] | None = None
+        self.formula_text: str | None = None
+        self.inline: list[str] | None = None
+        self.phonetic = 0
+        self.capture: list[str] | None = None
+
+    def start(self, name: str, attrs: dict[str, str]) -> None:
+        if name == _C_TAG:
+            if self.skip_row:
+                return
+            ref = attrs.get("r")
+            if ref:
+                letters = ref.rstrip(_ROW_DIGITS)
+                col = self.column_cache.get(letters)
+                if col is None:
+                    col = self.column_cache[letters] = column_index_from_string(letters)
+                self.col = col
+            else:
+                self.col += 1
+            self.ref = ref
+            self.data_type = attrs.get("t", "n")
+            self.style_id = attrs.get("s")
+            self.value = None
+            self.formula = None
+            self.formula_text = None
+            self.inline = None
+        elif name == _V_TAG or name == _F_TAG:
+            if self.skip_row:
+                return
+            if name == _F_TAG:
+                self.formula = attrs
+            self.capture = []
+        elif name == _ROW_TAG:
+            self._start_row(attrs.get("r"))
+        elif name == _IS_TAG:
+            self.inline = []
+        elif name == _T_TAG:
+            if self.inline is not None and not self.phonetic:
+                self.capture = self.inline
+        elif name == _RPH_TAG:
+            self.phonetic += 1
+
+    def end(self, name: str) -> None:
+        if name == _V_TAG:
+            if self.capture is not None:
+                self.value = "".join(self.capture) or None
+                self.capture = None
+        elif name == _C_TAG:
+            if not self.skip_row:
+                self._end_cell()
+        elif name == _F_TAG:
+            if self.capture is not None:
+                self.formula_text = "".join(self.capture) or None
+                self.capture = None
+        elif name == _T_TAG:
+            self.capture = None
+        elif name == _ROW_TAG:
+            if not self.skip_row:
+                self._end_row()
+        elif name == _RPH_TAG:
+            self.phonetic -= 1
+
+    def characters(self, data: str) -> None:
+        if self.capture is not None:
+            self.capture.append(data)
+
+    def _start_row(self, r_attr: str | None) -> None:
+        if r_attr:
+            try:
+                self.row_counter = int(r_attr)
+            except ValueError:
+                as_float = float(r_attr)
+                if not as_float.is_integer():
+                    raise ValueError(f"{r_attr} is not a valid row number")
+                self.row_counter = int(as_float)
+        else:
+            self.row_counter += 1
+        if self.max_row is not None and self.row_counter > self.max_row:
+            raise _StopParsing
+        self.skip_row = self.row_counter <= self.row_count
+        self.cells = []
+        self.col = 0
+
+    def _end_cell(self) -> None:
+        data_type = self.data_type
+        raw = self.value
+        value: Any = None
+        if data_type == "inlineStr":
+            if self.inline is not None:
+                value = "".join(self.inline)
+        elif raw is not None:
+            if data_type == "n":
+                value = _cast_number(raw)
+                style_id = self.style_id or "0"
+                if style_id in self.date_styles:
+                    try:
+                        value = from_excel(
+                            value, self.epoch, timedelta=style_id in self.timedelta_styles
+                        )
+                    except (OverflowError, ValueError):
+                        warn(
+                            f"Cell {self.ref} is marked as a date but the serial value "
+                            f"{value} is outside the limits for dates. The cell will "
+                            "be treated as an error."
+                        )
+                        value = "#VALUE!"
+            elif data_type == "s":
+                value = self.strings[int(raw)]
+            elif data_type == "b":
+                value = bool(int(raw))
+            elif data_type == "d":
+                value = from_ISO8601(raw)
+            else:
+                value = raw
+
+        if self.formula is not None:
+            if value is None:
+                value = self._parse_formula()
+            elif self.formula.get("t") == "shared" and self.formula_text is not None:
+                self._parse_formula()
+
+        if value is not None or self.max_col is None:
+            # An unsized sheet is as wide as the last cell present, empty or not.
+            self.cells.append((self.col, value))
+
+    def _parse_formula(self) -> Any:
+        if "t" not in self.formula:
+            # A plain formula needs no shared-formula state; skip the element.
+            return "=" + (self.formula_text or "")
+        cell = Element(CELL_TAG, {"r": self.ref} if self.ref else {})
+        formula = SubElement(cell, FORMULA_TAG, self.formula)
+        formula.text = self.formula_text
+        return self.formulas.parse_formula(cell)
+
+    def _end_row(self) -> None:
+        rows = self.rows
+        while self.row_count < self.row_counter - 1:
+            self.row_count += 1
+            rows.append(list(self.empty_row))
+        cells = self.cells
+        width = self.max_col if self.max_col is not None else (cells[-1][0] if cells else 0)
+        values: list[Any] = [None] * width
+        for col, value in cells:
+            if 1 <= col <= width:
+                values[col - 1] = value
+        self.row_count += 1
+        rows.append(values)
+
+
+def _stream_sheet_rows(ws: ReadOnlyWorksheet) -> Iterator[list[Any]]:
+    collector = _SheetValueCollector(ws)
+    with ws._get_source() as src:
+        for _ in _stream_xml(src, collector.start, collector.end, collector.characters):
+            if collector.rows:
+                rows, collector.rows = collector.rows, []
+                yield from rows
+    yield from collector.rows
 
 
 def _strip_visual_relationships(xml_bytes: bytes) -> bytes:
@@ -135,11 +492,18 @@ def _strip_visual_relationships(xml_bytes: bytes) -> bytes:
     return ET.tostring(root, encoding="utf-8", xml_declaration=True)
 
 
-def _sanitize_openxml_for_data_read(raw: bytes) -> bytes:
-    source = BytesIO(raw)
+def _sanitize_openxml_for_data_read(source: ExcelSource) -> bytes:
+    """``source`` without its drawing parts and the relationships pointing at them.
+
+    Only the ``.rels`` parts that lose a relationship are re-encoded; every
+    other member keeps its compressed bytes (see :func:`copy_member_raw`),
+    so large worksheets are not inflated and deflated again.
+    """
     output = BytesIO()
 
-    with zipfile.ZipFile(source, "r") as zin, zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as zout:
+    with zipfile.ZipFile(source_stream(source), "r") as zin, zipfile.ZipFile(
+        output, "w", zipfile.ZIP_DEFLATED
+    ) as zout:
         for item in zin.infolist():
             name = item.filename.replace("\\", "/")
             lower_name = name.lower()
@@ -147,62 +511,349 @@ def _sanitize_openxml_for_data_read(raw: bytes) -> bytes:
             if lower_name.startswith(_DRAWING_PREFIXES):
                 continue
 
-            payload = zin.read(item.filename)
             if lower_name.endswith(".rels"):
-                payload = _strip_visual_relationships(payload)
+                payload = zin.read(item.filename)
+                stripped = _strip_visual_relationships(payload)
+                if stripped is not payload:
+                    zout.writestr(name, stripped)
+                    continue
 
-            zout.writestr(name, payload)
+            if name != item.filename:
+                item = copy.copy(item)
+                item.filename = name
+            copy_member_raw(zin, item, zout)
 
     return output.getvalue()
 
 
-def parse_excel_bytes(raw: bytes, filename: str | None) -> dict[str, list[list[Any]]]:
-    extension = _extract_extension(filename)
-    ensure_supported_excel_filename(filename)
-    _validate_magic_bytes(raw, extension)
+class _OpenpyxlSheets:
+    """Read-only openpyxl workbook; rows come from the single-pass parser."""
+
+    def __init__(self, source: ExcelSource) -> None:
+        self._wb = load_workbook(
+            filename=source_stream(source),
+            read_only=True,
+            data_only=True,
+            keep_links=False,
+        )
+        self._sheets = {ws.title: ws for ws in self._wb.worksheets}
+        self.sheet_names = list(self._sheets)
+
+    def iter_rows(self, sheet_name: str) -> Iterator[list[Any]]:
+        return _iter_sheet_rows(self._sheets[sheet_name])
+
+    def row_count_hint(self, sheet_name: str) -> int | None:
+        return self._sheets[sheet_name].max_row
+
+    def close(self) -> None:
+        self._wb.close()
+
+
+class _IterparseSheets:
+    """Workbook structure from openpyxl, rows streamed through expat.
+
+    openpyxl still resolves the workbook part, sheet order, styles and epoch;
+    the shared strings and each worksheet are streamed once with no per-cell
+    objects.
+    """
+
+    def __init__(self, source: ExcelSource) -> None:
+        reader = ExcelReader(
+            source_stream(source),
+            read_only=True,
+            data_only=True,
+            keep_links=False,
+        )
+        self._archive = reader.archive
+        try:
+            reader.read_manifest()
+            strings_part = reader.package.find(SHARED_STRINGS)
+            if strings_part is not None:
+                with reader.archive.open(strings_part.PartName[1:]) as src:
+                    reader.shared_strings = _read_shared_strings(src)
+            reader.read_workbook()
+            apply_stylesheet(reader.archive, reader.wb)
+            reader.read_worksheets()
+        except Exception:
+            self._archive.close()
+            raise
+        self._sheets = {ws.title: ws for ws in reader.wb.worksheets}
+        self.sheet_names = list(self._sheets)
+
+    def iter_rows(self, sheet_name: str) -> Iterator[list[Any]]:
+        return _stream_sheet_rows(self._sheets[sheet_name])
+
+    def row_count_hint(self, sheet_name: str) -> int | None:
+        return self._sheets[sheet_name].max_row
+
+    def close(self) -> None:
+        self._archive.close()
+
+
+class _XlrdSheets:
+    """Legacy .xls via xlrd; sheets are loaded on demand and unloaded after use."""
+
+    def __init__(self, source: ExcelSource) -> None:
+        self._contents = _mapped_view(source)
+        try:
+            self._book = xlrd.open_workbook(file_contents=self._contents, on_demand=True)
+        except Exception:
+            self._close_contents()
+            raise
+        self.sheet_names = self._book.sheet_names()
+
+    def iter_rows(self, sheet_name: str) -> Iterator[list[Any]]:
+        sheet = self._book.sheet_by_name(sheet_name)
+        try:
+            for row_index in range(sheet.nrows):
+                yield [sheet.cell_value(row_index, col_index) for col_index in range(sheet.ncols)]
+        finally:
+            self._book.unload_sheet(sheet_name)
+
+    def row_count_hint(self, sheet_name: str) -> int | None:
+        return None
+
+    def _close_contents(self) -> None:
+        if isinstance(self._contents, mmap.mmap):
+            self._contents.close()
+
+    def close(self) -> None:
+        self._book.release_resources()
+        self._close_contents()
+
+
+class _XlsbSheets:
+    def __init__(self, source: ExcelSource) -> None:
+        # pyxlsb opens its input with ZipFile, so the upload handle is read
+        # directly instead of being copied to a named temp file.
+        self._book = open_xlsb_workbook(source_stream(source))
+        self.sheet_names = list(self._book.sheets)
+
+    def iter_rows(self, sheet_name: str) -> Iterator[list[Any]]:
+        with self._book.get_sheet(sheet_name) as sheet:
+            for row in sheet.rows():
+                values = [cell.v for cell in row]
+                while values and values[-1] is None:
+                    values.pop()
+                yield values
+
+    def row_count_hint(self, sheet_name: str) -> int | None:
+        return None
+
+    def close(self) -> None:
+        self._book.close()
+
+
+class _CachedSheets:
+    """Rows served from the parsed-workbook cache; nothing is parsed."""
+
+    def __init__(self, workbook: ParsedWorkbook) -> None:
+        self.workbook = workbook
+        self.sheet_names = list(workbook.sheets)
+
+    def iter_rows(self, sheet_name: str) -> Iterator[list[Any]]:
+        for row in self.workbook.sheets[sheet_name]:
+            yield list(row)
+
+    def row_count_hint(self, sheet_name: str) -> int | None:
+        return len(self.workbook.sheets[sheet_name])
+
+    def close(self) -> None:
+        pass
+
+
+def _read_error() -> HTTPException:
+    # Don't leak internal exception details (file paths, library internals).
+    return HTTPException(
+        status_code=400,
+        detail="Could not read the workbook. The file may be corrupted or in an unsupported format.",
+    )
+
+
+class WorkbookReader:
+    """Lazy, per-sheet view of an uploaded workbook.
+
+    Sheet names are available as soon as the workbook is opened; rows are
+    only parsed when a sheet is iterated, one row at a time, so tools that
+    touch a single sheet (or stream rows straight to their output) never
+    hold the whole workbook in memory. :meth:`materialize` is the eager
+    escape hatch and returns what :func:`parse_excel_bytes` returns.
+
+    .xlsx-family files fall back from the iterparse engine to openpyxl, and
+    from the upload as-is to a copy with visual parts stripped, when opening
+    fails or a sheet fails before any of its rows were handed out
+    (:meth:`materialize` simply starts over). Read failures surface as the
+    usual 400 ``HTTPException``.
+
+    Uploads whose bytes were already parsed with the same engine are served
+    from the shared parsed-workbook cache without parsing; a full
+    :meth:`materialize` populates it.
+    """
+
+    def __init__(
+        self,
+        source: ExcelSource,
+        filename: str | None,
+        *,
+        engine: ReaderEngine = "openpyxl",
+    ) -> None:
+        if engine not in READER_ENGINES:
+            raise ValueError(f"Unknown reader engine: {engine!r}")
+        extension = _extract_extension(filename)
+        ensure_supported_excel_filename(filename)
+        _validate_magic_bytes(source, extension)
 
-    try:
         if extension in _OPENPYXL_EXTENSIONS:
+            openers = [
+                lambda: _OpenpyxlSheets(source),
+                lambda: _OpenpyxlSheets(_sanitize_openxml_for_data_read(source)),
+            ]
+            if engine == "iterparse":
+                openers.insert(0, lambda: _IterparseSheets(source))
+        elif extension in _XLRD_EXTENSIONS:
+            openers = [lambda: _XlrdSheets(source)]
+        elif extension in _PYXLSB_EXTENSIONS:
+            openers = [lambda: _XlsbSheets(source)]
+        else:
+            raise HTTPException(status_code=400, detail="Unsupported workbook format")
+
+        self._openers = openers
+        self._sheets: Any = None
+        self._source = source
+        self._engine = engine
+        self._cache_key: CacheKey | None = None
+
+        cache = get_workbook_cache()
+        # The upload is only hashed when a lookup could hit or a full read is
+        # stored; streaming callers on an empty cache never pay for it.
+        if cache.enabled and len(cache):
+            cached = cache.get(self._key())
+            if cached is not None:
+                self._openers = []
+                self._sheets = _CachedSheets(cached)
+                return
+        self._next_backend(None)
+
+    def _key(self) -> CacheKey:
+        if self._cache_key is None:
+            self._cache_key = workbook_cache_key(self._source, self._engine)
+        return self._cache_key
+
+    def _store(self, workbook: ParsedWorkbook) -> None:
+        cache = get_workbook_cache()
+        if cache.enabled:
+            cache.put(self._key(), workbook)
+
+    @property
+    def cached(self) -> bool:
+        """True when rows come from the parsed-workbook cache."""
+        return isinstance(self._sheets, _CachedSheets)
+
+    def _next_backend(self, error: Exception | None) -> None:
+        if self._sheets is not None:
+            self._sheets.close()
+            self._sheets = None
+        while self._openers:
+            try:
+                self._sheets = self._openers.pop(0)()
+                return
+            except HTTPException:
+                raise
+            except Exception as exc:
+                error = exc
+        raise _read_error() from error
+
+    @property
+    def sheet_names(self) -> list[str]:
+        return list(self._sheets.sheet_names)
+
+    def iter_rows(self, sheet_name: str) -> Iterator[list[Any]]:
+        """Yield the rows of ``sheet_name`` lazily; raises ``KeyError`` if it is missing."""
+        if sheet_name not in self._sheets.sheet_names:
+            raise KeyError(sheet_name)
+        return self._iter_rows(sheet_name)
+
+    def _iter_rows(self, sheet_name: str) -> Iterator[list[Any]]:
+        started = False
+        while True:
+            try:
+                for row in self._sheets.iter_rows(sheet_name):
+                    started = True
+                    yield row
+                return
+            except HTTPException:
+                raise
+            except Exception as error:
+                if started:
+                    raise _read_error() from error
+                self._next_backend(error)
+
+    def row_count_hint(self, sheet_name: str) -> int | None:
+        """Row count declared by the sheet's ``<dimension>``, if the format has one.
+
+        Only a hint: files written by other tools may carry a stale or
+        missing dimension. ``None`` when unknown.
+        """
+        if sheet_name not in self._sheets.sheet_names:
+            raise KeyError(sheet_name)
+        return self._sheets.row_count_hint(sheet_name)
+
+    def read_sheet(self, sheet_name: str) -> list[list[Any]]:
+        return list(self.iter_rows(sheet_name))
+
+    def _read_all(self) -> dict[str, list[list[Any]]]:
+        while True:
             try:
-                return _read_openpyxl_values(raw)
-            except Exception:
-                sanitized = _sanitize_openxml_for_data_read(raw)
-                return _read_openpyxl_values(sanitized)
-
-        if extension in _XLRD_EXTENSIONS:
-            workbook = xlrd.open_workbook(file_contents=raw)
-            data = {}
-            for sheet in workbook.sheets():
-                rows: list[list[Any]] = []
-                for row_index in range(sheet.nrows):
-                    rows.append([sheet.cell_value(row_index, col_index) for col_index in range(sheet.ncols)])
-                data[sheet.name] = rows
-            return data
-
-        if extension in _PYXLSB_EXTENSIONS:
-            data = {}
-            with NamedTemporaryFile(delete=True, suffix=extension) as temp:
-                temp.write(raw)
-                temp.flush()
-                with open_xlsb_workbook(temp.name) as workbook:
-                    for sheet_name in workbook.sheets:
-                        rows: list[list[Any]] = []
-                        with workbook.get_sheet(sheet_name) as sheet:
-                            for row in sheet.rows():
-                                values = [cell.v for cell in row]
-                                while values and values[-1] is None:
-                                    values.pop()
-                                rows.append(values)
-                        data[sheet_name] = rows
-            return data
-
-    except HTTPException:
-        raise
-    except Exception as error:
-        # Don't leak internal exception details (file paths, library internals).
-        raise HTTPException(
-            status_code=400,
-            detail="Could not read the workbook. The file may be corrupted or in an unsupported format.",
-        ) from error
-
-    raise HTTPException(status_code=400, detail="Unsupported workbook format")
+                return {
+                    name: list(self._sheets.iter_rows(name)) for name in self._sheets.sheet_names
+                }
+            except HTTPException:
+                raise
+            except Exception as error:
+                self._next_backend(error)
+
+    def parsed(self) -> ParsedWorkbook:
+        """Every sheet as an immutable :class:`ParsedWorkbook`, shared with the cache."""
+        if isinstance(self._sheets, _CachedSheets):
+            return self._sheets.workbook
+        workbook = ParsedWorkbook.from_lists(self._read_all())
+        self._store(workbook)
+        return workbook
+
+    def materialize(self) -> dict[str, list[list[Any]]]:
+        """Every sheet as nested lists, for tools that need random access."""
+        if isinstance(self._sheets, _CachedSheets):
+            return self._sheets.workbook.to_lists()
+        workbook_data = self._read_all()
+        if get_workbook_cache().enabled:
+            self._store(ParsedWorkbook.from_lists(workbook_data))
+        return workbook_data
+
+    def close(self) -> None:
+        if self._sheets is not None:
+            self._sheets.close()
+            self._sheets = None
+
+    def __enter__(self) -> "WorkbookReader":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def parse_excel_bytes(
+    source: ExcelSource,
+    filename: str | None,
+    *,
+    engine: ReaderEngine = "openpyxl",
+) -> dict[str, list[list[Any]]]:
+    """Read every sheet's values from ``source`` (bytes or a seekable upload handle).
+
+    ``engine="iterparse"`` selects the streaming value-only reader for
+    .xlsx-family files. It returns the same shape and values as the default
+    engine and falls back to it on any parse error. The engine is ignored
+    for .xls/.xlsb. Prefer :class:`WorkbookReader` when only some sheets or
+    a single pass over the rows is needed.
+    """
+    with WorkbookReader(source, filename, engine=engine) as reader:
+        return reader.materialize()
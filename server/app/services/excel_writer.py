@@ -0,0 +1,127 @@
+"""Streaming .xlsx output for tools that rebuild a workbook from row data.
+
+Tools that only produce values (conversions, merges, splits, data-only
+cleaning) used to build a regular openpyxl ``Workbook`` and ``append`` into
+it, which keeps a full ``Cell`` object alive for every output cell until the
+workbook is saved. :class:`WorkbookWriter` uses openpyxl's write-only mode
+instead: every row is serialised to the sheet's temporary XML file as soon as
+it is appended, so a sheet can be fed from a generator without ever being
+held in memory.
+
+Sheet titles follow the same rules as a regular workbook (openpyxl validates
+them and de-duplicates clashes), and each sheet gets the ``<dimension>`` a
+regular workbook would have written, so our own readers pad rows of the
+output exactly as they did before.
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from typing import Any, BinaryIO, Iterable
+
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet._write_only import WriteOnlyWorksheet
+
+__all__ = ["WorkbookWriter"]
+
+# The write-only serializer emits ``<sheetPr>`` and then ``<sheetViews>``; the
+# dimension belongs between the two and the whole prefix is well under this.
+_HEAD_BYTES = 4096
+_DIMENSION_ANCHOR = b"<sheetViews"
+
+
+def _insert_dimension(path: str, ref: str) -> None:
+    """Splice ``<dimension ref=...>`` into a closed write-only sheet file."""
+    with open(path, "rb") as src:
+        head = src.read(_HEAD_BYTES)
+        anchor = head.find(_DIMENSION_ANCHOR)
+        if anchor < 0:
+            return
+        fd, patched = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as dst:
+            dst.write(head[:anchor])
+            dst.write(b'<dimension ref="%s" />' % ref.encode("ascii"))
+            dst.write(head[anchor:])
+            shutil.copyfileobj(src, dst)
+    os.replace(patched, path)
+
+
+class WorkbookWriter:
+    """Write-only workbook built one sheet at a time from row iterables.
+
+    Rows are appended as they arrive; ``blank_none=True`` writes ``None``
+    cells as empty strings, which is how the rebuild-from-data tools have
+    always written gaps. A workbook saved without any sheet gets an empty
+    ``Sheet1``. Use it as a context manager so the per-sheet temp files are
+    removed when a tool bails out before saving.
+    """
+
+    def __init__(self) -> None:
+        self._wb = Workbook(write_only=True)
+
+    @property
+    def sheet_names(self) -> list[str]:
+        return list(self._wb.sheetnames)
+
+    def write_sheet(
+        self,
+        title: str,
+        rows: Iterable[Iterable[Any]],
+        *,
+        blank_none: bool = False,
+    ) -> str:
+        """Create a sheet, stream ``rows`` into it and return its final title."""
+        ws: WriteOnlyWorksheet = self._wb.create_sheet(title)
+        row_index = 0
+        min_row = max_row = max_col = 0
+        for row in rows:
+            if blank_none:
+                values = ["" if value is None else value for value in row]
+            else:
+                values = list(row)
+            ws.append(values)
+            row_index += 1
+            if values:
+                min_row = min_row or row_index
+                max_row = row_index
+                max_col = max(max_col, len(values))
+        ws.close()
+
+        if max_row:
+            ref = f"A{min_row}:{get_column_letter(max_col)}{max_row}"
+        else:
+            ref = "A1:A1"
+        _insert_dimension(ws._writer.out, ref)
+        return ws.title
+
+    def save(self, target: str | BinaryIO) -> None:
+        """Write the .xlsx to a path or binary file (a temp file works)."""
+        if not self._wb.worksheets:
+            self.write_sheet("Sheet1", ())
+        self._wb.save(target)
+
+    def to_bytes(self) -> bytes:
+        output = BytesIO()
+        self.save(output)
+        return output.getvalue()
+
+    def close(self) -> None:
+        # Saved sheets have already cleaned up after themselves.
+        for ws in self._wb.worksheets:
+            writer = ws._writer
+            if writer is None:
+                continue
+            if not ws.closed and ws._rows is not None:
+                ws._rows.close()
+            writer.close()
+            if os.path.exists(writer.out):
+                os.remove(writer.out)
+
+    def __enter__(self) -> "WorkbookWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
@@ -0,0 +1,354 @@
+"""Edit string cell values by rewriting worksheet XML in place.
+
+``load_workbook_for_edit`` round-trips the whole workbook through openpyxl:
+every sheet is loaded with all of its styles, and whatever openpyxl does not
+model (shapes, some charts, slicers, sparklines) is lost on save. Tools that
+only change string values (trim spaces, change case, find and replace) need
+none of that. :func:`mutate_string_cells` rewrites just the ``<c>`` elements
+it changes in the targeted worksheet parts, appends new entries to
+``sharedStrings.xml`` when a shared string changes, and copies every other
+member of the package byte-for-byte (see :mod:`app.services.ooxml_zip`).
+
+It returns ``None`` for packages outside what it handles (cells without a
+reference, a non-UTF-8 part, a value that is not text); callers then fall
+back to the openpyxl path.
+"""
+
+from __future__ import annotations
+
+import re
+import zipfile
+from io import BytesIO
+from typing import Any, Callable
+from xml.sax.saxutils import escape
+
+from fastapi import HTTPException
+from openpyxl.reader.excel import ExcelReader, _find_workbook_part
+from openpyxl.reader.workbook import WorkbookParser
+from openpyxl.utils import column_index_from_string
+from openpyxl.worksheet._reader import _cast_number
+from openpyxl.xml.constants import SHARED_STRINGS
+
+from app.services.excel_reader import ExcelSource, _read_shared_strings, source_stream
+from app.services.ooxml_zip import rewrite_package
+
+__all__ = ["mutate_string_cells"]
+
+_WORKSHEET_REL = "/worksheet"
+_SHEET_DATA_RE = re.compile(rb"<(?:[\w.-]+:)?sheetData\b[^>]*?(/?)>")
+_SHEET_DATA_END_RE = re.compile(rb"</(?:[\w.-]+:)?sheetData>")
+_CELL_RE = re.compile(
+    rb"<(?P<prefix>(?:[\w.-]+:)?)c\b(?P<attrs>[^>]*?)(?:/>|>(?P<body>.*?)</(?P=prefix)c>)",
+    re.DOTALL,
+)
+_ATTR_RE = re.compile(rb'\s(r|t|vm)="([^"]*)"')
+_TYPE_ATTR_RE = re.compile(rb'\st="[^"]*"')
+_REF_RE = re.compile(r"^\$?([A-Za-z]{1,3})\$?(\d+)$")
+_VALUE_RE = re.compile(rb"<(?:[\w.-]+:)?v(?:\s[^>]*)?>(.*?)</(?:[\w.-]+:)?v>", re.DOTALL)
+_INLINE_RE = re.compile(rb"<(?:[\w.-]+:)?is\b.*?</(?:[\w.-]+:)?is>", re.DOTALL)
+_PHONETIC_RE = re.compile(rb"<(?:[\w.-]+:)?rPh\b.*?</(?:[\w.-]+:)?rPh>", re.DOTALL)
+_TEXT_RE = re.compile(rb"<(?:[\w.-]+:)?t(?:\s[^>]*)?>(.*?)</(?:[\w.-]+:)?t>", re.DOTALL)
+_FORMULA_RE = re.compile(rb"<(?:[\w.-]+:)?f\b")
+_EXT_RE = re.compile(rb"<(?:[\w.-]+:)?extLst\b.*?</(?:[\w.-]+:)?extLst>", re.DOTALL)
+_CHAR_REF_RE = re.compile(r"&#(x[0-9A-Fa-f]+|\d+);")
+_NAMED_REFS = {"&lt;": "<", "&gt;": ">", "&quot;": '"', "&apos;": "'", "&amp;": "&"}
+_NAMED_REF_RE = re.compile("|".join(_NAMED_REFS))
+# Characters XML 1.0 cannot carry; OOXML spells them as _xHHHH_.
+_ILLEGAL_XML_RE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_SST_END_RE = re.compile(rb"</(?P<prefix>(?:[\w.-]+:)?)sst>")
+_UNIQUE_COUNT_RE = re.compile(rb'(\suniqueCount=")(\d+)(")')
+_XML_ENCODING_RE = re.compile(rb'^\s*<\?xml[^>]*encoding="([^"]+)"')
+
+
+class _Unsupported(Exception):
+    """The package needs something only the openpyxl path can do."""
+
+
+def _unescape(raw: bytes) -> str:
+    text = raw.decode("utf-8")
+    if "&" not in text:
+        return text
+    text = _CHAR_REF_RE.sub(
+        lambda m: chr(int(m.group(1)[1:], 16) if m.group(1)[0] == "x" else int(m.group(1))),
+        text,
+    )
+    return _NAMED_REF_RE.sub(lambda m: _NAMED_REFS[m.group(0)], text)
+
+
+def _text_element(prefix: bytes, value: str) -> bytes:
+    value = _ILLEGAL_XML_RE.sub(lambda m: f"_x{ord(m.group(0)):04X}_", value)
+    space = b' xml:space="preserve"' if value != value.strip() else b""
+    return b"<%st%s>%s</%st>" % (prefix, space, escape(value).encode("utf-8"), prefix)
+
+
+def _rich_text(body: bytes) -> str:
+    """Plain text of an ``<si>`` or ``<is>`` body: runs joined, phonetic runs dropped."""
+    body = _PHONETIC_RE.sub(b"", body)
+    return "".join(_unescape(match) for match in _TEXT_RE.findall(body))
+
+
+def _check_utf8(xml: bytes) -> None:
+    declared = _XML_ENCODING_RE.match(xml)
+    if declared and declared.group(1).lower() not in (b"utf-8", b"utf8"):
+        raise _Unsupported
+
+
+class _SharedStrings:
+    """The package's shared strings, plus the entries this edit appends."""
+
+    def __init__(self, archive: zipfile.ZipFile, part: str | None) -> None:
+        self._archive = archive
+        self.part = part
+        self._strings: list[str] | None = None
+        self.added: dict[str, int] = {}
+
+    @property
+    def strings(self) -> list[str]:
+        if self._strings is None:
+            if self.part is None:
+                self._strings = []
+            else:
+                with self._archive.open(self.part) as src:
+                    self._strings = _read_shared_strings(src)
+        return self._strings
+
+    def __getitem__(self, index: int) -> str:
+        try:
+            return self.strings[index]
+        except IndexError:
+            raise _Unsupported from None
+
+    def index_of(self, value: str) -> int:
+        index = self.added.get(value)
+        if index is None:
+            index = self.added[value] = len(self.strings) + len(self.added)
+        return index
+
+    def rewritten(self) -> bytes:
+        """``sharedStrings.xml`` with the added entries appended."""
+        xml = self._archive.read(self.part)
+        _check_utf8(xml)
+        end = None
+        for end in _SST_END_RE.finditer(xml):
+            pass
+        if end is None:
+            raise _Unsupported
+        prefix = end.group("prefix")
+        entries = b"".join(
+            b"<%ssi>%s</%ssi>" % (prefix, _text_element(prefix, value), prefix) for value in self.added
+        )
+        head = _UNIQUE_COUNT_RE.sub(
+            lambda m: m.group(1) + str(int(m.group(2)) + len(self.added)).encode() + m.group(3),
+            xml[: end.start()],
+            count=1,
+        )
+        return head + entries + xml[end.start():]
+
+
+def _cell_text(attrs: dict[bytes, bytes], body: bytes | None, strings: _SharedStrings) -> str | None:
+    """The cell's value when it is text, as openpyxl would read it; ``None`` otherwise."""
+    kind = attrs.get(b"t", b"n")
+    if body is None or b"vm" in attrs:
+        return None
+    if kind == b"s":
+        value = _VALUE_RE.search(body)
+        return strings[int(value.group(1))] if value else None
+    if kind == b"inlineStr":
+        inline = _INLINE_RE.search(body)
+        return _rich_text(inline.group(0)) if inline else None
+    if kind == b"str" and not _FORMULA_RE.search(body):
+        value = _VALUE_RE.search(body)
+        return _unescape(value.group(1)) if value else None
+    return None
+
+
+def _header_text(attrs: dict[bytes, bytes], body: bytes | None, strings: _SharedStrings) -> str:
+    text = _cell_text(attrs, body, strings)
+    if text is not None:
+        return text.strip()
+    value = _VALUE_RE.search(body) if body else None
+    if value is None:
+        return ""
+    kind = attrs.get(b"t", b"n")
+    raw = _unescape(value.group(1))
+    if kind == b"n":
+        return str(_cast_number(raw)).strip()
+    if kind == b"b":
+        return str(raw == "1")
+    return raw.strip()
+
+
+def _rewrite_cell(
+    prefix: bytes,
+    attrs: bytes,
+    body: bytes,
+    value: str | None,
+    shared: bool,
+    strings: _SharedStrings,
+) -> bytes:
+    attrs = _TYPE_ATTR_RE.sub(b"", attrs)
+    if value is None:
+        return b"<%sc%s/>" % (prefix, attrs)
+    extension = _EXT_RE.search(body)
+    tail = extension.group(0) if extension else b""
+    if shared:
+        content = b"<%sv>%d</%sv>" % (prefix, strings.index_of(value), prefix)
+        return b'<%sc%s t="s">%s%s</%sc>' % (prefix, attrs, content, tail, prefix)
+    content = b"<%sis>%s</%sis>" % (prefix, _text_element(prefix, value), prefix)
+    return b'<%sc%s t="inlineStr">%s%s</%sc>' % (prefix, attrs, content, tail, prefix)
+
+
+def _mutate_sheet(
+    xml: bytes,
+    strings: _SharedStrings,
+    *,
+    selected_columns: list[str],
+    strict_columns: bool,
+    mutate: Callable[[Any], Any],
+) -> bytes | None:
+    """The sheet part with mutated cells rewritten, or ``None`` when nothing changed."""
+    _check_utf8(xml)
+    start = _SHEET_DATA_RE.search(xml)
+    if start is None or start.group(1):
+        return None
+    end = _SHEET_DATA_END_RE.search(xml, start.end())
+    if end is None:
+        raise _Unsupported
+
+    header: dict[int, str] = {}
+    targets: set[int] | None = None
+    pieces: list[bytes] = []
+    copied_to = 0
+    for cell in _CELL_RE.finditer(xml, start.end(), end.start()):
+        attrs = dict(_ATTR_RE.findall(cell.group("attrs")))
+        reference = _REF_RE.match(attrs.get(b"r", b"").decode("ascii", "replace"))
+        if reference is None:
+            raise _Unsupported
+        column = column_index_from_string(reference.group(1).upper())
+        row = int(reference.group(2))
+        body = cell.group("body")
+
+        if row == 1:
+            header[column] = _header_text(attrs, body, strings)
+            continue
+        if targets is None:
+            if selected_columns:
+                names = {name: index for index, name in sorted(header.items(), reverse=True)}
+                targets = {names[name] for name in selected_columns if name in names}
+                if not targets:
+                    if strict_columns:
+                        raise HTTPException(status_code=400, detail=f"Column not found: {selected_columns[0]}")
+                    return None
+            else:
+                targets = {index for index, name in header.items() if name}
+        if column not in targets:
+            continue
+        if body is not None and _FORMULA_RE.search(body):
+            # openpyxl hands the formula text to ``mutate``; leave that to it.
+            raise _Unsupported
+
+        text = _cell_text(attrs, body, strings)
+        if text is None:
+            continue
+        updated = mutate(text)
+        if updated == text:
+            continue
+        if updated is not None and not isinstance(updated, str):
+            raise _Unsupported
+        pieces.append(xml[copied_to : cell.start()])
+        pieces.append(
+            _rewrite_cell(
+                cell.group("prefix"),
+                cell.group("attrs"),
+                body,
+                updated,
+                attrs.get(b"t") == b"s",
+                strings,
+            )
+        )
+        copied_to = cell.end()
+
+    if not pieces:
+        return None
+    pieces.append(xml[copied_to:])
+    return b"".join(pieces)
+
+
+def _worksheet_parts(reader: ExcelReader) -> tuple[dict[str, str], str | None]:
+    """``{sheet title: worksheet part}`` in workbook order, and the shared strings part."""
+    reader.read_manifest()
+    workbook_part = _find_workbook_part(reader.package)
+    parser = WorkbookParser(reader.archive, workbook_part.PartName[1:])
+    parser.parse()
+    sheets = {
+        sheet.name: rel.target.lstrip("/")
+        for sheet, rel in parser.find_sheets()
+        if rel.Type.endswith(_WORKSHEET_REL)
+    }
+    strings_part = reader.package.find(SHARED_STRINGS)
+    return sheets, strings_part.PartName[1:] if strings_part is not None else None
+
+
+def mutate_string_cells(
+    source: ExcelSource,
+    *,
+    sheet: str,
+    all_sheets: bool,
+    selected_columns: list[str],
+    mutate: Callable[[Any], Any],
+) -> bytes | None:
+    """Apply ``mutate`` to the text data cells of the targeted sheets, editing only their XML.
+
+    Same contract as ``apply_value_mutation_inplace``: the header is row 1,
+    columns are matched against trimmed header text (all non-blank header
+    columns when ``selected_columns`` is empty), and ``mutate`` sees each
+    text value below the header. Returns the new package, or ``None`` if the
+    openpyxl path has to handle it, as it does whenever a targeted cell holds
+    a formula.
+    """
+    try:
+        reader = ExcelReader(source_stream(source), read_only=True)
+    except Exception:
+        return None
+    archive = reader.archive
+    try:
+        try:
+            sheets, strings_part = _worksheet_parts(reader)
+        except Exception:
+            return None
+
+        if all_sheets:
+            targets = list(sheets)
+        else:
+            selected = sheet.strip()
+            if not selected:
+                raise HTTPException(status_code=400, detail="sheet is required when all_sheets is false")
+            if selected not in sheets:
+                # Might be a chartsheet or something openpyxl reports more precisely.
+                return None
+            targets = [selected]
+
+        strings = _SharedStrings(archive, strings_part)
+        replacements: dict[str, bytes | None] = {}
+        try:
+            for name in targets:
+                part = sheets[name]
+                updated = _mutate_sheet(
+                    archive.read(part),
+                    strings,
+                    selected_columns=selected_columns,
+                    strict_columns=not all_sheets,
+                    mutate=mutate,
+                )
+                if updated is not None:
+                    replacements[part] = updated
+            if strings.added:
+                replacements[strings.part] = strings.rewritten()
+        except (_Unsupported, KeyError, UnicodeDecodeError):
+            return None
+    finally:
+        archive.close()
+
+    output = BytesIO()
+    rewrite_package(source_stream(source), output, replacements)
+    return output.getvalue()
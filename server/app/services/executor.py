@@ -0,0 +1,231 @@
+"""Bounded execution engine for CPU-heavy tool work.
+
+Tool routes are ``async def`` but the work they do — parsing workbooks
+with openpyxl/xlrd/pyxlsb, saving output workbooks, building PDFs — is
+synchronous and CPU bound. Running it directly on the event loop stalls
+every other request on the worker (``/health``, inspect paging, auth).
+
+``ToolExecutor`` runs those bodies on a shared worker pool instead:
+
+* a fixed-size ``ThreadPoolExecutor`` sized by ``TOOL_EXECUTOR_WORKERS``;
+* a per-tier concurrency cap so anonymous traffic can never occupy every
+  worker slot;
+* a bounded wait queue per tier — once it is full, callers get
+  :class:`ExecutorSaturatedError` and the route layer turns that into a
+  ``503`` with ``Retry-After``. The queue counts callers waiting for a
+  tier slot and callers holding one but waiting for a free pool thread
+  (the tier caps add up to more than the pool).
+
+A tier slot is held for as long as the work itself, not the awaiting
+request: a thread cannot be interrupted, so when a request is cancelled
+mid-run the slot is only released once its worker thread finishes.
+
+A thread pool (rather than a process pool) is used because tool bodies
+close over request state (mutation callbacks, compiled regexes, open
+workbooks) that is not picklable. Offloading still frees the event loop,
+which is what keeps the rest of the worker responsive.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Mapping, TypeVar
+
+from app.core.config import get_settings
+from app.core.limits import Tier
+
+T = TypeVar("T")
+
+
+class ExecutorSaturatedError(RuntimeError):
+    """Raised when a tier's wait queue is full and new work is refused."""
+
+    def __init__(self, tier: Tier, retry_after_seconds: int) -> None:
+        super().__init__(f"Tool executor saturated for tier {tier.value}")
+        self.tier = tier
+        self.retry_after_seconds = retry_after_seconds
+
+
+@dataclass
+class _TierState:
+    cap: int
+    semaphore: asyncio.Semaphore
+    running: int = 0
+    # Waiting for a tier slot.
+    waiting: int = 0
+    # Holding a slot, waiting in the pool's queue for a thread.
+    backlog: int = 0
+    completed: int = 0
+    rejected: int = 0
+    peak_waiting: int = 0
+
+
+class ToolExecutor:
+    def __init__(
+        self,
+        *,
+        max_workers: int,
+        tier_caps: Mapping[Tier, int],
+        max_queue: int,
+        retry_after_seconds: int = 5,
+    ) -> None:
+        if max_workers < 1:
+            raise ValueError("max_workers must be >= 1")
+        self._max_workers = max_workers
+        self._max_queue = max(0, max_queue)
+        self._retry_after = max(1, retry_after_seconds)
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="tool-worker"
+        )
+        self._tiers: dict[Tier, _TierState] = {}
+        for tier in Tier:
+            cap = max(1, min(tier_caps.get(tier, max_workers), max_workers))
+            self._tiers[tier] = _TierState(cap=cap, semaphore=asyncio.Semaphore(cap))
+
+    async def run(
+        self, tier: Tier, fn: Callable[..., T], /, *args: Any, **kwargs: Any
+    ) -> T:
+        """Run ``fn(*args, **kwargs)`` on the pool under ``tier``'s cap.
+
+        Raises :class:`ExecutorSaturatedError` without queueing when the
+        work cannot start right away and the tier already has ``max_queue``
+        callers waiting, for a slot or for a pool thread.
+        """
+
+        state = self._tiers[tier]
+        if self._must_wait(state) and state.waiting + state.backlog >= self._max_queue:
+            state.rejected += 1
+            raise ExecutorSaturatedError(tier, self._retry_after)
+
+        state.waiting += 1
+        state.peak_waiting = max(state.peak_waiting, state.waiting + state.backlog)
+        try:
+            await state.semaphore.acquire()
+        finally:
+            state.waiting -= 1
+
+        loop = asyncio.get_running_loop()
+        # Every pool thread is taken: this call sits in the pool's queue
+        # until ``_started`` moves it to ``running``.
+        queued = self._occupied() >= self._max_workers
+
+        def call() -> T:
+            if queued:
+                loop.call_soon_threadsafe(self._started, state)
+            return fn(*args, **kwargs)
+
+        if queued:
+            state.backlog += 1
+        else:
+            state.running += 1
+        try:
+            future = self._pool.submit(call)
+        except BaseException:
+            self._finished(state, False, queued)
+            raise
+        # The slot is released when the work is done (or cancelled before it
+        # started), even if this coroutine has been cancelled in between.
+        future.add_done_callback(functools.partial(self._on_done, loop, state, queued))
+        return await asyncio.wrap_future(future)
+
+    def _occupied(self) -> int:
+        return sum(s.running + s.backlog for s in self._tiers.values())
+
+    def _must_wait(self, state: _TierState) -> bool:
+        """Whether new work for this tier would not start right away."""
+
+        return state.semaphore.locked() or self._occupied() >= self._max_workers
+
+    def _started(self, state: _TierState) -> None:
+        state.backlog -= 1
+        state.running += 1
+
+    def _finished(self, state: _TierState, ran: bool, queued: bool) -> None:
+        if ran or not queued:
+            state.running -= 1
+        else:
+            state.backlog -= 1
+        if ran:
+            state.completed += 1
+        state.semaphore.release()
+
+    def _on_done(
+        self, loop: asyncio.AbstractEventLoop, state: _TierState, queued: bool, future: Future[Any]
+    ) -> None:
+        # Runs on the worker thread (or wherever the future was cancelled);
+        # a cancelled pool future never started. ``_started`` was scheduled
+        # before this, so the two run in order on the loop.
+        try:
+            loop.call_soon_threadsafe(self._finished, state, not future.cancelled(), queued)
+        except RuntimeError:
+            pass  # the loop is closed; nothing is left to release
+
+    def stats(self) -> dict[str, Any]:
+        """Snapshot of pool size, per-tier occupancy and queue depth."""
+
+        return {
+            "max_workers": self._max_workers,
+            "max_queue": self._max_queue,
+            "running": sum(s.running for s in self._tiers.values()),
+            "queued": sum(s.waiting + s.backlog for s in self._tiers.values()),
+            "tiers": {
+                tier.value: {
+                    "cap": state.cap,
+                    "running": state.running,
+                    "queued": state.waiting + state.backlog,
+                    "waiting_for_slot": state.waiting,
+                    "waiting_for_worker": state.backlog,
+                    "peak_queued": state.peak_waiting,
+                    "completed": state.completed,
+                    "rejected": state.rejected,
+                }
+                for tier, state in self._tiers.items()
+            },
+        }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_executor: ToolExecutor | None = None
+
+
+def get_tool_executor() -> ToolExecutor:
+    """Return the process-wide executor, creating it from settings on first use."""
+
+    global _executor
+    if _executor is None:
+        settings = get_settings()
+        workers = settings.tool_executor_workers or min(4, os.cpu_count() or 1)
+        _executor = ToolExecutor(
+            max_workers=workers,
+            tier_caps={
+                Tier.ANON: settings.tool_concurrency_anon,
+                Tier.FREE: settings.tool_concurrency_free,
+                Tier.PRO: settings.tool_concurrency_pro,
+            },
+            max_queue=settings.tool_executor_queue_depth,
+            retry_after_seconds=settings.tool_executor_retry_after,
+        )
+    return _executor
+
+
+def shutdown_tool_executor() -> None:
+    """Tear down the shared executor (wired to app shutdown)."""
+
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+
+
+__all__ = [
+    "ExecutorSaturatedError",
+    "ToolExecutor",
+    "get_tool_executor",
+    "shutdown_tool_executor",
+]
@@ -4,11 +4,33 @@ Each file is encrypted with a random data encryption key (DEK). The DEK
 is then encrypted with the application's master key (KEK) and stored
 alongside the job metadata. This ensures files at rest in object storage
 are unreadable without access to both the database row and the KEK.
+
+Files are encrypted in fixed-size chunks, each sealed on its own, so an
+output can be encrypted while it is uploaded (:class:`StreamEncryptor`)
+and a download decrypted while it is still arriving from storage
+(:class:`StreamDecryptor`). Chunk ``i`` uses the nonce
+``nonce_prefix || i`` (a 32-bit big-endian counter), and the last chunk is
+sealed with different associated data from the others, so chunks cannot
+be reordered, dropped or truncated without failing authentication.
+
+Two blob layouts are in use, told apart by their length:
+
+* legacy, 72 bytes: ``dek_nonce (12) + encrypted_dek (48) + file_nonce (12)``,
+  the whole file sealed as a single GCM message;
+* chunked, 73 bytes: ``version (1) + dek_nonce (12) + encrypted_dek (48) +
+  nonce_prefix (8) + chunk_size (4)``.
 """
 
 from __future__ import annotations
 
+import hashlib
+import hmac
 import os
+import struct
+import uuid
+from collections.abc import Iterator
+from functools import lru_cache
+from typing import BinaryIO
 
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
@@ -16,12 +38,20 @@ from app.core.config import get_settings
 
 # KEK must be exactly 32 bytes (256 bits) for AES-256.
 _KEK_BYTES = 32
-
-
-def _get_kek() -> bytes:
-    """Load the master key-encryption-key from settings."""
-    settings = get_settings()
-    raw = settings.file_encryption_key
+_NONCE_BYTES = 12
+_TAG_BYTES = 16
+_LEGACY_BLOB_BYTES = 72
+_CHUNKED_VERSION = 2
+_CHUNKED_BLOB = struct.Struct(">B12s48s8sI")
+CHUNK_SIZE = 64 * 1024
+# Associated data marking a chunk as the last one of the file.
+_MIDDLE_CHUNK = b"\x00"
+_FINAL_CHUNK = b"\x01"
+_CONTENT_HASH_LABEL = b"xlsxworld/tool-job-content-hash/v1"
+_HASH_CHUNK = 1024 * 1024
+
+
+def _parse_kek(raw: str | None) -> bytes:
     if not raw:
         raise RuntimeError("FILE_ENCRYPTION_KEY is not configured")
     key = bytes.fromhex(raw)
@@ -30,32 +60,178 @@ def _get_kek() -> bytes:
     return key
 
 
+@lru_cache(maxsize=1)
+def _kek_cipher(raw: str | None) -> AESGCM:
+    """The master key-encryption-key as a cipher, parsed once per configured value."""
+    return AESGCM(_parse_kek(raw))
+
+
+@lru_cache(maxsize=1)
+def _content_hash_key(raw: str | None) -> bytes:
+    """A key for :func:`content_digest`, derived from the KEK so the two are never the same key."""
+    return hmac.new(_parse_kek(raw), _CONTENT_HASH_LABEL, hashlib.sha256).digest()
+
+
+def _get_kek() -> AESGCM:
+    """Load the master key-encryption-key from settings."""
+    return _kek_cipher(get_settings().file_encryption_key)
+
+
+def content_digest(user_id: uuid.UUID, source: BinaryIO) -> str:
+    """Keyed SHA-256 of ``source`` (from its start) for ``user_id``, as 64 hex chars.
+
+    Identical outputs of one user hash the same, so a stored object can be
+    reused; the user id is part of the input, so the same output of two
+    users never matches. Being keyed, a leaked digest cannot be checked
+    against a guessed file.
+    """
+    digest = hmac.new(_content_hash_key(get_settings().file_encryption_key), user_id.bytes, hashlib.sha256)
+    source.seek(0)
+    while chunk := source.read(_HASH_CHUNK):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _chunk_nonce(prefix: bytes, index: int) -> bytes:
+    return prefix + index.to_bytes(4, "big")
+
+
+def _read_chunk(source: BinaryIO, size: int) -> bytes:
+    """Up to ``size`` bytes; fewer only at the end of ``source``."""
+    chunk = source.read(size)
+    while 0 < len(chunk) < size and (more := source.read(size - len(chunk))):
+        chunk += more
+    return chunk
+
+
+class StreamEncryptor:
+    """Chunked encryption of one file under a fresh DEK.
+
+    The blob for the database row is known up front (:attr:`blob`), so the
+    ciphertext can go straight into a streaming upload as
+    :meth:`encrypt_stream` produces it, with memory bounded by two chunks.
+    """
+
+    def __init__(self) -> None:
+        self.chunk_size = CHUNK_SIZE
+        dek = AESGCM.generate_key(bit_length=256)
+        self._cipher = AESGCM(dek)
+        self._prefix = os.urandom(8)
+        self._index = 0
+
+        # Encrypt the DEK with the KEK
+        dek_nonce = os.urandom(_NONCE_BYTES)
+        encrypted_dek = _get_kek().encrypt(dek_nonce, dek, None)
+        self.blob = _CHUNKED_BLOB.pack(_CHUNKED_VERSION, dek_nonce, encrypted_dek, self._prefix, self.chunk_size)
+
+    def ciphertext_size(self, plaintext_size: int) -> int:
+        """Length of the ciphertext for ``plaintext_size`` bytes; an empty file is one empty chunk."""
+        chunks = max(1, -(-plaintext_size // self.chunk_size))
+        return plaintext_size + chunks * _TAG_BYTES
+
+    def seal(self, chunk: bytes | memoryview, *, final: bool) -> bytes:
+        """Encrypt the next chunk; every chunk but the last must be exactly :attr:`chunk_size` long."""
+        if self._index >= 1 << 32:
+            raise ValueError("File has too many chunks for the nonce counter")
+        sealed = self._cipher.encrypt(
+            _chunk_nonce(self._prefix, self._index), chunk, _FINAL_CHUNK if final else _MIDDLE_CHUNK
+        )
+        self._index += 1
+        return sealed
+
+    def encrypt_stream(self, source: BinaryIO) -> Iterator[bytes]:
+        """Encrypt ``source`` from its start, one sealed chunk at a time.
+
+        Each chunk is read before the previous one is sealed, since the
+        last chunk is sealed differently and only the next read tells.
+        """
+        source.seek(0)
+        chunk = _read_chunk(source, self.chunk_size)
+        while True:
+            following = _read_chunk(source, self.chunk_size) if len(chunk) == self.chunk_size else b""
+            yield self.seal(chunk, final=not following)
+            if not following:
+                return
+            chunk = following
+
+
 def encrypt_file(plaintext: bytes) -> tuple[bytes, bytes]:
-    """Encrypt file content with a fresh DEK.
+    """Encrypt file content with a fresh DEK, in chunks of :data:`CHUNK_SIZE`.
 
     Returns:
         (ciphertext, encrypted_dek_blob)
 
-    The encrypted_dek_blob contains: dek_nonce (12) + encrypted_dek (48) + file_nonce (12)
-    Total blob: 72 bytes.
+    The 73-byte blob is the chunked layout described in the module docstring.
     """
-    # Generate a random DEK
-    dek = AESGCM.generate_key(bit_length=256)
-    file_nonce = os.urandom(12)
+    encryptor = StreamEncryptor()
+    size = encryptor.chunk_size
+    last = max(0, (len(plaintext) - 1) // size)
+    view = memoryview(plaintext)
+    ciphertext = b"".join(
+        encryptor.seal(view[index * size:(index + 1) * size], final=index == last)
+        for index in range(last + 1)
+    )
+    return ciphertext, encryptor.blob
+
+
+def _unwrap_dek(dek_nonce: bytes, encrypted_dek: bytes) -> AESGCM:
+    return AESGCM(_get_kek().decrypt(dek_nonce, encrypted_dek, None))
 
-    # Encrypt the file with the DEK
-    file_cipher = AESGCM(dek)
-    ciphertext = file_cipher.encrypt(file_nonce, plaintext, None)
 
-    # Encrypt the DEK with the KEK
-    kek = _get_kek()
-    dek_nonce = os.urandom(12)
-    kek_cipher = AESGCM(kek)
-    encrypted_dek = kek_cipher.encrypt(dek_nonce, dek, None)
+class StreamDecryptor:
+    """Incremental decryption of a stored file.
+
+    Feed the ciphertext in pieces of any size to :meth:`update`, which
+    returns whatever plaintext is complete and authenticated so far, then
+    call :meth:`finalize`. Chunked files come out one chunk behind the
+    input (the decryptor has to see whether more follows before it knows
+    which chunk is last); legacy files are a single GCM message and are
+    only released by :meth:`finalize`.
+
+    Raises ``cryptography.exceptions.InvalidTag`` on tampered, truncated or
+    reordered ciphertext, and ``ValueError`` for a blob it does not know.
+    """
 
-    # Pack: dek_nonce + encrypted_dek + file_nonce
-    blob = dek_nonce + encrypted_dek + file_nonce
-    return ciphertext, blob
+    def __init__(self, encrypted_dek_blob: bytes) -> None:
+        if len(encrypted_dek_blob) == _LEGACY_BLOB_BYTES:
+            self._cipher = _unwrap_dek(encrypted_dek_blob[:12], encrypted_dek_blob[12:60])
+            self._legacy_nonce: bytes | None = encrypted_dek_blob[60:72]
+            self._record = 0
+        elif len(encrypted_dek_blob) == _CHUNKED_BLOB.size:
+            version, dek_nonce, encrypted_dek, prefix, chunk_size = _CHUNKED_BLOB.unpack(encrypted_dek_blob)
+            if version != _CHUNKED_VERSION:
+                raise ValueError(f"Unknown encryption blob version {version}")
+            self._cipher = _unwrap_dek(dek_nonce, encrypted_dek)
+            self._legacy_nonce = None
+            self._prefix = prefix
+            self._record = chunk_size + _TAG_BYTES
+        else:
+            raise ValueError("Unknown encryption blob layout")
+        self._buffer = bytearray()
+        self._index = 0
+
+    def update(self, data: bytes) -> bytes:
+        self._buffer += data
+        if self._legacy_nonce is not None:
+            return b""
+        out: list[bytes] = []
+        record = self._record
+        # Keep at least one full record back: it may turn out to be the last.
+        while len(self._buffer) > record:
+            out.append(self._open(bytes(self._buffer[:record]), _MIDDLE_CHUNK))
+            del self._buffer[:record]
+        return b"".join(out)
+
+    def finalize(self) -> bytes:
+        data, self._buffer = bytes(self._buffer), bytearray()
+        if self._legacy_nonce is not None:
+            return self._cipher.decrypt(self._legacy_nonce, data, None)
+        return self._open(data, _FINAL_CHUNK)
+
+    def _open(self, sealed: bytes, marker: bytes) -> bytes:
+        plaintext = self._cipher.decrypt(_chunk_nonce(self._prefix, self._index), sealed, marker)
+        self._index += 1
+        return plaintext
 
 
 def decrypt_file(ciphertext: bytes, encrypted_dek_blob: bytes) -> bytes:
@@ -63,18 +239,8 @@ def decrypt_file(ciphertext: bytes, encrypted_dek_blob: bytes) -> bytes:
 
     Args:
         ciphertext: The encrypted file bytes from storage.
-        encrypted_dek_blob: The 72-byte blob from the database row.
+        encrypted_dek_blob: The blob from the database row (either layout).
     """
-    # Unpack blob
-    dek_nonce = encrypted_dek_blob[:12]
-    encrypted_dek = encrypted_dek_blob[12:60]
-    file_nonce = encrypted_dek_blob[60:72]
-
-    # Decrypt the DEK with the KEK
-    kek = _get_kek()
-    kek_cipher = AESGCM(kek)
-    dek = kek_cipher.decrypt(dek_nonce, encrypted_dek, None)
-
-    # Decrypt the file with the DEK
-    file_cipher = AESGCM(dek)
-    return file_cipher.decrypt(file_nonce, ciphertext, None)
+    decryptor = StreamDecryptor(encrypted_dek_blob)
+    head = decryptor.update(ciphertext)
+    return head + decryptor.finalize()
@@ -0,0 +1,187 @@
+"""Upload-once file handles.
+
+``POST /api/v1/tools/files`` stores the raw bytes of an upload in a local
+spool directory and returns a ``file_token``; every tool route then accepts
+``file_token=`` in place of a fresh multipart upload, so a session that runs
+several tools on the same 10–100 MB workbook only sends it once.
+
+Handles are owned by the quota key of the uploader (``user:<id>`` or
+``ip:<address>``) and are invisible to anyone else. Each tier may keep a
+limited number of live handles (:attr:`Limits.max_file_handles`), every
+handle expires after an idle TTL, and the whole spool is kept under a byte
+budget; in all three cases the least recently used handles go first.
+
+The index lives in process memory, like the inspect token store, so handles
+do not survive a restart. Every store spools into its own locked
+subdirectory (:mod:`app.services.spool_dirs`), as the job recorder does, so
+several workers can share ``FILE_HANDLE_DIR``. On start a store removes the
+subdirectories whose process has exited and never touches those of live
+workers.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import secrets
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Callable
+
+from app.core.config import get_settings
+from app.services.spool_dirs import claim_spool_dir, remove_orphaned_spool_dirs, remove_quietly
+
+_FILE_PREFIX = "fh-"
+_DIR_PREFIX = "proc-"
+
+
+@dataclass
+class FileHandle:
+    token: str
+    owner: str
+    filename: str | None
+    content_type: str | None
+    size: int
+    path: str
+    last_used: float
+
+
+def _write_spool_file(path: str, source: BinaryIO) -> int:
+    source.seek(0)
+    with open(path, "xb") as out:
+        shutil.copyfileobj(source, out)
+        size = out.tell()
+    source.seek(0)
+    return size
+
+
+class FileHandleStore:
+    def __init__(
+        self,
+        directory: str,
+        *,
+        ttl_seconds: float,
+        max_total_bytes: int,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._ttl = ttl_seconds
+        self._max_total_bytes = max_total_bytes
+        self._clock = clock
+        # Least recently used first; with a sliding TTL that is also expiry order.
+        self._handles: OrderedDict[str, FileHandle] = OrderedDict()
+        self._total_bytes = 0
+        self.expirations = 0
+        self.evictions = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._spool = claim_spool_dir(directory, _DIR_PREFIX)
+        self._directory = self._spool.path
+        remove_orphaned_spool_dirs(directory, _DIR_PREFIX)
+
+    @property
+    def ttl_seconds(self) -> float:
+        return self._ttl
+
+    def _drop(self, token: str) -> None:
+        handle = self._handles.pop(token)
+        self._total_bytes -= handle.size
+        # Requests that already opened the file keep reading it after unlink.
+        remove_quietly(handle.path)
+
+    def _expire(self) -> None:
+        now = self._clock()
+        while self._handles:
+            token, handle = next(iter(self._handles.items()))
+            if now - handle.last_used <= self._ttl:
+                break
+            self._drop(token)
+            self.expirations += 1
+
+    async def put(
+        self,
+        *,
+        owner: str,
+        filename: str | None,
+        content_type: str | None,
+        source: BinaryIO,
+        max_handles: int,
+    ) -> FileHandle:
+        """Copy ``source`` into the spool and return its new handle."""
+        token = secrets.token_urlsafe(24)
+        path = os.path.join(self._directory, f"{_FILE_PREFIX}{token}")
+        size = await asyncio.to_thread(_write_spool_file, path, source)
+
+        self._expire()
+        owned = [t for t, h in self._handles.items() if h.owner == owner]
+        for stale in owned[: max(0, len(owned) - max_handles + 1)]:
+            self._drop(stale)
+            self.evictions += 1
+        while self._handles and self._total_bytes + size > self._max_total_bytes:
+            self._drop(next(iter(self._handles)))
+            self.evictions += 1
+
+        handle = FileHandle(
+            token=token,
+            owner=owner,
+            filename=filename,
+            content_type=content_type,
+            size=size,
+            path=path,
+            last_used=self._clock(),
+        )
+        self._handles[token] = handle
+        self._total_bytes += size
+        return handle
+
+    def get(self, token: str, *, owner: str) -> FileHandle | None:
+        """The live handle for ``token`` if ``owner`` uploaded it; refreshes its TTL."""
+        self._expire()
+        handle = self._handles.get(token)
+        if handle is None or handle.owner != owner:
+            return None
+        handle.last_used = self._clock()
+        self._handles.move_to_end(token)
+        return handle
+
+    def delete(self, token: str, *, owner: str) -> bool:
+        handle = self._handles.get(token)
+        if handle is None or handle.owner != owner:
+            return False
+        self._drop(token)
+        return True
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "handles": len(self._handles),
+            "bytes": self._total_bytes,
+            "max_bytes": self._max_total_bytes,
+            "ttl_seconds": self._ttl,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+        }
+
+
+_store: FileHandleStore | None = None
+
+
+def get_file_handle_store() -> FileHandleStore:
+    """Return the process-wide store, creating it from settings on first use."""
+
+    global _store
+    if _store is None:
+        settings = get_settings()
+        directory = settings.file_handle_dir or os.path.join(
+            tempfile.gettempdir(), "xlsxworld-file-handles"
+        )
+        _store = FileHandleStore(
+            directory,
+            ttl_seconds=settings.file_handle_ttl_seconds,
+            max_total_bytes=settings.file_handle_max_total_bytes,
+        )
+    return _store
+
+
+__all__ = ["FileHandle", "FileHandleStore", "get_file_handle_store"]
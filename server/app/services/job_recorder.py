@@ -0,0 +1,548 @@
+"""Background queue that records signed-in users' tool runs.
+
+Recording used to be one ``BackgroundTasks`` closure per request. Each
+closure held the output in memory until its own storage upload and
+single-row insert finished, and the work was lost if the process stopped
+first. Under a burst those closures piled up one per request.
+
+:class:`JobRecorder` replaces that with:
+
+* a spill directory: :meth:`JobRecorder.submit` writes the output and a
+  small ``.json`` description to disk and returns, so nothing is held in
+  memory while it waits;
+* a bounded queue drained by a fixed pool of upload workers. Each worker
+  encrypts an output into Storage, or reuses the user's identical stored
+  output (:meth:`JobsService.store_output`), and retries with exponential
+  backoff. Once the queue is full, new outputs
+  are dropped and counted rather than queued without limit;
+* a single inserter that writes the ``tool_jobs`` rows of uploaded outputs
+  in batches, as one multi-row ``INSERT`` per batch
+  (:meth:`JobsService.insert_jobs`). A row reusing an object whose job was
+  deleted in the meantime is left out and its entry goes back to upload.
+
+Spilled entries survive a restart. Every recorder works in its own locked
+subdirectory (:mod:`app.services.spool_dirs`). On start it adopts the
+entries of any subdirectory whose lock is free, which means the process
+that owned it has exited. The ``.json`` is written last
+(and rewritten once the output is uploaded), so an entry is always either
+complete or ignored. Uploads upsert and inserts skip existing ids, so
+replaying an entry is harmless.
+
+:meth:`JobRecorder.stats` reports depth, lag and drop counters
+(``GET /api/v1/admin/job-recorder``).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import logging
+import os
+import random
+import shutil
+import tempfile
+import time
+import uuid
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, BinaryIO, Union
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.services.jobs_service import RETENTION_DAYS_FREE, JobsService, StoredOutput, _object_path
+from app.services.spool_dirs import SpoolDir, claim_spool_dir, orphaned_spool_dirs, remove_quietly
+from app.services.storage_service import StorageService, get_storage_service
+
+log = logging.getLogger(__name__)
+
+_DIR_PREFIX = "rec-"
+_BACKOFF_CAP_SECONDS = 60.0
+
+
+@dataclass
+class _Entry:
+    job_id: uuid.UUID
+    meta: dict[str, Any]
+    output_path: str
+    attempts: int = 0
+    # Set once the output is in Storage (uploaded, or an identical one reused).
+    stored: StoredOutput | None = None
+    enqueued_at: float = field(default_factory=time.time)
+
+    @property
+    def user_id(self) -> uuid.UUID:
+        return uuid.UUID(self.meta["user_id"])
+
+    @property
+    def object_path(self) -> str:
+        return _object_path(self.user_id, self.job_id, self.meta["output_filename"])
+
+    def row(self) -> dict[str, Any]:
+        assert self.stored is not None
+        enqueued = datetime.fromtimestamp(self.enqueued_at, timezone.utc)
+        return {
+            "id": self.job_id,
+            "user_id": self.user_id,
+            "tool_slug": self.meta["tool_slug"],
+            "tool_name": self.meta["tool_name"],
+            "original_filename": self.meta["original_filename"],
+            "output_filename": self.meta["output_filename"],
+            "storage_path": self.stored.storage_path,
+            "encryption_blob": self.stored.encryption_blob,
+            "content_hash": self.stored.content_hash,
+            "mime_type": self.meta["mime_type"],
+            "output_size_bytes": self.stored.size,
+            "success": self.meta["success"],
+            "error_type": self.meta["error_type"],
+            "duration_ms": self.meta["duration_ms"],
+            # Retention runs from the tool run, not from when the queue got to it.
+            "expires_at": enqueued + timedelta(days=RETENTION_DAYS_FREE),
+        }
+
+
+def _write_output(path: str, output: Union[bytes, BinaryIO]) -> None:
+    with open(path, "xb") as out:
+        if isinstance(output, bytes):
+            out.write(output)
+        else:
+            output.seek(0)
+            shutil.copyfileobj(output, out)
+
+
+def _write_meta(entry: _Entry, directory: str) -> None:
+    """Write (or replace) the entry's description; its presence makes the entry live."""
+    stored = entry.stored
+    payload = {
+        **entry.meta,
+        "enqueued_at": entry.enqueued_at,
+        "stored": None if stored is None else {
+            "storage_path": stored.storage_path,
+            "encryption_blob": base64.b64encode(stored.encryption_blob).decode("ascii"),
+            "size": stored.size,
+            "content_hash": stored.content_hash,
+            "reused": stored.reused,
+        },
+    }
+    final = os.path.join(directory, f"{entry.job_id}.json")
+    partial = final + ".tmp"
+    with open(partial, "w", encoding="utf-8") as out:
+        json.dump(payload, out)
+    os.replace(partial, final)
+
+
+def _read_entry(directory: str, job_id: uuid.UUID) -> _Entry:
+    with open(os.path.join(directory, f"{job_id}.json"), encoding="utf-8") as src:
+        payload = json.load(src)
+    stored = payload.pop("stored")
+    enqueued_at = payload.pop("enqueued_at")
+    return _Entry(
+        job_id=job_id,
+        meta=payload,
+        output_path=os.path.join(directory, f"{job_id}.out"),
+        stored=None if stored is None else StoredOutput(
+            storage_path=stored["storage_path"],
+            encryption_blob=base64.b64decode(stored["encryption_blob"]),
+            size=stored["size"],
+            content_hash=stored["content_hash"],
+            reused=stored["reused"],
+        ),
+        enqueued_at=enqueued_at,
+    )
+
+
+class JobRecorder:
+    def __init__(
+        self,
+        directory: str,
+        *,
+        session_factory: Callable[[], AsyncSession],
+        storage: StorageService,
+        workers: int = 4,
+        max_pending: int = 256,
+        batch_size: int = 50,
+        batch_wait_seconds: float = 0.5,
+        max_attempts: int = 5,
+        retry_base_seconds: float = 1.0,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        self._root = directory
+        self._session_factory = session_factory
+        self._storage = storage
+        self._workers = workers
+        self._max_pending = max(1, max_pending)
+        self._batch_size = max(1, batch_size)
+        self._batch_wait = max(0.0, batch_wait_seconds)
+        self._max_attempts = max(1, max_attempts)
+        self._retry_base = max(0.0, retry_base_seconds)
+
+        # Set by ``start``.
+        self._spool: SpoolDir | None = None
+        self._directory = ""
+        self._uploads: asyncio.Queue[_Entry] = asyncio.Queue()
+        self._inserts: asyncio.Queue[_Entry] = asyncio.Queue()
+        self._tasks: list[asyncio.Task[None]] = []
+        # Every entry on disk that has not been inserted or given up on, by id.
+        self._pending: dict[uuid.UUID, _Entry] = {}
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._lags: deque[float] = deque(maxlen=256)
+
+        self.peak_pending = 0
+        self.recovered = 0
+        self.recorded = 0
+        self.reused = 0
+        self.dropped = 0
+        self.failed = 0
+        self.upload_retries = 0
+        self.insert_retries = 0
+        self.batches = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        """Claim a spill directory, adopt orphaned entries and start the workers."""
+        await asyncio.to_thread(self._open_directory)
+        for job_id in await asyncio.to_thread(self._adopt_orphans):
+            try:
+                entry = await asyncio.to_thread(_read_entry, self._directory, job_id)
+            except (OSError, ValueError, KeyError) as exc:
+                log.warning("job_recorder: dropping unreadable entry %s: %s", job_id, exc)
+                self._discard_files(job_id)
+                continue
+            self.recovered += 1
+            self._track(entry)
+        self._tasks = [asyncio.create_task(self._upload_worker()) for _ in range(self._workers)]
+        self._tasks.append(asyncio.create_task(self._insert_worker()))
+
+    async def stop(self, *, drain_seconds: float = 5.0) -> None:
+        """Give queued work ``drain_seconds`` to finish, then stop; the rest stays on disk."""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self._idle.wait(), drain_seconds)
+        except asyncio.TimeoutError:
+            log.warning("job_recorder: stopping with %d entries pending", len(self._pending))
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+
+    async def submit(
+        self,
+        *,
+        user_id: uuid.UUID,
+        tool_slug: str,
+        tool_name: str,
+        original_filename: str | None,
+        output_filename: str,
+        output_bytes: Union[bytes, BinaryIO],
+        mime_type: str,
+        success: bool,
+        error_type: str | None,
+        duration_ms: int | None,
+    ) -> uuid.UUID | None:
+        """Spill the output and queue it for recording; returns the future job id.
+
+        Takes the same arguments as :meth:`JobsService.record_authenticated_job`
+        and, like it, never raises: a full queue or a failed spill write
+        returns ``None`` and counts as a drop.
+        """
+        if len(self._pending) >= self._max_pending:
+            self.dropped += 1
+            log.warning("job_recorder: queue full, dropping %s output", tool_slug)
+            return None
+        job_id = uuid.uuid4()
+        entry = _Entry(
+            job_id=job_id,
+            meta={
+                "user_id": str(user_id),
+                "tool_slug": tool_slug,
+                "tool_name": tool_name,
+                "original_filename": original_filename,
+                "output_filename": output_filename,
+                "mime_type": mime_type,
+                "success": success,
+                "error_type": error_type,
+                "duration_ms": duration_ms,
+            },
+            output_path=os.path.join(self._directory, f"{job_id}.out"),
+        )
+        # Reserve the slot before the first await so concurrent submits respect the bound.
+        self._pending[job_id] = entry
+        self._idle.clear()
+        try:
+            await asyncio.to_thread(_write_output, entry.output_path, output_bytes)
+            await asyncio.to_thread(_write_meta, entry, self._directory)
+        except Exception as exc:  # noqa: BLE001 — recording must never raise
+            log.warning("job_recorder: spill write failed: %s", exc)
+            self.dropped += 1
+            self._forget(entry)
+            return None
+        del self._pending[job_id]
+        self._track(entry)
+        return job_id
+
+    def stats(self) -> dict[str, Any]:
+        """Queue depth per stage, lag and outcome counters."""
+        now = time.time()
+        oldest = min((entry.enqueued_at for entry in self._pending.values()), default=None)
+        lags = sorted(self._lags)
+        return {
+            "running": self.running,
+            "workers": self._workers,
+            "pending": len(self._pending),
+            "max_pending": self._max_pending,
+            "peak_pending": self.peak_pending,
+            "awaiting_upload": self._uploads.qsize(),
+            "awaiting_insert": self._inserts.qsize(),
+            "oldest_pending_seconds": round(now - oldest, 3) if oldest is not None else 0.0,
+            "lag_p50_seconds": round(lags[len(lags) // 2], 3) if lags else 0.0,
+            "lag_max_seconds": round(lags[-1], 3) if lags else 0.0,
+            "recovered": self.recovered,
+            "recorded": self.recorded,
+            "reused": self.reused,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "upload_retries": self.upload_retries,
+            "insert_retries": self.insert_retries,
+            "batches": self.batches,
+        }
+
+    # -- internals ---------------------------------------------------------
+
+    def _open_directory(self) -> None:
+        self._spool = claim_spool_dir(self._root, _DIR_PREFIX)
+        self._directory = self._spool.path
+
+    def _adopt_orphans(self) -> list[uuid.UUID]:
+        """Move complete entries from directories nobody holds into ours; returns their ids."""
+        adopted: list[uuid.UUID] = []
+        for other in orphaned_spool_dirs(self._root, _DIR_PREFIX):
+            for member in os.listdir(other):
+                stem, ext = os.path.splitext(member)
+                if ext != ".json":
+                    continue
+                try:
+                    job_id = uuid.UUID(stem)
+                except ValueError:
+                    continue
+                if not os.path.exists(os.path.join(other, f"{stem}.out")):
+                    continue
+                os.replace(os.path.join(other, f"{stem}.out"), os.path.join(self._directory, f"{stem}.out"))
+                os.replace(os.path.join(other, member), os.path.join(self._directory, member))
+                adopted.append(job_id)
+        return adopted
+
+    def _track(self, entry: _Entry) -> None:
+        self._pending[entry.job_id] = entry
+        self.peak_pending = max(self.peak_pending, len(self._pending))
+        self._idle.clear()
+        (self._inserts if entry.stored is not None else self._uploads).put_nowait(entry)
+
+    def _forget(self, entry: _Entry) -> None:
+        self._pending.pop(entry.job_id, None)
+        self._discard_files(entry.job_id)
+        if not self._pending:
+            self._idle.set()
+
+    def _discard_files(self, job_id: uuid.UUID) -> None:
+        for ext in (".json", ".out"):
+            remove_quietly(os.path.join(self._directory, f"{job_id}{ext}"))
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(_BACKOFF_CAP_SECONDS, self._retry_base * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _jobs_service(self, session: AsyncSession) -> JobsService:
+        return JobsService(session, self._storage)
+
+    async def _upload_worker(self) -> None:
+        while True:
+            entry = await self._uploads.get()
+            try:
+                await self._upload(entry)
+            except Exception:  # noqa: BLE001 — a worker must outlive any one entry
+                log.exception("job_recorder: upload of %s failed", entry.job_id)
+                self.failed += 1
+                self._forget(entry)
+
+    async def _upload(self, entry: _Entry) -> None:
+        while True:
+            entry.attempts += 1
+            try:
+                # ``store_output`` ends the lookup's transaction before it
+                # uploads, so the session holds no connection meanwhile.
+                async with self._session_factory() as session:
+                    with open(entry.output_path, "rb") as output:
+                        stored = await self._jobs_service(session).store_output(
+                            entry.user_id,
+                            entry.object_path,
+                            output,
+                            now=datetime.now(timezone.utc),
+                        )
+                break
+            except Exception as exc:  # noqa: BLE001
+                if entry.attempts >= self._max_attempts:
+                    log.warning("job_recorder: giving up on %s upload: %s", entry.job_id, exc)
+                    self.failed += 1
+                    self._forget(entry)
+                    return
+                self.upload_retries += 1
+                await asyncio.sleep(self._backoff(entry.attempts))
+        entry.stored = stored
+        if stored.reused:
+            self.reused += 1
+        entry.attempts = 0
+        # A restart from here on only has to insert the row.
+        await asyncio.to_thread(_write_meta, entry, self._directory)
+        await self._inserts.put(entry)
+
+    async def _next_batch(self) -> list[_Entry]:
+        batch = [await self._inserts.get()]
+        deadline = asyncio.get_running_loop().time() + self._batch_wait
+        while len(batch) < self._batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            try:
+                batch.append(self._inserts.get_nowait() if timeout <= 0 else await asyncio.wait_for(self._inserts.get(), timeout))
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
+        return batch
+
+    async def _insert_worker(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._insert(batch)
+            except Exception:  # noqa: BLE001
+                log.exception("job_recorder: insert of %d rows failed", len(batch))
+                await self._give_up(batch)
+
+    async def _insert(self, batch: list[_Entry]) -> None:
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                lost = await self._insert_rows(batch)
+                break
+            except Exception as exc:  # noqa: BLE001
+                if attempt >= self._max_attempts:
+                    log.warning("job_recorder: batch insert of %d rows failed: %s", len(batch), exc)
+                    if len(batch) > 1:
+                        # One bad row (e.g. its user was deleted) must not sink the rest.
+                        for entry in batch:
+                            await self._insert_one(entry)
+                    else:
+                        await self._give_up(batch)
+                    return
+                self.insert_retries += 1
+                await asyncio.sleep(self._backoff(attempt))
+        self.batches += 1
+        await self._done(batch, lost)
+
+    async def _insert_one(self, entry: _Entry) -> None:
+        try:
+            lost = await self._insert_rows([entry])
+        except Exception as exc:  # noqa: BLE001
+            log.warning("job_recorder: insert of %s failed: %s", entry.job_id, exc)
+            await self._give_up([entry])
+            return
+        self.batches += 1
+        await self._done([entry], lost)
+
+    async def _insert_rows(self, batch: list[_Entry]) -> set[str]:
+        """Insert the batch's rows; returns the reused objects that were gone (rows not inserted)."""
+        reused = {entry.stored.storage_path for entry in batch if entry.stored is not None and entry.stored.reused}
+        async with self._session_factory() as session:
+            return await self._jobs_service(session).insert_jobs(
+                [entry.row() for entry in batch], reused_paths=reused
+            )
+
+    async def _done(self, batch: list[_Entry], lost: set[str]) -> None:
+        now = time.time()
+        for entry in batch:
+            assert entry.stored is not None
+            if entry.stored.reused and entry.stored.storage_path in lost:
+                await self._store_again(entry)
+                continue
+            self.recorded += 1
+            self._lags.append(now - entry.enqueued_at)
+            self._forget(entry)
+
+    async def _store_again(self, entry: _Entry) -> None:
+        """Send an entry whose reused object went away back to the upload stage."""
+        entry.stored = None
+        try:
+            await asyncio.to_thread(_write_meta, entry, self._directory)
+        except OSError as exc:
+            log.warning("job_recorder: could not requeue %s: %s", entry.job_id, exc)
+            self.failed += 1
+            self._forget(entry)
+            return
+        await self._uploads.put(entry)
+
+    async def _give_up(self, batch: list[_Entry]) -> None:
+        for entry in batch:
+            self.failed += 1
+            # Best-effort cleanup of the orphaned object (a reused one is not ours).
+            if entry.stored is not None and not entry.stored.reused:
+                try:
+                    await self._storage.delete(entry.stored.storage_path)
+                except Exception:  # noqa: BLE001
+                    pass
+            self._forget(entry)
+
+
+_recorder: JobRecorder | None = None
+
+
+def get_job_recorder() -> JobRecorder | None:
+    """The process-wide recorder, or ``None`` when the app has not started one."""
+
+    return _recorder
+
+
+async def start_job_recorder() -> None:
+    """Create and start the recorder from settings (wired to app startup)."""
+
+    global _recorder
+    settings = get_settings()
+    if _recorder is not None or settings.job_recorder_workers <= 0:
+        return
+    from app.db.session import AsyncSessionFactory
+
+    directory = settings.job_recorder_dir or os.path.join(tempfile.gettempdir(), "xlsxworld-job-recorder")
+    os.makedirs(directory, exist_ok=True)
+    recorder = JobRecorder(
+        directory,
+        session_factory=AsyncSessionFactory,
+        storage=get_storage_service(),
+        workers=settings.job_recorder_workers,
+        max_pending=settings.job_recorder_max_pending,
+        batch_size=settings.job_recorder_batch_size,
+        batch_wait_seconds=settings.job_recorder_batch_wait_ms / 1000,
+        max_attempts=settings.job_recorder_max_attempts,
+    )
+    await recorder.start()
+    _recorder = recorder
+
+
+async def stop_job_recorder() -> None:
+    """Drain briefly and stop the recorder (wired to app shutdown)."""
+
+    global _recorder
+    if _recorder is not None:
+        recorder, _recorder = _recorder, None
+        await recorder.stop()
+
+
+__all__ = ["JobRecorder", "get_job_recorder", "start_job_recorder", "stop_job_recorder"]
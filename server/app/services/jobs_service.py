@@ -12,22 +12,39 @@ isolates two responsibilities:
   queries that power the ``/me/jobs`` API.
 * ``cleanup_expired`` is used by the scheduled job that frees Storage
   for jobs whose retention window has elapsed.
+
+Outputs are stored content-addressed per user: each row carries a keyed
+digest of its output, and a run whose output matches one of the user's
+stored outputs points its row at the existing object instead of encrypting
+and uploading a copy. The rows that point at an object are its references;
+deleting a job or expiring it only removes the object with the last one.
+A reused object is claimed again when the new row is inserted, under a
+row lock that :meth:`JobsService.delete_for_user` also takes, so a delete
+racing the insert either sees the new reference or makes the insert fall
+back to uploading its own copy.
 """
 
 from __future__ import annotations
 
 import logging
+import os
 import uuid
+from collections.abc import AsyncIterator, Iterator, Mapping, Sequence, Set
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
+from io import BytesIO
+from typing import Any, BinaryIO, Union
 
 from fastapi import Depends
 from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
 from app.db.models import ToolJob
 from app.db.session import get_db_session
-from app.services.file_encryption import decrypt_file, encrypt_file
-from app.services.storage_service import StorageService, StorageServiceError
+from app.services.file_encryption import StreamDecryptor, StreamEncryptor, content_digest
+from app.services.storage_service import StorageService, StorageServiceError, get_storage_service
 
 log = logging.getLogger(__name__)
 
@@ -43,6 +60,21 @@ class JobNotFoundError(JobsServiceError):
     """Raised when a job is missing or not owned by the caller."""
 
 
+# A stored object is only reused while its newest row has this long to live.
+_REUSE_MIN_REMAINING = timedelta(days=1)
+
+
+@dataclass(frozen=True)
+class StoredOutput:
+    """Where a job's output lives in Storage and how it is encrypted."""
+
+    storage_path: str
+    encryption_blob: bytes
+    size: int
+    content_hash: str
+    reused: bool  # an existing object of the same user; not ours to delete
+
+
 def _object_path(user_id: uuid.UUID, job_id: uuid.UUID, output_filename: str) -> str:
     suffix = (
         output_filename.rsplit(".", 1)[-1] if "." in output_filename else "bin"
@@ -50,6 +82,13 @@ def _object_path(user_id: uuid.UUID, job_id: uuid.UUID, output_filename: str) ->
     return f"{user_id}/{job_id}.{suffix}"
 
 
+async def _in_threadpool(chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+    """Drive a blocking chunk iterator (file reads, encryption) off the event loop."""
+
+    while (chunk := await run_in_threadpool(next, chunks, None)) is not None:
+        yield chunk
+
+
 class JobsService:
     def __init__(self, db: AsyncSession, storage: StorageService) -> None:
         self._db = db
@@ -63,7 +102,7 @@ class JobsService:
         tool_name: str,
         original_filename: str | None,
         output_filename: str,
-        output_bytes: bytes,
+        output_bytes: Union[bytes, BinaryIO],
         mime_type: str,
         success: bool,
         error_type: str | None,
@@ -71,24 +110,31 @@ class JobsService:
     ) -> uuid.UUID | None:
         """Upload the output and insert a history row.
 
+        ``output_bytes`` may also be a seekable file handle (such as a
+        streamed response's tee spool). Either way the output is encrypted
+        chunk by chunk as the upload consumes it, so no full copy of the
+        ciphertext is ever held.
+
         Never raises — returns ``None`` on any failure so the caller can
         always proceed to hand bytes back to the user.
         """
 
         job_id = uuid.uuid4()
         path = _object_path(user_id, job_id, output_filename)
+        output = BytesIO(output_bytes) if isinstance(output_bytes, bytes) else output_bytes
 
+        now = datetime.now(timezone.utc)
         try:
-            ciphertext, encryption_blob = encrypt_file(output_bytes)
-            await self._storage.upload(
-                object_path=path, content=ciphertext, mime_type="application/octet-stream"
-            )
+            stored = await self.store_output(user_id, path, output, now=now)
+            if stored.reused and not await self.claim_stored_output(stored.storage_path, now=now):
+                # The matched job went away meanwhile: store our own copy.
+                await self._db.commit()
+                stored = await self.store_output(user_id, path, output, now=now, reuse=False)
         except Exception as exc:  # noqa: BLE001 — recording must never raise
             log.warning("jobs.record: storage upload failed: %s", exc)
             return None
 
         try:
-            now = datetime.now(timezone.utc)
             job = ToolJob(
                 id=job_id,
                 user_id=user_id,
@@ -96,10 +142,11 @@ class JobsService:
                 tool_name=tool_name,
                 original_filename=original_filename,
                 output_filename=output_filename,
-                storage_path=path,
-                encryption_blob=encryption_blob,
+                storage_path=stored.storage_path,
+                encryption_blob=stored.encryption_blob,
+                content_hash=stored.content_hash,
                 mime_type=mime_type,
-                output_size_bytes=len(output_bytes),
+                output_size_bytes=stored.size,
                 success=success,
                 error_type=error_type,
                 duration_ms=duration_ms,
@@ -118,15 +165,154 @@ class JobsService:
                 await self._db.rollback()
             except Exception:  # noqa: BLE001
                 pass
-            # Best-effort cleanup of the orphaned object.
-            try:
-                await self._storage.delete(path)
-            except Exception:  # noqa: BLE001
-                pass
+            # Best-effort cleanup of the orphaned object (a reused one is not ours).
+            if not stored.reused:
+                try:
+                    await self._storage.delete(path)
+                except Exception:  # noqa: BLE001
+                    pass
             return None
 
         return job_id
 
+    async def store_output(
+        self,
+        user_id: uuid.UUID,
+        object_path: str,
+        output: BinaryIO,
+        *,
+        now: datetime,
+        reuse: bool = True,
+    ) -> StoredOutput:
+        """Make ``output`` available in Storage for a new job of ``user_id``.
+
+        When the user already has a job with byte-identical output whose
+        object is staying around for a while, that object and its key are
+        reused: no encryption, no upload. Otherwise ``output`` is uploaded
+        to ``object_path``. A reused object must be claimed with
+        :meth:`claim_stored_output` in the transaction that inserts the row.
+        """
+
+        digest = await run_in_threadpool(content_digest, user_id, output)
+        if reuse:
+            existing = await self._find_stored_output(user_id, digest, now)
+            found = None
+            if existing is not None and existing.storage_path and existing.encryption_blob:
+                found = StoredOutput(
+                    storage_path=existing.storage_path,
+                    encryption_blob=existing.encryption_blob,
+                    size=existing.output_size_bytes,
+                    content_hash=digest,
+                    reused=True,
+                )
+            # End the lookup's transaction: the upload below must not keep a
+            # pooled connection idle in it.
+            await self._db.commit()
+            if found is not None:
+                return found
+        encryption_blob, size = await self.upload_output(object_path, output)
+        return StoredOutput(
+            storage_path=object_path,
+            encryption_blob=encryption_blob,
+            size=size,
+            content_hash=digest,
+            reused=False,
+        )
+
+    async def _find_stored_output(
+        self, user_id: uuid.UUID, content_hash: str, now: datetime
+    ) -> ToolJob | None:
+        # Only objects with a live reference well past now: cleanup never
+        # deletes those, so it cannot race with the new row that shares one.
+        stmt = (
+            select(ToolJob)
+            .where(
+                ToolJob.user_id == user_id,
+                ToolJob.content_hash == content_hash,
+                ToolJob.storage_path.is_not(None),
+                ToolJob.encryption_blob.is_not(None),
+                ToolJob.expires_at > now + _REUSE_MIN_REMAINING,
+            )
+            .order_by(ToolJob.expires_at.desc())
+            .limit(1)
+        )
+        result = await self._db.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def claim_stored_output(self, storage_path: str, *, now: datetime) -> bool:
+        """Whether a live job still holds ``storage_path``, locking it until commit.
+
+        Call in the transaction that inserts a row reusing the object: a
+        delete of the job holding it waits for that commit and then counts
+        the new row (see :meth:`delete_for_user`). ``False`` means the
+        object may be gone and the output has to be stored again.
+        """
+
+        stmt = (
+            select(ToolJob.id)
+            .where(ToolJob.storage_path == storage_path, ToolJob.expires_at > now + _REUSE_MIN_REMAINING)
+            .limit(1)
+            .with_for_update(read=True)
+        )
+        result = await self._db.execute(stmt)
+        return result.scalar_one_or_none() is not None
+
+    async def _lock_references(self, storage_path: str) -> None:
+        """Lock every row pointing at ``storage_path`` until commit."""
+
+        await self._db.execute(
+            select(ToolJob.id).where(ToolJob.storage_path == storage_path).with_for_update()
+        )
+
+    async def _is_shared(self, job: ToolJob) -> bool:
+        """Whether another row still points at ``job``'s Storage object."""
+
+        stmt = (
+            select(ToolJob.id)
+            .where(ToolJob.storage_path == job.storage_path, ToolJob.id != job.id)
+            .limit(1)
+        )
+        result = await self._db.execute(stmt)
+        return result.scalar_one_or_none() is not None
+
+    async def upload_output(self, object_path: str, output: BinaryIO) -> tuple[bytes, int]:
+        """Encrypt ``output`` into ``object_path`` as the upload consumes it.
+
+        Returns ``(encryption_blob, plaintext size)``. Uploads upsert, so
+        calling this again for the same path after a failure is safe.
+        """
+
+        output_size = output.seek(0, os.SEEK_END)
+        encryptor = StreamEncryptor()
+        await self._storage.upload(
+            object_path=object_path,
+            content=_in_threadpool(encryptor.encrypt_stream(output)),
+            mime_type="application/octet-stream",
+            content_length=encryptor.ciphertext_size(output_size),
+        )
+        return encryptor.blob, output_size
+
+    async def insert_jobs(
+        self, rows: Sequence[Mapping[str, Any]], *, reused_paths: Set[str] = frozenset()
+    ) -> set[str]:
+        """Insert ``tool_jobs`` rows with one multi-row INSERT and commit.
+
+        Rows whose id already exists are skipped, so replaying a batch
+        (e.g. after a restart) does not fail or duplicate anything. Rows
+        pointing at one of ``reused_paths`` are only inserted if that object
+        can still be claimed (:meth:`claim_stored_output`); the paths that
+        could not are returned and their rows left out.
+        """
+
+        now = datetime.now(timezone.utc)
+        lost = {path for path in reused_paths if not await self.claim_stored_output(path, now=now)}
+        rows = [row for row in rows if row["storage_path"] not in lost]
+        if rows:
+            stmt = pg_insert(ToolJob).values(rows).on_conflict_do_nothing(index_elements=[ToolJob.id])
+            await self._db.execute(stmt)
+        await self._db.commit()
+        return lost
+
     async def list_for_user(
         self,
         user_id: uuid.UUID,
@@ -153,16 +339,37 @@ class JobsService:
         result = await self._db.execute(stmt)
         return list(result.scalars().all())
 
-    async def download_and_decrypt(self, job: ToolJob) -> bytes:
-        """Fetch encrypted file from storage and decrypt it."""
+    async def open_download(self, job: ToolJob) -> AsyncIterator[bytes]:
+        """Start fetching the job's file and return its plaintext as a stream.
+
+        The key is unwrapped and the first chunk fetched before this
+        returns, so a missing object or a bad key raises here rather than
+        after a response has started. The rest is decrypted chunk by chunk
+        as it arrives from storage; tampering found later (including a
+        truncated object) raises from the iterator.
+        """
 
         if not job.storage_path:
             raise JobsServiceError("Job has no stored file")
         if not job.encryption_blob:
             raise JobsServiceError("Job is missing encryption metadata")
 
-        ciphertext = await self._storage.download(job.storage_path)
-        return decrypt_file(ciphertext, job.encryption_blob)
+        decryptor = StreamDecryptor(job.encryption_blob)
+        chunks = self._storage.iter_download(job.storage_path)
+        first = await anext(chunks, b"")
+
+        async def plaintext() -> AsyncIterator[bytes]:
+            try:
+                if piece := decryptor.update(first):
+                    yield piece
+                async for chunk in chunks:
+                    if piece := decryptor.update(chunk):
+                        yield piece
+                yield decryptor.finalize()
+            finally:
+                await chunks.aclose()
+
+        return plaintext()
 
     async def get_for_user(
         self, user_id: uuid.UUID, job_id: uuid.UUID
@@ -180,7 +387,12 @@ class JobsService:
         self, user_id: uuid.UUID, job_id: uuid.UUID
     ) -> None:
         job = await self.get_for_user(user_id, job_id)
+        # An object shared with the user's other jobs stays for them. The
+        # lock makes a concurrent insert reusing the object either commit
+        # first, so ``_is_shared`` sees it, or wait and find this job gone.
         if job.storage_path:
+            await self._lock_references(job.storage_path)
+        if job.storage_path and not await self._is_shared(job):
             try:
                 await self._storage.delete(job.storage_path)
             except StorageServiceError as exc:
@@ -197,6 +409,10 @@ class JobsService:
     async def cleanup_expired(self, now: datetime) -> int:
         """Drop Storage objects for expired rows and prune ancient rows.
 
+        An object shared by several rows (see :meth:`store_output`) is only
+        deleted once none of them is live; expired rows that share an object
+        with a live row just let go of it.
+
         Returns the number of Storage objects removed.
         """
 
@@ -205,18 +421,31 @@ class JobsService:
         )
         result = await self._db.execute(stmt)
         expired = list(result.scalars().all())
-        removed = 0
+        by_path: dict[str, list[ToolJob]] = {}
         for job in expired:
-            if not job.storage_path:
-                continue
-            try:
-                await self._storage.delete(job.storage_path)
+            if job.storage_path:
+                by_path.setdefault(job.storage_path, []).append(job)
+
+        still_used: set[str] = set()
+        if by_path:
+            live = await self._db.execute(
+                select(ToolJob.storage_path)
+                .where(ToolJob.storage_path.in_(list(by_path)), ToolJob.expires_at >= now)
+                .distinct()
+            )
+            still_used = set(live.scalars().all())
+
+        removed = 0
+        for path, jobs in by_path.items():
+            if path not in still_used:
+                try:
+                    await self._storage.delete(path)
+                    removed += 1
+                except StorageServiceError as exc:
+                    log.warning("jobs.cleanup: failed to delete %s: %s", path, exc)
+                    continue
+            for job in jobs:
                 job.storage_path = None
-                removed += 1
-            except StorageServiceError as exc:
-                log.warning(
-                    "jobs.cleanup: failed to delete %s: %s", job.storage_path, exc
-                )
         await self._db.flush()
 
         prune_before = now - timedelta(days=ROW_RETENTION_DAYS)
@@ -233,9 +462,8 @@ async def get_jobs_service(
 ) -> JobsService:
     """Request-scoped :class:`JobsService` factory.
 
-    ``StorageService`` is a thin ``httpx`` wrapper with no per-request
-    state, so a fresh instance per call is fine — negligible overhead in
-    a hot path and keeps the dependency graph explicit.
+    The session is per request; the ``StorageService`` (and the pooled
+    HTTP client behind it) is shared by the whole process.
     """
 
-    return JobsService(db, StorageService())
+    return JobsService(db, get_storage_service())
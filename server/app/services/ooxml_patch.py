@@ -0,0 +1,254 @@
+"""Change a few elements of an .xlsx package without loading its cells.
+
+Structural tools (freeze header, password protect, remove password) touch
+one element per worksheet and maybe one in ``workbook.xml``. Round-tripping
+through openpyxl for that re-parses and re-serialises every cell and style.
+:func:`patch_workbook` streams each targeted worksheet part instead: the XML
+before ``<sheetData>`` and after ``</sheetData>`` goes through a
+:class:`SheetPatch`, the rows in between are passed through unparsed, and
+every other member of the package is copied raw (see
+:mod:`app.services.ooxml_zip`).
+
+Patches raise :class:`PatchNotApplicable` for XML they do not recognise;
+:func:`patch_workbook` then returns ``None`` and the tool falls back to
+openpyxl.
+"""
+
+from __future__ import annotations
+
+import re
+import zipfile
+from collections.abc import Callable, Iterable
+from io import BytesIO
+from typing import BinaryIO
+from xml.sax.saxutils import quoteattr
+
+from openpyxl.reader.excel import ExcelReader, _find_workbook_part
+from openpyxl.worksheet.protection import SheetProtection
+
+from app.services.excel_reader import ExcelSource, source_stream
+from app.services.excel_xml_editor import _worksheet_parts
+from app.services.ooxml_zip import Replacement, rewrite_package
+from app.services.workbook_inspection import inspect_workbook
+
+__all__ = [
+    "FreezeRows",
+    "PatchNotApplicable",
+    "SetSheetProtection",
+    "SheetPatch",
+    "lock_structure",
+    "patch_workbook",
+]
+
+_READ_CHUNK = 256 * 1024
+# Rewritten worksheets are almost all row data; favour speed over a few percent of size.
+_PATCH_COMPRESSLEVEL = 1
+_SHEET_DATA_RE = re.compile(rb"<(?:[\w.-]+:)?sheetData\b[^>]*?(/?)>")
+_ROOT_RE = re.compile(rb"<((?:[\w.-]+:)?)(?:worksheet|workbook)\b")
+
+
+class PatchNotApplicable(Exception):
+    """The XML is not in a shape the patch engine can edit safely."""
+
+
+def _prefix(xml: bytes) -> bytes:
+    root = _ROOT_RE.search(xml)
+    if root is None:
+        raise PatchNotApplicable("No worksheet or workbook root element")
+    return root.group(1)
+
+
+def _empty_element(prefix: bytes, name: str, attrs: dict[str, str]) -> bytes:
+    rendered = "".join(f" {key}={quoteattr(value)}" for key, value in attrs.items())
+    return f"<{prefix.decode()}{name}{rendered}/>".encode("utf-8")
+
+
+def _element_re(prefix: bytes, name: bytes) -> re.Pattern[bytes]:
+    """An element that is empty or has content, assuming it does not nest in itself."""
+    tag = re.escape(prefix + name)
+    return re.compile(rb"<%s\b[^>]*?(?:/>|>.*?</%s>)" % (tag, tag), re.DOTALL)
+
+
+class SheetPatch:
+    """Edits to the XML around a worksheet's ``<sheetData>``; rows are never seen.
+
+    ``head`` is everything up to and including the ``<sheetData>`` start tag,
+    ``tail`` everything from ``</sheetData>`` on (or after ``<sheetData/>``).
+    ``prefix`` is the namespace prefix of the root element, usually empty.
+    """
+
+    def edit_head(self, head: bytes, prefix: bytes) -> bytes:
+        return head
+
+    def edit_tail(self, tail: bytes, prefix: bytes) -> bytes:
+        return tail
+
+
+class FreezeRows(SheetPatch):
+    """Freeze the top ``rows`` rows in the first sheet view, as ``ws.freeze_panes = "A{rows+1}"`` does."""
+
+    def __init__(self, rows: int) -> None:
+        self.rows = rows
+
+    def edit_head(self, head: bytes, prefix: bytes) -> bytes:
+        p = re.escape(prefix)
+        top_left = f"A{self.rows + 1}"
+        frozen = _empty_element(
+            prefix,
+            "pane",
+            {"ySplit": str(self.rows), "topLeftCell": top_left, "activePane": "bottomLeft", "state": "frozen"},
+        ) + _empty_element(prefix, "selection", {"pane": "bottomLeft", "activeCell": top_left, "sqref": top_left})
+
+        view = re.search(rb"<%ssheetView\b[^>]*?(/?)>" % p, head)
+        if view is None:
+            # Schema order: sheetPr, dimension, sheetViews, sheetFormatPr, cols, sheetData.
+            anchor = re.search(rb"<%s(?:sheetFormatPr|cols|sheetData)\b" % p, head)
+            if anchor is None:
+                raise PatchNotApplicable("No place for sheetViews")
+            views = b'<%ssheetViews><%ssheetView workbookViewId="0">%s</%ssheetView></%ssheetViews>' % (
+                prefix, prefix, frozen, prefix, prefix,
+            )
+            return head[: anchor.start()] + views + head[anchor.start():]
+        if view.group(1):
+            opened = head[view.start(): view.end() - 2].rstrip() + b">"
+            return head[: view.start()] + opened + frozen + b"</%ssheetView>" % prefix + head[view.end():]
+        close = head.find(b"</%ssheetView>" % prefix, view.end())
+        if close == -1:
+            raise PatchNotApplicable("Unterminated sheetView")
+        # ``pane`` and ``selection`` lead a view; pivot selections and extensions stay.
+        body = _element_re(prefix, b"pane").sub(b"", head[view.end(): close], count=1)
+        body = _element_re(prefix, b"selection").sub(b"", body)
+        return head[: view.end()] + frozen + body + head[close:]
+
+
+class SetSheetProtection(SheetPatch):
+    """Replace ``<sheetProtection>`` with ``protection``; an inactive one removes it, as openpyxl's writer does."""
+
+    def __init__(self, protection: SheetProtection) -> None:
+        self.attrs = dict(protection.to_tree().attrib) if protection else None
+
+    def edit_tail(self, tail: bytes, prefix: bytes) -> bytes:
+        existing = _element_re(prefix, b"sheetProtection")
+        if self.attrs is None:
+            return existing.sub(b"", tail, count=1)
+        element = _empty_element(prefix, "sheetProtection", self.attrs)
+        if existing.search(tail):
+            return existing.sub(lambda _: element, tail, count=1)
+        # Directly after sheetData, or after sheetCalcPr when there is one.
+        close = re.match(rb"</%ssheetData>\s*" % re.escape(prefix), tail)
+        at = close.end() if close else 0
+        calc = _element_re(prefix, b"sheetCalcPr").match(tail, at)
+        if calc:
+            at = calc.end()
+        return tail[:at] + element + tail[at:]
+
+
+def lock_structure(locked: bool) -> Callable[[bytes], bytes]:
+    """Set or clear ``lockStructure`` on ``<workbookProtection>``, as ``wb.security.lockStructure`` does."""
+
+    def edit(xml: bytes) -> bytes:
+        prefix = _prefix(xml)
+        p = re.escape(prefix)
+        found = re.search(rb"<%sworkbookProtection\b([^>]*?)\s*/>" % p, xml)
+        if found is None:
+            if re.search(rb"<%sworkbookProtection\b" % p, xml):
+                raise PatchNotApplicable("workbookProtection with content")
+            if not locked:
+                return xml
+            anchor = re.search(rb"<%s(?:bookViews|sheets)\b" % p, xml)
+            if anchor is None:
+                raise PatchNotApplicable("No place for workbookProtection")
+            element = _empty_element(prefix, "workbookProtection", {"lockStructure": "1"})
+            return xml[: anchor.start()] + element + xml[anchor.start():]
+        attrs = re.sub(rb"""\s+lockStructure=("[^"]*"|'[^']*')""", b"", found.group(1))
+        if locked:
+            attrs += b' lockStructure="1"'
+        elif not attrs.strip():
+            return xml[: found.start()] + xml[found.end():]
+        return xml[: found.start()] + b"<%sworkbookProtection%s/>" % (prefix, attrs) + xml[found.end():]
+
+    return edit
+
+
+def _stream_sheet(patch: SheetPatch) -> Callable[[BinaryIO, BinaryIO], None]:
+    """Stream a worksheet part through ``patch``, copying the rows in between as they come."""
+
+    def rewrite(src: BinaryIO, dst: BinaryIO) -> None:
+        buffer = b""
+        while (start := _SHEET_DATA_RE.search(buffer)) is None:
+            chunk = src.read(_READ_CHUNK)
+            if not chunk:
+                raise PatchNotApplicable("No sheetData")
+            buffer += chunk
+        prefix = _prefix(buffer)
+        dst.write(patch.edit_head(buffer[: start.end()], prefix))
+        pending = buffer[start.end():]
+        if not start.group(1):
+            end_tag = b"</%ssheetData>" % prefix
+            # Keep enough of each chunk back to catch an end tag split across reads.
+            keep = len(end_tag) - 1
+            while (found := pending.find(end_tag)) == -1:
+                chunk = src.read(_READ_CHUNK)
+                if not chunk:
+                    raise PatchNotApplicable("Unterminated sheetData")
+                if len(pending) > keep:
+                    dst.write(pending[:-keep])
+                    pending = pending[-keep:]
+                pending += chunk
+            dst.write(pending[:found])
+            pending = pending[found:]
+        dst.write(patch.edit_tail(pending + src.read(), prefix))
+
+    return rewrite
+
+
+def patch_workbook(
+    source: ExcelSource,
+    *,
+    sheet_patch: SheetPatch | None = None,
+    sheets: Iterable[str] | None = None,
+    workbook_patch: Callable[[bytes], bytes] | None = None,
+) -> bytes | None:
+    """Apply ``sheet_patch`` to ``sheets`` (all worksheets when ``None``) and ``workbook_patch`` to ``workbook.xml``.
+
+    Names in ``sheets`` that are not worksheets are ignored, like the
+    openpyxl tools do. Returns the new package, or ``None`` when the source
+    is not a package this can edit (an encrypted or damaged file, unusual
+    XML); the caller then takes the openpyxl path, which reports errors.
+    """
+    if inspect_workbook(source).container != "zip":
+        return None
+    try:
+        reader = ExcelReader(source_stream(source), read_only=True)
+    except Exception:
+        return None
+    try:
+        worksheets, _ = _worksheet_parts(reader)
+        workbook_part = _find_workbook_part(reader.package).PartName[1:]
+        # The streamed copy has no way to back out, so check the XML is plain UTF-8 up front.
+        if workbook_patch is not None:
+            workbook_xml = reader.archive.read(workbook_part)
+            workbook_xml.decode("utf-8")
+    except Exception:
+        return None
+    finally:
+        reader.archive.close()
+
+    replacements: dict[str, Replacement] = {}
+    if sheet_patch is not None:
+        wanted = set(worksheets) if sheets is None else set(sheets)
+        for title, part in worksheets.items():
+            if title in wanted:
+                replacements[part] = _stream_sheet(sheet_patch)
+    if workbook_patch is not None:
+        try:
+            replacements[workbook_part] = workbook_patch(workbook_xml)
+        except PatchNotApplicable:
+            return None
+
+    output = BytesIO()
+    try:
+        rewrite_package(source_stream(source), output, replacements, compresslevel=_PATCH_COMPRESSLEVEL)
+    except (PatchNotApplicable, zipfile.BadZipFile):
+        return None
+    return output.getvalue()
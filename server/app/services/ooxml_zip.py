@@ -0,0 +1,125 @@
+"""Rewrite a few members of an OOXML package and copy the rest untouched.
+
+Tools that only change one or two parts of a workbook (a worksheet, the
+shared strings, a ``.rels`` file) have no reason to inflate and re-deflate
+every drawing, image and VBA project in it. :func:`rewrite_package` copies
+each untouched member's compressed bytes straight from the input zip to the
+output, headers included, so they come out byte-for-byte identical and cost
+no compression work.
+"""
+
+from __future__ import annotations
+
+import copy
+import struct
+import zipfile
+from collections.abc import Mapping
+from typing import BinaryIO, Callable, Union
+
+__all__ = ["Replacement", "copy_member_raw", "rewrite_package"]
+
+_COPY_CHUNK = 1024 * 1024
+_ZIP64_EXTRA_ID = 0x0001
+_FLAG_ENCRYPTED = 0x01
+_FLAG_DATA_DESCRIPTOR = 0x08
+
+
+def _strip_zip64_extra(extra: bytes) -> bytes:
+    """``extra`` without its ZIP64 record; ``FileHeader`` writes a fresh one when needed."""
+    kept = bytearray()
+    position = 0
+    while position + 4 <= len(extra):
+        field_id, size = struct.unpack_from("<HH", extra, position)
+        end = position + 4 + size
+        if field_id != _ZIP64_EXTRA_ID:
+            kept += extra[position:end]
+        position = end
+    return bytes(kept)
+
+
+def copy_member_raw(src: zipfile.ZipFile, info: zipfile.ZipInfo, dst: zipfile.ZipFile) -> None:
+    """Copy member ``info`` of ``src`` into ``dst`` without decompressing it.
+
+    ``zipfile`` has no public API for this, so the local header is written
+    the way ``ZipFile.open(..., "w")`` does and the member registered in
+    ``dst``'s directory by hand. Encrypted members fall back to a normal
+    read and write.
+    """
+    if info.flag_bits & _FLAG_ENCRYPTED:
+        dst.writestr(info, src.read(info))
+        return
+
+    fp = src.fp
+    fp.seek(info.header_offset)
+    header = struct.unpack(zipfile.structFileHeader, fp.read(zipfile.sizeFileHeader))
+    if header[zipfile._FH_SIGNATURE] != zipfile.stringFileHeader:
+        raise zipfile.BadZipFile(f"Bad local header for {info.filename!r}")
+    fp.seek(
+        info.header_offset
+        + zipfile.sizeFileHeader
+        + header[zipfile._FH_FILENAME_LENGTH]
+        + header[zipfile._FH_EXTRA_FIELD_LENGTH]
+    )
+
+    out = copy.copy(info)
+    out.extra = _strip_zip64_extra(info.extra)
+    # Sizes and CRC are known up front, so they go in the local header.
+    out.flag_bits = info.flag_bits & ~_FLAG_DATA_DESCRIPTOR
+    zip64 = out.file_size > zipfile.ZIP64_LIMIT or out.compress_size > zipfile.ZIP64_LIMIT
+
+    dst.fp.seek(dst.start_dir)
+    out.header_offset = dst.fp.tell()
+    dst._writecheck(out)
+    dst._didModify = True
+    dst.fp.write(out.FileHeader(zip64))
+    remaining = info.compress_size
+    while remaining:
+        chunk = fp.read(min(_COPY_CHUNK, remaining))
+        if not chunk:
+            raise zipfile.BadZipFile(f"Truncated member {info.filename!r}")
+        dst.fp.write(chunk)
+        remaining -= len(chunk)
+    dst.filelist.append(out)
+    dst.NameToInfo[out.filename] = out
+    dst.start_dir = dst.fp.tell()
+
+
+# A replacement is new content, ``None`` to drop the member, or a function
+# that streams the old content (first argument) into the new (second).
+Replacement = Union[bytes, None, Callable[[BinaryIO, BinaryIO], None]]
+
+
+def rewrite_package(
+    source: BinaryIO,
+    out: BinaryIO,
+    replacements: Mapping[str, Replacement],
+    *,
+    compresslevel: int | None = None,
+) -> None:
+    """Write ``source`` to ``out`` with the members in ``replacements`` changed.
+
+    Replaced members are deflated (at ``compresslevel``) and keep their
+    name, timestamp and position. Everything else is copied raw with
+    :func:`copy_member_raw`.
+    """
+    with zipfile.ZipFile(source) as zin, zipfile.ZipFile(
+        out, "w", zipfile.ZIP_DEFLATED, compresslevel=compresslevel
+    ) as zout:
+        for info in zin.infolist():
+            if info.filename not in replacements:
+                copy_member_raw(zin, info, zout)
+                continue
+            replacement = replacements[info.filename]
+            if replacement is None:
+                continue
+            replaced = zipfile.ZipInfo(info.filename, info.date_time)
+            replaced.compress_type = zipfile.ZIP_DEFLATED
+            replaced.compress_level = compresslevel
+            replaced.external_attr = info.external_attr
+            if isinstance(replacement, bytes):
+                zout.writestr(replaced, replacement)
+                continue
+            with zin.open(info) as src, zout.open(
+                replaced, "w", force_zip64=info.file_size > zipfile.ZIP64_LIMIT // 2
+            ) as dst:
+                replacement(src, dst)
@@ -0,0 +1,106 @@
+"""Per-process spool directories under a root shared by several workers.
+
+The job recorder and the file-handle store both keep user data in a local
+directory that every uvicorn worker of a host may share. Each process works
+in its own ``<prefix><id>`` subdirectory and holds an exclusive ``flock`` on
+its ``.lock`` file for as long as it runs; a subdirectory whose lock is free
+belongs to a process that has exited.
+
+A subdirectory is created and locked under a temporary name and only then
+renamed into the ``<prefix>`` namespace, so no other process ever sees one
+that is not locked yet. Lock files are never created on someone else's
+directory: one without a ``.lock`` is skipped, and one that disappears
+while it is looked at has been taken by another process.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import os
+import shutil
+import uuid
+from collections.abc import Iterator
+
+_LOCK = ".lock"
+_TEMP_PREFIX = ".new-"
+
+
+class SpoolDir:
+    """A subdirectory this process owns; the lock is held until :meth:`close`."""
+
+    def __init__(self, path: str, lock_fd: int) -> None:
+        self.path = path
+        self._lock_fd: int | None = lock_fd
+
+    def close(self) -> None:
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+
+def claim_spool_dir(root: str, prefix: str) -> SpoolDir:
+    """Create a new ``<prefix><id>`` directory under ``root``, already locked."""
+    name = uuid.uuid4().hex
+    staging = os.path.join(root, f"{_TEMP_PREFIX}{name}")
+    # Spooled files are user data; keep them private to this account.
+    os.makedirs(staging, mode=0o700)
+    fd = os.open(os.path.join(staging, _LOCK), os.O_CREAT | os.O_RDWR, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        path = os.path.join(root, f"{prefix}{name}")
+        os.rename(staging, path)
+    except BaseException:
+        os.close(fd)
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return SpoolDir(path, fd)
+
+
+def orphaned_spool_dirs(root: str, prefix: str) -> Iterator[str]:
+    """Yield the ``<prefix>`` directories under ``root`` whose process has exited.
+
+    Each one is locked while the caller handles it and removed once the
+    caller asks for the next, so two processes never take the same one.
+    """
+    for name in sorted(os.listdir(root)):
+        if not name.startswith(prefix):
+            continue
+        path = os.path.join(root, name)
+        lock = os.path.join(path, _LOCK)
+        try:
+            fd = os.open(lock, os.O_RDWR)
+        except (FileNotFoundError, NotADirectoryError):
+            continue  # no lock yet, or already taken
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                continue  # a live process owns it
+            if not os.path.exists(lock):
+                continue  # removed by whoever held the lock before us
+            yield path
+            shutil.rmtree(path, ignore_errors=True)
+        finally:
+            os.close(fd)
+
+
+def remove_orphaned_spool_dirs(root: str, prefix: str) -> None:
+    """Remove the ``<prefix>`` directories under ``root`` whose process has exited."""
+    for _path in orphaned_spool_dirs(root, prefix):
+        pass  # each is removed as the sweep moves on
+
+
+def remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+__all__ = [
+    "SpoolDir",
+    "claim_spool_dir",
+    "orphaned_spool_dirs",
+    "remove_orphaned_spool_dirs",
+    "remove_quietly",
+]
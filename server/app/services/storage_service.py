@@ -4,23 +4,102 @@ A thin wrapper around the Supabase Storage REST API, mirroring the pattern
 the auth_service follows (no extra dependency; just httpx + the
 service-role key). All methods assume a private bucket — writes and signed
 URLs both require the service-role key.
+
+Every call goes through one process-wide ``httpx.AsyncClient``
+(:func:`get_storage_client`), so requests reuse pooled keep-alive
+connections instead of paying for a TCP and TLS handshake each time, and
+speaks HTTP/2 (``httpx[http2]``) so concurrent calls share one connection.
+The client is opened on app startup and closed on shutdown.
 """
 
 from __future__ import annotations
 
-from typing import Any
+import asyncio
+import os
+from collections.abc import AsyncIterable, AsyncIterator
+from typing import Any, BinaryIO, Union
 
 import httpx
+from starlette.concurrency import run_in_threadpool
 
 from app.core.config import get_settings
 
+_STREAM_CHUNK = 256 * 1024
+_DOWNLOAD_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+
+_client: httpx.AsyncClient | None = None
+_client_loop: asyncio.AbstractEventLoop | None = None
+# Closes of clients left behind by an earlier loop; referenced until they finish.
+_retiring: set[asyncio.Future[None]] = set()
+
+
+def get_storage_client() -> httpx.AsyncClient:
+    """Return the shared Storage client, creating it on first use.
+
+    Pooled connections belong to the event loop that opened them, so a
+    caller on a different loop (a CLI run, a test) gets a fresh client and
+    the previous one is closed.
+    """
+
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        if _client is not None and _client_loop is not None:
+            _retire_client(_client, _client_loop, loop)
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(30.0, connect=10.0),
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=60.0),
+            http2=True,
+        )
+        _client_loop = loop
+    return _client
+
+
+def _retire_client(
+    client: httpx.AsyncClient,
+    owner: asyncio.AbstractEventLoop,
+    current: asyncio.AbstractEventLoop,
+) -> None:
+    """Close ``client`` on the loop its connections belong to, if that loop is still open."""
+
+    if not owner.is_closed():
+        asyncio.run_coroutine_threadsafe(client.aclose(), owner)
+        return
+    # The owning loop is gone, so its transports cannot shut down cleanly; close
+    # the pool anyway so the client drops its sockets instead of holding them.
+    task = current.create_task(_close_quietly(client))
+    _retiring.add(task)
+    task.add_done_callback(_retiring.discard)
+
+
+async def _close_quietly(client: httpx.AsyncClient) -> None:
+    try:
+        await client.aclose()
+    except RuntimeError:
+        pass  # "Event loop is closed" from a transport of the old loop
+
+
+async def close_storage_client() -> None:
+    """Close the shared Storage client (wired to app shutdown)."""
+
+    global _client, _client_loop
+    if _client is not None:
+        client, _client, _client_loop = _client, None, None
+        await client.aclose()
+
+
+async def _read_chunks(handle: BinaryIO) -> AsyncIterator[bytes]:
+    while chunk := await run_in_threadpool(handle.read, _STREAM_CHUNK):
+        yield chunk
+
 
 class StorageServiceError(RuntimeError):
     """Raised when a Supabase Storage call fails."""
 
 
 class StorageService:
-    def __init__(self) -> None:
+    def __init__(self, client: httpx.AsyncClient | None = None) -> None:
+        self._own_client = client
         settings = get_settings()
         if not settings.supabase_secret_key:
             raise StorageServiceError("SUPABASE_SECRET_KEY is not configured")
@@ -38,16 +117,25 @@ class StorageService:
     def bucket(self) -> str:
         return self._bucket
 
+    @property
+    def _client(self) -> httpx.AsyncClient:
+        return self._own_client if self._own_client is not None else get_storage_client()
+
     async def upload(
         self,
         *,
         object_path: str,
-        content: bytes,
+        content: Union[bytes, BinaryIO, AsyncIterable[bytes]],
         mime_type: str,
+        content_length: int | None = None,
     ) -> str:
-        """Upload bytes to ``<bucket>/<object_path>``. Returns the object path.
+        """Upload ``content`` to ``<bucket>/<object_path>``. Returns the object path.
 
-        Uses upsert so re-uploads (e.g. retries) overwrite cleanly.
+        ``content`` may be a seekable file handle, which is streamed from
+        its start without being read into memory, or an async iterable of
+        chunks, sent as they are produced (pass ``content_length`` when it
+        is known up front). Uses upsert so re-uploads (e.g. retries)
+        overwrite cleanly.
         """
 
         url = f"{self._base_url}/object/{self._bucket}/{object_path}"
@@ -56,8 +144,16 @@ class StorageService:
             "content-type": mime_type,
             "x-upsert": "true",
         }
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(url, content=content, headers=headers)
+        body: Any = content
+        if isinstance(content, AsyncIterable):
+            if content_length is not None:
+                headers["content-length"] = str(content_length)
+        elif not isinstance(content, (bytes, bytearray, memoryview)):
+            # A known length keeps the upload out of chunked transfer encoding.
+            headers["content-length"] = str(content.seek(0, os.SEEK_END))
+            content.seek(0)
+            body = _read_chunks(content)
+        response = await self._client.post(url, content=body, headers=headers)
         self._raise_for_status(response, "upload")
         return object_path
 
@@ -67,10 +163,9 @@ class StorageService:
         """Create a short-lived signed URL that downloads the stored object."""
 
         url = f"{self._base_url}/object/sign/{self._bucket}/{object_path}"
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(
-                url, headers=self._headers, json={"expiresIn": expires_in_seconds}
-            )
+        response = await self._client.post(
+            url, headers=self._headers, json={"expiresIn": expires_in_seconds}
+        )
         self._raise_for_status(response, "sign")
         data: dict[str, Any] = response.json()
         # Supabase returns a path like "/object/sign/<bucket>/<path>?token=..."
@@ -83,21 +178,37 @@ class StorageService:
             signed_path = "/storage/v1" + signed_path
         return f"{self._public_root}{signed_path}"
 
-    async def download(self, object_path: str) -> bytes:
-        """Download raw bytes from ``<bucket>/<object_path>``."""
+    async def iter_download(self, object_path: str) -> AsyncIterator[bytes]:
+        """Yield ``<bucket>/<object_path>`` in chunks as it arrives.
+
+        The request is sent on the first ``__anext__``, so a missing object
+        raises there, before anything is yielded.
+        """
 
         url = f"{self._base_url}/object/{self._bucket}/{object_path}"
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.get(url, headers=self._headers)
-        self._raise_for_status(response, "download")
-        return response.content
+        async with self._client.stream(
+            "GET", url, headers=self._headers, timeout=_DOWNLOAD_TIMEOUT
+        ) as response:
+            if response.status_code >= 400:
+                await response.aread()
+            self._raise_for_status(response, "download")
+            async for chunk in response.aiter_bytes(_STREAM_CHUNK):
+                yield chunk
+
+    async def download_to(self, object_path: str, destination: BinaryIO) -> int:
+        """Stream ``<bucket>/<object_path>`` into ``destination``. Returns the byte count."""
+
+        written = 0
+        async for chunk in self.iter_download(object_path):
+            destination.write(chunk)
+            written += len(chunk)
+        return written
 
     async def delete(self, object_path: str) -> None:
         """Hard-delete a stored object. Succeeds silently on 404."""
 
         url = f"{self._base_url}/object/{self._bucket}/{object_path}"
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.request("DELETE", url, headers=self._headers)
+        response = await self._client.request("DELETE", url, headers=self._headers)
         if response.status_code == 404:
             return
         self._raise_for_status(response, "delete")
@@ -109,3 +220,15 @@ class StorageService:
             raise StorageServiceError(
                 f"Storage {op} failed ({response.status_code}): {body}"
             )
+
+
+_service: StorageService | None = None
+
+
+def get_storage_service() -> StorageService:
+    """Return the process-wide :class:`StorageService` (settings are read once)."""
+
+    global _service
+    if _service is None:
+        _service = StorageService()
+    return _service
@@ -0,0 +1,205 @@
+"""Content-addressed cache of parsed workbook values shared by every tool.
+
+A typical session sends the same upload to several tools in a row
+(preview, then a clean tool, then a conversion), and each request used to
+parse it from scratch. Parsed values are cached under the SHA-256 of the
+upload plus the reader engine, so identical bytes are parsed once.
+
+Entries are immutable (sheets are tuples of row tuples, which is also
+smaller than nested lists) and can be shared with other holders such as
+the inspect token store. Callers that want the usual mutable
+``dict[str, list[list]]`` get a fresh copy from :meth:`ParsedWorkbook.to_lists`.
+
+The cache is bounded by an approximate byte budget and a sliding TTL, and
+evicts least-recently-used entries first. Tool bodies run on the executor's
+worker threads, so every operation takes a lock.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, BinaryIO, Callable, Union
+
+from app.core.config import get_settings
+
+CacheKey = tuple[str, str]
+SheetRows = tuple[tuple[Any, ...], ...]
+
+_HASH_CHUNK = 1024 * 1024
+
+
+def _estimate_size(sheets: dict[str, SheetRows]) -> int:
+    total = 0
+    for rows in sheets.values():
+        total += sys.getsizeof(rows)
+        for row in rows:
+            total += sys.getsizeof(row)
+            for cell in row:
+                total += sys.getsizeof(cell)
+    return total
+
+
+class ParsedWorkbook:
+    """Immutable parsed values of one workbook, as stored in the cache."""
+
+    __slots__ = ("sheets", "size")
+
+    def __init__(self, sheets: dict[str, SheetRows]) -> None:
+        self.sheets = sheets
+        self.size = _estimate_size(sheets)
+
+    @classmethod
+    def from_lists(cls, workbook_data: dict[str, list[list[Any]]]) -> "ParsedWorkbook":
+        return cls({name: tuple(map(tuple, rows)) for name, rows in workbook_data.items()})
+
+    def to_lists(self) -> dict[str, list[list[Any]]]:
+        """A mutable copy in the shape ``parse_excel_bytes`` returns."""
+        return {name: [list(row) for row in rows] for name, rows in self.sheets.items()}
+
+
+# Digests of upload handles, kept for as long as the handle lives: a request
+# that opens its upload more than once hashes it once.
+_digests: weakref.WeakKeyDictionary[BinaryIO, str] = weakref.WeakKeyDictionary()
+_digests_lock = threading.Lock()
+
+
+def workbook_cache_key(source: Union[bytes, BinaryIO], engine: str) -> CacheKey:
+    """SHA-256 of the upload contents plus the reader engine."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(source).hexdigest(), engine
+    with _digests_lock:
+        known = _digests.get(source)
+    if known is not None:
+        return known, engine
+    digest = hashlib.sha256()
+    source.seek(0)
+    while chunk := source.read(_HASH_CHUNK):
+        digest.update(chunk)
+    source.seek(0)
+    with _digests_lock:
+        _digests[source] = digest.hexdigest()
+    return digest.hexdigest(), engine
+
+
+class WorkbookCache:
+    def __init__(
+        self,
+        *,
+        max_bytes: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._max_bytes = max_bytes
+        self._ttl = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (last used, entry); ordered least recently used first, which
+        # with a sliding TTL is also the order in which entries expire.
+        self._entries: OrderedDict[CacheKey, tuple[float, ParsedWorkbook]] = OrderedDict()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.oversized = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._max_bytes > 0 and self._ttl > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _drop(self, key: CacheKey) -> None:
+        _, entry = self._entries.pop(key)
+        self._total_bytes -= entry.size
+
+    def _expire(self, now: float) -> None:
+        while self._entries:
+            key, (last_used, _) = next(iter(self._entries.items()))
+            if now - last_used <= self._ttl:
+                break
+            self._drop(key)
+            self.expirations += 1
+
+    def get(self, key: CacheKey) -> ParsedWorkbook | None:
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            found = self._entries.get(key)
+            if found is None:
+                self.misses += 1
+                return None
+            entry = found[1]
+            self._entries[key] = (now, entry)
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: CacheKey, entry: ParsedWorkbook) -> None:
+        if not self.enabled:
+            return
+        if entry.size > self._max_bytes:
+            with self._lock:
+                self.oversized += 1
+            return
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            if key in self._entries:
+                self._drop(key)
+            while self._entries and self._total_bytes + entry.size > self._max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+            self._entries[key] = (now, entry)
+            self._total_bytes += entry.size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Snapshot of occupancy and hit/miss/eviction counters."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self._max_bytes,
+                "ttl_seconds": self._ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "oversized": self.oversized,
+            }
+
+
+_cache: WorkbookCache | None = None
+
+
+def get_workbook_cache() -> WorkbookCache:
+    """Return the process-wide cache, creating it from settings on first use."""
+
+    global _cache
+    if _cache is None:
+        settings = get_settings()
+        _cache = WorkbookCache(
+            max_bytes=settings.workbook_cache_max_bytes,
+            ttl_seconds=settings.workbook_cache_ttl_seconds,
+        )
+    return _cache
+
+
+__all__ = [
+    "CacheKey",
+    "ParsedWorkbook",
+    "WorkbookCache",
+    "get_workbook_cache",
+    "workbook_cache_key",
+]
@@ -0,0 +1,213 @@
+"""What an upload is, worked out once and shared by every reader and tool.
+
+A request used to open the upload's zip several times before doing any
+real work: the magic-byte check, the reader, and ``has_visual_elements``
+scanning ``namelist()`` for drawings afterwards. :func:`inspect_workbook`
+reads the container signature, and on first use the central directory, into
+a :class:`WorkbookInspection`; the few small parts that describe the
+workbook's outline are only read if the outline is asked for. Inspections of spooled upload handles are kept
+for as long as the handle lives, so later calls for the same upload cost a
+dictionary lookup.
+
+openpyxl opens its own ``ZipFile`` from the stream and has no way to be
+handed a parsed directory, so readers built on it still read the directory
+once more themselves; everything else asks the inspection.
+"""
+
+from __future__ import annotations
+
+import posixpath
+import re
+import threading
+import weakref
+import zipfile
+from io import BytesIO
+from typing import BinaryIO, Callable, Literal, Union
+from xml.etree import ElementTree as ET
+
+Container = Literal["zip", "ole", "unknown"]
+
+ZIP_MAGIC = b"PK\x03\x04"
+OLE_MAGIC = b"\xd0\xcf\x11\xe0"
+VISUAL_PREFIXES = ("xl/drawings/", "xl/charts/", "xl/media/")
+
+_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_DOC_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_HEAD_BYTES = 4096
+_DIMENSION_RE = re.compile(rb"<(?:[\w.-]+:)?dimension\b[^>]*?\bref=[\"']([^\"']*)[\"']")
+_UNIQUE_COUNT_RE = re.compile(rb"<(?:[\w.-]+:)?sst\b[^>]*?\buniqueCount=[\"'](\d+)[\"']")
+
+
+class WorkbookInspection:
+    """Container format, zip parts and workbook outline of one upload.
+
+    ``container`` comes from the first bytes and is always known. The parts
+    are read from the zip the first time any of them is asked for, and the
+    outline (dimensions and string count) separately the first time it is;
+    both are empty (no parts, no dimensions, ``None`` counts) for non-zip or
+    damaged files.
+    """
+
+    def __init__(self, source: Union[bytes, BinaryIO], container: Container) -> None:
+        self.container = container
+        # A handle is only referenced weakly: it is also the key it is cached under.
+        self._source: Union[bytes, weakref.ref[BinaryIO]] = (
+            source if isinstance(source, (bytes, bytearray, memoryview)) else weakref.ref(source)
+        )
+        self._lock = threading.Lock()
+        self._scanned = False
+        self._outlined = False
+        self._parts: tuple[str, ...] = ()
+        self._has_visual_elements = False
+        self._sheet_dimensions: dict[str, str | None] = {}
+        self._shared_string_count: int | None = None
+
+    @property
+    def parts(self) -> tuple[str, ...]:
+        """Member names, with backslashes normalised to ``/``."""
+        self._scan()
+        return self._parts
+
+    @property
+    def has_visual_elements(self) -> bool:
+        """Whether the package has drawings, charts or embedded media."""
+        self._scan()
+        return self._has_visual_elements
+
+    @property
+    def sheet_dimensions(self) -> dict[str, str | None]:
+        """``{sheet title: dimension ref}`` for every worksheet, in workbook order."""
+        self._outline()
+        return self._sheet_dimensions
+
+    @property
+    def shared_string_count(self) -> int | None:
+        """``uniqueCount`` of the shared string table, if it declares one."""
+        self._outline()
+        return self._shared_string_count
+
+    def _scan(self) -> None:
+        if self._scanned:
+            return
+        with self._lock:
+            if self._scanned:
+                return
+            self._open_archive(self._read_parts)
+            self._scanned = True
+
+    def _outline(self) -> None:
+        # Decompresses the head of every worksheet, so only done on request.
+        if self._outlined:
+            return
+        with self._lock:
+            if self._outlined:
+                return
+            self._open_archive(self._read_outline)
+            self._outlined = True
+
+    def _open_archive(self, read: Callable[[zipfile.ZipFile, dict[str, str]], None]) -> None:
+        source = self._source() if isinstance(self._source, weakref.ref) else self._source
+        if self.container != "zip" or source is None:
+            return
+        try:
+            with zipfile.ZipFile(_stream(source)) as archive:
+                names = {info.filename.replace("\\", "/"): info.filename for info in archive.infolist()}
+                read(archive, names)
+        except (zipfile.BadZipFile, OSError, ValueError):
+            pass
+
+    def _read_parts(self, archive: zipfile.ZipFile, names: dict[str, str]) -> None:
+        self._parts = tuple(names)
+        self._has_visual_elements = any(name.lower().startswith(VISUAL_PREFIXES) for name in names)
+
+    def _read_outline(self, archive: zipfile.ZipFile, names: dict[str, str]) -> None:
+        try:
+            self._read_sheet_outline(archive, names)
+        except (ET.ParseError, KeyError, OSError, zipfile.BadZipFile, RuntimeError, ValueError):
+            # The outline is a hint; readers report broken workbooks themselves.
+            pass
+
+    def _read_sheet_outline(self, archive: zipfile.ZipFile, names: dict[str, str]) -> None:
+        workbook_part = next(
+            (target for kind, target in _relationships(archive, names, "").values() if kind.endswith("/officeDocument")),
+            None,
+        )
+        if workbook_part is None:
+            return
+        targets = _relationships(archive, names, workbook_part)
+        root = ET.fromstring(archive.read(names[workbook_part]))
+        for sheet in root.iter(f"{_MAIN_NS}sheet"):
+            kind, target = targets.get(sheet.get(f"{_DOC_REL_NS}id", ""), ("", ""))
+            if kind.endswith("/worksheet") and target in names:
+                self._sheet_dimensions[sheet.get("name", "")] = _first_match(archive, names[target], _DIMENSION_RE)
+        strings = next((target for kind, target in targets.values() if kind.endswith("/sharedStrings")), None)
+        if strings in names:
+            count = _first_match(archive, names[strings], _UNIQUE_COUNT_RE)
+            self._shared_string_count = int(count) if count is not None else None
+
+
+def _stream(source: Union[bytes, BinaryIO]) -> BinaryIO:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return BytesIO(source)
+    source.seek(0)
+    return source
+
+
+def _relationships(archive: zipfile.ZipFile, names: dict[str, str], part: str) -> dict[str, tuple[str, str]]:
+    """``{id: (type, target part)}`` for the internal relationships in ``part``'s ``.rels``."""
+    folder, base = posixpath.split(part)
+    rels = posixpath.join(folder, "_rels", f"{base}.rels")
+    found: dict[str, tuple[str, str]] = {}
+    if rels not in names:
+        return found
+    for rel in ET.fromstring(archive.read(names[rels])).iter(f"{_REL_NS}Relationship"):
+        if rel.get("TargetMode") == "External":
+            continue
+        target = rel.get("Target", "")
+        target = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join(folder, target))
+        found[rel.get("Id", "")] = (rel.get("Type", ""), target)
+    return found
+
+
+def _first_match(archive: zipfile.ZipFile, name: str, pattern: re.Pattern[bytes]) -> str | None:
+    with archive.open(name) as member:
+        found = pattern.search(member.read(_HEAD_BYTES))
+    return found.group(1).decode("utf-8", "replace") if found else None
+
+
+_inspections: weakref.WeakKeyDictionary[BinaryIO, WorkbookInspection] = weakref.WeakKeyDictionary()
+_inspections_lock = threading.Lock()
+
+
+def _container(source: Union[bytes, BinaryIO]) -> Container:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        head = bytes(source[:4])
+    else:
+        source.seek(0)
+        head = source.read(4)
+        source.seek(0)
+    if head.startswith(ZIP_MAGIC):
+        return "zip"
+    if head.startswith(OLE_MAGIC):
+        return "ole"
+    return "unknown"
+
+
+def inspect_workbook(source: Union[bytes, BinaryIO]) -> WorkbookInspection:
+    """The inspection of ``source``, shared for as long as an upload handle lives.
+
+    ``bytes`` cannot be referenced weakly, so they get a fresh inspection per
+    call; tool routes pass the spooled handle.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return WorkbookInspection(source, _container(source))
+    with _inspections_lock:
+        inspection = _inspections.get(source)
+        if inspection is None:
+            inspection = WorkbookInspection(source, _container(source))
+            _inspections[source] = inspection
+    return inspection
+
+
+__all__ = ["Container", "WorkbookInspection", "inspect_workbook"]
@@ -1,3 +1,4 @@
+from app.tools.files import router as files_router
 from app.tools.inspect import pagination_router as inspect_pagination_router
 from app.tools.inspect import router as inspect_router
 from app.tools.convert import router as convert_router
@@ -20,4 +21,7 @@ tool_routers = [
 # These must NOT be quota-enforced: they are part of an already-counted job.
 tool_pagination_routers = [
     inspect_pagination_router,
+    # Upload-once file handles: storing a file is not a job either; the
+    # tool runs that use its token are counted.
+    files_router,
 ]
@@ -1,33 +1,73 @@
 from __future__ import annotations
 
+import asyncio
+import os
 import re
-import zipfile
+import threading
+import time
+from collections.abc import AsyncIterator, Iterator, Sequence
 from io import BytesIO
+from tempfile import SpooledTemporaryFile
+from typing import Any, BinaryIO, Callable, TypeVar
 from urllib.parse import quote
 
 from fastapi import HTTPException, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
 from app.core.limits import Tier, effective_limits
 from app.core.security import AuthenticatedPrincipal
-from app.services.excel_reader import ensure_supported_excel_filename
+from app.services.excel_reader import (
+    ExcelSource,
+    ensure_supported_excel_filename,
+)
+from app.services.executor import ExecutorSaturatedError, get_tool_executor
+from app.services.workbook_inspection import inspect_workbook
 
-_VISUAL_PREFIXES = ("xl/drawings/", "xl/charts/", "xl/media/")
+T = TypeVar("T")
 
 MAX_UPLOAD_SIZE_BYTES = 20 * 1024 * 1024  # 20 MB
 _READ_CHUNK = 64 * 1024  # 64 KB
+_SPOOL_MAX_MEMORY = 1024 * 1024  # 1 MB, same threshold as Starlette's multipart spool
 
 _INVALID_SHEET_CHARS = re.compile(r"[\\/\*?:\[\]]")
 
 
-async def read_with_limit(file: UploadFile, max_bytes: int = MAX_UPLOAD_SIZE_BYTES) -> bytes:
-    chunks: list[bytes] = []
+async def spool_with_limit(file: UploadFile, max_bytes: int = MAX_UPLOAD_SIZE_BYTES) -> BinaryIO:
+    """Return a seekable handle on the upload, enforcing ``max_bytes``.
+
+    Starlette's multipart parser already streams file parts into a
+    ``SpooledTemporaryFile`` (memory up to 1 MB, then disk), so when the
+    upload is seekable its size is checked by seeking and the same handle is
+    returned — the body is never copied into a Python ``bytes``. Anything
+    else is streamed into our own spool with the cap enforced per chunk.
+    Point ``TMPDIR`` at a tmpfs mount to keep rolled-over spools off disk.
+    """
+    handle = file.file
+    if handle.seekable():
+        size = file.size
+        if size is None:
+            size = handle.seek(0, os.SEEK_END)
+        if size > max_bytes:
+            raise HTTPException(status_code=400, detail="File too large")
+        handle.seek(0)
+        return handle
+
+    spool = SpooledTemporaryFile(max_size=_SPOOL_MAX_MEMORY)
     total = 0
     while chunk := await file.read(_READ_CHUNK):
         total += len(chunk)
         if total > max_bytes:
+            spool.close()
             raise HTTPException(status_code=400, detail="File too large")
-        chunks.append(chunk)
-    return b"".join(chunks)
+        spool.write(chunk)
+    spool.seek(0)
+    return spool  # type: ignore[return-value]
+
+
+async def read_with_limit(file: UploadFile, max_bytes: int = MAX_UPLOAD_SIZE_BYTES) -> bytes:
+    handle = await spool_with_limit(file, max_bytes)
+    return await run_in_threadpool(handle.read)
 
 
 def check_excel_file(file: UploadFile):
@@ -107,31 +147,17 @@ def _safe_xml_tag(raw: str, fallback: str = "field") -> str:
     return tag
 
 
-def has_visual_elements(raw: bytes) -> bool:
-    try:
-        with zipfile.ZipFile(BytesIO(raw), "r") as zf:
-            for name in zf.namelist():
-                if name.replace("\\", "/").lower().startswith(_VISUAL_PREFIXES):
-                    return True
-    except Exception:
-        pass
-    return False
+def has_visual_elements(source: ExcelSource) -> bool:
+    return inspect_workbook(source).has_visual_elements
 
 
-def file_response(
-    content: bytes,
-    filename: str,
-    media_type: str,
-    *,
-    visual_elements_removed: bool = False,
-) -> Response:
+def _download_headers(filename: str, *, visual_elements_removed: bool) -> dict[str, str]:
     encoded_filename = quote(filename, safe="")
     headers = {
         "Content-Disposition": (
             f'attachment; filename="{filename}"; '
             f"filename*=UTF-8''{encoded_filename}"
         ),
-        "Content-Length": str(len(content)),
         "X-Content-Type-Options": "nosniff",
     }
     if visual_elements_removed:
@@ -141,6 +167,18 @@ def file_response(
         headers["Access-Control-Expose-Headers"] = (
             f"{exposed}, X-Visual-Elements-Removed".lstrip(", ")
         )
+    return headers
+
+
+def file_response(
+    content: bytes,
+    filename: str,
+    media_type: str,
+    *,
+    visual_elements_removed: bool = False,
+) -> Response:
+    headers = _download_headers(filename, visual_elements_removed=visual_elements_removed)
+    headers["Content-Length"] = str(len(content))
     return Response(
         content=content,
         media_type=media_type,
@@ -148,6 +186,238 @@ def file_response(
     )
 
 
+def streaming_file_response(
+    chunks: AsyncIterator[bytes],
+    filename: str,
+    media_type: str,
+    *,
+    visual_elements_removed: bool = False,
+) -> StreamingResponse:
+    """Like :func:`file_response`, but the body is sent as ``chunks`` arrive (no Content-Length)."""
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers=_download_headers(filename, visual_elements_removed=visual_elements_removed),
+    )
+
+
+async def run_tool_work(
+    principal: AuthenticatedPrincipal | None,
+    fn: Callable[..., T],
+    /,
+    *args: Any,
+    **kwargs: Any,
+) -> T:
+    """Run a synchronous tool body on the shared executor.
+
+    Concurrency is capped by the caller's tier. When the tier's queue is
+    full the request is refused with ``503`` + ``Retry-After`` instead of
+    piling up behind work that is already running.
+    """
+
+    tier = effective_limits(principal).tier
+    try:
+        return await get_tool_executor().run(tier, fn, *args, **kwargs)
+    except ExecutorSaturatedError as exc:
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "detail": "The server is busy processing other files. Please retry shortly.",
+                "error_code": "SERVER_BUSY",
+            },
+            headers={"Retry-After": str(exc.retry_after_seconds)},
+        ) from exc
+
+
+class ToolOutputStream:
+    """Output of a generator tool body that is running on the executor.
+
+    The body appends each chunk to a spooled temporary file as fast as it
+    produces them and never waits for the client, so its tier slot and
+    pool thread are given back as soon as the output is complete; iterating
+    with ``async for`` (or via :func:`streaming_file_response`) reads the
+    spool behind it. A slow download therefore costs spool space, not a
+    worker. When the stream was created with ``tee=True`` the spool is kept
+    as :attr:`spool` for job recording, which uploads it once
+    :attr:`completed` is set; otherwise it is closed when iteration ends.
+    Abandoning the iteration (client disconnect) stops the tool body at its
+    next chunk.
+    """
+
+    def __init__(self, cancelled: threading.Event, spool: SpooledTemporaryFile, *, tee: bool) -> None:
+        self._cancelled = cancelled
+        self._file = spool
+        self._lock = threading.Lock()
+        self._written = 0
+        self._sent = 0
+        self._reader_waiting = False
+        self._changed = asyncio.Event()
+        self._done = False
+        self._error: BaseException | None = None
+        self.spool = spool if tee else None
+        self.completed = False
+        self.finished_at: float | None = None
+        self._driver: asyncio.Task | None = None
+
+    def _append(self, loop: asyncio.AbstractEventLoop, chunk: bytes) -> bool:
+        """Called on the worker thread; ``False`` once nobody reads any more."""
+        with self._lock:
+            if self._cancelled.is_set() or self._file.closed:
+                return False
+            self._file.seek(0, os.SEEK_END)
+            self._file.write(chunk)
+            self._written += len(chunk)
+            # Only wake the reader when it is parked, not once per chunk.
+            wake, self._reader_waiting = self._reader_waiting, False
+        if wake:
+            loop.call_soon_threadsafe(self._changed.set)
+        return True
+
+    def _finish(self, error: BaseException | None) -> None:
+        self._done = True
+        self._error = error
+        if error is None:
+            self.finished_at = time.perf_counter()
+        self._changed.set()
+
+    def _take(self) -> bytes:
+        with self._lock:
+            if self._sent == self._written:
+                return b""
+            self._file.seek(self._sent)
+            chunk = self._file.read(min(self._written - self._sent, _READ_CHUNK))
+        self._sent += len(chunk)
+        return chunk
+
+    async def _wait(self) -> None:
+        """Wait until there is unsent output or the body has finished."""
+        while True:
+            with self._lock:
+                if self._sent != self._written or self._done:
+                    return
+                self._changed.clear()
+                self._reader_waiting = True
+            await self._changed.wait()
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        try:
+            while True:
+                await self._wait()
+                chunk = self._take()
+                if chunk:
+                    yield chunk
+                elif self._error is not None:
+                    raise self._error
+                else:
+                    self.completed = True
+                    return
+        finally:
+            if not self.completed:
+                self.cancel()
+            if self.spool is None:
+                with self._lock:
+                    self._file.close()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+
+def _pump_chunks(
+    loop: asyncio.AbstractEventLoop,
+    stream: ToolOutputStream,
+    fn: Callable[..., Iterator[bytes]],
+    args: tuple[Any, ...],
+    kwargs: dict[str, Any],
+) -> None:
+    chunks = fn(*args, **kwargs)
+    try:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            if not stream._append(loop, chunk):
+                return
+    finally:
+        chunks.close()
+
+
+async def stream_tool_work(
+    principal: AuthenticatedPrincipal | None,
+    fn: Callable[..., Iterator[bytes]],
+    /,
+    *args: Any,
+    tee: bool = False,
+    close_when_done: Sequence[BinaryIO] = (),
+    **kwargs: Any,
+) -> ToolOutputStream:
+    """Run a generator tool body on the shared executor and stream its chunks.
+
+    Returns once the first chunk (or the end of the output) is available, so
+    anything the body raises before its first ``yield`` — a 404 for a
+    missing sheet, a 400 for an unreadable file, the 503 for a saturated
+    executor — still surfaces as a normal error response. Handles in
+    ``close_when_done`` (typically a :func:`detach_upload` handle) are closed
+    after the body finishes.
+    """
+
+    loop = asyncio.get_running_loop()
+    stream = ToolOutputStream(threading.Event(), SpooledTemporaryFile(max_size=_SPOOL_MAX_MEMORY), tee=tee)
+
+    async def _drive() -> None:
+        try:
+            await run_tool_work(principal, _pump_chunks, loop, stream, fn, args, kwargs)
+        except Exception as exc:  # noqa: BLE001 — handed to the consumer
+            stream._finish(exc)
+        else:
+            stream._finish(None)
+        finally:
+            for handle in close_when_done:
+                handle.close()
+
+    stream._driver = asyncio.create_task(_drive())
+    await stream._wait()
+    if stream._written == 0 and stream._error is not None:
+        stream._file.close()
+        raise stream._error
+    return stream
+
+
+def detach_upload(file: UploadFile, handle: BinaryIO) -> BinaryIO:
+    """Take ownership of the spooled upload ``handle`` so it outlives the endpoint.
+
+    FastAPI closes form uploads as soon as the endpoint returns, which is
+    before a streaming body is sent. The caller becomes responsible for
+    closing ``handle`` (see ``close_when_done`` on :func:`stream_tool_work`).
+    """
+    if file.file is handle:
+        file.file = BytesIO()
+    return handle
+
+
+async def spool_upload_for_principal(
+    file: UploadFile,
+    *,
+    principal: AuthenticatedPrincipal | None,
+) -> BinaryIO:
+    """Tier-aware version of :func:`spool_with_limit`.
+
+    Preferred over :func:`read_upload_for_principal` for spreadsheet inputs:
+    the returned handle can be passed straight to ``parse_excel_bytes`` /
+    ``load_workbook_for_edit``. Size errors are reported exactly as in
+    :func:`read_upload_for_principal`.
+    """
+
+    limits = effective_limits(principal)
+    try:
+        return await spool_with_limit(file, max_bytes=limits.max_upload_bytes)
+    except HTTPException as exc:
+        # ``read_with_limit`` / ``spool_with_limit`` raise
+        # ``HTTPException(status_code=400, detail="File too large")`` —
+        # remap to 413 with a tier code so the client can react specifically.
+        if exc.status_code != 400:
+            raise
+        raise _tier_size_error(limits.tier) from exc
+
+
 async def read_upload_for_principal(
     file: UploadFile,
     *,
@@ -165,20 +435,24 @@ async def read_upload_for_principal(
     try:
         return await read_with_limit(file, max_bytes=limits.max_upload_bytes)
     except HTTPException as exc:
-        # ``read_with_limit`` raises ``HTTPException(status_code=400,
-        # detail="File too large")`` — remap to 413 with a tier code so
-        # the client can react specifically.
+        # ``read_with_limit`` / ``spool_with_limit`` raise
+        # ``HTTPException(status_code=400, detail="File too large")`` —
+        # remap to 413 with a tier code so the client can react specifically.
         if exc.status_code != 400:
             raise
-        error_code = (
-            "ANON_FILE_TOO_LARGE"
-            if limits.tier is Tier.ANON
-            else "FREE_FILE_TOO_LARGE"
-        )
-        raise HTTPException(
-            status_code=413,
-            detail={
-                "detail": "File too large for your tier.",
-                "error_code": error_code,
-            },
-        ) from exc
+        raise _tier_size_error(limits.tier) from exc
+
+
+def _tier_size_error(tier: Tier) -> HTTPException:
+    error_code = (
+        "ANON_FILE_TOO_LARGE"
+        if tier is Tier.ANON
+        else "FREE_FILE_TOO_LARGE"
+    )
+    return HTTPException(
+        status_code=413,
+        detail={
+            "detail": "File too large for your tier.",
+            "error_code": error_code,
+        },
+    )
@@ -2,19 +2,25 @@
 
 The helper wraps :func:`app.tools._common.file_response` so anonymous
 behavior stays byte-identical to today. For authenticated callers it
-schedules a fire-and-forget :class:`JobsService.record_authenticated_job`
-call via FastAPI's ``BackgroundTasks`` — background tasks run after the
-response is sent so a slow Storage upload never blocks the user's
-download.
+schedules a fire-and-forget recording via FastAPI's ``BackgroundTasks`` —
+background tasks run after the response is sent so a slow Storage upload
+never blocks the user's download. When the app has started the
+:mod:`job recorder <app.services.job_recorder>`, that task only spills the
+output into its queue; otherwise it runs
+:class:`JobsService.record_authenticated_job` inline.
 """
 
 from __future__ import annotations
 
+import time
+from typing import Any
+
 from fastapi import BackgroundTasks, Response
 
 from app.core.security import AuthenticatedPrincipal, get_current_user_optional
+from app.services.job_recorder import get_job_recorder
 from app.services.jobs_service import JobsService, get_jobs_service
-from app.tools._common import file_response
+from app.tools._common import ToolOutputStream, file_response, streaming_file_response
 
 
 jobs_service_dep = get_jobs_service
@@ -26,6 +32,16 @@ existing imports continue to work.
 """
 
 
+async def _record_job(jobs_service: JobsService, **job: Any) -> None:
+    """Hand a finished output to the job recorder, or record it inline without one."""
+
+    recorder = get_job_recorder()
+    if recorder is not None and recorder.running:
+        await recorder.submit(**job)
+    else:
+        await jobs_service.record_authenticated_job(**job)
+
+
 async def record_and_respond(
     *,
     principal: AuthenticatedPrincipal | None,
@@ -61,7 +77,8 @@ async def record_and_respond(
         return response
 
     async def _record() -> None:
-        await jobs_service.record_authenticated_job(
+        await _record_job(
+            jobs_service,
             user_id=principal.user_id,
             tool_slug=tool_slug,
             tool_name=tool_name,
@@ -78,8 +95,66 @@ async def record_and_respond(
     return response
 
 
+async def record_and_stream(
+    *,
+    principal: AuthenticatedPrincipal | None,
+    background_tasks: BackgroundTasks,
+    jobs_service: JobsService | None,
+    tool_slug: str,
+    tool_name: str,
+    original_filename: str | None,
+    stream: ToolOutputStream,
+    output_filename: str,
+    mime_type: str,
+    started: float,
+) -> Response:
+    """Streaming counterpart of :func:`record_and_respond`.
+
+    The download is sent as ``stream`` produces it. For authenticated
+    callers the stream must have been started with ``tee=True``: once the
+    body has been sent in full, the teed copy is recorded exactly like
+    ``output_bytes`` is in :func:`record_and_respond` (read straight from
+    the spool), with ``duration_ms`` measured up to the last chunk.
+    Interrupted downloads are not recorded.
+    """
+
+    response = streaming_file_response(stream, output_filename, mime_type)
+
+    if principal is None or jobs_service is None:
+        return response
+
+    async def _record() -> None:
+        spool = stream.spool
+        if spool is None:
+            return
+        try:
+            if not stream.completed:
+                return
+            finished_at = stream.finished_at or time.perf_counter()
+            # The spool is copied or uploaded as it is read, never loaded whole.
+            await _record_job(
+                jobs_service,
+                user_id=principal.user_id,
+                tool_slug=tool_slug,
+                tool_name=tool_name,
+                original_filename=original_filename,
+                output_filename=output_filename,
+                output_bytes=spool,
+                mime_type=mime_type,
+                success=True,
+                error_type=None,
+                duration_ms=int((finished_at - started) * 1000),
+            )
+        finally:
+            spool.close()
+
+    background_tasks.add_task(_record)
+    return response
+
+
 __all__ = [
     "jobs_service_dep",
     "record_and_respond",
+    "record_and_stream",
     "get_current_user_optional",
 ]
@@ -0,0 +1,113 @@
+"""``file`` / ``file_token`` inputs for tool routes.
+
+Every tool takes its workbook either as a multipart ``file`` or as the
+``file_token`` returned by ``POST /api/v1/tools/files`` (see
+:mod:`app.services.file_handles`). A token is resolved into an ordinary
+``UploadFile`` over the spooled copy, so route bodies — size checks,
+``spool_upload_for_principal``, ``detach_upload`` — work unchanged.
+
+Single-input routes use ``Depends(file_or_token("..."))`` in place of
+``File(...)``. Routes with several inputs take the optional ``File`` and
+``Form`` fields themselves and resolve them with :func:`pick_upload` and
+the per-request :func:`file_token_resolver`.
+"""
+
+from __future__ import annotations
+
+from collections.abc import AsyncIterator, Callable
+from typing import Awaitable
+
+from fastapi import Depends, File, Form, HTTPException, Request, UploadFile
+from starlette.datastructures import Headers
+
+from app.core.quota_guard import _key_for_request
+from app.core.security import AuthenticatedPrincipal, get_current_user_optional
+from app.services.file_handles import get_file_handle_store
+
+TokenResolver = Callable[[str], UploadFile]
+
+_TOKEN_DESCRIPTION = "Token from POST /api/v1/tools/files, instead of uploading the file again"
+
+
+def _token_not_found() -> HTTPException:
+    return HTTPException(
+        status_code=404,
+        detail={
+            "detail": "File token not found or expired. Upload the file again.",
+            "error_code": "FILE_TOKEN_NOT_FOUND",
+        },
+    )
+
+
+async def file_token_resolver(
+    request: Request,
+    principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
+) -> AsyncIterator[TokenResolver]:
+    """Yield a function that opens the caller's file handles as uploads.
+
+    Files opened during the request are closed when it finishes. A token
+    uploaded by someone else is reported exactly like an expired one.
+    """
+
+    owner = _key_for_request(request, principal)
+    store = get_file_handle_store()
+    opened: list[UploadFile] = []
+
+    def resolve(token: str) -> UploadFile:
+        handle = store.get(token, owner=owner)
+        if handle is None:
+            raise _token_not_found()
+        headers = Headers({"content-type": handle.content_type or "application/octet-stream"})
+        upload = UploadFile(
+            file=open(handle.path, "rb"),
+            size=handle.size,
+            filename=handle.filename,
+            headers=headers,
+        )
+        opened.append(upload)
+        return upload
+
+    try:
+        yield resolve
+    finally:
+        # ``detach_upload`` swaps ``.file`` out for streaming routes; closing
+        # the placeholder is harmless and the stream closes the real file.
+        for upload in opened:
+            upload.file.close()
+
+
+def pick_upload(
+    file: UploadFile | None,
+    file_token: str | None,
+    resolve: TokenResolver,
+    *,
+    field: str = "file",
+) -> UploadFile:
+    """Return the uploaded ``file`` or the one behind ``file_token``; exactly one must be set."""
+    token = (file_token or "").strip()
+    if file is not None and token:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Send either {field} or {field}_token, not both",
+        )
+    if file is not None:
+        return file
+    if token:
+        return resolve(token)
+    raise HTTPException(status_code=400, detail=f"Either {field} or {field}_token is required")
+
+
+def file_or_token(description: str = "Excel file") -> Callable[..., Awaitable[UploadFile]]:
+    """Dependency for a single ``file`` input that also accepts ``file_token``."""
+
+    async def dependency(
+        file: UploadFile | None = File(None, description=description),
+        file_token: str | None = Form(None, description=_TOKEN_DESCRIPTION),
+        resolve: TokenResolver = Depends(file_token_resolver),
+    ) -> UploadFile:
+        return pick_upload(file, file_token, resolve)
+
+    return dependency
+
+
+__all__ = ["TokenResolver", "file_or_token", "file_token_resolver", "pick_upload"]
@@ -0,0 +1,149 @@
+"""One-pass column statistics for the summary stats report.
+
+:class:`SheetAggregator` consumes a sheet's rows as the reader yields them,
+so a sheet is never held in memory as rows. Every column keeps a count of
+blanks, a running mean and sum of squared deviations (Welford's algorithm,
+which stays accurate where ``sum(x*x)`` cancels) and its numeric values in a
+compact ``array('d')``. Order statistics (median, percentiles, min/max) and
+distinct counts come from those values once the sheet is done, not from
+another pass over the rows.
+
+With NumPy installed the order statistics come from ``numpy.percentile``,
+which selects the requested ranks with introselect instead of sorting the
+column. Without it the values are sorted once with the built-in sort, which
+in CPython beats a selection algorithm written in Python. Both interpolate
+linearly between closest ranks, like ``statistics.median`` and Excel's
+``PERCENTILE.INC``.
+"""
+
+from __future__ import annotations
+
+import math
+from array import array
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+try:
+    import numpy as np
+except ImportError:  # optional; the pure-Python path gives the same numbers
+    np = None
+
+PERCENTILES = (10, 25, 75, 90)
+
+
+@dataclass(frozen=True)
+class ColumnSummary:
+    name: str
+    count: int
+    minimum: float
+    maximum: float
+    mean: float
+    median: float
+    stdev: float
+    total: float
+    blanks: int
+    distinct: int
+    percentiles: tuple[float, ...]  # matching ``PERCENTILES``
+
+
+class _Column:
+    __slots__ = ("values", "blanks", "mean", "m2")
+
+    def __init__(self) -> None:
+        self.values = array("d")
+        self.blanks = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+
+def _rank_value(ordered: Sequence[float], position: float) -> float:
+    """Value at fractional ``position`` of ``ordered``, interpolating linearly."""
+    low = math.floor(position)
+    high = min(low + 1, len(ordered) - 1)
+    fraction = position - low
+    return ordered[low] + (ordered[high] - ordered[low]) * fraction if fraction else ordered[low]
+
+
+def _order_statistics(values: array) -> tuple[float, float, float, tuple[float, ...], int]:
+    """``(min, max, median, percentiles, distinct)`` of a non-empty column."""
+    if np is not None:
+        data = np.frombuffer(values, dtype=np.float64)
+        # ``np.percentile`` partitions around the requested ranks instead of sorting.
+        median, *percentiles = (float(q) for q in np.percentile(data, (50, *PERCENTILES)))
+        return float(data.min()), float(data.max()), median, tuple(percentiles), int(np.unique(data).size)
+    ordered = sorted(values)
+    last = len(ordered) - 1
+    median, *percentiles = (_rank_value(ordered, last * q / 100) for q in (50, *PERCENTILES))
+    return ordered[0], ordered[last], median, tuple(percentiles), len(set(values))
+
+
+class SheetAggregator:
+    """Column statistics of one sheet; row 1 is the header."""
+
+    def __init__(self, header: Sequence[Any]) -> None:
+        self.header = list(header)
+        self.data_rows = 0
+        self._columns = [_Column() for _ in self.header]
+        # Rows shorter than the header, by length; their missing cells are blanks.
+        self._short_rows: dict[int, int] = {}
+
+    def add_rows(self, rows: Iterable[Sequence[Any]]) -> None:
+        columns = self._columns
+        width = len(columns)
+        short_rows = self._short_rows
+        data_rows = 0
+        for row in rows:
+            data_rows += 1
+            if len(row) < width:
+                short_rows[len(row)] = short_rows.get(len(row), 0) + 1
+            for column, value in zip(columns, row):
+                if value is None:
+                    column.blanks += 1
+                    continue
+                if isinstance(value, (int, float)):
+                    number = float(value)
+                elif isinstance(value, str):
+                    try:
+                        number = float(value)
+                    except ValueError:
+                        if not value.strip():
+                            column.blanks += 1
+                        continue
+                else:
+                    continue
+                values = column.values
+                values.append(number)
+                delta = number - column.mean
+                column.mean += delta / len(values)
+                column.m2 += delta * (number - column.mean)
+        self.data_rows += data_rows
+
+    def summaries(self) -> list[ColumnSummary]:
+        """Summaries of the columns with at least one numeric value, in header order."""
+        out: list[ColumnSummary] = []
+        for index, (name, column) in enumerate(zip(self.header, self._columns)):
+            count = len(column.values)
+            if not count:
+                continue
+            missing = sum(rows for length, rows in self._short_rows.items() if length <= index)
+            minimum, maximum, median, percentiles, distinct = _order_statistics(column.values)
+            out.append(
+                ColumnSummary(
+                    name=str(name) if name is not None else f"Column {index + 1}",
+                    count=count,
+                    minimum=minimum,
+                    maximum=maximum,
+                    mean=column.mean,
+                    median=median,
+                    stdev=math.sqrt(column.m2 / (count - 1)) if count > 1 else 0.0,
+                    total=math.fsum(column.values),
+                    blanks=column.blanks + missing,
+                    distinct=distinct,
+                    percentiles=percentiles,
+                )
+            )
+        return out
+
+
+__all__ = ["PERCENTILES", "ColumnSummary", "SheetAggregator"]
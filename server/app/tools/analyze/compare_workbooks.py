@@ -4,21 +4,23 @@ import time
 from datetime import datetime, timezone
 from io import BytesIO
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, UploadFile
 from openpyxl import Workbook, load_workbook
 from openpyxl.styles import Font, PatternFill
 
 from app.core.security import AuthenticatedPrincipal
+from app.services.excel_reader import ExcelSource, source_stream
 from app.services.jobs_service import JobsService
 from app.tools._common import (
-    check_excel_file, read_upload_for_principal,
-    safe_base_filename, unique_sheet_title,
+    check_excel_file, run_tool_work, safe_base_filename,
+    spool_upload_for_principal, unique_sheet_title,
 )
 from app.tools._recording import (
     get_current_user_optional,
     jobs_service_dep,
     record_and_respond,
 )
+from app.tools._uploads import TokenResolver, file_token_resolver, pick_upload
 from app.tools.analyze._styles import (
     ALT_ROW_FILL, BODY_FONT, BOLD_FONT, CENTER_ALIGNMENT, THIN_BORDER,
     WHITE_FILL, GREEN_FILL, RED_FILL, AMBER_FILL, WHITE_BOLD_FONT,
@@ -61,29 +63,17 @@ def _read_sheet_data(ws_val, ws_form) -> dict[str, tuple[str, str]]:
     return data
 
 
-@router.post(
-    "/compare-workbooks",
-    summary="Compare Workbooks",
-    description="Compare two Excel files cell by cell and return an XLSX diff report.",
-)
-async def compare_workbooks(
-    background_tasks: BackgroundTasks,
-    file_a: UploadFile = File(..., description="Original Excel file"),
-    file_b: UploadFile = File(..., description="Modified Excel file"),
-    principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
-    jobs_service: JobsService = Depends(jobs_service_dep),
-):
-    started = time.perf_counter()
-    check_excel_file(file_a)
-    check_excel_file(file_b)
-    raw_a = await read_upload_for_principal(file_a, principal=principal)
-    raw_b = await read_upload_for_principal(file_b, principal=principal)
-
+def _compare_report(
+    source_a: ExcelSource,
+    source_b: ExcelSource,
+    name_a: str,
+    name_b: str,
+) -> tuple[bytes, dict[str, int]]:
     try:
-        wb_a_val = load_workbook(BytesIO(raw_a), data_only=True, read_only=True)
-        wb_a_form = load_workbook(BytesIO(raw_a), data_only=False, read_only=True)
-        wb_b_val = load_workbook(BytesIO(raw_b), data_only=True, read_only=True)
-        wb_b_form = load_workbook(BytesIO(raw_b), data_only=False, read_only=True)
+        wb_a_val = load_workbook(source_stream(source_a), data_only=True, read_only=True)
+        wb_a_form = load_workbook(source_stream(source_a), data_only=False, read_only=True)
+        wb_b_val = load_workbook(source_stream(source_b), data_only=True, read_only=True)
+        wb_b_form = load_workbook(source_stream(source_b), data_only=False, read_only=True)
     except Exception as exc:
         raise HTTPException(
             status_code=400,
@@ -178,8 +168,6 @@ async def compare_workbooks(
     ws_sum = out.active
     ws_sum.title = "Summary"
 
-    name_a = file_a.filename or "original"
-    name_b = file_b.filename or "modified"
     scan_time = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
 
     next_row = write_info_box(ws_sum, [
@@ -275,6 +263,44 @@ async def compare_workbooks(
     buf = BytesIO()
     out.save(buf)
 
+    counts = {
+        "added": len(added_sheets),
+        "removed": len(removed_sheets),
+        "modified": len(modified_sheets),
+        "changed": total_changed,
+    }
+    return buf.getvalue(), counts
+
+
+@router.post(
+    "/compare-workbooks",
+    summary="Compare Workbooks",
+    description="Compare two Excel files cell by cell and return an XLSX diff report.",
+)
+async def compare_workbooks(
+    background_tasks: BackgroundTasks,
+    file_a: UploadFile | None = File(None, description="Original Excel file"),
+    file_b: UploadFile | None = File(None, description="Modified Excel file"),
+    file_a_token: str | None = Form(None, description="File token to use instead of file_a"),
+    file_b_token: str | None = Form(None, description="File token to use instead of file_b"),
+    resolve: TokenResolver = Depends(file_token_resolver),
+    principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
+    jobs_service: JobsService = Depends(jobs_service_dep),
+):
+    started = time.perf_counter()
+    file_a = pick_upload(file_a, file_a_token, resolve, field="file_a")
+    file_b = pick_upload(file_b, file_b_token, resolve, field="file_b")
+    check_excel_file(file_a)
+    check_excel_file(file_b)
+    source_a = await spool_upload_for_principal(file_a, principal=principal)
+    source_b = await spool_upload_for_principal(file_b, principal=principal)
+
+    name_a = file_a.filename or "original"
+    name_b = file_b.filename or "modified"
+    output_bytes, counts = await run_tool_work(
+        principal, _compare_report, source_a, source_b, name_a, name_b,
+    )
+
     base_a = safe_base_filename(name_a, "original")
     base_b = safe_base_filename(name_b, "modified")
     output_name = f"comparison-{base_a}-vs-{base_b}.xlsx"
@@ -286,16 +312,16 @@ async def compare_workbooks(
         tool_slug="compare-workbooks",
         tool_name="Compare Workbooks",
         original_filename=file_a.filename,
-        output_bytes=buf.getvalue(),
+        output_bytes=output_bytes,
         output_filename=output_name,
         mime_type=_XLSX_MIME,
         success=True,
         error_type=None,
         duration_ms=int((time.perf_counter() - started) * 1000),
     )
-    resp.headers["X-Sheets-Added"] = str(len(added_sheets))
-    resp.headers["X-Sheets-Removed"] = str(len(removed_sheets))
-    resp.headers["X-Sheets-Modified"] = str(len(modified_sheets))
-    resp.headers["X-Total-Changed"] = str(total_changed)
+    resp.headers["X-Sheets-Added"] = str(counts["added"])
+    resp.headers["X-Sheets-Removed"] = str(counts["removed"])
+    resp.headers["X-Sheets-Modified"] = str(counts["modified"])
+    resp.headers["X-Total-Changed"] = str(counts["changed"])
     resp.headers["Access-Control-Expose-Headers"] = "X-Sheets-Added, X-Sheets-Removed, X-Sheets-Modified, X-Total-Changed"
     return resp
@@ -5,18 +5,25 @@ import time
 from datetime import datetime, timezone
 from io import BytesIO
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile
 from openpyxl import Workbook, load_workbook
 from openpyxl.styles import Font, PatternFill
 
 from app.core.security import AuthenticatedPrincipal
+from app.services.excel_reader import ExcelSource, source_stream
 from app.services.jobs_service import JobsService
-from app.tools._common import check_excel_file, read_upload_for_principal, safe_base_filename
+from app.tools._common import (
+    check_excel_file,
+    run_tool_work,
+    safe_base_filename,
+    spool_upload_for_principal,
+)
 from app.tools._recording import (
     get_current_user_optional,
     jobs_service_dep,
     record_and_respond,
 )
+from app.tools._uploads import file_or_token
 from app.tools.analyze._styles import (
     ALT_ROW_FILL, BODY_FONT, BOLD_FONT, CENTER_ALIGNMENT, THIN_BORDER,
     WHITE_FILL, WRAP_ALIGNMENT,
@@ -81,24 +88,13 @@ _REFERENCE_ROWS: list[list[str]] = [
 ]
 
 
-@router.post(
-    "/scan-formula-errors",
-    summary="Scan Formula Errors",
-    description="Scan every cell across all sheets for formula errors and return an XLSX report.",
-)
-async def scan_formula_errors(
-    background_tasks: BackgroundTasks,
-    file: UploadFile = File(..., description="Excel file"),
-    principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
-    jobs_service: JobsService = Depends(jobs_service_dep),
-):
-    started = time.perf_counter()
-    check_excel_file(file)
-    raw = await read_upload_for_principal(file, principal=principal)
-
+def _scan_formula_errors_report(
+    source: ExcelSource,
+    original_name: str,
+) -> tuple[bytes, dict[str, int]]:
     try:
-        wb = load_workbook(BytesIO(raw), data_only=True, read_only=True)
-        wb_formulas = load_workbook(BytesIO(raw), data_only=False, read_only=True)
+        wb = load_workbook(source_stream(source), data_only=True, read_only=True)
+        wb_formulas = load_workbook(source_stream(source), data_only=False, read_only=True)
     except Exception as exc:
         raise HTTPException(
             status_code=400,
@@ -135,7 +131,6 @@ async def scan_formula_errors(
 
     total_errors = len(details)
     scan_time = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
-    original_name = file.filename or "workbook"
     out = Workbook()
 
     # ── Summary ──────────────────────────────────────────────────────
@@ -231,6 +226,29 @@ async def scan_formula_errors(
     # ── Save ─────────────────────────────────────────────────────────
     buf = BytesIO()
     out.save(buf)
+    return buf.getvalue(), error_counts
+
+
+@router.post(
+    "/scan-formula-errors",
+    summary="Scan Formula Errors",
+    description="Scan every cell across all sheets for formula errors and return an XLSX report.",
+)
+async def scan_formula_errors(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = Depends(file_or_token("Excel file")),
+    principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
+    jobs_service: JobsService = Depends(jobs_service_dep),
+):
+    started = time.perf_counter()
+    check_excel_file(file)
+    source = await spool_upload_for_principal(file, principal=principal)
+
+    original_name = file.filename or "workbook"
+    output_bytes, error_counts = await run_tool_work(
+        principal, _scan_formula_errors_report, source, original_name,
+    )
+    total_errors = sum(error_counts.values())
     base = safe_base_filename(original_name, "workbook")
 
     output_name = f"formula-errors-{base}.xlsx"
@@ -241,7 +259,7 @@ async def scan_formula_errors(
         tool_slug="scan-formula-errors",
         tool_name="Scan Formula Errors",
         original_filename=file.filename,
-        output_bytes=buf.getvalue(),
+        output_bytes=output_bytes,
         output_filename=output_name,
         mime_type=_XLSX_MIME,
         success=True,
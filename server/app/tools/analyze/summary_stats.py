@@ -1,22 +1,28 @@
 from __future__ import annotations
 
-import statistics
 import time
 from io import BytesIO
 from typing import Any
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile
 from openpyxl import Workbook
 
 from app.core.security import AuthenticatedPrincipal
-from app.services.excel_reader import parse_excel_bytes
+from app.services.excel_reader import ExcelSource, WorkbookReader
 from app.services.jobs_service import JobsService
-from app.tools._common import check_excel_file, read_upload_for_principal, safe_base_filename
+from app.tools._common import (
+    check_excel_file,
+    run_tool_work,
+    safe_base_filename,
+    spool_upload_for_principal,
+)
 from app.tools._recording import (
     get_current_user_optional,
     jobs_service_dep,
     record_and_respond,
 )
+from app.tools._uploads import file_or_token
+from app.tools.analyze._column_stats import PERCENTILES, SheetAggregator
 from app.tools.analyze._styles import (
     ALT_ROW_FILL, BODY_FONT, BOLD_FONT, CENTER_ALIGNMENT, THIN_BORDER,
     WHITE_FILL, apply_header_row, auto_size,
@@ -27,74 +33,52 @@ router = APIRouter()
 _XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
 
-def _numeric_values(cells: list[Any]) -> list[float]:
-    nums: list[float] = []
-    for c in cells:
-        if c is None:
-            continue
-        if isinstance(c, (int, float)):
-            nums.append(float(c))
-        elif isinstance(c, str):
-            try:
-                nums.append(float(c))
-            except ValueError:
-                pass
-    return nums
+def _summary_stats_report(source: ExcelSource, filename: str | None) -> tuple[bytes, int, int]:
+    with WorkbookReader(source, filename, engine="iterparse") as reader:
+        return _summary_stats_from_reader(reader)
 
 
-@router.post(
-    "/summary-stats",
-    summary="Summary Stats",
-    description="Compute summary statistics for numeric columns across all sheets.",
-)
-async def summary_stats(
-    background_tasks: BackgroundTasks,
-    file: UploadFile = File(..., description="Excel file"),
-    principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
-    jobs_service: JobsService = Depends(jobs_service_dep),
-):
-    started = time.perf_counter()
-    check_excel_file(file)
-    raw = await read_upload_for_principal(file, principal=principal)
-
-    workbook_data = parse_excel_bytes(raw, file.filename)
-
+def _summary_stats_from_reader(reader: WorkbookReader) -> tuple[bytes, int, int]:
     out = Workbook()
     out.remove(out.active)
     total_columns = 0
     sheets_analyzed = 0
 
-    for sheet_name, rows in workbook_data.items():
-        if len(rows) < 2:
+    for sheet_name in reader.sheet_names:
+        rows = reader.iter_rows(sheet_name)
+        header = next(rows, None)
+        if header is None:
+            continue
+        aggregator = SheetAggregator(header)
+        aggregator.add_rows(rows)
+        if not aggregator.data_rows:
             continue
-        header = rows[0]
-        data_rows = rows[1:]
         stats_rows: list[list[Any]] = []
 
-        for col_idx, col_name in enumerate(header):
-            col_cells = [r[col_idx] if col_idx < len(r) else None for r in data_rows]
-            nums = _numeric_values(col_cells)
-            if not nums:
-                continue
+        for summary in aggregator.summaries():
             total_columns += 1
-            blanks = sum(1 for c in col_cells if c is None or (isinstance(c, str) and c.strip() == ""))
             stats_rows.append([
-                str(col_name) if col_name is not None else f"Column {col_idx + 1}",
-                len(nums),
-                round(min(nums), 4),
-                round(max(nums), 4),
-                round(statistics.mean(nums), 4),
-                round(statistics.median(nums), 4),
-                round(statistics.stdev(nums), 4) if len(nums) > 1 else 0,
-                round(sum(nums), 4),
-                blanks,
+                summary.name,
+                summary.count,
+                round(summary.minimum, 4),
+                round(summary.maximum, 4),
+                round(summary.mean, 4),
+                round(summary.median, 4),
+                round(summary.stdev, 4),
+                round(summary.total, 4),
+                summary.blanks,
+                summary.distinct,
+                *(round(value, 4) for value in summary.percentiles),
             ])
 
         if not stats_rows:
             continue
         sheets_analyzed += 1
         ws = out.create_sheet(sheet_name[:31])
-        headers = ["Column", "Count", "Min", "Max", "Mean", "Median", "Std Dev", "Sum", "Blanks"]
+        headers = [
+            "Column", "Count", "Min", "Max", "Mean", "Median", "Std Dev", "Sum", "Blanks", "Distinct",
+            *(f"P{p}" for p in PERCENTILES),
+        ]
         for c, h in enumerate(headers, 1):
             ws.cell(row=1, column=c, value=h)
         apply_header_row(ws, 1, len(headers))
@@ -119,6 +103,27 @@ async def summary_stats(
 
     buf = BytesIO()
     out.save(buf)
+    return buf.getvalue(), sheets_analyzed, total_columns
+
+
+@router.post(
+    "/summary-stats",
+    summary="Summary Stats",
+    description="Compute summary statistics for numeric columns across all sheets.",
+)
+async def summary_stats(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = Depends(file_or_token("Excel file")),
+    principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
+    jobs_service: JobsService = Depends(jobs_service_dep),
+):
+    started = time.perf_counter()
+    check_excel_file(file)
+    source = await spool_upload_for_principal(file, principal=principal)
+
+    output_bytes, sheets_analyzed, total_columns = await run_tool_work(
+        principal, _summary_stats_report, source, file.filename,
+    )
     base = safe_base_filename(file.filename, "workbook")
 
     output_name = f"summary-stats-{base}.xlsx"
@@ -129,7 +134,7 @@ async def summary_stats(
         tool_slug="summary-stats",
         tool_name="Summary Stats",
         original_filename=file.filename,
-        output_bytes=buf.getvalue(),
+        output_bytes=output_bytes,
         output_filename=output_name,
         mime_type=_XLSX_MIME,
         success=True,
@@ -1,19 +1,28 @@
 from __future__ import annotations
 
-from io import BytesIO
 from typing import Any, Callable
 
 from fastapi import HTTPException
-from openpyxl import Workbook
 from openpyxl.workbook import Workbook as OpenpyxlWorkbook
 
 from app.services.excel_editor import (
     FormatPreservingLoad,
+    delete_rows_bulk,
     header_index_map,
     load_workbook_for_edit,
     save_workbook_to_bytes,
     supports_inplace_edit,
 )
+from app.services.excel_reader import (
+    ExcelSource,
+    _extract_extension,
+    _validate_magic_bytes,
+    ensure_supported_excel_filename,
+    parse_excel_bytes,
+)
+from app.services.excel_writer import WorkbookWriter
+from app.services.excel_xml_editor import mutate_string_cells
+from app.tools._common import has_visual_elements
 
 
 def parse_columns_arg(columns: str) -> list[str]:
@@ -80,20 +89,10 @@ def with_updated_cell(row: list[Any], index: int, value: Any) -> list[Any]:
 
 
 def workbook_bytes_from_data(workbook_data: dict[str, list[list[Any]]]) -> bytes:
-    out_wb = Workbook()
-    out_wb.remove(out_wb.active)
-
-    for sheet_name, rows in workbook_data.items():
-        out_ws = out_wb.create_sheet(sheet_name[:31] if sheet_name else "Sheet")
-        for row in rows:
-            out_ws.append(["" if cell is None else cell for cell in row])
-
-    if not out_wb.worksheets:
-        out_wb.create_sheet("Sheet1")
-
-    output = BytesIO()
-    out_wb.save(output)
-    return output.getvalue()
+    with WorkbookWriter() as writer:
+        for sheet_name, rows in workbook_data.items():
+            writer.write_sheet(sheet_name[:31] if sheet_name else "Sheet", rows, blank_none=True)
+        return writer.to_bytes()
 
 
 def resolve_target_sheet_titles(
@@ -116,7 +115,7 @@ def resolve_target_sheet_titles(
 
 
 def apply_value_mutation_inplace(
-    raw: bytes,
+    source: ExcelSource,
     filename: str,
     *,
     sheet: str,
@@ -132,11 +131,28 @@ def apply_value_mutation_inplace(
     unless the callback explicitly handles them.
 
     Returns (output_bytes, visual_elements_removed).
+
+    Only the XML of the targeted worksheets (and the shared strings) is
+    rewritten when possible, which leaves every other part of the package
+    untouched; otherwise the workbook goes through openpyxl, which may not
+    keep drawings and charts.
     """
     if not supports_inplace_edit(filename):
         return None, False  # type: ignore[return-value]
 
-    loaded: FormatPreservingLoad = load_workbook_for_edit(raw, filename)
+    ensure_supported_excel_filename(filename)
+    _validate_magic_bytes(source, _extract_extension(filename))
+    output = mutate_string_cells(
+        source,
+        sheet=sheet,
+        all_sheets=all_sheets,
+        selected_columns=selected_columns,
+        mutate=mutate,
+    )
+    if output is not None:
+        return output, False
+
+    loaded: FormatPreservingLoad = load_workbook_for_edit(source, filename)
     workbook = loaded.workbook
 
     target_sheets = resolve_target_sheet_titles(workbook, sheet, all_sheets)
@@ -173,11 +189,58 @@ def apply_value_mutation_inplace(
                     cell.value = new_value
 
     output = save_workbook_to_bytes(workbook)
-    return output, loaded.visual_elements_lost
+    return output, loaded.visual_elements_lost or has_visual_elements(source)
+
+
+def apply_value_mutation_data(
+    source: ExcelSource,
+    filename: str | None,
+    *,
+    sheet: str,
+    all_sheets: bool,
+    selected_columns: list[str],
+    mutate: Callable[[str], Any],
+    allow_missing: bool = False,
+) -> bytes:
+    """Data-only counterpart of :func:`apply_value_mutation_inplace`.
+
+    Used for formats openpyxl cannot edit in place (.xls/.xlsb). Only string
+    values in the targeted data cells are passed to `mutate`; the workbook
+    is rebuilt from values, so formatting is not preserved.
+    """
+    workbook_data = parse_excel_bytes(source, filename)
+    target_sheets = resolve_target_sheets(workbook_data, sheet, all_sheets)
+
+    for sheet_name in target_sheets:
+        rows = workbook_data[sheet_name]
+        if len(rows) <= 1:
+            continue
+
+        header = rows[0]
+        data_rows = rows[1:]
+        column_indexes = resolve_column_indexes(
+            header,
+            selected_columns,
+            allow_missing=allow_missing,
+        )
+
+        updated_rows: list[list[Any]] = []
+        for row in data_rows:
+            updated_row = list(row)
+            for index in column_indexes:
+                value = get_cell(updated_row, index)
+                if not isinstance(value, str):
+                    continue
+                updated_row = with_updated_cell(updated_row, index, mutate(value))
+            updated_rows.append(updated_row)
+
+        workbook_data[sheet_name] = [header, *updated_rows]
+
+    return workbook_bytes_from_data(workbook_data)
 
 
 def delete_rows_inplace(
-    raw: bytes,
+    source: ExcelSource,
     filename: str,
     *,
     sheet: str,
@@ -191,7 +254,7 @@ def delete_rows_inplace(
     True to mark the row for deletion. Returns
     (output_bytes, visual_elements_removed, total_rows_removed).
     """
-    loaded: FormatPreservingLoad = load_workbook_for_edit(raw, filename)
+    loaded: FormatPreservingLoad = load_workbook_for_edit(source, filename)
     workbook = loaded.workbook
 
     target_sheets = resolve_target_sheet_titles(workbook, sheet, all_sheets)
@@ -208,10 +271,7 @@ def delete_rows_inplace(
             if should_delete(values):
                 rows_to_delete.append(row[0].row)
 
-        # Delete from bottom to top so indices stay valid.
-        for row_idx in reversed(rows_to_delete):
-            ws.delete_rows(row_idx, 1)
-        total_removed += len(rows_to_delete)
+        total_removed += delete_rows_bulk(ws, rows_to_delete)
 
     output = save_workbook_to_bytes(workbook)
     return output, loaded.visual_elements_lost, total_removed
@@ -3,26 +3,27 @@ from __future__ import annotations
 import re
 import time
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException, UploadFile
 
 from app.core.security import AuthenticatedPrincipal
 from app.services.excel_editor import supports_inplace_edit
-from app.services.excel_reader import parse_excel_bytes
 from app.services.jobs_service import JobsService
-from app.tools._common import check_excel_file, has_visual_elements, read_upload_for_principal
+from app.tools._common import (
+    check_excel_file,
+    has_visual_elements,
+    run_tool_work,
+    spool_upload_for_principal,
+)
 from app.tools._recording import (
     get_current_user_optional,
     jobs_service_dep,
     record_and_respond,
 )
+from app.tools._uploads import file_or_token
 from app.tools.clean._utils import (
+    apply_value_mutation_data,
     apply_value_mutation_inplace,
-    get_cell,
     parse_columns_arg,
-    resolve_column_indexes,
-    resolve_target_sheets,
-    with_updated_cell,
-    workbook_bytes_from_data,
 )
 
 router = APIRouter()
@@ -39,7 +40,7 @@ _XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 )
 async def find_replace(
     background_tasks: BackgroundTasks,
-    file: UploadFile = File(..., description="Excel file"),
+    file: UploadFile = Depends(file_or_token("Excel file")),
     find_text: str = Form(..., description="Text or regex pattern to find"),
     replace_text: str = Form("", description="Replacement text"),
     sheet: str = Form("", description="Sheet name (required if all_sheets=false)"),
@@ -52,7 +53,7 @@ async def find_replace(
 ):
     started = time.perf_counter()
     check_excel_file(file)
-    raw = await read_upload_for_principal(file, principal=principal)
+    source = await spool_upload_for_principal(file, principal=principal)
 
     if not find_text:
         raise HTTPException(status_code=400, detail="find_text is required")
@@ -73,8 +74,10 @@ async def find_replace(
         return pattern.sub(replace_text, value)
 
     if supports_inplace_edit(file.filename):
-        output_bytes, visual_lost = apply_value_mutation_inplace(
-            raw,
+        output_bytes, visual_lost = await run_tool_work(
+            principal,
+            apply_value_mutation_inplace,
+            source,
             file.filename,
             sheet=sheet,
             all_sheets=all_sheets,
@@ -94,38 +97,19 @@ async def find_replace(
             success=True,
             error_type=None,
             duration_ms=int((time.perf_counter() - started) * 1000),
-            visual_elements_removed=visual_lost or has_visual_elements(raw),
+            visual_elements_removed=visual_lost,
         )
 
-    workbook_data = parse_excel_bytes(raw, file.filename)
-    target_sheets = resolve_target_sheets(workbook_data, sheet, all_sheets)
-
-    for sheet_name in target_sheets:
-        rows = workbook_data[sheet_name]
-        if len(rows) <= 1:
-            continue
-
-        header = rows[0]
-        data_rows = rows[1:]
-        column_indexes = resolve_column_indexes(header, selected_columns)
-
-        replaced_rows: list[list[object]] = []
-        for row in data_rows:
-            updated_row = list(row)
-            for index in column_indexes:
-                value = get_cell(updated_row, index)
-                if not isinstance(value, str):
-                    continue
-                updated_row = with_updated_cell(
-                    updated_row,
-                    index,
-                    pattern.sub(replace_text, value),
-                )
-            replaced_rows.append(updated_row)
-
-        workbook_data[sheet_name] = [header, *replaced_rows]
-
-    output_bytes = workbook_bytes_from_data(workbook_data)
+    output_bytes = await run_tool_work(
+        principal,
+        apply_value_mutation_data,
+        source,
+        file.filename,
+        sheet=sheet,
+        all_sheets=all_sheets,
+        selected_columns=selected_columns,
+        mutate=_replace,
+    )
 
     return await record_and_respond(
         principal=principal,
@@ -140,5 +124,5 @@ async def find_replace(
         success=True,
         error_type=None,
         duration_ms=int((time.perf_counter() - started) * 1000),
-        visual_elements_removed=has_visual_elements(raw),
+        visual_elements_removed=has_visual_elements(source),
     )
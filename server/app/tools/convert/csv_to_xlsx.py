@@ -3,24 +3,38 @@ from __future__ import annotations
 import csv
 import time
 from io import BytesIO, TextIOWrapper
+from itertools import chain
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, UploadFile
-from openpyxl import Workbook
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException, UploadFile
 
 from app.core.security import AuthenticatedPrincipal
+from app.services.excel_writer import WorkbookWriter
 from app.services.jobs_service import JobsService
-from app.tools._common import read_upload_for_principal, safe_base_filename
+from app.tools._common import read_upload_for_principal, run_tool_work, safe_base_filename
 from app.tools._recording import (
     get_current_user_optional,
     jobs_service_dep,
     record_and_respond,
 )
+from app.tools._uploads import file_or_token
 
 router = APIRouter()
 
 _XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
 
+def _csv_to_xlsx_bytes(raw: bytes, sheet_name: str, delimiter: str) -> bytes:
+    text_stream = TextIOWrapper(BytesIO(raw), encoding="utf-8", errors="replace", newline="")
+    reader = csv.reader(text_stream, delimiter=delimiter)
+
+    first_row = next(reader, None)
+    rows = [[""]] if first_row is None else chain([first_row], reader)
+
+    with WorkbookWriter() as writer:
+        writer.write_sheet(sheet_name[:31] if sheet_name else "Sheet1", rows)
+        return writer.to_bytes()
+
+
 @router.post(
     "/csv-to-xlsx",
     summary="CSV to XLSX",
@@ -28,7 +42,7 @@ _XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 )
 async def csv_to_xlsx(
     background_tasks: BackgroundTasks,
-    file: UploadFile = File(..., description="CSV file to convert"),
+    file: UploadFile = Depends(file_or_token("CSV file to convert")),
     sheet_name: str = Form("Sheet1", description="Target sheet name"),
     delimiter: str = Form(",", description="CSV delimiter (single character)"),
     principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
@@ -44,23 +58,9 @@ async def csv_to_xlsx(
         raise HTTPException(status_code=400, detail="Delimiter must be a single character")
 
     try:
-        text_stream = TextIOWrapper(BytesIO(raw), encoding="utf-8", errors="replace", newline="")
-        reader = csv.reader(text_stream, delimiter=delimiter)
-
-        wb = Workbook()
-        ws = wb.active
-        ws.title = sheet_name[:31] if sheet_name else "Sheet1"
-
-        row_count = 0
-        for row in reader:
-            ws.append([cell for cell in row])
-            row_count += 1
-
-        if row_count == 0:
-            ws.append([""])
-
-        output = BytesIO()
-        wb.save(output)
+        output_bytes = await run_tool_work(
+            principal, _csv_to_xlsx_bytes, raw, sheet_name, delimiter,
+        )
 
         out_name = f"{safe_base_filename(file.filename, 'converted')}.xlsx"
 
@@ -71,7 +71,7 @@ async def csv_to_xlsx(
             tool_slug="csv-to-xlsx",
             tool_name="CSV to XLSX",
             original_filename=file.filename,
-            output_bytes=output.getvalue(),
+            output_bytes=output_bytes,
             output_filename=out_name,
             mime_type=_XLSX_MIME,
             success=True,
@@ -4,16 +4,16 @@ import json
 import time as _time
 from collections.abc import Iterable
 from datetime import date, datetime, time
-from io import BytesIO
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, UploadFile
-from openpyxl import Workbook
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException, UploadFile
 
 from app.core.security import AuthenticatedPrincipal
+from app.services.excel_writer import WorkbookWriter
 from app.services.jobs_service import JobsService
 from app.tools._common import (
     dedupe_headers,
     read_upload_for_principal,
+    run_tool_work,
     safe_base_filename,
     safe_sheet_title,
     unique_sheet_title,
@@ -23,6 +23,7 @@ from app.tools._recording import (
     jobs_service_dep,
     record_and_respond,
 )
+from app.tools._uploads import file_or_token
 
 router = APIRouter()
 
@@ -180,6 +181,30 @@ def _iter_sheet_map(sheet_map: dict[str, list[list]]) -> Iterable[tuple[str, lis
         yield key, rows
 
 
+def _normalized_rows(rows: list) -> Iterable[list]:
+    for row in rows if rows else [[""]]:
+        if isinstance(row, list):
+            yield [_normalize_cell(cell) for cell in row]
+        else:
+            yield [_normalize_cell(row)]
+
+
+def _json_to_xlsx_bytes(raw: bytes, include_headers: bool) -> bytes:
+    try:
+        payload = json.loads(raw.decode("utf-8-sig"))
+    except json.JSONDecodeError as error:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {error.msg}") from error
+
+    sheet_map = _to_sheet_map(payload, include_headers=include_headers)
+
+    with WorkbookWriter() as writer:
+        used_sheet_names: set[str] = set()
+        for raw_name, rows in _iter_sheet_map(sheet_map):
+            title = unique_sheet_title(safe_sheet_title(raw_name, "Sheet"), used_sheet_names)
+            writer.write_sheet(title, _normalized_rows(rows))
+        return writer.to_bytes()
+
+
 @router.post(
     "/json-to-xlsx",
     summary="JSON to XLSX",
@@ -187,7 +212,7 @@ def _iter_sheet_map(sheet_map: dict[str, list[list]]) -> Iterable[tuple[str, lis
 )
 async def json_to_xlsx(
     background_tasks: BackgroundTasks,
-    file: UploadFile = File(..., description="JSON file to convert"),
+    file: UploadFile = Depends(file_or_token("JSON file to convert")),
     include_headers: bool = Form(True, description="Include a header row when columns are inferred"),
     principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
     jobs_service: JobsService = Depends(jobs_service_dep),
@@ -200,30 +225,7 @@ async def json_to_xlsx(
 
     raw = await read_upload_for_principal(file, principal=principal)
 
-    try:
-        payload = json.loads(raw.decode("utf-8-sig"))
-    except json.JSONDecodeError as error:
-        raise HTTPException(status_code=400, detail=f"Invalid JSON: {error.msg}") from error
-
-    sheet_map = _to_sheet_map(payload, include_headers=include_headers)
-
-    wb = Workbook()
-    default_ws = wb.active
-    wb.remove(default_ws)
-
-    used_sheet_names: set[str] = set()
-    for raw_name, rows in _iter_sheet_map(sheet_map):
-        title = unique_sheet_title(safe_sheet_title(raw_name, "Sheet"), used_sheet_names)
-        ws = wb.create_sheet(title=title)
-        normalized_rows = rows if rows else [[""]]
-        for row in normalized_rows:
-            if isinstance(row, list):
-                ws.append([_normalize_cell(cell) for cell in row])
-            else:
-                ws.append([_normalize_cell(row)])
-
-    output = BytesIO()
-    wb.save(output)
+    output_bytes = await run_tool_work(principal, _json_to_xlsx_bytes, raw, include_headers)
 
     out_name = f"{safe_base_filename(file.filename, 'converted')}.xlsx"
 
@@ -234,7 +236,7 @@ async def json_to_xlsx(
         tool_slug="json-to-xlsx",
         tool_name="JSON to XLSX",
         original_filename=file.filename,
-        output_bytes=output.getvalue(),
+        output_bytes=output_bytes,
         output_filename=out_name,
         mime_type=_XLSX_MIME,
         success=True,
@@ -2,15 +2,16 @@ from __future__ import annotations
 
 import re
 import time
-from io import BytesIO
+from typing import Any, Iterator
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, UploadFile
-from openpyxl import Workbook
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException, UploadFile
 
 from app.core.security import AuthenticatedPrincipal
+from app.services.excel_writer import WorkbookWriter
 from app.services.jobs_service import JobsService
 from app.tools._common import (
     read_upload_for_principal,
+    run_tool_work,
     safe_base_filename,
     safe_sheet_title,
     unique_sheet_title,
@@ -20,6 +21,7 @@ from app.tools._recording import (
     jobs_service_dep,
     record_and_respond,
 )
+from app.tools._uploads import file_or_token
 
 router = APIRouter()
 
@@ -73,26 +75,17 @@ def _split_values(values_str: str) -> list[str]:
     return parts
 
 
-@router.post(
-    "/sql-to-xlsx",
-    summary="SQL to XLSX",
-    description="Parses INSERT statements from a SQL file and converts them into an XLSX workbook.",
-)
-async def sql_to_xlsx(
-    background_tasks: BackgroundTasks,
-    file: UploadFile = File(..., description="SQL file to convert"),
-    include_headers: bool = Form(True, description="Include column headers"),
-    principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
-    jobs_service: JobsService = Depends(jobs_service_dep),
-):
-    started = time.perf_counter()
-    filename = (file.filename or "").lower()
-    content_type = (file.content_type or "").lower()
-    if not filename.endswith(".sql") and content_type not in _SQL_CONTENT_TYPES:
-        raise HTTPException(status_code=400, detail="Unsupported file type, expected SQL")
+def _table_rows(data: dict, *, include_headers: bool) -> Iterator[list[Any]]:
+    if include_headers:
+        yield data["columns"]
+    for row in data["rows"]:
+        padded = list(row)
+        if len(padded) < len(data["columns"]):
+            padded.extend([None] * (len(data["columns"]) - len(padded)))
+        yield padded
 
-    raw = await read_upload_for_principal(file, principal=principal)
 
+def _sql_to_xlsx_bytes(raw: bytes, include_headers: bool) -> bytes:
     try:
         text = raw.decode("utf-8-sig")
     except UnicodeDecodeError:
@@ -111,24 +104,35 @@ async def sql_to_xlsx(
     if not tables:
         raise HTTPException(status_code=400, detail="No INSERT statements found in the SQL file")
 
-    wb = Workbook()
-    default_ws = wb.active
-    wb.remove(default_ws)
-
-    used_names: set[str] = set()
-    for table_name, data in tables.items():
-        title = unique_sheet_title(safe_sheet_title(table_name, "Sheet"), used_names)
-        ws = wb.create_sheet(title=title)
-        if include_headers:
-            ws.append(data["columns"])
-        for row in data["rows"]:
-            padded = list(row)
-            if len(padded) < len(data["columns"]):
-                padded.extend([None] * (len(data["columns"]) - len(padded)))
-            ws.append(padded)
-
-    output = BytesIO()
-    wb.save(output)
+    with WorkbookWriter() as writer:
+        used_names: set[str] = set()
+        for table_name, data in tables.items():
+            title = unique_sheet_title(safe_sheet_title(table_name, "Sheet"), used_names)
+            writer.write_sheet(title, _table_rows(data, include_headers=include_headers))
+        return writer.to_bytes()
+
+
+@router.post(
+    "/sql-to-xlsx",
+    summary="SQL to XLSX",
+    description="Parses INSERT statements from a SQL file and converts them into an XLSX workbook.",
+)
+async def sql_to_xlsx(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = Depends(file_or_token("SQL file to convert")),
+    include_headers: bool = Form(True, description="Include column headers"),
+    principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
+    jobs_service: JobsService = Depends(jobs_service_dep),
+):
+    started = time.perf_counter()
+    filename = (file.filename or "").lower()
+    content_type = (file.content_type or "").lower()
+    if not filename.endswith(".sql") and content_type not in _SQL_CONTENT_TYPES:
+        raise HTTPException(status_code=400, detail="Unsupported file type, expected SQL")
+
+    raw = await read_upload_for_principal(file, principal=principal)
+
+    output_bytes = await run_tool_work(principal, _sql_to_xlsx_bytes, raw, include_headers)
 
     out_name = f"{safe_base_filename(file.filename, 'converted')}.xlsx"
 
@@ -139,7 +143,7 @@ async def sql_to_xlsx(
         tool_slug="sql-to-xlsx",
         tool_name="SQL to XLSX",
         original_filename=file.filename,
-        output_bytes=output.getvalue(),
+        output_bytes=output_bytes,
         output_filename=out_name,
         mime_type=_XLSX_MIME,
         success=True,
@@ -1,22 +1,30 @@
 from __future__ import annotations
 
 import csv
+import io
 import re
 import time
 import zipfile
-from io import BytesIO, StringIO
+from collections.abc import Iterable, Iterator
+from io import StringIO
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Query, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, UploadFile
 
 from app.core.security import AuthenticatedPrincipal
-from app.services.excel_reader import ensure_supported_excel_filename, parse_excel_bytes
+from app.services.excel_reader import ExcelSource, WorkbookReader, ensure_supported_excel_filename
 from app.services.jobs_service import JobsService
-from app.tools._common import read_upload_for_principal, safe_base_filename
+from app.tools._common import (
+    detach_upload,
+    safe_base_filename,
+    spool_upload_for_principal,
+    stream_tool_work,
+)
 from app.tools._recording import (
     get_current_user_optional,
     jobs_service_dep,
-    record_and_respond,
+    record_and_stream,
 )
+from app.tools._uploads import file_or_token
 
 router = APIRouter()
 
@@ -35,18 +43,87 @@ def _build_unique_csv_name(raw_name: str, used_names: set[str]) -> str:
     return filename
 
 
-def _sheets_to_csv_zip(workbook_data: dict, sheet_names: list[str]) -> bytes:
-    zipped = BytesIO()
+_CSV_CHUNK_CHARS = 64 * 1024
+
+
+def _csv_chunks(rows: Iterable[list]) -> Iterator[bytes]:
+    """Encode ``rows`` as CSV, yielding roughly 64 KB of UTF-8 at a time."""
+    output = StringIO()
+    writer = csv.writer(output)
+    for r in rows:
+        writer.writerow(["" if c is None else c for c in r])
+        if output.tell() >= _CSV_CHUNK_CHARS:
+            yield output.getvalue().encode("utf-8")
+            output.seek(0)
+            output.truncate()
+    tail = output.getvalue()
+    if tail:
+        yield tail.encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable target that hands written bytes back in chunks.
+
+    ``zipfile`` writes to unseekable streams with data descriptors, so ZIP
+    members can be produced while the archive is being sent.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._buffer = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buffer += data
+        return len(data)
+
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def _csv_zip_chunks(reader: WorkbookReader, sheet_names: list[str]) -> Iterator[bytes]:
+    sink = _ChunkSink()
     used_names: set[str] = set()
-    with zipfile.ZipFile(zipped, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
         for sheet_name in sheet_names:
-            rows = workbook_data[sheet_name]
-            output = StringIO()
-            writer = csv.writer(output)
-            for r in rows:
-                writer.writerow(["" if c is None else c for c in r])
-            zf.writestr(_build_unique_csv_name(sheet_name, used_names), output.getvalue().encode("utf-8"))
-    return zipped.getvalue()
+            member_name = _build_unique_csv_name(sheet_name, used_names)
+            # Member sizes are not known up front, so allow them past 4 GiB.
+            with zf.open(member_name, mode="w", force_zip64=True) as member:
+                for chunk in _csv_chunks(reader.iter_rows(sheet_name)):
+                    member.write(chunk)
+                    if sink.pending() >= _CSV_CHUNK_CHARS:
+                        yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _sheet_csv_stream(source: ExcelSource, filename: str | None, sheet: str) -> Iterator[bytes]:
+    with WorkbookReader(source, filename, engine="iterparse") as reader:
+        if sheet not in reader.sheet_names:
+            raise HTTPException(status_code=404, detail="Sheet not found")
+        yield from _csv_chunks(reader.iter_rows(sheet))
+
+
+def _workbook_csv_zip_stream(
+    source: ExcelSource, filename: str | None, sheets: list[str] | None
+) -> Iterator[bytes]:
+    with WorkbookReader(source, filename, engine="iterparse") as reader:
+        if sheets:
+            missing = [name for name in sheets if name not in reader.sheet_names]
+            if missing:
+                raise HTTPException(status_code=404, detail=f"Sheet not found: {missing[0]}")
+            selected = sheets
+        else:
+            selected = reader.sheet_names
+
+        yield from _csv_zip_chunks(reader, selected)
 
 
 @router.post(
@@ -56,41 +133,37 @@ def _sheets_to_csv_zip(workbook_data: dict, sheet_names: list[str]) -> bytes:
 )
 async def xlsx_to_csv(
     background_tasks: BackgroundTasks,
-    file: UploadFile = File(..., description="Excel file"),
+    file: UploadFile = Depends(file_or_token("Excel file")),
     sheet: str = Query(..., description="Sheet name to export"),
     principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
     jobs_service: JobsService = Depends(jobs_service_dep),
 ):
     started = time.perf_counter()
     ensure_supported_excel_filename(file.filename)
-    raw = await read_upload_for_principal(file, principal=principal)
-
-    workbook_data = parse_excel_bytes(raw, file.filename)
-    if sheet not in workbook_data:
-        raise HTTPException(status_code=404, detail="Sheet not found")
-    rows = workbook_data[sheet]
-
-    output = StringIO()
-    writer = csv.writer(output)
-    for r in rows:
-        writer.writerow(["" if c is None else c for c in r])
-
-    encoded = output.getvalue().encode("utf-8")
+    source = detach_upload(file, await spool_upload_for_principal(file, principal=principal))
+
+    stream = await stream_tool_work(
+        principal,
+        _sheet_csv_stream,
+        source,
+        file.filename,
+        sheet,
+        tee=principal is not None,
+        close_when_done=(source,),
+    )
     download_name = f"{safe_base_filename(file.filename, sheet)}.csv"
 
-    return await record_and_respond(
+    return await record_and_stream(
         principal=principal,
         background_tasks=background_tasks,
         jobs_service=jobs_service,
         tool_slug="xlsx-to-csv",
         tool_name="XLSX to CSV",
         original_filename=file.filename,
-        output_bytes=encoded,
+        stream=stream,
         output_filename=download_name,
         mime_type="text/csv; charset=utf-8",
-        success=True,
-        error_type=None,
-        duration_ms=int((time.perf_counter() - started) * 1000),
+        started=started,
     )
 
 
@@ -101,39 +174,35 @@ async def xlsx_to_csv(
 )
 async def xlsx_to_csv_zip(
     background_tasks: BackgroundTasks,
-    file: UploadFile = File(..., description="Excel file"),
+    file: UploadFile = Depends(file_or_token("Excel file")),
     sheets: list[str] = Query(default=None, description="Sheet names to export (empty=all)"),
     principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
     jobs_service: JobsService = Depends(jobs_service_dep),
 ):
     started = time.perf_counter()
     ensure_supported_excel_filename(file.filename)
-    raw = await read_upload_for_principal(file, principal=principal)
-
-    workbook_data = parse_excel_bytes(raw, file.filename)
-
-    if sheets:
-        missing = [name for name in sheets if name not in workbook_data]
-        if missing:
-            raise HTTPException(status_code=404, detail=f"Sheet not found: {missing[0]}")
-        selected = sheets
-    else:
-        selected = list(workbook_data.keys())
-
-    zipped = _sheets_to_csv_zip(workbook_data, selected)
+    source = detach_upload(file, await spool_upload_for_principal(file, principal=principal))
+
+    stream = await stream_tool_work(
+        principal,
+        _workbook_csv_zip_stream,
+        source,
+        file.filename,
+        sheets,
+        tee=principal is not None,
+        close_when_done=(source,),
+    )
     download_name = f"{safe_base_filename(file.filename, 'sheets-csv')}.zip"
 
-    return await record_and_respond(
+    return await record_and_stream(
         principal=principal,
         background_tasks=background_tasks,
         jobs_service=jobs_service,
         tool_slug="xlsx-to-csv-zip",
         tool_name="XLSX to CSV ZIP",
         original_filename=file.filename,
-        output_bytes=zipped,
+        stream=stream,
         output_filename=download_name,
         mime_type="application/zip",
-        success=True,
-        error_type=None,
-        duration_ms=int((time.perf_counter() - started) * 1000),
+        started=started,
     )
@@ -3,25 +3,28 @@ from __future__ import annotations
 import json
 import math
 import time as _time
+from collections.abc import Iterable
 from datetime import date, datetime, time
 from decimal import Decimal
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Query, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, UploadFile
 
 from app.core.security import AuthenticatedPrincipal
-from app.services.excel_reader import ensure_supported_excel_filename, parse_excel_bytes
+from app.services.excel_reader import ExcelSource, WorkbookReader, ensure_supported_excel_filename
 from app.services.jobs_service import JobsService
 from app.tools._common import (
     dedupe_headers,
     normalize_sheet_selection,
-    read_upload_for_principal,
+    run_tool_work,
     safe_base_filename,
+    spool_upload_for_principal,
 )
 from app.tools._recording import (
     get_current_user_optional,
     jobs_service_dep,
     record_and_respond,
 )
+from app.tools._uploads import file_or_token
 
 router = APIRouter()
 
@@ -42,13 +45,15 @@ def _safe_json_value(value):
     return str(value)
 
 
-def _sheet_rows_to_records(rows: list[list]) -> list[dict[str, object | None]]:
-    if not rows:
+def _sheet_rows_to_records(rows: Iterable[list]) -> list[dict[str, object | None]]:
+    rows = iter(rows)
+    first_row = next(rows, None)
+    if first_row is None:
         return []
 
-    headers = dedupe_headers(rows[0])
+    headers = dedupe_headers(first_row)
     records: list[dict[str, object | None]] = []
-    for row in rows[1:]:
+    for row in rows:
         record: dict[str, object | None] = {}
         for index, header in enumerate(headers):
             value = row[index] if index < len(row) else None
@@ -57,6 +62,33 @@ def _sheet_rows_to_records(rows: list[list]) -> list[dict[str, object | None]]:
     return records
 
 
+def _workbook_to_json(
+    source: ExcelSource, filename: str | None, sheets: list[str] | None
+) -> tuple[bytes, str]:
+    with WorkbookReader(source, filename, engine="iterparse") as reader:
+        selected = normalize_sheet_selection(sheets)
+        if selected:
+            missing = [name for name in selected if name not in reader.sheet_names]
+            if missing:
+                raise HTTPException(status_code=404, detail=f"Sheet not found: {missing[0]}")
+            targets = selected
+        else:
+            targets = reader.sheet_names
+
+        if len(targets) == 1:
+            payload: object = _sheet_rows_to_records(reader.iter_rows(targets[0]))
+            download_name = f"{targets[0]}.json"
+        else:
+            payload = {
+                sheet_name: _sheet_rows_to_records(reader.iter_rows(sheet_name))
+                for sheet_name in targets
+            }
+            download_name = f"{safe_base_filename(filename, 'workbook')}.json"
+
+    encoded = json.dumps(payload, ensure_ascii=False, indent=2, allow_nan=False).encode("utf-8")
+    return encoded, download_name
+
+
 @router.post(
     "/xlsx-to-json",
     summary="Export XLSX to JSON",
@@ -64,36 +96,18 @@ def _sheet_rows_to_records(rows: list[list]) -> list[dict[str, object | None]]:
 )
 async def xlsx_to_json(
     background_tasks: BackgroundTasks,
-    file: UploadFile = File(..., description="Excel file"),
+    file: UploadFile = Depends(file_or_token("Excel file")),
     sheets: list[str] = Query(default=None, description="Sheet names to export (empty=all)"),
     principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
     jobs_service: JobsService = Depends(jobs_service_dep),
 ):
     started = _time.perf_counter()
     ensure_supported_excel_filename(file.filename)
-    raw = await read_upload_for_principal(file, principal=principal)
-
-    workbook_data = parse_excel_bytes(raw, file.filename)
-
-    selected = normalize_sheet_selection(sheets)
-    if selected:
-        missing = [name for name in selected if name not in workbook_data]
-        if missing:
-            raise HTTPException(status_code=404, detail=f"Sheet not found: {missing[0]}")
-        targets = selected
-    else:
-        targets = list(workbook_data.keys())
-
-    if len(targets) == 1:
-        payload: object = _sheet_rows_to_records(workbook_data[targets[0]])
-        download_name = f"{targets[0]}.json"
-    else:
-        payload = {
-            sheet_name: _sheet_rows_to_records(workbook_data[sheet_name]) for sheet_name in targets
-        }
-        download_name = f"{safe_base_filename(file.filename, 'workbook')}.json"
+    source = await spool_upload_for_principal(file, principal=principal)
 
-    encoded = json.dumps(payload, ensure_ascii=False, indent=2, allow_nan=False).encode("utf-8")
+    encoded, download_name = await run_tool_work(
+        principal, _workbook_to_json, source, file.filename, sheets,
+    )
 
     return await record_and_respond(
         principal=principal,
@@ -4,7 +4,7 @@ import re
 import time
 from io import BytesIO
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Query, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, UploadFile
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_LEFT
 from reportlab.lib.pagesizes import A3, A4, landscape, letter
@@ -14,18 +14,20 @@ from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer,
 from reportlab.platypus.flowables import KeepInFrame
 
 from app.core.security import AuthenticatedPrincipal
-from app.services.excel_reader import ensure_supported_excel_filename, parse_excel_bytes
+from app.services.excel_reader import ExcelSource, ensure_supported_excel_filename, parse_excel_bytes
 from app.services.jobs_service import JobsService
 from app.tools._common import (
     normalize_sheet_selection,
-    read_upload_for_principal,
+    run_tool_work,
     safe_base_filename,
+    spool_upload_for_principal,
 )
 from app.tools._recording import (
     get_current_user_optional,
     jobs_service_dep,
     record_and_respond,
 )
+from app.tools._uploads import file_or_token
 
 router = APIRouter()
 
@@ -309,6 +311,34 @@ def _build_pdf(
     return buf.getvalue()
 
 
+def _workbook_to_pdf(
+    source: ExcelSource,
+    filename: str | None,
+    sheets: list[str] | None,
+    orientation: str,
+    column_mode: str,
+    font_size: str,
+    header_style: str,
+    page_size: str,
+    header_color: str,
+) -> bytes:
+    workbook_data = parse_excel_bytes(source, filename)
+
+    selected = normalize_sheet_selection(sheets)
+    if selected:
+        missing = [name for name in selected if name not in workbook_data]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Sheet not found: {missing[0]}")
+        targets = selected
+    else:
+        targets = list(workbook_data.keys())
+
+    return _build_pdf(
+        workbook_data, targets, orientation, column_mode,
+        font_size, header_style, page_size, header_color,
+    )
+
+
 # ---------------------------------------------------------------------------
 # Route
 # ---------------------------------------------------------------------------
@@ -320,7 +350,7 @@ def _build_pdf(
 )
 async def xlsx_to_pdf(
     background_tasks: BackgroundTasks,
-    file: UploadFile = File(..., description="Excel file"),
+    file: UploadFile = Depends(file_or_token("Excel file")),
     sheets: list[str] = Query(default=None, description="Sheet names to export (empty = all)"),
     orientation: str = Query(default="landscape", description="portrait | landscape"),
     column_mode: str = Query(default="ellipsis", description="ellipsis | wrap | fit"),
@@ -333,17 +363,7 @@ async def xlsx_to_pdf(
 ):
     started = time.perf_counter()
     ensure_supported_excel_filename(file.filename)
-    raw = await read_upload_for_principal(file, principal=principal)
-    workbook_data = parse_excel_bytes(raw, file.filename)
-
-    selected = normalize_sheet_selection(sheets)
-    if selected:
-        missing = [name for name in selected if name not in workbook_data]
-        if missing:
-            raise HTTPException(status_code=404, detail=f"Sheet not found: {missing[0]}")
-        targets = selected
-    else:
-        targets = list(workbook_data.keys())
+    source = await spool_upload_for_principal(file, principal=principal)
 
     if orientation not in ("portrait", "landscape"):
         orientation = "landscape"
@@ -356,9 +376,9 @@ async def xlsx_to_pdf(
     if page_size not in _PAGE_SIZES:
         page_size = "A4"
 
-    pdf_bytes = _build_pdf(
-        workbook_data, targets, orientation, column_mode,
-        font_size, header_style, page_size, header_color,
+    pdf_bytes = await run_tool_work(
+        principal, _workbook_to_pdf, source, file.filename, sheets,
+        orientation, column_mode, font_size, header_style, page_size, header_color,
     )
     download_name = f"{safe_base_filename(file.filename, 'workbook')}.pdf"
     return await record_and_respond(
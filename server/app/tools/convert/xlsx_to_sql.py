@@ -4,21 +4,23 @@ import re
 import time as _time
 from datetime import date, datetime, time
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Query, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, UploadFile
 
 from app.core.security import AuthenticatedPrincipal
-from app.services.excel_reader import ensure_supported_excel_filename, parse_excel_bytes
+from app.services.excel_reader import ExcelSource, WorkbookReader, ensure_supported_excel_filename
 from app.services.jobs_service import JobsService
 from app.tools._common import (
     normalize_sheet_selection,
-    read_upload_for_principal,
+    run_tool_work,
     safe_base_filename,
+    spool_upload_for_principal,
 )
 from app.tools._recording import (
     get_current_user_optional,
     jobs_service_dep,
     record_and_respond,
 )
+from app.tools._uploads import file_or_token
 
 router = APIRouter()
 
@@ -107,6 +109,30 @@ def _sheet_to_sql(table_name: str, rows: list[list]) -> str:
     return "\n".join(lines) + "\n"
 
 
+def _workbook_to_sql(
+    source: ExcelSource, filename: str | None, sheets: list[str] | None, table_prefix: str
+) -> bytes:
+    with WorkbookReader(source, filename, engine="iterparse") as reader:
+        selected = normalize_sheet_selection(sheets)
+        if selected:
+            missing = [name for name in selected if name not in reader.sheet_names]
+            if missing:
+                raise HTTPException(status_code=404, detail=f"Sheet not found: {missing[0]}")
+            targets = selected
+        else:
+            targets = reader.sheet_names
+
+        # Column types are inferred over the whole sheet, so each sheet is
+        # read in full, but only one sheet is held at a time.
+        parts: list[str] = []
+        for sheet_name in targets:
+            table = _safe_identifier((table_prefix + sheet_name) if table_prefix else sheet_name)
+            parts.append(_sheet_to_sql(table, reader.read_sheet(sheet_name)))
+
+    sql_text = "\n".join(parts)
+    return sql_text.encode("utf-8")
+
+
 @router.post(
     "/xlsx-to-sql",
     summary="Export XLSX to SQL",
@@ -114,7 +140,7 @@ def _sheet_to_sql(table_name: str, rows: list[list]) -> str:
 )
 async def xlsx_to_sql(
     background_tasks: BackgroundTasks,
-    file: UploadFile = File(..., description="Excel file"),
+    file: UploadFile = Depends(file_or_token("Excel file")),
     sheets: list[str] = Query(default=None, description="Sheet names to export (empty=all)"),
     table_prefix: str = Query(default="", description="Prefix for table names"),
     principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
@@ -122,26 +148,11 @@ async def xlsx_to_sql(
 ):
     started = _time.perf_counter()
     ensure_supported_excel_filename(file.filename)
-    raw = await read_upload_for_principal(file, principal=principal)
-
-    workbook_data = parse_excel_bytes(raw, file.filename)
+    source = await spool_upload_for_principal(file, principal=principal)
 
-    selected = normalize_sheet_selection(sheets)
-    if selected:
-        missing = [name for name in selected if name not in workbook_data]
-        if missing:
-            raise HTTPException(status_code=404, detail=f"Sheet not found: {missing[0]}")
-        targets = selected
-    else:
-        targets = list(workbook_data.keys())
-
-    parts: list[str] = []
-    for sheet_name in targets:
-        table = _safe_identifier((table_prefix + sheet_name) if table_prefix else sheet_name)
-        parts.append(_sheet_to_sql(table, workbook_data[sheet_name]))
-
-    sql_text = "\n".join(parts)
-    encoded = sql_text.encode("utf-8")
+    encoded = await run_tool_work(
+        principal, _workbook_to_sql, source, file.filename, sheets, table_prefix,
+    )
     download_name = f"{safe_base_filename(file.filename, 'workbook')}.sql"
 
     return await record_and_respond(
@@ -6,23 +6,25 @@ import xml.etree.ElementTree as ET
 from datetime import date, datetime, time
 from decimal import Decimal
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Query, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, UploadFile
 
 from app.core.security import AuthenticatedPrincipal
-from app.services.excel_reader import ensure_supported_excel_filename, parse_excel_bytes
+from app.services.excel_reader import ExcelSource, WorkbookReader, ensure_supported_excel_filename
 from app.services.jobs_service import JobsService
 from app.tools._common import (
     _safe_xml_tag,
     dedupe_headers,
     normalize_sheet_selection,
-    read_upload_for_principal,
+    run_tool_work,
     safe_base_filename,
+    spool_upload_for_principal,
 )
 from app.tools._recording import (
     get_current_user_optional,
     jobs_service_dep,
     record_and_respond,
 )
+from app.tools._uploads import file_or_token
 
 router = APIRouter()
 
@@ -45,6 +47,45 @@ def _safe_xml_value(value) -> str:
     return str(value)
 
 
+def _workbook_to_xml(
+    source: ExcelSource,
+    filename: str | None,
+    sheets: list[str] | None,
+    root_tag: str,
+    row_tag: str,
+) -> bytes:
+    with WorkbookReader(source, filename, engine="iterparse") as reader:
+        selected = normalize_sheet_selection(sheets)
+        if selected:
+            missing = [name for name in selected if name not in reader.sheet_names]
+            if missing:
+                raise HTTPException(status_code=404, detail=f"Sheet not found: {missing[0]}")
+            targets = selected
+        else:
+            targets = reader.sheet_names
+
+        root = ET.Element(_safe_xml_tag(root_tag, "workbook"))
+
+        for sheet_name in targets:
+            rows = reader.iter_rows(sheet_name)
+            sheet_el = ET.SubElement(root, "sheet", name=sheet_name)
+
+            first_row = next(rows, None)
+            if first_row is None:
+                continue
+
+            headers = dedupe_headers(first_row, tag_safe=True, tag_fallback="column")
+            for data_row in rows:
+                row_el = ET.SubElement(sheet_el, _safe_xml_tag(row_tag, "row"))
+                for i, header in enumerate(headers):
+                    cell_el = ET.SubElement(row_el, header)
+                    cell_el.text = _safe_xml_value(data_row[i] if i < len(data_row) else None)
+
+    ET.indent(root)
+    xml_bytes = ET.tostring(root, encoding="unicode", xml_declaration=False)
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n' + xml_bytes).encode("utf-8")
+
+
 @router.post(
     "/xlsx-to-xml",
     summary="Export XLSX to XML",
@@ -52,7 +93,7 @@ def _safe_xml_value(value) -> str:
 )
 async def xlsx_to_xml(
     background_tasks: BackgroundTasks,
-    file: UploadFile = File(..., description="Excel file"),
+    file: UploadFile = Depends(file_or_token("Excel file")),
     sheets: list[str] = Query(default=None, description="Sheet names to export (empty=all)"),
     root_tag: str = Query(default="workbook", description="Root XML element name"),
     row_tag: str = Query(default="row", description="Row XML element name"),
@@ -61,38 +102,11 @@ async def xlsx_to_xml(
 ):
     started = _time.perf_counter()
     ensure_supported_excel_filename(file.filename)
-    raw = await read_upload_for_principal(file, principal=principal)
-
-    workbook_data = parse_excel_bytes(raw, file.filename)
-
-    selected = normalize_sheet_selection(sheets)
-    if selected:
-        missing = [name for name in selected if name not in workbook_data]
-        if missing:
-            raise HTTPException(status_code=404, detail=f"Sheet not found: {missing[0]}")
-        targets = selected
-    else:
-        targets = list(workbook_data.keys())
+    source = await spool_upload_for_principal(file, principal=principal)
 
-    root = ET.Element(_safe_xml_tag(root_tag, "workbook"))
-
-    for sheet_name in targets:
-        rows = workbook_data[sheet_name]
-        sheet_el = ET.SubElement(root, "sheet", name=sheet_name)
-
-        if not rows:
-            continue
-
-        headers = dedupe_headers(rows[0], tag_safe=True, tag_fallback="column")
-        for data_row in rows[1:]:
-            row_el = ET.SubElement(sheet_el, _safe_xml_tag(row_tag, "row"))
-            for i, header in enumerate(headers):
-                cell_el = ET.SubElement(row_el, header)
-                cell_el.text = _safe_xml_value(data_row[i] if i < len(data_row) else None)
-
-    ET.indent(root)
-    xml_bytes = ET.tostring(root, encoding="unicode", xml_declaration=False)
-    encoded = ('<?xml version="1.0" encoding="UTF-8"?>\n' + xml_bytes).encode("utf-8")
+    encoded = await run_tool_work(
+        principal, _workbook_to_xml, source, file.filename, sheets, root_tag, row_tag,
+    )
 
     download_name = f"{safe_base_filename(file.filename, 'workbook')}.xml"
 
@@ -1,16 +1,17 @@
 from __future__ import annotations
 
 import time
-from io import BytesIO
+from itertools import chain
 
 import defusedxml.ElementTree as ET
-from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, UploadFile
-from openpyxl import Workbook
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException, UploadFile
 
 from app.core.security import AuthenticatedPrincipal
+from app.services.excel_writer import WorkbookWriter
 from app.services.jobs_service import JobsService
 from app.tools._common import (
     read_upload_for_principal,
+    run_tool_work,
     safe_base_filename,
     safe_sheet_title,
     unique_sheet_title,
@@ -20,6 +21,7 @@ from app.tools._recording import (
     jobs_service_dep,
     record_and_respond,
 )
+from app.tools._uploads import file_or_token
 
 router = APIRouter()
 
@@ -84,6 +86,31 @@ def _extract_tables(root: ET.Element) -> dict[str, dict]:
     return tables
 
 
+def _xml_to_xlsx_bytes(raw: bytes, include_headers: bool) -> bytes:
+    try:
+        root = ET.fromstring(raw, forbid_dtd=True, forbid_entities=True, forbid_external=True)
+    except ET.ParseError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid XML: {e}") from e
+    except ET.EntitiesForbidden:
+        raise HTTPException(status_code=400, detail="XML entity declarations are not allowed")
+    except ET.DTDForbidden:
+        raise HTTPException(status_code=400, detail="XML DTD declarations are not allowed")
+    except ET.ExternalReferenceForbidden:
+        raise HTTPException(status_code=400, detail="XML external references are not allowed")
+
+    tables = _extract_tables(root)
+    if not tables:
+        raise HTTPException(status_code=400, detail="No tabular data found in the XML file")
+
+    with WorkbookWriter() as writer:
+        used_names: set[str] = set()
+        for table_name, data in tables.items():
+            title = unique_sheet_title(safe_sheet_title(table_name, "Sheet"), used_names)
+            rows = data["rows"]
+            writer.write_sheet(title, chain([data["headers"]], rows) if include_headers else rows)
+        return writer.to_bytes()
+
+
 @router.post(
     "/xml-to-xlsx",
     summary="XML to XLSX",
@@ -91,7 +118,7 @@ def _extract_tables(root: ET.Element) -> dict[str, dict]:
 )
 async def xml_to_xlsx(
     background_tasks: BackgroundTasks,
-    file: UploadFile = File(..., description="XML file to convert"),
+    file: UploadFile = Depends(file_or_token("XML file to convert")),
     include_headers: bool = Form(True, description="Include column headers"),
     principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
     jobs_service: JobsService = Depends(jobs_service_dep),
@@ -104,36 +131,7 @@ async def xml_to_xlsx(
 
     raw = await read_upload_for_principal(file, principal=principal)
 
-    try:
-        root = ET.fromstring(raw, forbid_dtd=True, forbid_entities=True, forbid_external=True)
-    except ET.ParseError as e:
-        raise HTTPException(status_code=400, detail=f"Invalid XML: {e}") from e
-    except ET.EntitiesForbidden:
-        raise HTTPException(status_code=400, detail="XML entity declarations are not allowed")
-    except ET.DTDForbidden:
-        raise HTTPException(status_code=400, detail="XML DTD declarations are not allowed")
-    except ET.ExternalReferenceForbidden:
-        raise HTTPException(status_code=400, detail="XML external references are not allowed")
-
-    tables = _extract_tables(root)
-    if not tables:
-        raise HTTPException(status_code=400, detail="No tabular data found in the XML file")
-
-    wb = Workbook()
-    default_ws = wb.active
-    wb.remove(default_ws)
-
-    used_names: set[str] = set()
-    for table_name, data in tables.items():
-        title = unique_sheet_title(safe_sheet_title(table_name, "Sheet"), used_names)
-        ws = wb.create_sheet(title=title)
-        if include_headers:
-            ws.append(data["headers"])
-        for row in data["rows"]:
-            ws.append(row)
-
-    output = BytesIO()
-    wb.save(output)
+    output_bytes = await run_tool_work(principal, _xml_to_xlsx_bytes, raw, include_headers)
 
     out_name = f"{safe_base_filename(file.filename, 'converted')}.xlsx"
 
@@ -144,7 +142,7 @@ async def xml_to_xlsx(
         tool_slug="xml-to-xlsx",
         tool_name="XML to XLSX",
         original_filename=file.filename,
-        output_bytes=output.getvalue(),
+        output_bytes=output_bytes,
         output_filename=out_name,
         mime_type=_XLSX_MIME,
         success=True,
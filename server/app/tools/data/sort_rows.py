@@ -4,17 +4,23 @@ import json
 import time
 from typing import Any
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException, UploadFile
 
 from app.core.security import AuthenticatedPrincipal
-from app.services.excel_reader import parse_excel_bytes
+from app.services.excel_reader import ExcelSource, WorkbookReader
 from app.services.jobs_service import JobsService
-from app.tools._common import check_excel_file, has_visual_elements, read_upload_for_principal
+from app.tools._common import (
+    check_excel_file,
+    has_visual_elements,
+    run_tool_work,
+    spool_upload_for_principal,
+)
 from app.tools._recording import (
     get_current_user_optional,
     jobs_service_dep,
     record_and_respond,
 )
+from app.tools._uploads import file_or_token
 from app.tools.clean._utils import workbook_bytes_from_data
 
 router = APIRouter()
@@ -39,53 +45,23 @@ def _comparable(value: Any) -> tuple[int, Any]:
     return (2, str(value).casefold())
 
 
-@router.post(
-    "/sort-rows",
-    summary="Sort Rows",
-    description="Sorts rows in a selected sheet by one or more columns.",
-)
-async def sort_rows(
-    background_tasks: BackgroundTasks,
-    file: UploadFile = File(..., description="Excel file"),
-    sheet: str = Form(..., description="Sheet name"),
-    sort_keys: str = Form(..., description='JSON array: [{"column":"Name","direction":"asc"}]'),
-    has_header: bool = Form(True, description="Whether first row is header"),
-    principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
-    jobs_service: JobsService = Depends(jobs_service_dep),
-):
-    started = time.perf_counter()
-    check_excel_file(file)
-    raw = await read_upload_for_principal(file, principal=principal)
-    workbook_data = parse_excel_bytes(raw, file.filename)
-    has_visuals = has_visual_elements(raw)
-
-    if sheet not in workbook_data:
-        raise HTTPException(status_code=404, detail="Sheet not found")
-
-    try:
-        keys = json.loads(sort_keys)
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid sort_keys JSON")
+def _sort_workbook(
+    source: ExcelSource,
+    filename: str | None,
+    sheet: str,
+    keys: list[dict[str, Any]],
+    has_header: bool,
+) -> bytes:
+    with WorkbookReader(source, filename) as reader:
+        if sheet not in reader.sheet_names:
+            raise HTTPException(status_code=404, detail="Sheet not found")
+        # The rewritten workbook keeps every sheet, so this tool needs them all.
+        workbook_data = reader.materialize()
 
     rows = workbook_data[sheet]
     if not rows:
         workbook_data[sheet] = []
-        output_bytes = workbook_bytes_from_data(workbook_data)
-        return await record_and_respond(
-            principal=principal,
-            background_tasks=background_tasks,
-            jobs_service=jobs_service,
-            tool_slug="sort-rows",
-            tool_name="Sort Rows",
-            original_filename=file.filename,
-            output_bytes=output_bytes,
-            output_filename="sorted.xlsx",
-            mime_type=_XLSX_MIME,
-            success=True,
-            error_type=None,
-            duration_ms=int((time.perf_counter() - started) * 1000),
-            visual_elements_removed=has_visuals,
-        )
+        return workbook_bytes_from_data(workbook_data)
 
     header = rows[0] if has_header else None
     data_rows = list(rows[1:] if has_header else rows)
@@ -128,7 +104,36 @@ async def sort_rows(
         )
 
     workbook_data[sheet] = ([header] if header else []) + data_rows
-    output_bytes = workbook_bytes_from_data(workbook_data)
+    return workbook_bytes_from_data(workbook_data)
+
+
+@router.post(
+    "/sort-rows",
+    summary="Sort Rows",
+    description="Sorts rows in a selected sheet by one or more columns.",
+)
+async def sort_rows(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = Depends(file_or_token("Excel file")),
+    sheet: str = Form(..., description="Sheet name"),
+    sort_keys: str = Form(..., description='JSON array: [{"column":"Name","direction":"asc"}]'),
+    has_header: bool = Form(True, description="Whether first row is header"),
+    principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
+    jobs_service: JobsService = Depends(jobs_service_dep),
+):
+    started = time.perf_counter()
+    check_excel_file(file)
+    source = await spool_upload_for_principal(file, principal=principal)
+    has_visuals = has_visual_elements(source)
+
+    try:
+        keys = json.loads(sort_keys)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid sort_keys JSON")
+
+    output_bytes = await run_tool_work(
+        principal, _sort_workbook, source, file.filename, sheet, keys, has_header,
+    )
 
     return await record_and_respond(
         principal=principal,
@@ -3,17 +3,23 @@ from __future__ import annotations
 import time
 from typing import Any
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException, UploadFile
 
 from app.core.security import AuthenticatedPrincipal
-from app.services.excel_reader import parse_excel_bytes
+from app.services.excel_reader import ExcelSource, parse_excel_bytes
 from app.services.jobs_service import JobsService
-from app.tools._common import check_excel_file, has_visual_elements, read_upload_for_principal
+from app.tools._common import (
+    check_excel_file,
+    has_visual_elements,
+    run_tool_work,
+    spool_upload_for_principal,
+)
 from app.tools._recording import (
     get_current_user_optional,
     jobs_service_dep,
     record_and_respond,
 )
+from app.tools._uploads import file_or_token
 from app.tools.clean._utils import workbook_bytes_from_data
 
 router = APIRouter()
@@ -23,26 +29,15 @@ _XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 _DELIMITERS = {"comma": ",", "space": " ", "dash": "-", "semicolon": ";", "pipe": "|", "tab": "\t"}
 
 
-@router.post(
-    "/split-column",
-    summary="Split Column",
-    description="Splits a single column into multiple columns by a delimiter.",
-)
-async def split_column(
-    background_tasks: BackgroundTasks,
-    file: UploadFile = File(..., description="Excel file"),
-    sheet: str = Form(..., description="Sheet name"),
-    column: str = Form(..., description="Column header name to split"),
-    delimiter: str = Form("comma", description="Delimiter: comma, space, dash, semicolon, pipe, tab, or custom string"),
-    keep_original: bool = Form(True, description="Keep the original column"),
-    principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
-    jobs_service: JobsService = Depends(jobs_service_dep),
-):
-    started = time.perf_counter()
-    check_excel_file(file)
-    raw = await read_upload_for_principal(file, principal=principal)
-    workbook_data = parse_excel_bytes(raw, file.filename)
-    has_visuals = has_visual_elements(raw)
+def _split_column_workbook(
+    source: ExcelSource,
+    filename: str | None,
+    sheet: str,
+    column: str,
+    delimiter: str,
+    keep_original: bool,
+) -> tuple[bytes, bool]:
+    workbook_data = parse_excel_bytes(source, filename)
 
     if sheet not in workbook_data:
         raise HTTPException(status_code=404, detail="Sheet not found")
@@ -101,7 +96,39 @@ async def split_column(
         new_rows.append(new_row)
 
     workbook_data[sheet] = new_rows
-    output_bytes = workbook_bytes_from_data(workbook_data)
+    return workbook_bytes_from_data(workbook_data), matched_any
+
+
+@router.post(
+    "/split-column",
+    summary="Split Column",
+    description="Splits a single column into multiple columns by a delimiter.",
+)
+async def split_column(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = Depends(file_or_token("Excel file")),
+    sheet: str = Form(..., description="Sheet name"),
+    column: str = Form(..., description="Column header name to split"),
+    delimiter: str = Form("comma", description="Delimiter: comma, space, dash, semicolon, pipe, tab, or custom string"),
+    keep_original: bool = Form(True, description="Keep the original column"),
+    principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
+    jobs_service: JobsService = Depends(jobs_service_dep),
+):
+    started = time.perf_counter()
+    check_excel_file(file)
+    source = await spool_upload_for_principal(file, principal=principal)
+    has_visuals = has_visual_elements(source)
+
+    output_bytes, matched_any = await run_tool_work(
+        principal,
+        _split_column_workbook,
+        source,
+        file.filename,
+        sheet,
+        column,
+        delimiter,
+        keep_original,
+    )
 
     response = await record_and_respond(
         principal=principal,
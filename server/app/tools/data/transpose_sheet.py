@@ -2,17 +2,23 @@ from __future__ import annotations
 
 import time
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException, UploadFile
 
 from app.core.security import AuthenticatedPrincipal
-from app.services.excel_reader import parse_excel_bytes
+from app.services.excel_reader import ExcelSource, WorkbookReader
 from app.services.jobs_service import JobsService
-from app.tools._common import check_excel_file, has_visual_elements, read_upload_for_principal
+from app.tools._common import (
+    check_excel_file,
+    has_visual_elements,
+    run_tool_work,
+    spool_upload_for_principal,
+)
 from app.tools._recording import (
     get_current_user_optional,
     jobs_service_dep,
     record_and_respond,
 )
+from app.tools._uploads import file_or_token
 from app.tools.clean._utils import workbook_bytes_from_data
 
 router = APIRouter()
@@ -20,6 +26,22 @@ router = APIRouter()
 _XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
 
+def _transpose_workbook(source: ExcelSource, filename: str | None, sheet: str) -> bytes:
+    with WorkbookReader(source, filename) as reader:
+        if sheet not in reader.sheet_names:
+            raise HTTPException(status_code=404, detail="Sheet not found")
+        # The rewritten workbook keeps every sheet, so this tool needs them all.
+        workbook_data = reader.materialize()
+
+    rows = workbook_data[sheet]
+    if rows:
+        max_cols = max(len(r) for r in rows)
+        padded = [list(r) + [None] * (max_cols - len(r)) for r in rows]
+        workbook_data[sheet] = list(map(list, zip(*padded)))
+
+    return workbook_bytes_from_data(workbook_data)
+
+
 @router.post(
     "/transpose-sheet",
     summary="Transpose Sheet",
@@ -27,27 +49,19 @@ _XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 )
 async def transpose_sheet(
     background_tasks: BackgroundTasks,
-    file: UploadFile = File(..., description="Excel file"),
+    file: UploadFile = Depends(file_or_token("Excel file")),
     sheet: str = Form(..., description="Sheet name to transpose"),
     principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
     jobs_service: JobsService = Depends(jobs_service_dep),
 ):
     started = time.perf_counter()
     check_excel_file(file)
-    raw = await read_upload_for_principal(file, principal=principal)
-    workbook_data = parse_excel_bytes(raw, file.filename)
-    has_visuals = has_visual_elements(raw)
-
-    if sheet not in workbook_data:
-        raise HTTPException(status_code=404, detail="Sheet not found")
+    source = await spool_upload_for_principal(file, principal=principal)
+    has_visuals = has_visual_elements(source)
 
-    rows = workbook_data[sheet]
-    if rows:
-        max_cols = max(len(r) for r in rows)
-        padded = [list(r) + [None] * (max_cols - len(r)) for r in rows]
-        workbook_data[sheet] = list(map(list, zip(*padded)))
-
-    output_bytes = workbook_bytes_from_data(workbook_data)
+    output_bytes = await run_tool_work(
+        principal, _transpose_workbook, source, file.filename, sheet,
+    )
 
     return await record_and_respond(
         principal=principal,
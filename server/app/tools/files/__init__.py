@@ -0,0 +1,8 @@
+from fastapi import APIRouter
+
+from app.tools.files.file_handles import router as file_handles_router
+
+# Registered WITHOUT quota enforcement in app_factory: storing a file is not
+# a job; each tool run that uses the token is counted as usual.
+router = APIRouter(prefix="/api/v1/tools", tags=["files"])
+router.include_router(file_handles_router)
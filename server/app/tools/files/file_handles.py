@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile
+from pydantic import BaseModel
+
+from app.core.limits import effective_limits
+from app.core.quota_guard import _key_for_request
+from app.core.security import AuthenticatedPrincipal, get_current_user_optional
+from app.services.file_handles import get_file_handle_store
+from app.tools._common import spool_upload_for_principal
+
+router = APIRouter()
+
+
+class FileHandleOut(BaseModel):
+    file_token: str
+    filename: str | None
+    size: int
+    expires_in: int
+
+
+@router.post(
+    "/files",
+    response_model=FileHandleOut,
+    summary="Upload File Once",
+    description=(
+        "Stores an upload and returns a file_token that any tool accepts instead of "
+        "the file. Tokens expire after a period of inactivity."
+    ),
+)
+async def upload_file_handle(
+    request: Request,
+    file: UploadFile = File(..., description="File to keep for later tool runs"),
+    principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
+):
+    source = await spool_upload_for_principal(file, principal=principal)
+    store = get_file_handle_store()
+    handle = await store.put(
+        owner=_key_for_request(request, principal),
+        filename=file.filename,
+        content_type=file.content_type,
+        source=source,
+        max_handles=effective_limits(principal).max_file_handles,
+    )
+    return FileHandleOut(
+        file_token=handle.token,
+        filename=handle.filename,
+        size=handle.size,
+        expires_in=int(store.ttl_seconds),
+    )
+
+
+@router.delete(
+    "/files/{file_token}",
+    status_code=204,
+    summary="Discard Uploaded File",
+    description="Deletes a stored upload before its token expires.",
+)
+async def delete_file_handle(
+    request: Request,
+    file_token: str,
+    principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
+):
+    if not get_file_handle_store().delete(file_token, owner=_key_for_request(request, principal)):
+        raise HTTPException(status_code=404, detail="File token not found")
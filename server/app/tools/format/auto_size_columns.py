@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import time
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile
 from openpyxl.utils import get_column_letter
 
 from app.core.security import AuthenticatedPrincipal
@@ -11,13 +11,20 @@ from app.services.excel_editor import (
     save_workbook_to_bytes,
     supports_inplace_edit,
 )
+from app.services.excel_reader import ExcelSource
 from app.services.jobs_service import JobsService
-from app.tools._common import check_excel_file, has_visual_elements, read_upload_for_principal
+from app.tools._common import (
+    check_excel_file,
+    has_visual_elements,
+    run_tool_work,
+    spool_upload_for_principal,
+)
 from app.tools._recording import (
     get_current_user_optional,
     jobs_service_dep,
     record_and_respond,
 )
+from app.tools._uploads import file_or_token
 
 router = APIRouter()
 
@@ -28,28 +35,8 @@ MIN_WIDTH = 8
 MAX_WIDTH = 60
 
 
-@router.post(
-    "/auto-size-columns",
-    summary="Auto-Size Columns",
-    description="Auto-sizes all column widths based on cell content across all sheets.",
-)
-async def auto_size_columns(
-    background_tasks: BackgroundTasks,
-    file: UploadFile = File(..., description="Excel file"),
-    principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
-    jobs_service: JobsService = Depends(jobs_service_dep),
-):
-    started = time.perf_counter()
-    check_excel_file(file)
-    raw = await read_upload_for_principal(file, principal=principal)
-
-    if not supports_inplace_edit(file.filename):
-        raise HTTPException(
-            status_code=400,
-            detail="Auto-size columns requires an .xlsx or .xlsm file.",
-        )
-
-    loaded = load_workbook_for_edit(raw, file.filename)
+def _auto_size_workbook(source: ExcelSource, filename: str | None) -> tuple[bytes, bool]:
+    loaded = load_workbook_for_edit(source, filename)
     wb = loaded.workbook
 
     for ws in wb.worksheets:
@@ -69,7 +56,33 @@ async def auto_size_columns(
                     width = max(width, min(len(str(value)) + PADDING, MAX_WIDTH))
             ws.column_dimensions[col_letter].width = width
 
-    output_bytes = save_workbook_to_bytes(wb)
+    return save_workbook_to_bytes(wb), loaded.visual_elements_lost
+
+
+@router.post(
+    "/auto-size-columns",
+    summary="Auto-Size Columns",
+    description="Auto-sizes all column widths based on cell content across all sheets.",
+)
+async def auto_size_columns(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = Depends(file_or_token("Excel file")),
+    principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
+    jobs_service: JobsService = Depends(jobs_service_dep),
+):
+    started = time.perf_counter()
+    check_excel_file(file)
+    source = await spool_upload_for_principal(file, principal=principal)
+
+    if not supports_inplace_edit(file.filename):
+        raise HTTPException(
+            status_code=400,
+            detail="Auto-size columns requires an .xlsx or .xlsm file.",
+        )
+
+    output_bytes, visual_lost = await run_tool_work(
+        principal, _auto_size_workbook, source, file.filename,
+    )
 
     return await record_and_respond(
         principal=principal,
@@ -84,5 +97,5 @@ async def auto_size_columns(
         success=True,
         error_type=None,
         duration_ms=int((time.perf_counter() - started) * 1000),
-        visual_elements_removed=loaded.visual_elements_lost or has_visual_elements(raw),
+        visual_elements_removed=visual_lost or has_visual_elements(source),
     )
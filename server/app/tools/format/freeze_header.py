@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import time
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException, UploadFile
 
 from app.core.security import AuthenticatedPrincipal
 from app.services.excel_editor import (
@@ -10,19 +10,41 @@ from app.services.excel_editor import (
     save_workbook_to_bytes,
     supports_inplace_edit,
 )
+from app.services.excel_reader import ExcelSource
+from app.services.ooxml_patch import FreezeRows, patch_workbook
 from app.services.jobs_service import JobsService
-from app.tools._common import check_excel_file, has_visual_elements, read_upload_for_principal
+from app.tools._common import (
+    check_excel_file,
+    has_visual_elements,
+    run_tool_work,
+    spool_upload_for_principal,
+)
 from app.tools._recording import (
     get_current_user_optional,
     jobs_service_dep,
     record_and_respond,
 )
+from app.tools._uploads import file_or_token
 
 router = APIRouter()
 
 _XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
 
+def _freeze_header_workbook(source: ExcelSource, filename: str | None, rows: int) -> tuple[bytes, bool]:
+    patched = patch_workbook(source, sheet_patch=FreezeRows(rows))
+    if patched is not None:
+        return patched, False
+
+    loaded = load_workbook_for_edit(source, filename)
+    wb = loaded.workbook
+
+    for ws in wb.worksheets:
+        ws.freeze_panes = f"A{rows + 1}"
+
+    return save_workbook_to_bytes(wb), loaded.visual_elements_lost or has_visual_elements(source)
+
+
 @router.post(
     "/freeze-header",
     summary="Freeze Header",
@@ -30,14 +52,14 @@ _XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 )
 async def freeze_header(
     background_tasks: BackgroundTasks,
-    file: UploadFile = File(..., description="Excel file"),
+    file: UploadFile = Depends(file_or_token("Excel file")),
     rows: int = Form(1, description="Number of rows to freeze", ge=1, le=100),
     principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
     jobs_service: JobsService = Depends(jobs_service_dep),
 ):
     started = time.perf_counter()
     check_excel_file(file)
-    raw = await read_upload_for_principal(file, principal=principal)
+    source = await spool_upload_for_principal(file, principal=principal)
 
     if not supports_inplace_edit(file.filename):
         raise HTTPException(
@@ -45,13 +67,9 @@ async def freeze_header(
             detail="Freeze header requires an .xlsx or .xlsm file.",
         )
 
-    loaded = load_workbook_for_edit(raw, file.filename)
-    wb = loaded.workbook
-
-    for ws in wb.worksheets:
-        ws.freeze_panes = f"A{rows + 1}"
-
-    output_bytes = save_workbook_to_bytes(wb)
+    output_bytes, visual_lost = await run_tool_work(
+        principal, _freeze_header_workbook, source, file.filename, rows,
+    )
 
     return await record_and_respond(
         principal=principal,
@@ -66,5 +84,5 @@ async def freeze_header(
         success=True,
         error_type=None,
         duration_ms=int((time.perf_counter() - started) * 1000),
-        visual_elements_removed=loaded.visual_elements_lost or has_visual_elements(raw),
+        visual_elements_removed=visual_lost,
     )
@@ -0,0 +1,198 @@
+"""Compact column-oriented sheets for the inspect store.
+
+A previewed sheet used to be kept as a tuple of row tuples, which costs a
+pointer per cell plus a boxed Python object for every number and every
+repeated string. :class:`ColumnarSheet` keeps each column in the cheapest
+encoding its values allow:
+
+* ``int`` (within int64): an ``array('q')``;
+* ``float``: an ``array('d')``;
+* anything else (strings, dates, booleans, mixed types): dictionary
+  encoded — each distinct value is stored once and rows hold a 1, 2 or 4
+  byte code into that list.
+
+A numeric column may hold a few cells of another type (the header, a
+stray note); those are kept aside in a sorted side list. Every column has a
+null bitmap, so blanks cost one bit. Rows shorter than
+the widest row keep their length, so :meth:`ColumnarSheet.rows` returns
+exactly the lists the parsed workbook held. :attr:`ColumnarSheet.nbytes`
+is the real footprint of the arrays, bitmaps and distinct values.
+"""
+
+from __future__ import annotations
+
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Sequence
+from typing import Any
+
+_INT64_MIN = -(2**63)
+_INT64_MAX = 2**63 - 1
+# A numeric column stays typed while at most 1/16 of its cells are something
+# else (typically the header row), which are then kept aside.
+_MAX_EXCEPTION_SHARE = 16
+# ``I`` is 4 bytes on every platform we run on; fall back to ``L`` otherwise.
+_CODE_4 = "I" if array("I").itemsize >= 4 else "L"
+
+
+def _code_typecode(distinct: int) -> str:
+    if distinct <= 0xFF:
+        return "B"
+    if distinct <= 0xFFFF:
+        return "H"
+    return _CODE_4
+
+
+def _fits_int64(value: Any) -> bool:
+    return value.__class__ is int and _INT64_MIN <= value <= _INT64_MAX
+
+
+class _Column:
+    __slots__ = ("kind", "data", "values", "nulls", "exc_rows", "exc_values")
+
+    def __init__(
+        self,
+        kind: str,
+        data: array,
+        nulls: bytearray,
+        *,
+        values: list[Any] | None = None,
+        exceptions: dict[int, Any] | None = None,
+    ) -> None:
+        self.kind = kind  # "int", "float" or "dict"
+        self.data = data
+        self.nulls = nulls
+        self.values = values
+        # Sparse cells that don't fit a typed column (the header, a stray note).
+        exceptions = exceptions or {}
+        self.exc_rows = array("q", sorted(exceptions))
+        self.exc_values = [exceptions[index] for index in self.exc_rows]
+
+    @classmethod
+    def encode(cls, cells: Sequence[Any]) -> "_Column":
+        nulls = bytearray((len(cells) + 7) // 8)
+        ints = floats = present = 0
+        for index, value in enumerate(cells):
+            if value is None:
+                nulls[index >> 3] |= 1 << (index & 7)
+                continue
+            present += 1
+            if _fits_int64(value):
+                ints += 1
+            elif value.__class__ is float:
+                floats += 1
+
+        typed = max(ints, floats)
+        if typed and (present - typed) * _MAX_EXCEPTION_SHARE <= len(cells):
+            if ints >= floats:
+                kind, typecode, fits, filler = "int", "q", _fits_int64, 0
+            else:
+                kind, typecode, fits, filler = "float", "d", (lambda v: v.__class__ is float), 0.0
+            exceptions = {
+                index: value
+                for index, value in enumerate(cells)
+                if value is not None and not fits(value)
+            }
+            data = array(typecode, (filler if v is None or i in exceptions else v for i, v in enumerate(cells)))
+            return cls(kind, data, nulls, exceptions=exceptions)
+
+        # Keyed by type too, so 1, 1.0 and True stay distinct values.
+        lookup: dict[tuple[type, Any], int] = {}
+        values: list[Any] = []
+        codes: list[int] = []
+        for value in cells:
+            if value is None:
+                codes.append(0)
+                continue
+            key = (value.__class__, value)
+            code = lookup.get(key)
+            if code is None:
+                code = lookup[key] = len(values)
+                values.append(value)
+            codes.append(code)
+        return cls("dict", array(_code_typecode(len(values)), codes), nulls, values=values)
+
+    def slice(self, start: int, stop: int) -> list[Any]:
+        if self.kind == "dict":
+            values = self.values
+            out = [values[code] for code in self.data[start:stop]] if values else [None] * (stop - start)
+        else:
+            out = self.data[start:stop].tolist()
+        nulls = self.nulls
+        for offset, index in enumerate(range(start, stop)):
+            if nulls[index >> 3] & (1 << (index & 7)):
+                out[offset] = None
+        first = bisect_left(self.exc_rows, start)
+        last = bisect_left(self.exc_rows, stop, first)
+        for position in range(first, last):
+            out[self.exc_rows[position] - start] = self.exc_values[position]
+        return out
+
+    @property
+    def nbytes(self) -> int:
+        size = (
+            sys.getsizeof(self)
+            + sys.getsizeof(self.data)
+            + sys.getsizeof(self.nulls)
+            + sys.getsizeof(self.exc_rows)
+            + sys.getsizeof(self.exc_values)
+            + sum(sys.getsizeof(v) for v in self.exc_values)
+        )
+        if self.values is not None:
+            size += sys.getsizeof(self.values) + sum(sys.getsizeof(v) for v in self.values)
+        return size
+
+
+class ColumnarSheet:
+    """Immutable rows of one sheet stored column by column."""
+
+    __slots__ = ("_columns", "_row_count", "_widths", "_width", "nbytes")
+
+    def __init__(self, rows: Sequence[Sequence[Any]]) -> None:
+        self._row_count = len(rows)
+        widths = [len(row) for row in rows]
+        self._width = max(widths, default=0)
+        # Only ragged sheets pay for per-row lengths.
+        if any(w != self._width for w in widths):
+            self._widths: array | None = array(_code_typecode(self._width), widths)
+        else:
+            self._widths = None
+        self._columns = tuple(
+            _Column.encode([row[c] if c < len(row) else None for row in rows])
+            for c in range(self._width)
+        )
+        self.nbytes = (
+            sys.getsizeof(self)
+            + sys.getsizeof(self._columns)
+            + sum(column.nbytes for column in self._columns)
+            + (sys.getsizeof(self._widths) if self._widths is not None else 0)
+        )
+
+    def __len__(self) -> int:
+        return self._row_count
+
+    def rows(self, start: int = 0, stop: int | None = None) -> list[list[Any]]:
+        """Rows ``start`` to ``stop`` (clamped like a slice) as fresh lists."""
+        start, stop, _ = slice(start, stop).indices(self._row_count)
+        if start >= stop:
+            return []
+        columns = [column.slice(start, stop) for column in self._columns]
+        out = [list(row) for row in zip(*columns)] if columns else [[] for _ in range(stop - start)]
+        if self._widths is not None:
+            for offset, width in enumerate(self._widths[start:stop]):
+                del out[offset][width:]
+        return out
+
+    def row(self, index: int) -> list[Any]:
+        found = self.rows(index, index + 1) if index >= 0 else []
+        if not found:
+            raise IndexError(index)
+        return found[0]
+
+
+def columnar_workbook(sheets: dict[str, Sequence[Sequence[Any]]]) -> dict[str, ColumnarSheet]:
+    return {name: ColumnarSheet(rows) for name, rows in sheets.items()}
+
+
+__all__ = ["ColumnarSheet", "columnar_workbook"]
@@ -0,0 +1,114 @@
+"""Sheets that are still being indexed in the background after a preview.
+
+``preview`` answers as soon as it has each sheet's header and sample rows;
+the tool worker then keeps reading the workbook and hands every
+``_CHUNK_ROWS`` rows over as a column-encoded chunk. Pages that ask for
+rows that have not arrived yet wait for them instead of failing.
+
+An :class:`IndexingSheet` is fed from the worker thread
+(:meth:`IndexingSheet.index_rows`), but its state is only ever changed by
+callbacks on the event loop, so readers need no lock.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Iterable
+from typing import Any
+
+from app.tools.inspect._columnar import ColumnarSheet
+
+_CHUNK_ROWS = 4096
+
+
+class IndexingAbandoned(Exception):
+    """The event loop that owns the sheet has shut down."""
+
+
+class IndexingSheet:
+    """Rows of one sheet as a growing list of fixed-size column-encoded chunks."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._chunks: list[ColumnarSheet] = []
+        self._row_count = 0
+        self._progress = asyncio.Event()
+        self.complete = False
+        self.error: BaseException | None = None
+
+    # Worker side ---------------------------------------------------------
+
+    def index_rows(self, rows: Iterable[list[Any]]) -> None:
+        """Encode ``rows`` chunk by chunk on the calling thread and publish each one."""
+        chunk: list[list[Any]] = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == _CHUNK_ROWS:
+                self._publish_threadsafe(ColumnarSheet(chunk), False, None)
+                chunk = []
+        self._publish_threadsafe(ColumnarSheet(chunk) if chunk else None, True, None)
+
+    def fail(self, error: BaseException) -> None:
+        """Mark the sheet as broken; pages waiting for it re-raise ``error``."""
+        try:
+            self._publish_threadsafe(None, True, error)
+        except IndexingAbandoned:
+            pass
+
+    def _publish_threadsafe(
+        self, chunk: ColumnarSheet | None, complete: bool, error: BaseException | None
+    ) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._publish, chunk, complete, error)
+        except RuntimeError as exc:  # the loop is gone: nobody can page this sheet
+            raise IndexingAbandoned from exc
+
+    def _publish(self, chunk: ColumnarSheet | None, complete: bool, error: BaseException | None) -> None:
+        if chunk is not None:
+            self._chunks.append(chunk)
+            self._row_count += len(chunk)
+        self.complete = complete or error is not None
+        self.error = error
+        progress, self._progress = self._progress, asyncio.Event()
+        progress.set()
+
+    # Loop side -----------------------------------------------------------
+
+    async def wait_for(self, stop: int) -> None:
+        """Return once rows ``[0, stop)`` are available or the sheet is complete."""
+        while not self.complete and self._row_count < stop:
+            await self._progress.wait()
+        if self.error is not None:
+            raise self.error
+
+    @property
+    def nbytes(self) -> int:
+        return sum(chunk.nbytes for chunk in self._chunks)
+
+    def __len__(self) -> int:
+        return self._row_count
+
+    def rows(self, start: int = 0, stop: int | None = None) -> list[list[Any]]:
+        start, stop, _ = slice(start, stop).indices(self._row_count)
+        out: list[list[Any]] = []
+        while start < stop:
+            chunk_index, offset = divmod(start, _CHUNK_ROWS)
+            taken = self._chunks[chunk_index].rows(offset, offset + stop - start)
+            out.extend(taken)
+            start += len(taken)
+        return out
+
+    def row(self, index: int) -> list[Any]:
+        found = self.rows(index, index + 1) if index >= 0 else []
+        if not found:
+            raise IndexError(index)
+        return found[0]
+
+
+async def wait_for_rows(sheet: Any, stop: int) -> None:
+    """Wait until ``sheet`` has ``stop`` rows or is complete; no-op for stored sheets."""
+    if isinstance(sheet, IndexingSheet):
+        await sheet.wait_for(stop)
+
+
+__all__ = ["IndexingAbandoned", "IndexingSheet", "wait_for_rows"]
@@ -0,0 +1,449 @@
+"""Server-side filter, sort and search for ``page_sheet``.
+
+Queries are answered from per-column indexes that are built the first time
+a column is used and then kept with the token (see ``_store``):
+
+* a sort index: the data rows ordered by the column (blanks last) plus each
+  row's dense rank in that order. Sorting, ``=``/``!=`` and range filters
+  are binary searches or rank lookups over it instead of scans;
+* a search column: every cell of the column lower-cased into one
+  newline-separated string with row start offsets, so ``contains`` is
+  ``str.find`` over a single buffer and a hit maps back to its row by
+  bisection.
+
+The ordered result of the last few queries is also kept, so paging through
+one filtered view only slices it.
+
+``regex`` searches accept a backtracking-safe subset of Python's syntax (no
+backreferences, lookarounds or quantified groups; few quantifiers, only one
+of them variable-length like ``*`` or ``{2,5}``) and only look at the first
+``_MAX_REGEX_CELL_CHARS`` characters of a cell, which bounds the cost of a
+single match. They stop with ``400`` once they run past a deadline, checked
+between cells.
+
+Values compare within their kind only: numbers with numbers, dates with
+dates, text case-insensitively with text. ``amount>10`` never matches a
+text cell.
+"""
+
+from __future__ import annotations
+
+import datetime
+import math
+import re
+import re._constants as _sre
+import re._parser as _sre_parser
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from fastapi import HTTPException
+
+_SCAN_CHUNK_ROWS = 4096
+_CACHED_RESULTS = 8
+_MAX_PATTERN_LENGTH = 256
+_MAX_PATTERN_REPEATS = 4
+# A match cannot be interrupted: this bounds what one cell can cost.
+_MAX_REGEX_CELL_CHARS = 1024
+_REGEX_SEARCH_SECONDS = 2.0
+_FILTER_RE = re.compile(r"^(?P<column>.+?)(?P<op>!=|>=|<=|=|>|<|~)(?P<value>.*)$", re.DOTALL)
+
+# Kinds, in the order they sort in.
+_NUMBER, _DATE, _TEXT, _BOOL, _OTHER = range(5)
+
+
+def _sort_key(value: Any) -> tuple:
+    cls = value.__class__
+    if cls is int or (cls is float and not math.isnan(value)):
+        return (_NUMBER, value)
+    if cls is str:
+        return (_TEXT, value.casefold())
+    if cls is datetime.datetime:
+        return (_DATE, value.replace(tzinfo=None))
+    if cls is datetime.date:
+        return (_DATE, datetime.datetime(value.year, value.month, value.day))
+    if cls is bool:
+        return (_BOOL, value)
+    return (_OTHER, str(value))
+
+
+def _filter_keys(raw: str) -> list[tuple]:
+    """Keys a filter value may mean, most specific first (``"10"`` is 10 and the text "10")."""
+    keys: list[tuple] = []
+    text = raw.strip()
+    try:
+        number = float(text)
+    except ValueError:
+        pass
+    else:
+        if not math.isnan(number):
+            keys.append((_NUMBER, int(number) if number.is_integer() else number))
+    try:
+        keys.append(_sort_key(datetime.datetime.fromisoformat(text)))
+    except ValueError:
+        pass
+    if text.lower() in ("true", "false"):
+        keys.append((_BOOL, text.lower() == "true"))
+    keys.append((_TEXT, raw.casefold()))
+    return keys
+
+
+def _search_text(value: Any) -> str:
+    if value is None:
+        return ""
+    if value.__class__ in (datetime.datetime, datetime.date, datetime.time):
+        value = value.isoformat()
+    return str(value).lower().replace("\n", " ")
+
+
+# What a quantifier may apply to: one character, so a repeat can never
+# nest another repeat or an alternation.
+_SINGLE_CHARACTER = frozenset(
+    {_sre.LITERAL, _sre.NOT_LITERAL, _sre.ANY, _sre.IN, _sre.CATEGORY}
+)
+_REPEATS = frozenset({_sre.MAX_REPEAT, _sre.MIN_REPEAT, _sre.POSSESSIVE_REPEAT})
+
+
+def _unsafe_pattern(items: Any) -> str | None:
+    """Why a parsed pattern could backtrack badly, or ``None`` if it cannot."""
+    repeats = variable = 0
+    stack = [items]
+    while stack:
+        for op, av in stack.pop():
+            if op in (_sre.GROUPREF, _sre.GROUPREF_EXISTS, _sre.GROUPREF_IGNORE):
+                return "backreferences are not supported"
+            if op in (_sre.ASSERT, _sre.ASSERT_NOT):
+                return "lookarounds are not supported"
+            if op in _REPEATS:
+                body = list(av[2])
+                if len(body) != 1 or body[0][0] not in _SINGLE_CHARACTER:
+                    return "quantifiers may only follow a single character or character class"
+                repeats += 1
+                if repeats > _MAX_PATTERN_REPEATS:
+                    return f"at most {_MAX_PATTERN_REPEATS} quantifiers are allowed"
+                low, high = av[0], av[1]
+                # Two of these can split the same run of characters in O(n^k) ways.
+                if low != high and high > 1:
+                    variable += 1
+                    if variable > 1:
+                        return "only one variable-length quantifier (*, +, {m,n}) is allowed"
+            elif op is _sre.BRANCH:
+                stack.extend(av[1])
+            elif op is _sre.SUBPATTERN:
+                stack.append(av[3])
+            elif op is _sre.ATOMIC_GROUP:
+                stack.append(av)
+    return None
+
+
+@dataclass(frozen=True)
+class ColumnFilter:
+    column: str
+    op: str
+    value: str
+
+
+@dataclass(frozen=True)
+class SortKey:
+    column: str
+    descending: bool = False
+
+
+@dataclass(frozen=True)
+class SheetQuery:
+    filters: tuple[ColumnFilter, ...] = ()
+    sort: tuple[SortKey, ...] = ()
+    search: str | None = None
+    regex: bool = False
+
+
+def parse_query(
+    filters: list[str] | None,
+    sort: list[str] | None,
+    search: str | None,
+    regex: bool,
+) -> SheetQuery | None:
+    """Parse the ``filter``/``sort``/``search`` query parameters; ``None`` if there are none."""
+    parsed_filters = []
+    for raw in filters or ():
+        match = _FILTER_RE.match(raw)
+        if match is None:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid filter {raw!r}; expected <column><op><value> with op one of = != > >= < <= ~",
+            )
+        parsed_filters.append(ColumnFilter(match["column"], match["op"], match["value"]))
+    parsed_sort = []
+    for raw in sort or ():
+        descending = raw.startswith("-")
+        column = raw[1:] if descending else raw
+        if not column:
+            raise HTTPException(status_code=400, detail="Invalid sort key; expected <column> or -<column>")
+        parsed_sort.append(SortKey(column, descending))
+    if search == "":
+        search = None
+    if search is not None and regex:
+        if len(search) > _MAX_PATTERN_LENGTH:
+            raise HTTPException(status_code=400, detail="Search pattern is too long")
+        try:
+            reason = _unsafe_pattern(_sre_parser.parse(search))
+        except re.error as exc:
+            raise HTTPException(status_code=400, detail=f"Invalid search pattern: {exc}") from exc
+        if reason is not None:
+            raise HTTPException(status_code=400, detail=f"Unsupported search pattern: {reason}")
+    if not parsed_filters and not parsed_sort and search is None:
+        return None
+    return SheetQuery(tuple(parsed_filters), tuple(parsed_sort), search, regex)
+
+
+class _SortIndex:
+    __slots__ = ("order", "ranks", "present", "key_at")
+
+    def __init__(self, order: array, ranks: array, present: int, key_at: Callable[[int], tuple]) -> None:
+        self.order = order  # data row indexes, by value; blanks last
+        self.ranks = ranks  # data row index -> dense rank; blanks rank highest
+        self.present = present  # non-blank rows, i.e. where the blanks start in ``order``
+        self.key_at = key_at
+
+    def _position(self, key: tuple, right: bool) -> int:
+        find = bisect_right if right else bisect_left
+        return find(self.order, key, 0, self.present, key=self.key_at)
+
+    def between(self, low: tuple, high: tuple, *, include_low: bool, include_high: bool) -> array:
+        start = self._position(low, right=not include_low)
+        stop = self._position(high, right=include_high)
+        return self.order[start:max(start, stop)]
+
+    @property
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.order) + sys.getsizeof(self.ranks)
+
+
+class _SearchColumn:
+    __slots__ = ("text", "starts")
+
+    def __init__(self, text: str, starts: array) -> None:
+        self.text = text
+        self.starts = starts  # start of every row's text, plus the end
+
+    def contains(self, needle: str) -> set[int]:
+        if not needle:
+            return set(range(len(self.starts) - 1))
+        found: set[int] = set()
+        text, starts = self.text, self.starts
+        position = text.find(needle)
+        while position != -1:
+            row = bisect_right(starts, position) - 1
+            found.add(row)
+            # Skip the rest of this row: one hit is enough.
+            position = text.find(needle, starts[row + 1])
+        return found
+
+    def matches(self, pattern: re.Pattern[str], deadline: float) -> set[int]:
+        found: set[int] = set()
+        text, starts = self.text, self.starts
+        search, now = pattern.search, time.monotonic
+        for row in range(len(starts) - 1):
+            start = starts[row]
+            if search(text, start, min(starts[row + 1] - 1, start + _MAX_REGEX_CELL_CHARS)):
+                found.add(row)
+            if now() > deadline:
+                raise HTTPException(status_code=400, detail="Search pattern is too slow; try a simpler one")
+        return found
+
+    @property
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.text) + sys.getsizeof(self.starts)
+
+
+class _KeyReader:
+    """``data row index -> sort key`` by reading single cells back from the sheet."""
+
+    __slots__ = ("_sheet", "_column")
+
+    def __init__(self, sheet: Any, column: int) -> None:
+        self._sheet = sheet
+        self._column = column
+
+    def __call__(self, index: int) -> tuple:
+        row = self._sheet.row(1 + index)
+        value = row[self._column] if self._column < len(row) else None
+        return _sort_key(value)
+
+
+class SheetIndex:
+    """Lazily built indexes for one stored sheet; safe to query from worker threads."""
+
+    def __init__(self, sheet: Any) -> None:
+        self._sheet = sheet
+        self._data_rows = max(len(sheet) - 1, 0)
+        self._header = [str(cell) if cell is not None else "" for cell in sheet.row(0)] if len(sheet) else []
+        self._sorts: dict[int, _SortIndex] = {}
+        self._searches: dict[int, _SearchColumn] = {}
+        self._results: OrderedDict[SheetQuery, array] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            sum(index.nbytes for index in self._sorts.values())
+            + sum(column.nbytes for column in self._searches.values())
+            + sum(sys.getsizeof(result) for result in self._results.values())
+        )
+
+    def _column(self, name: str) -> int:
+        try:
+            return self._header.index(name)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Unknown column {name!r}") from None
+
+    def _values(self, column: int) -> list[Any]:
+        values: list[Any] = []
+        for start in range(1, self._data_rows + 1, _SCAN_CHUNK_ROWS):
+            for row in self._sheet.rows(start, start + _SCAN_CHUNK_ROWS):
+                values.append(row[column] if column < len(row) else None)
+        return values
+
+    def _sort_index(self, column: int) -> _SortIndex:
+        index = self._sorts.get(column)
+        if index is not None:
+            return index
+        with self._lock:
+            if column not in self._sorts:
+                values = self._values(column)
+                keys = [_sort_key(v) if v is not None else None for v in values]
+                present = [i for i, key in enumerate(keys) if key is not None]
+                present.sort(key=keys.__getitem__)
+                blanks = [i for i, key in enumerate(keys) if key is None]
+                ranks = array("I", bytes(4 * len(keys)))
+                rank, previous = -1, None
+                for i in present:
+                    if keys[i] != previous:
+                        rank, previous = rank + 1, keys[i]
+                    ranks[i] = rank
+                for i in blanks:
+                    ranks[i] = rank + 1
+                # Sorted keys are not kept: bisection re-reads the few cells it visits.
+                self._sorts[column] = _SortIndex(
+                    array("I", present + blanks), ranks, len(present), _KeyReader(self._sheet, column)
+                )
+            return self._sorts[column]
+
+    def _search_column(self, column: int) -> _SearchColumn:
+        found = self._searches.get(column)
+        if found is not None:
+            return found
+        with self._lock:
+            if column not in self._searches:
+                cells = [_search_text(v) for v in self._values(column)]
+                starts = array("Q", [0])
+                position = 0
+                for cell in cells:
+                    position += len(cell) + 1
+                    starts.append(position)
+                self._searches[column] = _SearchColumn("\n".join(cells) + "\n", starts)
+            return self._searches[column]
+
+    def _filter(self, column_filter: ColumnFilter) -> set[int]:
+        column = self._column(column_filter.column)
+        if column_filter.op == "~":
+            return self._search_column(column).contains(_search_text(column_filter.value))
+
+        index = self._sort_index(column)
+        keys = _filter_keys(column_filter.value)
+        if column_filter.op in ("=", "!="):
+            equal: set[int] = set()
+            for key in keys:
+                equal.update(index.between(key, key, include_low=True, include_high=True))
+            return equal if column_filter.op == "=" else set(range(self._data_rows)) - equal
+
+        key = keys[0]
+        kind_low, kind_high = (key[0],), (key[0] + 1,)
+        if column_filter.op in (">", ">="):
+            return set(index.between(key, kind_high, include_low=column_filter.op == ">=", include_high=False))
+        return set(index.between(kind_low, key, include_low=True, include_high=column_filter.op == "<="))
+
+    def _search(self, needle: str, regex: bool) -> set[int]:
+        found: set[int] = set()
+        if regex:
+            # MULTILINE so ``^`` anchors at the start of every cell.
+            pattern = re.compile(needle, re.IGNORECASE | re.MULTILINE)
+            deadline = time.monotonic() + _REGEX_SEARCH_SECONDS
+            for column in range(len(self._header)):
+                found |= self._search_column(column).matches(pattern, deadline)
+        else:
+            needle = _search_text(needle)
+            for column in range(len(self._header)):
+                found |= self._search_column(column).contains(needle)
+        return found
+
+    def _order(self, query: SheetQuery) -> array:
+        matched: set[int] | None = None
+        for column_filter in query.filters:
+            rows = self._filter(column_filter)
+            matched = rows if matched is None else matched & rows
+        if query.search is not None:
+            rows = self._search(query.search, query.regex)
+            matched = rows if matched is None else matched & rows
+
+        if not query.sort:
+            return array("I", sorted(matched) if matched is not None else range(self._data_rows))
+
+        indexes = [(self._sort_index(self._column(key.column)), key.descending) for key in query.sort]
+        if len(indexes) == 1 and matched is None:
+            index, descending = indexes[0]
+            if not descending:
+                return index.order
+            # Not a plain reversal: ties keep their sheet order.
+            ranks = index.ranks
+            ordered = sorted(index.order[: index.present], key=lambda row: -ranks[row])
+            return array("I", ordered) + index.order[index.present :]
+
+        blank_ranks = [index.ranks[index.order[-1]] if index.present < len(index.order) else -1 for index, _ in indexes]
+
+        def key(row: int) -> tuple:
+            parts = []
+            for (index, descending), blank in zip(indexes, blank_ranks):
+                rank = index.ranks[row]
+                # Blanks stay last whichever way the column is sorted.
+                parts.append((rank == blank, -rank if descending else rank))
+            return tuple(parts)
+
+        candidates = matched if matched is not None else range(self._data_rows)
+        return array("I", sorted(candidates, key=key))
+
+    def run(self, query: SheetQuery) -> array:
+        """Data row indexes (0 = first row after the header) matching ``query``, in order."""
+        with self._lock:
+            result = self._results.get(query)
+            if result is not None:
+                self._results.move_to_end(query)
+                return result
+        result = self._order(query)
+        with self._lock:
+            self._results[query] = result
+            while len(self._results) > _CACHED_RESULTS:
+                self._results.popitem(last=False)
+        return result
+
+
+def fetch_rows(sheet: Any, indexes: array) -> list[list[Any]]:
+    """Data rows ``indexes`` of ``sheet``, reading runs of consecutive rows in one slice."""
+    out: list[list[Any]] = []
+    position = 0
+    while position < len(indexes):
+        start = indexes[position]
+        end = position + 1
+        while end < len(indexes) and indexes[end] == indexes[end - 1] + 1:
+            end += 1
+        out.extend(sheet.rows(1 + start, 1 + start + end - position))
+        position = end
+    return out
+
+
+__all__ = ["SheetIndex", "SheetQuery", "fetch_rows", "parse_query"]
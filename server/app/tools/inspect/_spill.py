@@ -0,0 +1,360 @@
+"""Disk tier of the inspect token store.
+
+Every previewed workbook is also written to a local directory, one file per
+sheet, so a token keeps working when the in-memory store has evicted it,
+after a restart, and on any uvicorn worker of the same host.
+
+A sheet file is a row-offset-indexed binary table::
+
+    header   b"XWR1" | row count (u64) | index position (u64)
+    rows     per row: cell count (u32), then one tagged value per cell
+    index    row count + 1 offsets (native u64), each the start of a row
+
+:class:`SpilledSheet` memory-maps the file and decodes only the rows a page
+asks for, so paging never deserialises the whole sheet. Values are written
+with a small tagged encoding rather than pickle: the directory is shared
+between processes and must never be able to execute code on read.
+
+``<token>/meta.json`` is written last and lists the sheets and their row
+totals; a token directory without it is incomplete and ignored. Its mtime
+is the token's last use, giving the same sliding TTL as the memory tier.
+"""
+
+from __future__ import annotations
+
+import datetime
+import json
+import mmap
+import os
+import re
+import shutil
+import struct
+import tempfile
+import time
+from array import array
+from collections.abc import Iterator, Mapping
+from typing import Any, BinaryIO, Callable, Protocol
+
+from app.core.config import get_settings
+
+_MAGIC = b"XWR1"
+_HEADER = struct.Struct("<4sQQ")
+_U32 = struct.Struct("<I")
+_I64 = struct.Struct("<q")
+_F64 = struct.Struct("<d")
+_META = "meta.json"
+_WRITE_CHUNK_ROWS = 4096
+_TOKEN_RE = re.compile(r"^[A-Za-z0-9_-]{8,128}$")
+
+_INT64_MIN = -(2**63)
+_INT64_MAX = 2**63 - 1
+
+(
+    _T_NONE,
+    _T_FALSE,
+    _T_TRUE,
+    _T_INT,
+    _T_BIGINT,
+    _T_FLOAT,
+    _T_STR,
+    _T_DATETIME,
+    _T_DATE,
+    _T_TIME,
+    _T_TIMEDELTA,
+) = range(11)
+
+
+class _RowSource(Protocol):
+    def __len__(self) -> int: ...
+
+    def rows(self, start: int = 0, stop: int | None = None) -> list[list[Any]]: ...
+
+
+def _encode_text(out: bytearray, tag: int, text: str) -> None:
+    data = text.encode("utf-8", "surrogatepass")
+    out.append(tag)
+    out += _U32.pack(len(data))
+    out += data
+
+
+def _encode_cell(out: bytearray, value: Any) -> None:
+    cls = value.__class__
+    if value is None:
+        out.append(_T_NONE)
+    elif cls is bool:
+        out.append(_T_TRUE if value else _T_FALSE)
+    elif cls is int:
+        if _INT64_MIN <= value <= _INT64_MAX:
+            out.append(_T_INT)
+            out += _I64.pack(value)
+        else:
+            _encode_text(out, _T_BIGINT, str(value))
+    elif cls is float:
+        out.append(_T_FLOAT)
+        out += _F64.pack(value)
+    elif cls is str:
+        _encode_text(out, _T_STR, value)
+    elif cls is datetime.datetime:
+        _encode_text(out, _T_DATETIME, value.isoformat())
+    elif cls is datetime.date:
+        _encode_text(out, _T_DATE, value.isoformat())
+    elif cls is datetime.time:
+        _encode_text(out, _T_TIME, value.isoformat())
+    elif cls is datetime.timedelta:
+        out.append(_T_TIMEDELTA)
+        out += _I64.pack(value // datetime.timedelta(microseconds=1))
+    else:
+        # Anything exotic is shown as text, which is what the JSON page does anyway.
+        _encode_text(out, _T_STR, str(value))
+
+
+def _decode_row(buf: memoryview | bytes, pos: int) -> list[Any]:
+    (count,) = _U32.unpack_from(buf, pos)
+    pos += 4
+    row: list[Any] = []
+    for _ in range(count):
+        tag = buf[pos]
+        pos += 1
+        if tag == _T_NONE:
+            row.append(None)
+        elif tag == _T_INT:
+            row.append(_I64.unpack_from(buf, pos)[0])
+            pos += 8
+        elif tag == _T_FLOAT:
+            row.append(_F64.unpack_from(buf, pos)[0])
+            pos += 8
+        elif tag == _T_FALSE or tag == _T_TRUE:
+            row.append(tag == _T_TRUE)
+        elif tag == _T_TIMEDELTA:
+            row.append(datetime.timedelta(microseconds=_I64.unpack_from(buf, pos)[0]))
+            pos += 8
+        else:
+            (length,) = _U32.unpack_from(buf, pos)
+            pos += 4
+            text = str(buf[pos : pos + length], "utf-8", "surrogatepass")
+            pos += length
+            if tag == _T_STR:
+                row.append(text)
+            elif tag == _T_BIGINT:
+                row.append(int(text))
+            elif tag == _T_DATETIME:
+                row.append(datetime.datetime.fromisoformat(text))
+            elif tag == _T_DATE:
+                row.append(datetime.date.fromisoformat(text))
+            elif tag == _T_TIME:
+                row.append(datetime.time.fromisoformat(text))
+            else:
+                raise ValueError(f"Corrupt sheet file: unknown tag {tag}")
+    return row
+
+
+def write_sheet_file(out: BinaryIO, sheet: _RowSource) -> None:
+    """Serialise ``sheet`` to ``out`` (a fresh binary file) in the indexed format."""
+    total = len(sheet)
+    out.write(_HEADER.pack(_MAGIC, 0, 0))
+    offsets = array("Q")
+    position = _HEADER.size
+    buf = bytearray()
+    for start in range(0, total, _WRITE_CHUNK_ROWS):
+        for row in sheet.rows(start, start + _WRITE_CHUNK_ROWS):
+            offsets.append(position + len(buf))
+            buf += _U32.pack(len(row))
+            for value in row:
+                _encode_cell(buf, value)
+        out.write(buf)
+        position += len(buf)
+        buf.clear()
+    offsets.append(position)
+    out.write(offsets.tobytes())
+    out.seek(0)
+    out.write(_HEADER.pack(_MAGIC, total, position))
+
+
+class SpilledSheet:
+    """Read-only, memory-mapped view of one sheet file; rows decode on demand."""
+
+    __slots__ = ("_mm", "_view", "_offsets", "_row_count")
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as fh:
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, row_count, index_at = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            self._mm.close()
+            raise ValueError(f"Not a sheet file: {path}")
+        self._row_count = row_count
+        self._view = memoryview(self._mm)
+        self._offsets = self._view[index_at : index_at + 8 * (row_count + 1)].cast("Q")
+
+    def __len__(self) -> int:
+        return self._row_count
+
+    def rows(self, start: int = 0, stop: int | None = None) -> list[list[Any]]:
+        start, stop, _ = slice(start, stop).indices(self._row_count)
+        return [_decode_row(self._view, self._offsets[i]) for i in range(start, stop)]
+
+    def row(self, index: int) -> list[Any]:
+        found = self.rows(index, index + 1) if index >= 0 else []
+        if not found:
+            raise IndexError(index)
+        return found[0]
+
+    def close(self) -> None:
+        self._offsets.release()
+        self._view.release()
+        self._mm.close()
+
+
+class SpilledWorkbook(Mapping[str, SpilledSheet]):
+    """Sheets of one spilled token, opened the first time each is asked for."""
+
+    def __init__(self, directory: str, files: dict[str, str], sheet_totals: dict[str, int]) -> None:
+        self._directory = directory
+        self._files = files
+        self.sheet_totals = sheet_totals
+        self._open: dict[str, SpilledSheet] = {}
+
+    def __contains__(self, sheet: object) -> bool:
+        return sheet in self._files
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._files)
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def __getitem__(self, sheet: str) -> SpilledSheet:
+        opened = self._open.get(sheet)
+        if opened is None:
+            opened = self._open[sheet] = SpilledSheet(
+                os.path.join(self._directory, self._files[sheet])
+            )
+        return opened
+
+
+class SpillStore:
+    def __init__(
+        self,
+        directory: str,
+        *,
+        max_bytes: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._ttl = ttl_seconds
+        self._clock = clock
+        if self.enabled:
+            # Spilled sheets are user data and the entries are named by token.
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self._max_bytes > 0 and self._ttl > 0
+
+    def _token_dir(self, token: str) -> str | None:
+        if not _TOKEN_RE.match(token):
+            return None
+        return os.path.join(self._directory, token)
+
+    def save(self, token: str, sheets: dict[str, _RowSource], sheet_totals: dict[str, int]) -> None:
+        """Write every sheet of ``token`` to disk; blocking, run it in a thread."""
+        target = self._token_dir(token)
+        if not self.enabled or target is None:
+            return
+        staging = tempfile.mkdtemp(prefix=".tmp-", dir=self._directory)
+        try:
+            files: dict[str, str] = {}
+            for index, (name, sheet) in enumerate(sheets.items()):
+                files[name] = f"{index}.rows"
+                with open(os.path.join(staging, files[name]), "wb") as out:
+                    write_sheet_file(out, sheet)
+            with open(os.path.join(staging, _META), "w", encoding="utf-8") as meta:
+                json.dump({"files": files, "sheet_totals": sheet_totals}, meta)
+            try:
+                os.replace(staging, target)
+            except OSError:
+                # Already spilled (a retry, or another worker got there first).
+                shutil.rmtree(staging, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        self.cleanup()
+
+    def load(self, token: str) -> SpilledWorkbook | None:
+        directory = self._token_dir(token)
+        if not self.enabled or directory is None:
+            return None
+        meta_path = os.path.join(directory, _META)
+        try:
+            if self._clock() - os.stat(meta_path).st_mtime > self._ttl:
+                return None
+            with open(meta_path, encoding="utf-8") as fh:
+                meta = json.load(fh)
+            os.utime(meta_path)
+        except (FileNotFoundError, ValueError):
+            return None
+        return SpilledWorkbook(directory, meta["files"], meta["sheet_totals"])
+
+    def touch(self, token: str) -> None:
+        """Refresh the disk copy's TTL while another tier is serving the token."""
+        directory = self._token_dir(token)
+        if not self.enabled or directory is None:
+            return
+        try:
+            os.utime(os.path.join(directory, _META))
+        except FileNotFoundError:
+            pass
+
+    def cleanup(self) -> None:
+        """Drop expired tokens, then the least recently used until under the byte budget."""
+        now = self._clock()
+        live: list[tuple[float, int, str]] = []
+        total = 0
+        for name in os.listdir(self._directory):
+            path = os.path.join(self._directory, name)
+            try:
+                if name.startswith(".tmp-"):
+                    # A writer that died mid-save; live staging dirs are seconds old.
+                    if now - os.stat(path).st_mtime > self._ttl:
+                        shutil.rmtree(path, ignore_errors=True)
+                    continue
+                last_used = os.stat(os.path.join(path, _META)).st_mtime
+                size = sum(entry.stat().st_size for entry in os.scandir(path))
+            except FileNotFoundError:
+                continue
+            if now - last_used > self._ttl:
+                shutil.rmtree(path, ignore_errors=True)
+                continue
+            live.append((last_used, size, path))
+            total += size
+        live.sort()
+        for _, size, path in live:
+            if total <= self._max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+
+_spill: SpillStore | None = None
+
+
+def get_spill_store(ttl_seconds: float) -> SpillStore:
+    """Return the process-wide spill store, creating it from settings on first use."""
+
+    global _spill
+    if _spill is None:
+        settings = get_settings()
+        directory = settings.inspect_spill_dir or os.path.join(
+            tempfile.gettempdir(), "xlsxworld-inspect"
+        )
+        _spill = SpillStore(
+            directory,
+            max_bytes=settings.inspect_spill_max_bytes,
+            ttl_seconds=ttl_seconds,
+        )
+    return _spill
+
+
+__all__ = ["SpillStore", "SpilledSheet", "SpilledWorkbook", "get_spill_store", "write_sheet_file"]
@@ -1,83 +1,262 @@
 from __future__ import annotations
 
 import asyncio
-import sys
+import logging
 import time
-from typing import Any, Dict, List, Tuple
+from collections import OrderedDict
+from typing import Callable, Dict, Mapping, Protocol, Sequence
 
 from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
 
-_WorkbookEntry = Tuple[float, Dict[str, List[List[Any]]], Dict[str, int], int]
+from app.core.security import AuthenticatedPrincipal
+from app.tools._common import run_tool_work
+from app.tools.inspect._columnar import ColumnarSheet
+from app.tools.inspect._indexing import IndexingSheet
+from app.tools.inspect._query import SheetIndex, SheetQuery
+from app.tools.inspect._spill import get_spill_store
+
+logger = logging.getLogger(__name__)
 
-_WORKBOOK_STORE: Dict[str, _WorkbookEntry] = {}
 _MAX_STORE = 32
 _MAX_TOTAL_BYTES = 512 * 1024 * 1024  # 512 MB total budget
 _TTL_SECONDS = 60 * 15  # 15 minutes
-_lock = asyncio.Lock()
+# How often a token served from memory refreshes the TTL of its disk copy.
+_SPILL_TOUCH_SECONDS = 60
+
+
+class StoredSheet(Protocol):
+    """What ``page_sheet`` needs from a sheet: in memory or memory-mapped."""
+
+    def __len__(self) -> int: ...
+
+    def rows(self, start: int = 0, stop: int | None = None) -> list[list]: ...
+
+    def row(self, index: int) -> list: ...
+
+
+class _Entry:
+    __slots__ = ("sheets", "sheet_totals", "size", "last_used", "spill_touched", "indexes", "index_bytes")
+
+    def __init__(
+        self,
+        sheets: Mapping[str, StoredSheet],
+        sheet_totals: Dict[str, int],
+        size: int,
+        last_used: float,
+    ) -> None:
+        self.sheets = sheets
+        self.sheet_totals = sheet_totals
+        self.size = size
+        self.last_used = last_used
+        self.spill_touched = last_used
+        # Query indexes (see ``_query``), built lazily per sheet.
+        self.indexes: Dict[str, SheetIndex] = {}
+        self.index_bytes = 0
+
+
+class _WorkbookStore:
+    """Token -> parsed workbook, LRU with a sliding TTL and a byte budget.
+
+    Entries are ordered least recently used first. Every access refreshes
+    the TTL, so that is also the order in which they expire: expiry and
+    eviction only ever look at the head, and the byte total is kept as a
+    running sum. Everything here runs on the event loop and never awaits,
+    so reads need no lock; writers serialise on ``lock``.
+
+    Tokens that are not in memory are looked up in the disk tier
+    (:mod:`._spill`) and promoted back as memory-mapped sheets.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int,
+        max_bytes: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self.total_bytes = 0
+        self.lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _drop(self, token: str) -> None:
+        self.total_bytes -= self._entries.pop(token).size
 
+    def _expire(self, now: float) -> None:
+        while self._entries:
+            token, entry = next(iter(self._entries.items()))
+            if now - entry.last_used <= self.ttl_seconds:
+                break
+            self._drop(token)
 
-def _estimate_size(workbook_data: dict[str, list[list[Any]]]) -> int:
-    total = 0
-    for rows in workbook_data.values():
-        for row in rows:
-            for cell in row:
-                total += sys.getsizeof(cell)
-    return total
+    def put(
+        self,
+        token: str,
+        sheets: Mapping[str, StoredSheet],
+        sheet_totals: Dict[str, int],
+        *,
+        size: int,
+    ) -> None:
+        now = self._clock()
+        self._expire(now)
+        if token in self._entries:
+            self._drop(token)
+        while self._entries and (
+            len(self._entries) >= self.max_entries
+            or self.total_bytes + size > self.max_bytes
+        ):
+            self._drop(next(iter(self._entries)))
+        self._entries[token] = _Entry(sheets, sheet_totals, size, now)
+        self.total_bytes += size
 
+    def update(self, token: str, sheet_totals: Dict[str, int], *, size: int) -> None:
+        """Replace totals and size of a live entry without touching its recency."""
+        entry = self._entries.get(token)
+        if entry is None:
+            return
+        entry.sheet_totals = sheet_totals
+        self.resize(token, size - entry.size)
 
-def _current_total_bytes() -> int:
-    return sum(entry[3] for entry in _WORKBOOK_STORE.values())
+    def resize(self, token: str, delta: int) -> None:
+        """Grow a live entry by ``delta`` bytes, evicting older entries to stay in budget."""
+        entry = self._entries.get(token)
+        if entry is None:
+            return
+        entry.size += delta
+        self.total_bytes += delta
+        while len(self._entries) > 1 and self.total_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            if oldest == token:
+                break
+            self._drop(oldest)
 
+    def get(self, token: str) -> _Entry | None:
+        """The live entry for ``token``, refreshing its TTL; ``None`` if unknown or expired."""
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        now = self._clock()
+        if now - entry.last_used > self.ttl_seconds:
+            self._drop(token)
+            return None
+        entry.last_used = now
+        self._entries.move_to_end(token)
+        return entry
 
-def _evict_expired() -> None:
-    now = time.time()
-    expired = [k for k, (ts, *_) in _WORKBOOK_STORE.items() if now - ts > _TTL_SECONDS]
-    for k in expired:
-        _WORKBOOK_STORE.pop(k, None)
 
+_WORKBOOK_STORE = _WorkbookStore(
+    max_entries=_MAX_STORE,
+    max_bytes=_MAX_TOTAL_BYTES,
+    ttl_seconds=_TTL_SECONDS,
+)
 
-def _evict_oldest(count: int) -> None:
-    oldest = sorted(_WORKBOOK_STORE.items(), key=lambda kv: kv[1][0])[:count]
-    for k, _ in oldest:
-        _WORKBOOK_STORE.pop(k, None)
+
+async def _spill(
+    token: str,
+    sheets: Mapping[str, StoredSheet],
+    sheet_totals: dict[str, int],
+) -> None:
+    # A full or broken disk only costs the fallback, not the preview.
+    try:
+        await run_in_threadpool(get_spill_store(_TTL_SECONDS).save, token, sheets, sheet_totals)
+    except OSError:
+        logger.warning("Could not spill inspect token to disk", exc_info=True)
 
 
 async def store_workbook(
     token: str,
-    workbook_data: dict[str, list[list[Any]]],
+    sheets: Mapping[str, ColumnarSheet | IndexingSheet],
+    sheet_totals: dict[str, int],
+    *,
+    complete: bool = True,
+) -> None:
+    """Keep ``sheets`` for paging under ``token``.
+
+    Complete workbooks are also written to the disk tier before this
+    returns, so the first page can land on any worker. Workbooks still being
+    indexed (``complete=False``) take no byte budget until
+    :func:`finish_workbook` is called for them.
+    """
+    size = sum(sheet.nbytes for sheet in sheets.values()) if complete else 0
+    async with _WORKBOOK_STORE.lock:
+        _WORKBOOK_STORE.put(token, sheets, sheet_totals, size=size)
+    if complete:
+        await _spill(token, sheets, sheet_totals)
+
+
+async def finish_workbook(
+    token: str,
+    sheets: Mapping[str, IndexingSheet],
     sheet_totals: dict[str, int],
 ) -> None:
-    entry_size = _estimate_size(workbook_data)
+    """Record the exact totals and size of a background-indexed workbook and spill it."""
+    async with _WORKBOOK_STORE.lock:
+        _WORKBOOK_STORE.update(
+            token, sheet_totals, size=sum(sheet.nbytes for sheet in sheets.values())
+        )
+    await _spill(token, sheets, sheet_totals)
 
-    async with _lock:
-        _evict_expired()
 
-        while (
-            len(_WORKBOOK_STORE) >= _MAX_STORE
-            or _current_total_bytes() + entry_size > _MAX_TOTAL_BYTES
-        ) and _WORKBOOK_STORE:
-            _evict_oldest(1)
+def _lookup(token: str) -> _Entry | None:
+    entry = _WORKBOOK_STORE.get(token)
+    spill = get_spill_store(_TTL_SECONDS)
+    if entry is not None:
+        if entry.last_used - entry.spill_touched > _SPILL_TOUCH_SECONDS:
+            entry.spill_touched = entry.last_used
+            spill.touch(token)
+        return entry
 
-        _WORKBOOK_STORE[token] = (time.time(), workbook_data, sheet_totals, entry_size)
+    spilled = spill.load(token)
+    if spilled is None:
+        return None
+    # Memory-mapped sheets live in the page cache, not on the heap, so the
+    # promoted entry only takes a slot, not byte budget.
+    _WORKBOOK_STORE.put(token, spilled, spilled.sheet_totals, size=0)
+    return _WORKBOOK_STORE.get(token)
 
 
-async def load_workbook(token: str) -> dict[str, list[list[Any]]]:
-    async with _lock:
-        meta = _WORKBOOK_STORE.get(token)
-        if not meta:
-            raise HTTPException(status_code=404, detail="Unknown or expired token")
-        ts, workbook_data, sheet_totals, entry_size = meta
-        if time.time() - ts > _TTL_SECONDS:
-            _WORKBOOK_STORE.pop(token, None)
-            raise HTTPException(status_code=404, detail="Token expired")
-        _WORKBOOK_STORE[token] = (time.time(), workbook_data, sheet_totals, entry_size)
-        return workbook_data
+async def load_workbook(token: str) -> Mapping[str, StoredSheet]:
+    entry = _lookup(token)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired token")
+    return entry.sheets
 
 
 async def get_sheet_total_rows(token: str, sheet: str) -> int | None:
-    async with _lock:
-        meta = _WORKBOOK_STORE.get(token)
-        if not meta:
-            return None
-        _, _, sheet_totals, _ = meta
-        return sheet_totals.get(sheet)
+    entry = _lookup(token)
+    if entry is None:
+        return None
+    return entry.sheet_totals.get(sheet)
+
+
+async def query_sheet(
+    token: str, sheet: str, query: SheetQuery, principal: AuthenticatedPrincipal | None
+) -> Sequence[int]:
+    """Data row indexes of ``sheet`` matching ``query``, in order.
+
+    The sheet must be fully indexed. Queries run on the tool executor under
+    ``principal``'s tier. Column indexes are built on first use, kept with
+    the token and counted against the byte budget, so repeat queries skip
+    the scan.
+    """
+    entry = _lookup(token)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired token")
+    index = entry.indexes.get(sheet)
+    if index is None:
+        index = entry.indexes[sheet] = SheetIndex(entry.sheets[sheet])
+    result = await run_tool_work(principal, index.run, query)
+    index_bytes = sum(built.nbytes for built in entry.indexes.values())
+    if index_bytes != entry.index_bytes:
+        async with _WORKBOOK_STORE.lock:
+            _WORKBOOK_STORE.resize(token, index_bytes - entry.index_bytes)
+            entry.index_bytes = index_bytes
+    return result
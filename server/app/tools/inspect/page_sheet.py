@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+import sys
 from typing import Any, List
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 
-from app.tools.inspect._store import load_workbook, get_sheet_total_rows
+from app.core.security import AuthenticatedPrincipal, get_current_user_optional
+from app.tools.inspect._indexing import wait_for_rows
+from app.tools.inspect._query import fetch_rows, parse_query
+from app.tools.inspect._store import load_workbook, get_sheet_total_rows, query_sheet
 
 router = APIRouter()
 
@@ -18,24 +22,43 @@ class SheetPage(BaseModel):
     limit: int
     total_rows: int
     done: bool
+    # Only set for filtered, sorted or searched pages.
+    matched_rows: int | None = None
+    row_indexes: List[int] | None = None
 
 
 @router.get(
     "/sheet",
     response_model=SheetPage,
     summary="Page Sheet",
-    description="Returns paginated rows for one sheet from a previously uploaded workbook token.",
+    description=(
+        "Returns paginated rows for one sheet from a previously uploaded workbook token. "
+        "Rows can be filtered (`filter=<column><op><value>`, op one of = != > >= < <= ~), "
+        "searched across all columns (`search`, optionally as a `regex` without backreferences, "
+        "lookarounds or quantified groups, with one variable-length quantifier at most, matched "
+        "against the first 1024 characters of each cell) and sorted "
+        "(`sort=<column>` or `sort=-<column>`); columns are named by their header."
+    ),
 )
 async def page_sheet(
     token: str = Query(..., description="Workbook token from preview"),
     sheet: str = Query(..., description="Sheet name"),
     offset: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=2000),
+    filter: list[str] = Query(default=None, description="Column filters, e.g. status=open or amount>=10"),
+    sort: list[str] = Query(default=None, description="Sort keys, e.g. amount or -amount"),
+    search: str | None = Query(None, description="Case-insensitive text to find in any column"),
+    regex: bool = Query(False, description="Treat search as a regular expression"),
+    principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
 ):
+    query = parse_query(filter, sort, search, regex)
     workbook_data = await load_workbook(token)
     if sheet not in workbook_data:
         raise HTTPException(status_code=404, detail="Sheet not found")
     rows = workbook_data[sheet]
+    # Sheets still being indexed after the preview: wait for this page's rows
+    # (for a query, for the whole sheet).
+    await wait_for_rows(rows, sys.maxsize if query is not None else 1 + offset + limit)
 
     sheet_total = await get_sheet_total_rows(token, sheet)
     total_rows = sheet_total if sheet_total is not None else 0
@@ -44,15 +67,29 @@ async def page_sheet(
     if not rows:
         return SheetPage(sheet=sheet, header=None, rows=[], offset=offset, limit=limit, total_rows=0, done=True)
 
-    header = [*rows[0]]
-    data_only_rows = rows[1:]
-    data_rows = [[*row] for row in data_only_rows[offset : offset + limit]]
+    header = rows.row(0)
+    if query is not None:
+        matched = await query_sheet(token, sheet, query, principal)
+        row_indexes = matched[offset : offset + limit]
+        return SheetPage(
+            sheet=sheet,
+            header=header,
+            rows=fetch_rows(rows, row_indexes),
+            offset=offset,
+            limit=limit,
+            total_rows=total_rows,
+            done=offset + len(row_indexes) >= len(matched),
+            matched_rows=len(matched),
+            row_indexes=list(row_indexes),
+        )
+
+    data_rows = rows.rows(1 + offset, 1 + offset + limit)
     fetched = len(data_rows)
 
     if known_data_rows is not None:
         done = offset + fetched >= known_data_rows
     else:
-        done = offset + fetched >= len(data_only_rows)
+        done = offset + fetched >= len(rows) - 1
         total_rows = len(rows)
 
     return SheetPage(
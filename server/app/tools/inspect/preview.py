@@ -1,18 +1,28 @@
 from __future__ import annotations
 
+import asyncio
+import logging
 import secrets
+from itertools import islice
 from typing import Any, Dict, List
 
-from fastapi import APIRouter, Depends, File, Query, UploadFile
+from fastapi import APIRouter, Depends, Query, UploadFile
 from pydantic import BaseModel
 
 from app.core.security import AuthenticatedPrincipal, get_current_user_optional
-from app.services.excel_reader import ensure_supported_excel_filename, parse_excel_bytes
-from app.tools._common import read_upload_for_principal
-from app.tools.inspect._store import store_workbook
+from app.services.excel_reader import ExcelSource, WorkbookReader, ensure_supported_excel_filename
+from app.tools._common import detach_upload, spool_upload_for_principal, run_tool_work
+from app.tools._uploads import file_or_token
+from app.tools.inspect._indexing import IndexingAbandoned, IndexingSheet
+from app.tools.inspect._store import finish_workbook, store_workbook
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Background indexing jobs, kept referenced until they finish.
+_indexing_tasks: set[asyncio.Task] = set()
+
 
 class SheetPreview(BaseModel):
     name: str
@@ -27,39 +37,143 @@ class WorkbookPreview(BaseModel):
     sheet_count: int
 
 
+def _resolve(loop: asyncio.AbstractEventLoop, future: asyncio.Future, value: Any) -> None:
+    def _set() -> None:
+        if not future.done():
+            future.set_result(value)
+
+    loop.call_soon_threadsafe(_set)
+
+
+def _preview_and_index(
+    source: ExcelSource,
+    filename: str | None,
+    sample_rows: int,
+    loop: asyncio.AbstractEventLoop,
+    heads_ready: asyncio.Future,
+) -> None:
+    """Read every sheet's head, hand it to the endpoint, then index the full sheets.
+
+    Totals come from the sheet's ``<dimension>`` when the format has one and
+    it covers more than the head; otherwise they are only known once the
+    sheet has been read to the end.
+    """
+    sheets: dict[str, IndexingSheet] = {}
+    try:
+        with WorkbookReader(source, filename) as reader:
+            # (name, header + sample rows, total or None until the sheet is read)
+            heads: list[tuple[str, list[list[Any]], int | None]] = []
+            for name in reader.sheet_names:
+                rows = reader.iter_rows(name)
+                head = list(islice(rows, 1 + sample_rows))
+                rows.close()
+                hint = reader.row_count_hint(name)
+                if len(head) <= sample_rows:
+                    total: int | None = len(head)
+                elif hint is not None and hint > len(head):
+                    total = hint
+                else:
+                    total = None
+                heads.append((name, head, total))
+                sheets[name] = IndexingSheet(loop)
+            _resolve(loop, heads_ready, (heads, sheets))
+
+            for name, sheet in sheets.items():
+                sheet.index_rows(reader.iter_rows(name))
+    except IndexingAbandoned:
+        return
+    except BaseException as exc:
+        for sheet in sheets.values():
+            sheet.fail(exc)
+        raise
+
+
+async def _index_in_background(
+    principal: AuthenticatedPrincipal | None,
+    source: ExcelSource,
+    filename: str | None,
+    sample_rows: int,
+    heads_ready: asyncio.Future,
+) -> None:
+    try:
+        await run_tool_work(
+            principal,
+            _preview_and_index,
+            source,
+            filename,
+            sample_rows,
+            asyncio.get_running_loop(),
+            heads_ready,
+        )
+    finally:
+        source.close()
+
+
+async def _finish_indexing(token: str, sheets: dict[str, IndexingSheet], job: asyncio.Task) -> None:
+    try:
+        await job
+    except Exception:
+        # The sheets carry the error; pages past the head report it.
+        logger.warning("Background indexing failed for inspect token", exc_info=True)
+        return
+    await finish_workbook(token, sheets, {name: len(sheet) for name, sheet in sheets.items()})
+
+
+def _keep(task: asyncio.Task) -> None:
+    _indexing_tasks.add(task)
+    task.add_done_callback(_indexing_tasks.discard)
+
+
 @router.post(
     "/preview",
     response_model=WorkbookPreview,
     summary="Preview Workbook",
-    description="Uploads an Excel workbook, stores it temporarily, and returns sheet headers plus sample rows.",
+    description=(
+        "Uploads an Excel workbook, stores it temporarily, and returns sheet headers plus sample rows. "
+        "The rest of the workbook is indexed in the background; pages wait for rows not read yet."
+    ),
 )
 async def preview_workbook(
-    file: UploadFile = File(..., description="Excel file to inspect"),
+    file: UploadFile = Depends(file_or_token("Excel file to inspect")),
     sample_rows: int = Query(25, ge=1, le=500),
     principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
 ):
     ensure_supported_excel_filename(file.filename)
-    raw = await read_upload_for_principal(file, principal=principal)
+    source = detach_upload(file, await spool_upload_for_principal(file, principal=principal))
 
-    workbook_data = parse_excel_bytes(raw, file.filename)
+    heads_ready: asyncio.Future = asyncio.get_running_loop().create_future()
+    job = asyncio.ensure_future(
+        _index_in_background(principal, source, file.filename, sample_rows, heads_ready)
+    )
+    await asyncio.wait({heads_ready, job}, return_when=asyncio.FIRST_COMPLETED)
+    if not heads_ready.done():
+        job.result()
+    heads, workbook = heads_ready.result()
+
+    if any(total is None for _, _, total in heads):
+        # No usable dimension: the totals need the full read anyway.
+        await job
+    if job.done():
+        job.result()
     token = secrets.token_urlsafe(16)
 
     sheet_totals: Dict[str, int] = {}
     sheets: List[SheetPreview] = []
-
-    for sheet_name, rows in workbook_data.items():
-        header_list = [*rows[0]] if rows else []
-        data_rows = [[*row] for row in rows[1 : 1 + sample_rows]] if len(rows) > 1 else []
-        sheet_total = len(rows)
+    for sheet_name, head, total in heads:
+        sheet_total = len(workbook[sheet_name]) if job.done() else total
         sheet_totals[sheet_name] = sheet_total
         sheets.append(
             SheetPreview(
                 name=sheet_name,
-                headers=[*header_list],
-                sample=data_rows,
+                headers=[*head[0]] if head else [],
+                sample=head[1:],
                 total_rows=sheet_total,
             )
         )
 
-    await store_workbook(token, workbook_data, sheet_totals)
+    if job.done():
+        await store_workbook(token, workbook, sheet_totals)
+    else:
+        await store_workbook(token, workbook, sheet_totals, complete=False)
+        _keep(asyncio.ensure_future(_finish_indexing(token, workbook, job)))
     return WorkbookPreview(token=token, sheets=sheets, sheet_count=len(sheets))
@@ -1,20 +1,20 @@
 from __future__ import annotations
 
 import time
-from io import BytesIO
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, UploadFile
-from openpyxl import Workbook
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, UploadFile
 
 from app.core.security import AuthenticatedPrincipal
-from app.services.excel_reader import parse_excel_bytes
+from app.services.excel_reader import ExcelSource, WorkbookReader
+from app.services.excel_writer import WorkbookWriter
 from app.services.jobs_service import JobsService
 from app.tools._common import (
     _INVALID_SHEET_CHARS,
     check_excel_file,
     has_visual_elements,
-    read_upload_for_principal,
+    run_tool_work,
     safe_sheet_title,
+    spool_upload_for_principal,
     unique_sheet_title,
 )
 from app.tools._recording import (
@@ -22,12 +22,41 @@ from app.tools._recording import (
     jobs_service_dep,
     record_and_respond,
 )
+from app.tools._uploads import TokenResolver, file_token_resolver
 
 router = APIRouter()
 
 _XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
 
+def _append_workbooks(uploads: list[tuple[str | None, ExcelSource]]) -> bytes:
+    with WorkbookWriter() as writer:
+        used_titles: set[str] = set()
+        copied_sheets = 0
+
+        for file_index, (original_name, source) in enumerate(uploads, start=1):
+            filename = original_name or f"workbook_{file_index}.xlsx"
+            source_name = filename.rsplit(".", 1)[0] or f"workbook_{file_index}"
+            source_name = _INVALID_SHEET_CHARS.sub("_", source_name)
+
+            with WorkbookReader(source, original_name) as reader:
+                for sheet_name in reader.sheet_names:
+                    preferred_title = safe_sheet_title(sheet_name, f"sheet_{copied_sheets + 1}")
+                    requested_title = safe_sheet_title(
+                        f"{source_name}_{preferred_title}",
+                        preferred_title,
+                    )
+                    target_title = unique_sheet_title(requested_title, used_titles)
+                    writer.write_sheet(target_title, reader.iter_rows(sheet_name), blank_none=True)
+
+                    copied_sheets += 1
+
+        if copied_sheets == 0:
+            raise HTTPException(status_code=400, detail="No data found in uploaded workbooks")
+
+        return writer.to_bytes()
+
+
 @router.post(
     "/append-workbooks",
     summary="Append Workbooks",
@@ -35,50 +64,27 @@ _XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 )
 async def append_workbooks(
     background_tasks: BackgroundTasks,
-    files: list[UploadFile] = File(..., description="Excel files to append"),
+    files: list[UploadFile] = File([], description="Excel files to append"),
+    file_tokens: list[str] = Form([], description="File tokens to append after the uploaded files"),
+    resolve: TokenResolver = Depends(file_token_resolver),
     principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
     jobs_service: JobsService = Depends(jobs_service_dep),
 ):
     started = time.perf_counter()
+    files = [*files, *(resolve(token) for token in file_tokens if token.strip())]
     if len(files) < 2:
         raise HTTPException(status_code=400, detail="At least two workbook files are required")
 
-    out_wb = Workbook()
-    out_wb.remove(out_wb.active)
-    used_titles: set[str] = set()
-    copied_sheets = 0
+    uploads: list[tuple[str | None, ExcelSource]] = []
     any_visuals = False
-
-    for file_index, file in enumerate(files, start=1):
-        filename = file.filename or f"workbook_{file_index}.xlsx"
-        source_name = filename.rsplit(".", 1)[0] or f"workbook_{file_index}"
-        source_name = _INVALID_SHEET_CHARS.sub("_", source_name)
-
+    for file in files:
         check_excel_file(file)
-        raw = await read_upload_for_principal(file, principal=principal)
+        source = await spool_upload_for_principal(file, principal=principal)
         if not any_visuals:
-            any_visuals = has_visual_elements(raw)
-
-        workbook_data = parse_excel_bytes(raw, file.filename)
-        for sheet_name, rows in workbook_data.items():
-            preferred_title = safe_sheet_title(sheet_name, f"sheet_{copied_sheets + 1}")
-            requested_title = safe_sheet_title(
-                f"{source_name}_{preferred_title}",
-                preferred_title,
-            )
-            target_title = unique_sheet_title(requested_title, used_titles)
-            out_ws = out_wb.create_sheet(target_title)
-
-            for row in rows:
-                out_ws.append(["" if v is None else v for v in row])
-
-            copied_sheets += 1
-
-    if copied_sheets == 0:
-        raise HTTPException(status_code=400, detail="No data found in uploaded workbooks")
+            any_visuals = has_visual_elements(source)
+        uploads.append((file.filename, source))
 
-    output = BytesIO()
-    out_wb.save(output)
+    output_bytes = await run_tool_work(principal, _append_workbooks, uploads)
 
     return await record_and_respond(
         principal=principal,
@@ -87,7 +93,7 @@ async def append_workbooks(
         tool_slug="append-workbooks",
         tool_name="Append Workbooks",
         original_filename=files[0].filename,
-        output_bytes=output.getvalue(),
+        output_bytes=output_bytes,
         output_filename="appended.xlsx",
         mime_type=_XLSX_MIME,
         success=True,
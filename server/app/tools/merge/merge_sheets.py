@@ -1,26 +1,98 @@
 from __future__ import annotations
 
 import time
-from io import BytesIO
+from itertools import islice
+from typing import Any, Iterator
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, UploadFile
-from openpyxl import Workbook
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException, UploadFile
 
 from app.core.security import AuthenticatedPrincipal
-from app.services.excel_reader import parse_excel_bytes
+from app.services.excel_reader import ExcelSource, WorkbookReader
+from app.services.excel_writer import WorkbookWriter
 from app.services.jobs_service import JobsService
-from app.tools._common import check_excel_file, has_visual_elements, read_upload_for_principal
+from app.tools._common import (
+    check_excel_file,
+    has_visual_elements,
+    run_tool_work,
+    spool_upload_for_principal,
+)
 from app.tools._recording import (
     get_current_user_optional,
     jobs_service_dep,
     record_and_respond,
 )
+from app.tools._uploads import file_or_token
 
 router = APIRouter()
 
 _XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
 
+def _merge_sheets(
+    source: ExcelSource,
+    filename: str | None,
+    sheet_names: str,
+    output_sheet: str,
+) -> bytes:
+    with WorkbookReader(source, filename) as reader:
+        sheet_order = reader.sheet_names
+
+        selected = [s.strip() for s in sheet_names.split(",") if s.strip()]
+        if not selected:
+            selected = sheet_order
+
+        for s in selected:
+            if s not in sheet_order:
+                raise HTTPException(status_code=400, detail=f"Sheet not found: {s}")
+
+        # Build the union of headers across selected sheets so columns line up
+        # even when different sheets present different column orders or names.
+        merged_headers: list[str] = []
+        seen_headers: set[str] = set()
+        sheet_headers: dict[str, list[str]] = {}
+        for sheet_name in selected:
+            rows = reader.iter_rows(sheet_name)
+            first_row = next(rows, None)
+            rows.close()
+            if first_row is None:
+                sheet_headers[sheet_name] = []
+                continue
+            header_row = ["" if v is None else str(v) for v in first_row]
+            sheet_headers[sheet_name] = header_row
+            for column in header_row:
+                if column and column not in seen_headers:
+                    seen_headers.add(column)
+                    merged_headers.append(column)
+
+        def merged_rows() -> Iterator[list[Any]]:
+            if merged_headers:
+                yield merged_headers
+
+            for sheet_name in selected:
+                headers = sheet_headers.get(sheet_name, [])
+                # Map each merged-column to the index in this sheet's row, or None.
+                column_index_map: list[int | None] = []
+                for column in merged_headers:
+                    if column in headers:
+                        column_index_map.append(headers.index(column))
+                    else:
+                        column_index_map.append(None)
+
+                for row in islice(reader.iter_rows(sheet_name), 1, None):
+                    mapped_row = []
+                    for source_index in column_index_map:
+                        if source_index is None or source_index >= len(row):
+                            mapped_row.append("")
+                        else:
+                            value = row[source_index]
+                            mapped_row.append("" if value is None else value)
+                    yield mapped_row
+
+        with WorkbookWriter() as writer:
+            writer.write_sheet(output_sheet[:31] if output_sheet else "Merged", merged_rows())
+            return writer.to_bytes()
+
+
 @router.post(
     "/merge-sheets",
     summary="Merge Sheets",
@@ -28,7 +100,7 @@ _XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 )
 async def merge_sheets(
     background_tasks: BackgroundTasks,
-    file: UploadFile = File(..., description="Excel file"),
+    file: UploadFile = Depends(file_or_token("Excel file")),
     sheet_names: str = Form("", description="Comma-separated sheet names to merge (empty=all)"),
     output_sheet: str = Form("Merged", description="Output sheet name"),
     principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
@@ -36,69 +108,13 @@ async def merge_sheets(
 ):
     started = time.perf_counter()
     check_excel_file(file)
-    raw = await read_upload_for_principal(file, principal=principal)
-
-    workbook_data = parse_excel_bytes(raw, file.filename)
-    has_visuals = has_visual_elements(raw)
-    sheet_order = list(workbook_data.keys())
-
-    selected = [s.strip() for s in sheet_names.split(",") if s.strip()]
-    if not selected:
-        selected = sheet_order
-
-    for s in selected:
-        if s not in workbook_data:
-            raise HTTPException(status_code=400, detail=f"Sheet not found: {s}")
-
-    out_wb = Workbook()
-    out_ws = out_wb.active
-    out_ws.title = output_sheet[:31] if output_sheet else "Merged"
-
-    # Build the union of headers across selected sheets so columns line up
-    # even when different sheets present different column orders or names.
-    merged_headers: list[str] = []
-    seen_headers: set[str] = set()
-    sheet_headers: dict[str, list[str]] = {}
-    for sheet_name in selected:
-        rows = workbook_data[sheet_name]
-        if not rows:
-            sheet_headers[sheet_name] = []
-            continue
-        header_row = ["" if v is None else str(v) for v in rows[0]]
-        sheet_headers[sheet_name] = header_row
-        for column in header_row:
-            if column and column not in seen_headers:
-                seen_headers.add(column)
-                merged_headers.append(column)
-
-    if merged_headers:
-        out_ws.append(merged_headers)
-
-    for sheet_name in selected:
-        rows = workbook_data[sheet_name]
-        if len(rows) <= 1:
-            continue
-        headers = sheet_headers.get(sheet_name, [])
-        # Map each merged-column to the index in this sheet's row, or None.
-        column_index_map: list[int | None] = []
-        for column in merged_headers:
-            if column in headers:
-                column_index_map.append(headers.index(column))
-            else:
-                column_index_map.append(None)
-
-        for row in rows[1:]:
-            mapped_row = []
-            for source_index in column_index_map:
-                if source_index is None or source_index >= len(row):
-                    mapped_row.append("")
-                else:
-                    value = row[source_index]
-                    mapped_row.append("" if value is None else value)
-            out_ws.append(mapped_row)
-
-    output = BytesIO()
-    out_wb.save(output)
+    source = await spool_upload_for_principal(file, principal=principal)
+
+    has_visuals = has_visual_elements(source)
+
+    output_bytes = await run_tool_work(
+        principal, _merge_sheets, source, file.filename, sheet_names, output_sheet,
+    )
 
     return await record_and_respond(
         principal=principal,
@@ -107,7 +123,7 @@ async def merge_sheets(
         tool_slug="merge-sheets",
         tool_name="Merge Sheets",
         original_filename=file.filename,
-        output_bytes=output.getvalue(),
+        output_bytes=output_bytes,
         output_filename="merged.xlsx",
         mime_type=_XLSX_MIME,
         success=True,
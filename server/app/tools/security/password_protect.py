@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 import time
+from copy import copy
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException, UploadFile
 from openpyxl.worksheet.protection import SheetProtection
 
 from app.core.security import AuthenticatedPrincipal
@@ -11,19 +12,72 @@ from app.services.excel_editor import (
     save_workbook_to_bytes,
     supports_inplace_edit,
 )
+from app.services.excel_reader import ExcelSource
+from app.services.ooxml_patch import SetSheetProtection, lock_structure, patch_workbook
 from app.services.jobs_service import JobsService
-from app.tools._common import check_excel_file, has_visual_elements, read_upload_for_principal, normalize_sheet_selection
+from app.tools._common import (
+    check_excel_file,
+    has_visual_elements,
+    normalize_sheet_selection,
+    run_tool_work,
+    spool_upload_for_principal,
+)
 from app.tools._recording import (
     get_current_user_optional,
     jobs_service_dep,
     record_and_respond,
 )
+from app.tools._uploads import file_or_token
 
 router = APIRouter()
 
 _XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
 
+def _protect_workbook(
+    source: ExcelSource,
+    filename: str | None,
+    *,
+    password: str,
+    sheets: str,
+    protect_structure: bool,
+    protect_content: bool,
+    protect_formatting: bool,
+) -> tuple[bytes, bool]:
+    selected = normalize_sheet_selection([sheets]) if sheets.strip() else None
+    protection = SheetProtection(
+        sheet=protect_content,
+        formatCells=not protect_formatting,
+        formatColumns=not protect_formatting,
+        formatRows=not protect_formatting,
+        password=password,
+    )
+
+    patched = patch_workbook(
+        source,
+        sheet_patch=SetSheetProtection(protection),
+        sheets=selected or None,
+        workbook_patch=lock_structure(True) if protect_structure else None,
+    )
+    if patched is not None:
+        return patched, False
+
+    loaded = load_workbook_for_edit(source, filename)
+    wb = loaded.workbook
+
+    target_names = selected if selected else [ws.title for ws in wb.worksheets]
+
+    for ws in wb.worksheets:
+        if ws.title not in target_names:
+            continue
+        ws.protection = copy(protection)
+
+    if protect_structure:
+        wb.security.lockStructure = True
+
+    return save_workbook_to_bytes(wb), loaded.visual_elements_lost or has_visual_elements(source)
+
+
 @router.post(
     "/password-protect",
     summary="Password Protect",
@@ -31,7 +85,7 @@ _XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 )
 async def password_protect(
     background_tasks: BackgroundTasks,
-    file: UploadFile = File(..., description="Excel file"),
+    file: UploadFile = Depends(file_or_token("Excel file")),
     password: str = Form(..., description="Protection password", min_length=1),
     sheets: str = Form("", description="Comma-separated sheet names (empty=all sheets)"),
     protect_structure: bool = Form(True, description="Protect sheet structure"),
@@ -42,7 +96,7 @@ async def password_protect(
 ):
     started = time.perf_counter()
     check_excel_file(file)
-    raw = await read_upload_for_principal(file, principal=principal)
+    source = await spool_upload_for_principal(file, principal=principal)
 
     if not supports_inplace_edit(file.filename):
         raise HTTPException(
@@ -50,27 +104,17 @@ async def password_protect(
             detail="Password protect requires an .xlsx or .xlsm file.",
         )
 
-    loaded = load_workbook_for_edit(raw, file.filename)
-    wb = loaded.workbook
-
-    selected = normalize_sheet_selection([sheets]) if sheets.strip() else None
-    target_names = selected if selected else [ws.title for ws in wb.worksheets]
-
-    for ws in wb.worksheets:
-        if ws.title not in target_names:
-            continue
-        ws.protection = SheetProtection(
-            sheet=protect_content,
-            formatCells=not protect_formatting,
-            formatColumns=not protect_formatting,
-            formatRows=not protect_formatting,
-            password=password,
-        )
-
-    if protect_structure:
-        wb.security.lockStructure = True
-
-    output_bytes = save_workbook_to_bytes(wb)
+    output_bytes, visual_lost = await run_tool_work(
+        principal,
+        _protect_workbook,
+        source,
+        file.filename,
+        password=password,
+        sheets=sheets,
+        protect_structure=protect_structure,
+        protect_content=protect_content,
+        protect_formatting=protect_formatting,
+    )
 
     return await record_and_respond(
         principal=principal,
@@ -85,5 +129,5 @@ async def password_protect(
         success=True,
         error_type=None,
         duration_ms=int((time.perf_counter() - started) * 1000),
-        visual_elements_removed=loaded.visual_elements_lost or has_visual_elements(raw),
+        visual_elements_removed=visual_lost,
     )
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import time
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile
 from openpyxl.worksheet.protection import SheetProtection
 
 from app.core.security import AuthenticatedPrincipal
@@ -11,42 +11,38 @@ from app.services.excel_editor import (
     save_workbook_to_bytes,
     supports_inplace_edit,
 )
+from app.services.excel_reader import ExcelSource
+from app.services.ooxml_patch import SetSheetProtection, lock_structure, patch_workbook
 from app.services.jobs_service import JobsService
-from app.tools._common import check_excel_file, has_visual_elements, read_upload_for_principal
+from app.tools._common import (
+    check_excel_file,
+    has_visual_elements,
+    run_tool_work,
+    spool_upload_for_principal,
+)
 from app.tools._recording import (
     get_current_user_optional,
     jobs_service_dep,
     record_and_respond,
 )
+from app.tools._uploads import file_or_token
 
 router = APIRouter()
 
 _XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
 
-@router.post(
-    "/remove-password",
-    summary="Remove Password",
-    description="Removes sheet-level protection from all sheets.",
-)
-async def remove_password(
-    background_tasks: BackgroundTasks,
-    file: UploadFile = File(..., description="Excel file"),
-    principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
-    jobs_service: JobsService = Depends(jobs_service_dep),
-):
-    started = time.perf_counter()
-    check_excel_file(file)
-    raw = await read_upload_for_principal(file, principal=principal)
-
-    if not supports_inplace_edit(file.filename):
-        raise HTTPException(
-            status_code=400,
-            detail="Remove password requires an .xlsx or .xlsm file.",
-        )
+def _unprotect_workbook(source: ExcelSource, filename: str | None) -> tuple[bytes, bool]:
+    patched = patch_workbook(
+        source,
+        sheet_patch=SetSheetProtection(SheetProtection()),
+        workbook_patch=lock_structure(False),
+    )
+    if patched is not None:
+        return patched, False
 
     try:
-        loaded = load_workbook_for_edit(raw, file.filename)
+        loaded = load_workbook_for_edit(source, filename)
     except HTTPException as exc:
         if exc.status_code == 400:
             raise HTTPException(
@@ -68,7 +64,33 @@ async def remove_password(
 
     wb.security.lockStructure = False
 
-    output_bytes = save_workbook_to_bytes(wb)
+    return save_workbook_to_bytes(wb), loaded.visual_elements_lost or has_visual_elements(source)
+
+
+@router.post(
+    "/remove-password",
+    summary="Remove Password",
+    description="Removes sheet-level protection from all sheets.",
+)
+async def remove_password(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = Depends(file_or_token("Excel file")),
+    principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
+    jobs_service: JobsService = Depends(jobs_service_dep),
+):
+    started = time.perf_counter()
+    check_excel_file(file)
+    source = await spool_upload_for_principal(file, principal=principal)
+
+    if not supports_inplace_edit(file.filename):
+        raise HTTPException(
+            status_code=400,
+            detail="Remove password requires an .xlsx or .xlsm file.",
+        )
+
+    output_bytes, visual_lost = await run_tool_work(
+        principal, _unprotect_workbook, source, file.filename,
+    )
 
     return await record_and_respond(
         principal=principal,
@@ -83,5 +105,5 @@ async def remove_password(
         success=True,
         error_type=None,
         duration_ms=int((time.perf_counter() - started) * 1000),
-        visual_elements_removed=loaded.visual_elements_lost or has_visual_elements(raw),
+        visual_elements_removed=visual_lost,
     )
@@ -2,20 +2,28 @@ from __future__ import annotations
 
 import re
 import time
-from io import BytesIO
+from itertools import chain, islice
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, UploadFile
-from openpyxl import Workbook
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException, UploadFile
 
 from app.core.security import AuthenticatedPrincipal
-from app.services.excel_reader import parse_excel_bytes
+from app.services.excel_reader import ExcelSource, WorkbookReader
+from app.services.excel_writer import WorkbookWriter
 from app.services.jobs_service import JobsService
-from app.tools._common import check_excel_file, has_visual_elements, read_upload_for_principal, safe_sheet_title, unique_sheet_title
+from app.tools._common import (
+    check_excel_file,
+    has_visual_elements,
+    run_tool_work,
+    safe_sheet_title,
+    spool_upload_for_principal,
+    unique_sheet_title,
+)
 from app.tools._recording import (
     get_current_user_optional,
     jobs_service_dep,
     record_and_respond,
 )
+from app.tools._uploads import file_or_token
 
 router = APIRouter()
 
@@ -75,6 +83,62 @@ _VALID_STYLES = {
 }
 
 
+def _split_sheet(
+    source: ExcelSource,
+    filename: str | None,
+    sheet: str,
+    *,
+    chunk_size: int,
+    part_base: str,
+    part_separator: str,
+    numbering_style: str,
+    custom_sequence: str,
+) -> bytes:
+    with WorkbookReader(source, filename) as reader:
+        if sheet not in reader.sheet_names:
+            raise HTTPException(status_code=404, detail="Sheet not found")
+        rows = reader.iter_rows(sheet)
+        header = next(rows, None)
+        if header is None:
+            raise HTTPException(status_code=400, detail="Sheet is empty")
+
+        if numbering_style not in _VALID_STYLES:
+            raise HTTPException(status_code=400, detail="Invalid numbering_style")
+
+        if len(part_separator) > 4:
+            raise HTTPException(status_code=400, detail="part_separator must be 4 characters or fewer")
+
+        custom_tokens = [
+            token.strip()
+            for token in re.split(r"[\r\n,]+", custom_sequence)
+            if token.strip()
+        ]
+        if numbering_style == "custom" and not custom_tokens:
+            raise HTTPException(status_code=400, detail="custom_sequence is required when numbering_style is custom")
+
+        with WorkbookWriter() as writer:
+            used_titles: set[str] = set()
+
+            # Parts are cut from the row stream as it is read; a header-only
+            # sheet still produces one part holding just the header.
+            idx = 0
+            first_row = next(rows, None)
+            while idx == 0 or first_row is not None:
+                idx += 1
+                token = _build_part_token(idx, numbering_style, custom_tokens)
+                default_name = f"part_{idx}"
+                requested_name = f"{part_base}{part_separator}{token}"
+                base_title = safe_sheet_title(requested_name, default_name)
+                sheet_title = unique_sheet_title(base_title, used_titles)
+                part_rows = [header] if first_row is None else chain(
+                    [header, first_row], islice(rows, chunk_size - 1)
+                )
+                writer.write_sheet(sheet_title, part_rows, blank_none=True)
+                first_row = next(rows, None)
+
+            return writer.to_bytes()
+
+
 @router.post(
     "/split-sheet",
     summary="Split Sheet",
@@ -82,7 +146,7 @@ _VALID_STYLES = {
 )
 async def split_sheet(
     background_tasks: BackgroundTasks,
-    file: UploadFile = File(..., description="Excel file"),
+    file: UploadFile = Depends(file_or_token("Excel file")),
     sheet: str = Form(..., description="Sheet name"),
     chunk_size: int = Form(1000, description="Max rows per chunk (including header)"),
     part_base: str = Form("part", description="Base name used for split sheets"),
@@ -94,62 +158,24 @@ async def split_sheet(
 ):
     started = time.perf_counter()
     check_excel_file(file)
-    raw = await read_upload_for_principal(file, principal=principal)
+    source = await spool_upload_for_principal(file, principal=principal)
     if chunk_size < 2:
         raise HTTPException(status_code=400, detail="chunk_size must be >= 2")
 
-    workbook_data = parse_excel_bytes(raw, file.filename)
-    has_visuals = has_visual_elements(raw)
-
-    if sheet not in workbook_data:
-        raise HTTPException(status_code=404, detail="Sheet not found")
-
-    rows = workbook_data[sheet]
-    if not rows:
-        raise HTTPException(status_code=400, detail="Sheet is empty")
-
-    if numbering_style not in _VALID_STYLES:
-        raise HTTPException(status_code=400, detail="Invalid numbering_style")
-
-    if len(part_separator) > 4:
-        raise HTTPException(status_code=400, detail="part_separator must be 4 characters or fewer")
-
-    custom_tokens = [
-        token.strip()
-        for token in re.split(r"[\r\n,]+", custom_sequence)
-        if token.strip()
-    ]
-    if numbering_style == "custom" and not custom_tokens:
-        raise HTTPException(status_code=400, detail="custom_sequence is required when numbering_style is custom")
-
-    header = rows[0]
-    chunks = [rows[i : i + chunk_size] for i in range(1, len(rows), chunk_size)]
-
-    out_wb = Workbook()
-    out_wb.remove(out_wb.active)
-    used_titles: set[str] = set()
-
-    for idx, chunk in enumerate(chunks, start=1):
-        token = _build_part_token(idx, numbering_style, custom_tokens)
-        default_name = f"part_{idx}"
-        requested_name = f"{part_base}{part_separator}{token}"
-        base_title = safe_sheet_title(requested_name, default_name)
-        sheet_title = unique_sheet_title(base_title, used_titles)
-        part = out_wb.create_sheet(sheet_title)
-        part.append(["" if v is None else v for v in header])
-        for row in chunk:
-            part.append(["" if v is None else v for v in row])
-
-    if not chunks:
-        token = _build_part_token(1, numbering_style, custom_tokens)
-        requested_name = f"{part_base}{part_separator}{token}"
-        base_title = safe_sheet_title(requested_name, "part_1")
-        sheet_title = unique_sheet_title(base_title, used_titles)
-        part = out_wb.create_sheet(sheet_title)
-        part.append(["" if v is None else v for v in header])
-
-    output = BytesIO()
-    out_wb.save(output)
+    has_visuals = has_visual_elements(source)
+
+    output_bytes = await run_tool_work(
+        principal,
+        _split_sheet,
+        source,
+        file.filename,
+        sheet,
+        chunk_size=chunk_size,
+        part_base=part_base,
+        part_separator=part_separator,
+        numbering_style=numbering_style,
+        custom_sequence=custom_sequence,
+    )
 
     return await record_and_respond(
         principal=principal,
@@ -158,7 +184,7 @@ async def split_sheet(
         tool_slug="split-sheet",
         tool_name="Split Sheet",
         original_filename=file.filename,
-        output_bytes=output.getvalue(),
+        output_bytes=output_bytes,
         output_filename="split.xlsx",
         mime_type=_XLSX_MIME,
         success=True,
@@ -4,22 +4,66 @@ import time
 import zipfile
 from io import BytesIO
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, UploadFile
-from openpyxl import Workbook
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException, UploadFile
 
 from app.core.security import AuthenticatedPrincipal
-from app.services.excel_reader import parse_excel_bytes
+from app.services.excel_reader import ExcelSource, WorkbookReader
+from app.services.excel_writer import WorkbookWriter
 from app.services.jobs_service import JobsService
-from app.tools._common import check_excel_file, has_visual_elements, read_upload_for_principal
+from app.tools._common import (
+    check_excel_file,
+    has_visual_elements,
+    run_tool_work,
+    spool_upload_for_principal,
+)
 from app.tools._recording import (
     get_current_user_optional,
     jobs_service_dep,
     record_and_respond,
 )
+from app.tools._uploads import file_or_token
 
 router = APIRouter()
 
 
+def _split_workbook_to_zip(source: ExcelSource, filename: str | None, sheet_names: str) -> bytes:
+    with WorkbookReader(source, filename) as reader:
+        targets = reader.sheet_names
+        if not targets:
+            raise HTTPException(status_code=400, detail="Workbook is empty")
+
+        selected_sheet_names = [
+            sheet_name.strip() for sheet_name in sheet_names.split(",") if sheet_name.strip()
+        ]
+        if selected_sheet_names:
+            missing = [name for name in selected_sheet_names if name not in targets]
+            if missing:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Sheet not found: {missing[0]}",
+                )
+            selected_set = set(selected_sheet_names)
+            targets = [name for name in targets if name in selected_set]
+
+        if not targets:
+            raise HTTPException(status_code=400, detail="Select at least one sheet")
+
+        zipped = BytesIO()
+        with zipfile.ZipFile(zipped, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for sheet_name in targets:
+                member_name = f"{sheet_name.replace(' ', '_') or 'sheet'}.xlsx"
+                with WorkbookWriter() as child:
+                    child.write_sheet(
+                        sheet_name[:31] if sheet_name else "Sheet1",
+                        reader.iter_rows(sheet_name),
+                        blank_none=True,
+                    )
+                    with zf.open(member_name, mode="w") as member:
+                        child.save(member)
+
+    return zipped.getvalue()
+
+
 @router.post(
     "/split-workbook",
     summary="Split Workbook",
@@ -27,53 +71,19 @@ router = APIRouter()
 )
 async def split_workbook(
     background_tasks: BackgroundTasks,
-    file: UploadFile = File(..., description="Excel file"),
+    file: UploadFile = Depends(file_or_token("Excel file")),
     sheet_names: str = Form("", description="Comma-separated sheet names to split (empty=all)"),
     principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
     jobs_service: JobsService = Depends(jobs_service_dep),
 ):
     started = time.perf_counter()
     check_excel_file(file)
-    raw = await read_upload_for_principal(file, principal=principal)
+    source = await spool_upload_for_principal(file, principal=principal)
 
-    workbook_data = parse_excel_bytes(raw, file.filename)
-    if not workbook_data:
-        raise HTTPException(status_code=400, detail="Workbook is empty")
-
-    has_visuals = has_visual_elements(raw)
-
-    selected_sheet_names = [
-        sheet_name.strip() for sheet_name in sheet_names.split(",") if sheet_name.strip()
-    ]
-    if selected_sheet_names:
-        missing = [name for name in selected_sheet_names if name not in workbook_data]
-        if missing:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Sheet not found: {missing[0]}",
-            )
-        selected_set = set(selected_sheet_names)
-        workbook_data = {
-            name: rows for name, rows in workbook_data.items() if name in selected_set
-        }
-
-    if not workbook_data:
-        raise HTTPException(status_code=400, detail="Select at least one sheet")
-
-    zipped = BytesIO()
-    with zipfile.ZipFile(zipped, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
-        for sheet_name, rows in workbook_data.items():
-            child_wb = Workbook()
-            child_ws = child_wb.active
-            child_ws.title = sheet_name[:31] if sheet_name else "Sheet1"
-
-            for row in rows:
-                child_ws.append(["" if v is None else v for v in row])
-
-            child_bytes = BytesIO()
-            child_wb.save(child_bytes)
-            member_name = f"{sheet_name.replace(' ', '_') or 'sheet'}.xlsx"
-            zf.writestr(member_name, child_bytes.getvalue())
+    output_bytes = await run_tool_work(
+        principal, _split_workbook_to_zip, source, file.filename, sheet_names,
+    )
+    has_visuals = has_visual_elements(source)
 
     return await record_and_respond(
         principal=principal,
@@ -82,7 +92,7 @@ async def split_workbook(
         tool_slug="split-workbook",
         tool_name="Split Workbook",
         original_filename=file.filename,
-        output_bytes=zipped.getvalue(),
+        output_bytes=output_bytes,
         output_filename="split_workbook.zip",
         mime_type="application/zip",
         success=True,
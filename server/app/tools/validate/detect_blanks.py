@@ -2,21 +2,27 @@ from __future__ import annotations
 
 import time
 from io import BytesIO
-from typing import Any
+from typing import Any, Iterator
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile
 from openpyxl import Workbook
 from openpyxl.utils import get_column_letter
 
 from app.core.security import AuthenticatedPrincipal
-from app.services.excel_reader import parse_excel_bytes
+from app.services.excel_reader import ExcelSource, WorkbookReader
 from app.services.jobs_service import JobsService
-from app.tools._common import check_excel_file, read_upload_for_principal, safe_base_filename
+from app.tools._common import (
+    check_excel_file,
+    run_tool_work,
+    safe_base_filename,
+    spool_upload_for_principal,
+)
 from app.tools._recording import (
     get_current_user_optional,
     jobs_service_dep,
     record_and_respond,
 )
+from app.tools._uploads import file_or_token
 from app.tools.analyze._styles import (
     ALT_ROW_FILL, BODY_FONT, BOLD_FONT, CENTER_ALIGNMENT, THIN_BORDER,
     WHITE_FILL, apply_header_row, auto_size, write_info_box,
@@ -27,57 +33,58 @@ router = APIRouter()
 _XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
 
-@router.post(
-    "/detect-blanks",
-    summary="Detect Blanks",
-    description="Scans all sheets for blank cells and returns a report.",
-)
-async def detect_blanks(
-    background_tasks: BackgroundTasks,
-    file: UploadFile = File(..., description="Excel file"),
-    principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
-    jobs_service: JobsService = Depends(jobs_service_dep),
-):
-    started = time.perf_counter()
-    check_excel_file(file)
-    raw = await read_upload_for_principal(file, principal=principal)
+def _scan_sheet_blanks(
+    sheet_name: str, rows: Iterator[list[Any]], detail_rows: list[list[str]]
+) -> tuple[int, int | None]:
+    """Count blank cells under the header row, appending one detail row per blank.
+
+    Returns ``(blank_count, total_cells)``; ``total_cells`` is ``None`` for an
+    empty sheet, which is left out of the report.
+    """
+    header = next(rows, None)
+    if header is None:
+        return 0, None
+
+    blank_count = 0
+    data_row_count = 0
+    for r_idx, row in enumerate(rows):
+        data_row_count += 1
+        for c_idx in range(len(header)):
+            val = row[c_idx] if c_idx < len(row) else None
+            if val is None or (isinstance(val, str) and val.strip() == ""):
+                blank_count += 1
+                col_header = str(header[c_idx]) if header[c_idx] is not None else ""
+                cell_ref = f"{get_column_letter(c_idx + 1)}{r_idx + 2}"
+                detail_rows.append([sheet_name, cell_ref, str(r_idx + 2), col_header])
+
+    return blank_count, len(header) * data_row_count
 
-    workbook_data = parse_excel_bytes(raw, file.filename)
 
+def _detect_blanks_report(source: ExcelSource, filename: str | None) -> tuple[bytes, int, int]:
     summary_rows: list[list[Any]] = []
     detail_rows: list[list[str]] = []
     total_blanks = 0
     sheets_affected = 0
 
-    for sheet_name, rows in workbook_data.items():
-        if not rows:
-            continue
-        header = rows[0]
-        data_rows = rows[1:] if len(rows) > 1 else []
-        total_cells = len(header) * len(data_rows) if data_rows else 0
-        blank_count = 0
-
-        for r_idx, row in enumerate(data_rows):
-            for c_idx in range(len(header)):
-                val = row[c_idx] if c_idx < len(row) else None
-                if val is None or (isinstance(val, str) and val.strip() == ""):
-                    blank_count += 1
-                    col_header = str(header[c_idx]) if header[c_idx] is not None else ""
-                    cell_ref = f"{get_column_letter(c_idx + 1)}{r_idx + 2}"
-                    detail_rows.append([sheet_name, cell_ref, str(r_idx + 2), col_header])
-
-        pct = round(blank_count / total_cells * 100, 1) if total_cells else 0
-        summary_rows.append([sheet_name, total_cells, blank_count, f"{pct}%"])
-        total_blanks += blank_count
-        if blank_count > 0:
-            sheets_affected += 1
+    with WorkbookReader(source, filename, engine="iterparse") as reader:
+        for sheet_name in reader.sheet_names:
+            blank_count, total_cells = _scan_sheet_blanks(
+                sheet_name, reader.iter_rows(sheet_name), detail_rows
+            )
+            if total_cells is None:
+                continue
+            pct = round(blank_count / total_cells * 100, 1) if total_cells else 0
+            summary_rows.append([sheet_name, total_cells, blank_count, f"{pct}%"])
+            total_blanks += blank_count
+            if blank_count > 0:
+                sheets_affected += 1
 
     out = Workbook()
     ws_sum = out.active
     ws_sum.title = "Summary"
 
     next_row = write_info_box(ws_sum, [
-        ("File Name:", file.filename or "workbook"),
+        ("File Name:", filename or "workbook"),
         ("Total Blanks:", str(total_blanks)),
         ("Sheets Affected:", str(sheets_affected)),
     ])
@@ -121,6 +128,27 @@ async def detect_blanks(
 
     buf = BytesIO()
     out.save(buf)
+    return buf.getvalue(), total_blanks, sheets_affected
+
+
+@router.post(
+    "/detect-blanks",
+    summary="Detect Blanks",
+    description="Scans all sheets for blank cells and returns a report.",
+)
+async def detect_blanks(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = Depends(file_or_token("Excel file")),
+    principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
+    jobs_service: JobsService = Depends(jobs_service_dep),
+):
+    started = time.perf_counter()
+    check_excel_file(file)
+    source = await spool_upload_for_principal(file, principal=principal)
+
+    output_bytes, total_blanks, sheets_affected = await run_tool_work(
+        principal, _detect_blanks_report, source, file.filename,
+    )
     base = safe_base_filename(file.filename, "workbook")
 
     output_name = f"blanks-report-{base}.xlsx"
@@ -131,7 +159,7 @@ async def detect_blanks(
         tool_slug="detect-blanks",
         tool_name="Detect Blanks",
         original_filename=file.filename,
-        output_bytes=buf.getvalue(),
+        output_bytes=output_bytes,
         output_filename=output_name,
         mime_type=_XLSX_MIME,
         success=True,
@@ -1,23 +1,30 @@
 from __future__ import annotations
 
+import itertools
 import re
 import time
 from io import BytesIO
-from typing import Any
+from typing import Any, Iterator
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException, UploadFile
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill
 
 from app.core.security import AuthenticatedPrincipal
-from app.services.excel_reader import parse_excel_bytes
+from app.services.excel_reader import ExcelSource, WorkbookReader
 from app.services.jobs_service import JobsService
-from app.tools._common import check_excel_file, read_upload_for_principal, safe_base_filename
+from app.tools._common import (
+    check_excel_file,
+    run_tool_work,
+    safe_base_filename,
+    spool_upload_for_principal,
+)
 from app.tools._recording import (
     get_current_user_optional,
     jobs_service_dep,
     record_and_respond,
 )
+from app.tools._uploads import file_or_token
 from app.tools.analyze._styles import (
     ALT_ROW_FILL, BODY_FONT, THIN_BORDER, WHITE_FILL,
     apply_header_row, auto_size,
@@ -35,34 +42,24 @@ GRAY_FILL = PatternFill(start_color="808080", end_color="808080", fill_type="sol
 WHITE_FONT = Font(name="Arial", bold=True, color="FFFFFF", size=10)
 
 
-@router.post(
-    "/validate-emails",
-    summary="Validate Emails",
-    description="Scans selected columns for email addresses and validates format.",
-)
-async def validate_emails(
-    background_tasks: BackgroundTasks,
-    file: UploadFile = File(..., description="Excel file"),
-    sheet: str = Form(..., description="Sheet name"),
-    column: str = Form(..., description="Column header name containing emails"),
-    principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
-    jobs_service: JobsService = Depends(jobs_service_dep),
-):
-    started = time.perf_counter()
-    check_excel_file(file)
-    raw = await read_upload_for_principal(file, principal=principal)
-
-    workbook_data = parse_excel_bytes(raw, file.filename)
+def _validate_emails_report(
+    source: ExcelSource,
+    filename: str | None,
+    sheet: str,
+    column: str,
+) -> tuple[bytes, int, int, int]:
+    with WorkbookReader(source, filename, engine="iterparse") as reader:
+        if sheet not in reader.sheet_names:
+            raise HTTPException(status_code=404, detail="Sheet not found")
+        return _validate_email_rows(reader.iter_rows(sheet), column)
 
-    if sheet not in workbook_data:
-        raise HTTPException(status_code=404, detail="Sheet not found")
 
-    rows = workbook_data[sheet]
-    if len(rows) < 2:
+def _validate_email_rows(rows: Iterator[list[Any]], column: str) -> tuple[bytes, int, int, int]:
+    header = next(rows, None)
+    first_data_row = next(rows, None)
+    if header is None or first_data_row is None:
         raise HTTPException(status_code=400, detail="Sheet has no data rows")
-
-    header = rows[0]
-    data_rows = rows[1:]
+    data_rows = itertools.chain([first_data_row], rows)
 
     col_idx = None
     for i, h in enumerate(header):
@@ -124,6 +121,29 @@ async def validate_emails(
 
     buf = BytesIO()
     out.save(buf)
+    return buf.getvalue(), valid_count, invalid_count, empty_count
+
+
+@router.post(
+    "/validate-emails",
+    summary="Validate Emails",
+    description="Scans selected columns for email addresses and validates format.",
+)
+async def validate_emails(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = Depends(file_or_token("Excel file")),
+    sheet: str = Form(..., description="Sheet name"),
+    column: str = Form(..., description="Column header name containing emails"),
+    principal: AuthenticatedPrincipal | None = Depends(get_current_user_optional),
+    jobs_service: JobsService = Depends(jobs_service_dep),
+):
+    started = time.perf_counter()
+    check_excel_file(file)
+    source = await spool_upload_for_principal(file, principal=principal)
+
+    output_bytes, valid_count, invalid_count, empty_count = await run_tool_work(
+        principal, _validate_emails_report, source, file.filename, sheet, column,
+    )
     base = safe_base_filename(file.filename, "workbook")
 
     output_name = f"email-validation-{base}.xlsx"
@@ -134,7 +154,7 @@ async def validate_emails(
         tool_slug="validate-emails",
         tool_name="Validate Emails",
         original_filename=file.filename,
-        output_bytes=buf.getvalue(),
+        output_bytes=output_bytes,
         output_filename=output_name,
         mime_type=_XLSX_MIME,
         success=True,
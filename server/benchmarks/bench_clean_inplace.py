@@ -0,0 +1,81 @@
+"""Benchmark the format-preserving clean tools on one sheet of a big workbook.
+
+Compares the openpyxl round trip (``load_workbook_for_edit`` loads and
+re-saves every sheet with its styles) against the selective XML editor,
+which rewrites only the targeted worksheet and the shared strings and
+copies every other member raw, for a trim-spaces edit of the first sheet.
+
+Usage::
+
+    python -m benchmarks.bench_clean_inplace [--sheets 8] [--rows 20000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from io import BytesIO
+
+from openpyxl import Workbook
+from openpyxl.styles import Font
+
+from app.services.excel_editor import load_workbook_for_edit, save_workbook_to_bytes
+from app.services.excel_xml_editor import mutate_string_cells
+
+
+def build_workbook(sheets: int, rows: int) -> bytes:
+    wb = Workbook()
+    wb.remove(wb.active)
+    bold = Font(bold=True)
+    for index in range(sheets):
+        ws = wb.create_sheet(f"Sheet{index + 1}")
+        ws.append(["id", "name", "city", "amount"])
+        for i in range(rows):
+            ws.append([i, f"  name {i % 5000}  ", f" city {i % 40} ", i * 0.5])
+            if i % 10 == 0:
+                ws.cell(i + 2, 2).font = bold
+    buf = BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def _trim(value):
+    return value.strip() if isinstance(value, str) else value
+
+
+def _openpyxl_round_trip(raw: bytes) -> bytes:
+    wb = load_workbook_for_edit(BytesIO(raw), "book.xlsx").workbook
+    ws = wb["Sheet1"]
+    for row in ws.iter_rows(min_row=2):
+        for cell in row:
+            updated = _trim(cell.value)
+            if updated != cell.value:
+                cell.value = updated
+    return save_workbook_to_bytes(wb)
+
+
+def _selective(raw: bytes) -> bytes:
+    return mutate_string_cells(BytesIO(raw), sheet="Sheet1", all_sheets=False, selected_columns=[], mutate=_trim)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sheets", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    raw = build_workbook(args.sheets, args.rows)
+    print(f"{args.sheets} sheets x {args.rows} rows, {len(raw) / 2**20:.1f} MiB")
+    for name, fn in (("openpyxl round trip", _openpyxl_round_trip), ("selective XML edit", _selective)):
+        samples = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            fn(raw)
+            samples.append(time.perf_counter() - started)
+        print(f"  {name:<20} {statistics.median(samples):7.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Benchmark filtered, sorted and searched inspect pages.
+
+Compares a linear scan of the stored sheet per request (what a client-side
+or naive server-side filter costs) against :class:`SheetIndex`, for the
+first query on a column (index build) and for repeat queries with a
+different filter value on the same columns (answered from the cached
+indexes).
+
+Usage::
+
+    python -m benchmarks.bench_inspect_query [--rows 200000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+
+from app.tools.inspect._columnar import ColumnarSheet
+from app.tools.inspect._query import SheetIndex, parse_query
+
+
+def build_sheet(rows: int) -> ColumnarSheet:
+    statuses = ("open", "closed", "pending", "void")
+    return ColumnarSheet(
+        [["id", "amount", "status", "note"]]
+        + [[i, (i * 7919) % 100_000 / 4, statuses[i % 4], f"note {i % 997}"] for i in range(rows)]
+    )
+
+
+def _linear(sheet: ColumnarSheet, threshold: float, needle: str) -> list[list]:
+    matched = [
+        row
+        for row in sheet.rows(1)
+        if isinstance(row[1], float) and row[1] > threshold and needle in str(row[3]).lower()
+    ]
+    matched.sort(key=lambda row: row[1], reverse=True)
+    return matched[:100]
+
+
+def _time(fn, repeats: int) -> float:
+    samples = []
+    for i in range(repeats):
+        started = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    sheet = build_sheet(args.rows)
+    print(f"{args.rows} rows, {sheet.nbytes / 2**20:.1f} MiB column-encoded")
+
+    def query(i: int):
+        return parse_query([f"amount>{20_000 + i}", f"note~{i % 10}"], ["-amount"], None, False)
+
+    linear = _time(lambda i: _linear(sheet, 20_000 + i, str(i % 10)), args.repeats)
+    index = SheetIndex(sheet)
+    started = time.perf_counter()
+    index.run(query(-1))
+    first = time.perf_counter() - started
+    repeat = _time(lambda i: index.run(query(i)), args.repeats)
+    paged = _time(lambda i: index.run(query(0)), args.repeats)
+
+    print(f"  linear scan per request   {linear * 1e3:8.1f} ms")
+    print(f"  indexed, first query      {first * 1e3:8.1f} ms (builds sort + search indexes)")
+    print(f"  indexed, new filter value {repeat * 1e3:8.1f} ms")
+    print(f"  indexed, next page        {paged * 1e6:8.1f} us")
+    print(f"  index size                {index.nbytes / 2**20:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
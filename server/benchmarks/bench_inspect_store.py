@@ -0,0 +1,139 @@
+"""Benchmark the inspect token store with many large workbooks resident.
+
+Compares the previous store (a plain dict that re-summed every entry's size
+on each insert, sorted all entries to evict one, scanned for expired tokens
+on every store and took one global lock on every read) against the current
+LRU store, for both operations a busy instance does all the time: paging
+rows out of a stored token and storing a fresh preview once the store is
+full.
+
+Usage::
+
+    python -m benchmarks.bench_inspect_store [--rows 200000] [--resident 1 8 32]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Any
+
+from app.tools.inspect._columnar import ColumnarSheet
+from app.tools.inspect._store import _MAX_STORE, _TTL_SECONDS, _WorkbookStore
+
+
+class _PreviousStore:
+    """The store as it was before the LRU rewrite, kept for comparison."""
+
+    def __init__(self, max_entries: int, max_bytes: int) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: dict[str, tuple[float, dict, dict, int]] = {}
+        self.lock = asyncio.Lock()
+
+    async def put(self, token: str, sheets: dict[str, ColumnarSheet], totals: dict) -> None:
+        size = sum(sheet.nbytes for sheet in sheets.values())
+        async with self.lock:
+            now = time.time()
+            for key in [k for k, (ts, *_) in self.entries.items() if now - ts > _TTL_SECONDS]:
+                self.entries.pop(key, None)
+            while (
+                len(self.entries) >= self.max_entries
+                or sum(entry[3] for entry in self.entries.values()) + size > self.max_bytes
+            ) and self.entries:
+                oldest = sorted(self.entries.items(), key=lambda kv: kv[1][0])[:1]
+                for key, _ in oldest:
+                    self.entries.pop(key, None)
+            self.entries[token] = (time.time(), sheets, totals, size)
+
+    async def get(self, token: str) -> dict[str, ColumnarSheet]:
+        async with self.lock:
+            ts, sheets, totals, size = self.entries[token]
+            self.entries[token] = (time.time(), sheets, totals, size)
+            return sheets
+
+
+class _CurrentStore:
+    def __init__(self, max_entries: int, max_bytes: int) -> None:
+        self.store = _WorkbookStore(
+            max_entries=max_entries, max_bytes=max_bytes, ttl_seconds=_TTL_SECONDS
+        )
+
+    async def put(self, token: str, sheets: dict[str, ColumnarSheet], totals: dict) -> None:
+        async with self.store.lock:
+            self.store.put(
+                token, sheets, totals, size=sum(sheet.nbytes for sheet in sheets.values())
+            )
+
+    async def get(self, token: str) -> dict[str, ColumnarSheet]:
+        return self.store.get(token).sheets
+
+
+def build_sheet(rows: int) -> ColumnarSheet:
+    statuses = ("open", "closed", "pending", "void")
+    return ColumnarSheet(
+        [["id", "amount", "status", "note"]]
+        + [[i, i * 0.25, statuses[i % 4], f"note {i % 997}"] for i in range(rows)]
+    )
+
+
+async def _page_latency(store: Any, tokens: list[str], pages: int) -> tuple[float, float]:
+    """Median token lookup and median full 100-row page, in seconds."""
+    lookups = []
+    page_samples = []
+    for i in range(pages):
+        token = tokens[i % len(tokens)]
+        started = time.perf_counter()
+        sheet = (await store.get(token))["Data"]
+        looked_up = time.perf_counter()
+        start = 1 + (i * 100) % (len(sheet) - 101)
+        sheet.rows(start, start + 100)
+        done = time.perf_counter()
+        lookups.append(looked_up - started)
+        page_samples.append(done - started)
+    return statistics.median(lookups), statistics.median(page_samples)
+
+
+async def _store_latency(store: Any, sheets: dict, stores: int) -> float:
+    samples = []
+    for i in range(stores):
+        started = time.perf_counter()
+        await store.put(f"fresh-{i}", sheets, {"Data": 0})
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+async def _run(rows: int, resident_counts: list[int], pages: int) -> None:
+    sheet = build_sheet(rows)
+    sheets = {"Data": sheet}
+    print(f"{rows} rows per workbook, {sheet.nbytes / 2**20:.1f} MiB column-encoded")
+    for resident in resident_counts:
+        line = [f"  {resident:>3} resident"]
+        for name, factory in (("previous", _PreviousStore), ("current", _CurrentStore)):
+            # Budget fits exactly ``resident`` workbooks, so every later store evicts.
+            store = factory(min(resident, _MAX_STORE), sheet.nbytes * resident)
+            tokens = [f"t{i}" for i in range(resident)]
+            for token in tokens:
+                await store.put(token, sheets, {"Data": rows + 1})
+            lookup, page = await _page_latency(store, tokens, pages)
+            put = await _store_latency(store, sheets, 200)
+            line.append(
+                f"{name}: lookup {lookup * 1e6:5.2f} us, page {page * 1e6:6.1f} us, "
+                f"store {put * 1e6:6.1f} us"
+            )
+        print("  |  ".join(line))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--resident", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--pages", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(_run(args.rows, args.resident, args.pages))
+
+
+if __name__ == "__main__":
+    main()
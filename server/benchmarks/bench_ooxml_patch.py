@@ -0,0 +1,81 @@
+"""Benchmark the structural tools' patch path against the openpyxl round trip.
+
+Freeze header, password protect and remove password each change one
+element per worksheet. The openpyxl path loads and re-saves every cell and
+style; :func:`~app.services.ooxml_patch.patch_workbook` streams the rows of
+each targeted worksheet through untouched and copies every other member
+raw. Password protect targets a single sheet, so it shows the cost when
+most of the package is copied without recompression.
+
+Usage::
+
+    python -m benchmarks.bench_ooxml_patch [--sheets 6] [--rows 20000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from io import BytesIO
+
+from openpyxl.worksheet.protection import SheetProtection
+
+from app.services.excel_editor import load_workbook_for_edit, save_workbook_to_bytes
+from app.services.ooxml_patch import FreezeRows, SetSheetProtection, lock_structure, patch_workbook
+from benchmarks.bench_clean_inplace import build_workbook
+
+
+def _openpyxl_freeze(raw: bytes) -> bytes:
+    wb = load_workbook_for_edit(BytesIO(raw), "book.xlsx").workbook
+    for ws in wb.worksheets:
+        ws.freeze_panes = "A2"
+    return save_workbook_to_bytes(wb)
+
+
+def _openpyxl_protect_one(raw: bytes) -> bytes:
+    wb = load_workbook_for_edit(BytesIO(raw), "book.xlsx").workbook
+    wb["Sheet1"].protection = SheetProtection(sheet=True, password="Secret-1")
+    wb.security.lockStructure = True
+    return save_workbook_to_bytes(wb)
+
+
+def _patch_freeze(raw: bytes) -> bytes:
+    return patch_workbook(raw, sheet_patch=FreezeRows(1))
+
+
+def _patch_protect_one(raw: bytes) -> bytes:
+    return patch_workbook(
+        raw,
+        sheet_patch=SetSheetProtection(SheetProtection(sheet=True, password="Secret-1")),
+        sheets=["Sheet1"],
+        workbook_patch=lock_structure(True),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sheets", type=int, default=6)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    raw = build_workbook(args.sheets, args.rows)
+    print(f"{args.sheets} sheets x {args.rows} rows, {len(raw) / 2**20:.1f} MiB")
+    cases = (
+        ("openpyxl freeze all", _openpyxl_freeze),
+        ("patch freeze all", _patch_freeze),
+        ("openpyxl protect one", _openpyxl_protect_one),
+        ("patch protect one", _patch_protect_one),
+    )
+    for name, fn in cases:
+        samples = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            fn(raw)
+            samples.append(time.perf_counter() - started)
+        print(f"  {name:<22} {statistics.median(samples) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
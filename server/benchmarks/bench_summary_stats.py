@@ -0,0 +1,85 @@
+"""Benchmark summary statistics over already-parsed rows.
+
+Compares the former per-column approach (a list of cells per column,
+``float()`` on every cell, then ``statistics.mean``/``median``/``stdev``
+each walking the values again) with the one-pass
+:class:`~app.tools.analyze._column_stats.SheetAggregator`, which also
+produces percentiles and distinct counts. Parsing is excluded: both sides
+consume the same list of rows.
+
+Usage::
+
+    python -m benchmarks.bench_summary_stats [--rows 200000] [--columns 6]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+from typing import Any
+
+from app.tools.analyze._column_stats import SheetAggregator
+
+
+def build_rows(rows: int, columns: int) -> list[list[Any]]:
+    rng = random.Random(1)
+    out: list[list[Any]] = []
+    for index in range(rows):
+        row: list[Any] = [rng.uniform(0, 1000) for _ in range(columns - 1)]
+        row.append(str(rng.randint(0, 500)) if index % 9 else None)
+        out.append(row)
+    return out
+
+
+def _per_column(header: list[Any], data_rows: list[list[Any]]) -> list[tuple]:
+    stats = []
+    for col_idx, _ in enumerate(header):
+        col_cells = [r[col_idx] if col_idx < len(r) else None for r in data_rows]
+        nums: list[float] = []
+        for c in col_cells:
+            if isinstance(c, (int, float)):
+                nums.append(float(c))
+            elif isinstance(c, str):
+                try:
+                    nums.append(float(c))
+                except ValueError:
+                    pass
+        if not nums:
+            continue
+        blanks = sum(1 for c in col_cells if c is None or (isinstance(c, str) and c.strip() == ""))
+        stats.append((
+            len(nums), min(nums), max(nums), statistics.mean(nums), statistics.median(nums),
+            statistics.stdev(nums), sum(nums), blanks,
+        ))
+    return stats
+
+
+def _one_pass(header: list[Any], data_rows: list[list[Any]]) -> list:
+    aggregator = SheetAggregator(header)
+    aggregator.add_rows(iter(data_rows))
+    return aggregator.summaries()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--columns", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    data_rows = build_rows(args.rows, args.columns)
+    header = [f"c{index}" for index in range(args.columns)]
+    print(f"{args.rows} rows x {args.columns} columns")
+    for name, fn in (("per-column statistics", _per_column), ("one-pass aggregator", _one_pass)):
+        samples = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            fn(header, data_rows)
+            samples.append(time.perf_counter() - started)
+        print(f"  {name:<22} {statistics.median(samples) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
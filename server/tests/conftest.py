@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+
+import pytest
+
+from app.services.executor import shutdown_tool_executor
+
+
+@pytest.fixture(autouse=True)
+def _fresh_tool_executor() -> Iterator[None]:
+    """Give every test its own tool executor.
+
+    The executor's tier semaphores bind to the event loop that first uses
+    them, and a slot held by work that outlives a test's loop is never
+    released; sharing one executor across tests would let one test's
+    leftovers starve the next.
+    """
+
+    shutdown_tool_executor()
+    yield
+    shutdown_tool_executor()
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import asyncio
+import csv
+import io
+import threading
+import uuid
+import zipfile
+from unittest.mock import AsyncMock
+
+import openpyxl
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.core.security import AuthenticatedPrincipal, get_current_user_optional
+from app.services import executor as executor_module
+from app.services.executor import ToolExecutor
+from app.tools._common import run_tool_work, stream_tool_work
+from app.tools._recording import jobs_service_dep
+from app.tools.convert import xlsx_to_csv
+from app.tools.convert.xlsx_to_csv import router
+
+
+def _workbook_bytes(rows: int) -> bytes:
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Big"
+    ws.append(["id", "label"])
+    for i in range(rows):
+        ws.append([i, f"label-{i}"])
+    small = wb.create_sheet("Small")
+    small.append(["x", None, "y"])
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def _client(principal: AuthenticatedPrincipal | None, service) -> AsyncClient:
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_current_user_optional] = lambda: principal
+    app.dependency_overrides[jobs_service_dep] = lambda: service
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+def _principal() -> AuthenticatedPrincipal:
+    return AuthenticatedPrincipal(
+        user_id=uuid.uuid4(), email="a@b.c", role=None, session_id=None, claims={},
+    )
+
+
+@pytest.mark.asyncio
+async def test_csv_is_streamed_in_chunks_and_recorded_in_full() -> None:
+    raw = _workbook_bytes(20_000)
+    recorded: list[bytes] = []
+
+    async def record(**kwargs):
+        # The spool is handed over as-is and closed once recording returns.
+        spool = kwargs["output_bytes"]
+        spool.seek(0)
+        recorded.append(spool.read())
+        return uuid.uuid4()
+
+    service = AsyncMock()
+    service.record_authenticated_job = AsyncMock(side_effect=record)
+
+    async with _client(_principal(), service) as client:
+        response = await client.post(
+            "/xlsx-to-csv?sheet=Big",
+            files={"file": ("book.xlsx", raw, "application/octet-stream")},
+        )
+
+    assert response.status_code == 200
+    assert "content-length" not in response.headers
+    rows = list(csv.reader(io.StringIO(response.content.decode("utf-8"))))
+    assert rows[0] == ["id", "label"]
+    assert rows[-1] == ["19999", "label-19999"]
+    assert len(rows) == 20_001
+
+    kwargs = service.record_authenticated_job.call_args.kwargs
+    assert recorded == [response.content]
+    assert kwargs["tool_slug"] == "xlsx-to-csv"
+
+
+@pytest.mark.asyncio
+async def test_csv_zip_members_are_streamed() -> None:
+    raw = _workbook_bytes(5_000)
+
+    async with _client(None, AsyncMock()) as client:
+        response = await client.post(
+            "/xlsx-to-csv-zip",
+            files={"file": ("book.xlsx", raw, "application/octet-stream")},
+        )
+
+    assert response.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(response.content)) as zf:
+        assert zf.namelist() == ["Big.csv", "Small.csv"]
+        assert zf.read("Small.csv") == b"x,,y\r\n"
+        big = zf.read("Big.csv").decode("utf-8").splitlines()
+    assert big[1] == "0,label-0"
+    assert len(big) == 5_001
+
+
+@pytest.mark.asyncio
+async def test_errors_before_the_first_chunk_are_normal_responses() -> None:
+    async with _client(None, AsyncMock()) as client:
+        response = await client.post(
+            "/xlsx-to-csv?sheet=Missing",
+            files={"file": ("book.xlsx", _workbook_bytes(1), "application/octet-stream")},
+        )
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Sheet not found"
+
+
+@pytest.mark.asyncio
+async def test_abandoned_stream_stops_the_tool_body() -> None:
+    produced = 0
+    closed = threading.Event()
+
+    def body():
+        nonlocal produced
+        try:
+            while True:
+                produced += 1
+                yield b"x" * 1024
+        finally:
+            closed.set()
+
+    handle = io.BytesIO(b"upload")
+    stream = await stream_tool_work(None, body, close_when_done=(handle,))
+    chunks = stream.__aiter__()
+    first = await chunks.__anext__()
+    assert first and set(first) == {ord("x")}
+    await chunks.aclose()
+
+    for _ in range(100):
+        if closed.is_set() and handle.closed:
+            break
+        await asyncio.sleep(0.01)
+    assert closed.is_set()
+    assert handle.closed
+    assert not stream.completed
+
+
+@pytest.mark.asyncio
+async def test_slow_client_does_not_hold_an_executor_slot(monkeypatch: pytest.MonkeyPatch) -> None:
+    executor = ToolExecutor(max_workers=1, tier_caps={}, max_queue=0)
+    monkeypatch.setattr(executor_module, "_executor", executor)
+
+    def body():
+        for i in range(50):
+            yield bytes([i]) * 1024
+
+    stream = await stream_tool_work(None, body)
+    chunks = stream.__aiter__()
+    first = await chunks.__anext__()
+    # The body runs to the end while the client has read a single chunk.
+    for _ in range(100):
+        if executor.stats()["running"] == 0:
+            break
+        await asyncio.sleep(0.01)
+    assert executor.stats()["running"] == 0
+    assert await run_tool_work(None, lambda: "free") == "free"
+
+    rest = b"".join([chunk async for chunk in chunks])
+    assert first + rest == b"".join(bytes([i]) * 1024 for i in range(50))
+    assert stream.completed
+    executor.shutdown()
+
+
+def test_csv_chunks_match_single_buffer_output() -> None:
+    rows = [[i, None, f"v{i}"] for i in range(10_000)]
+    expected = io.StringIO()
+    writer = csv.writer(expected)
+    for r in rows:
+        writer.writerow(["" if c is None else c for c in r])
+
+    chunks = list(xlsx_to_csv._csv_chunks(rows))
+    assert len(chunks) > 1
+    assert b"".join(chunks) == expected.getvalue().encode("utf-8")
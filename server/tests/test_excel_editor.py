@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import io
+import random
+
+import openpyxl
+from openpyxl.formatting.rule import CellIsRule
+from openpyxl.styles import Font
+from openpyxl.worksheet.datavalidation import DataValidation
+
+from app.services.excel_editor import delete_rows_bulk
+
+
+def _styled_sheet(seed: int) -> openpyxl.Workbook:
+    rnd = random.Random(seed)
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    for row in range(1, 201):
+        for column in range(1, 5):
+            if rnd.random() < 0.7:
+                cell = ws.cell(row, column, value=rnd.choice([row * column, f"t{row}", None]))
+                if rnd.random() < 0.2:
+                    cell.font = Font(bold=True)
+    return wb
+
+
+def _cells(ws) -> list[tuple]:
+    # delete_rows leaves empty placeholder cells behind; only real content counts.
+    return sorted(
+        (coord, cell.value, cell.font.b)
+        for coord, cell in ws._cells.items()
+        if cell.value is not None or cell.has_style
+    )
+
+
+def test_bulk_delete_moves_cells_like_repeated_delete_rows() -> None:
+    for seed in range(3):
+        doomed = sorted(random.Random(seed).sample(range(2, 201), 80))
+        expected = _styled_sheet(seed).active
+        actual = _styled_sheet(seed).active
+        for row in reversed(doomed):
+            expected.delete_rows(row, 1)
+
+        assert delete_rows_bulk(actual, doomed + doomed[:5]) == 80
+        assert _cells(actual) == _cells(expected)
+        assert all(coord == (cell.row, cell.column) for coord, cell in actual._cells.items())
+        assert actual.max_row == expected.max_row
+
+
+def test_bulk_delete_moves_row_formatting_and_ranges() -> None:
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    for row in range(1, 21):
+        ws.append([row, f"v{row}", row % 3])
+    ws.row_dimensions[5].height = 30
+    ws.row_dimensions[4].height = 99
+    ws.merge_cells("A3:B6")
+    ws.merge_cells("C8:C9")
+    ws.merge_cells("A14:B14")
+    ws.conditional_formatting.add("A2:C20", CellIsRule(operator="greaterThan", formula=["5"]))
+    ws.conditional_formatting.add("C9", CellIsRule(operator="equal", formula=["1"]))
+    validation = DataValidation(type="whole")
+    validation.add("C2:C10")
+    validation.add("E14")
+    ws.add_data_validation(validation)
+    ws.auto_filter.ref = "A1:C20"
+    ws["B18"].hyperlink = "https://example.com"
+
+    assert delete_rows_bulk(ws, [3, 4, 9, 14]) == 4
+
+    assert {index: dim.height for index, dim in ws.row_dimensions.items() if dim.height} == {3: 30}
+    # A3:B6 loses its top rows and shrinks; C8:C9 would be a single cell and
+    # A14:B14 lost every row, so both are unmerged.
+    assert sorted(str(r) for r in ws.merged_cells.ranges) == ["A3:B4"]
+    assert isinstance(ws["A3"], openpyxl.cell.cell.Cell)
+    assert [str(cf.sqref) for cf in ws.conditional_formatting] == ["A2:C16"]
+    assert [str(dv.sqref) for dv in ws.data_validations.dataValidation] == ["C2:C7"]
+    assert ws.auto_filter.ref == "A1:C16"
+    assert ws["B14"].value == "v18"
+    assert ws["B14"].hyperlink.ref == "B14"
+
+    buf = io.BytesIO()
+    wb.save(buf)
+    reloaded = openpyxl.load_workbook(io.BytesIO(buf.getvalue())).active
+    assert reloaded.max_row == 16
+    assert [cell.value for cell in reloaded["A"]][:5] == [1, 2, None, None, 7]
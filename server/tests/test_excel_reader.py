@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import datetime
+import io
+import re
+import zipfile
+
+import openpyxl
+import pytest
+from openpyxl.cell.rich_text import CellRichText, TextBlock
+from openpyxl.cell.text import InlineFont
+
+from app.services import excel_reader, workbook_cache
+from app.services.excel_reader import parse_excel_bytes
+
+
+@pytest.fixture(autouse=True)
+def _fresh_workbook_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Each test parses its own bytes; never serve them from an earlier test.
+    monkeypatch.setattr(
+        workbook_cache, "_cache", workbook_cache.WorkbookCache(max_bytes=0, ttl_seconds=0)
+    )
+
+
+def _with_sheet_xml(raw: bytes, member: str, patch) -> bytes:
+    out = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(raw)) as zin, zipfile.ZipFile(out, "w") as zout:
+        for item in zin.infolist():
+            data = zin.read(item.filename)
+            if item.filename == member:
+                data = patch(data)
+            zout.writestr(item, data)
+    return out.getvalue()
+
+
+def test_formula_without_cached_value_falls_back_to_formula_text() -> None:
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Data"
+    ws.append(["qty", "double"])
+    ws.append([2, "=A2*2"])
+    ws["D4"] = "far"
+    buf = io.BytesIO()
+    wb.save(buf)
+
+    data = parse_excel_bytes(buf.getvalue(), "book.xlsx")
+
+    assert data["Data"] == [
+        ["qty", "double", None, None],
+        [2, "=A2*2", None, None],
+        [None, None, None, None],
+        [None, None, None, "far"],
+    ]
+
+
+def test_cached_values_win_and_shared_formulas_translate() -> None:
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Data"
+    for i in range(1, 4):
+        ws.cell(row=i, column=1, value=i)
+    buf = io.BytesIO()
+    wb.save(buf)
+
+    def patch(xml: bytes) -> bytes:
+        xml = xml.replace(b"A1:A3", b"A1:B3")
+        # B1 is the shared-formula master with a cached value; B2/B3 are
+        # dependents without one and must come back as translated formulas.
+        xml = re.sub(
+            rb'(<c r="A1"[^>]*>.*?</c>)',
+            rb'\1<c r="B1"><f t="shared" ref="B1:B3" si="0">A1*10</f><v>10</v></c>',
+            xml,
+        )
+        for row in (2, 3):
+            xml = re.sub(
+                rb'(<c r="A%d"[^>]*>.*?</c>)' % row,
+                rb'\1<c r="B%d"><f t="shared" si="0"/></c>' % row,
+                xml,
+            )
+        return xml
+
+    raw = _with_sheet_xml(buf.getvalue(), "xl/worksheets/sheet1.xml", patch)
+
+    for engine in ("openpyxl", "iterparse"):
+        assert parse_excel_bytes(raw, "book.xlsx", engine=engine)["Data"] == [
+            [1, 10],
+            [2, "=A2*10"],
+            [3, "=A3*10"],
+        ]
+
+
+def test_iterparse_engine_matches_openpyxl_engine() -> None:
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Mixed"
+    ws.append([
+        "text", 1, 2.5, True, False,
+        datetime.datetime(2024, 5, 1, 12, 30), datetime.timedelta(hours=30),
+        "=A1&B1", None, "  spaced  ",
+    ])
+    ws["B4"] = CellRichText(["plain ", TextBlock(InlineFont(b=True), "bold")])
+    ws["E6"] = "far"
+    wb.create_sheet("Empty")
+    tail = wb.create_sheet("Tail")
+    tail["C3"] = "z"
+    buf = io.BytesIO()
+    wb.save(buf)
+
+    def patch(xml: bytes) -> bytes:
+        # Inline strings with rich and phonetic runs, an error cell, cells and
+        # rows without references, and a duplicate row that must be ignored.
+        return xml.replace(
+            b"<sheetData>",
+            b'<sheetData><row r="1"><c r="A1" t="inlineStr"><is><r><t>in</t></r>'
+            b'<r><t xml:space="preserve"> line</t></r><rPh sb="0" eb="1"><t>PH</t></rPh>'
+            b'</is></c><c t="e"><v>#DIV/0!</v></c></row>'
+            b"<row><c><v>7</v></c><c><f>A2*2</f></c></row>"
+            b'<row r="1"><c r="A1"><v>5</v></c></row>',
+        )
+
+    raw = _with_sheet_xml(buf.getvalue(), "xl/worksheets/sheet3.xml", patch)
+
+    expected = parse_excel_bytes(raw, "book.xlsx")
+    assert parse_excel_bytes(raw, "book.xlsx", engine="iterparse") == expected
+    assert expected["Tail"] == [["in line", "#DIV/0!", None], [7, "=A2*2", None], [None, None, "z"]]
+    assert expected["Mixed"][3][1] == "plain bold"
+    assert expected["Empty"] == []
+
+
+def test_iterparse_engine_rejects_entities_and_falls_back(monkeypatch: pytest.MonkeyPatch) -> None:
+    wb = openpyxl.Workbook()
+    wb.active.append(["a", 1])
+    buf = io.BytesIO()
+    wb.save(buf)
+    raw = buf.getvalue()
+    with_entity = _with_sheet_xml(
+        raw,
+        "xl/worksheets/sheet1.xml",
+        lambda xml: xml.replace(b"<worksheet", b'<!DOCTYPE worksheet [<!ENTITY e "a">]><worksheet', 1),
+    )
+
+    with pytest.raises(ValueError):
+        sheets = excel_reader._IterparseSheets(with_entity)
+        list(sheets.iter_rows("Sheet"))
+
+    def broken(_self, _source):
+        raise RuntimeError("unexpected workbook XML")
+
+    monkeypatch.setattr(excel_reader._IterparseSheets, "__init__", broken)
+    with excel_reader.WorkbookReader(raw, "book.xlsx", engine="iterparse") as reader:
+        assert isinstance(reader._sheets, excel_reader._OpenpyxlSheets)
+    assert parse_excel_bytes(raw, "book.xlsx", engine="iterparse") == {"Sheet": [["a", 1]]}
+    with pytest.raises(ValueError):
+        parse_excel_bytes(raw, "book.xlsx", engine="sax")
+
+
+def _two_sheet_workbook() -> bytes:
+    wb = openpyxl.Workbook()
+    first = wb.active
+    first.title = "First"
+    first.append(["name", "qty"])
+    first.append(["a", 1])
+    second = wb.create_sheet("Second")
+    for i in range(5):
+        second.append([i, f"row-{i}"])
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("engine", ["openpyxl", "iterparse"])
+def test_workbook_reader_yields_rows_lazily_per_sheet(engine: str) -> None:
+    raw = _two_sheet_workbook()
+
+    with excel_reader.WorkbookReader(raw, "book.xlsx", engine=engine) as reader:
+        assert reader.sheet_names == ["First", "Second"]
+        rows = reader.iter_rows("Second")
+        assert next(rows) == [0, "row-0"]
+        assert list(rows) == [[i, f"row-{i}"] for i in range(1, 5)]
+        assert reader.read_sheet("First") == [["name", "qty"], ["a", 1]]
+        with pytest.raises(KeyError):
+            reader.iter_rows("Missing")
+        assert reader.materialize() == parse_excel_bytes(raw, "book.xlsx")
+
+
+def test_workbook_reader_falls_back_before_the_first_row(monkeypatch: pytest.MonkeyPatch) -> None:
+    raw = _two_sheet_workbook()
+
+    def broken(_self, _sheet_name):
+        raise RuntimeError("unexpected sheet XML")
+
+    monkeypatch.setattr(excel_reader._IterparseSheets, "iter_rows", broken)
+    with excel_reader.WorkbookReader(raw, "book.xlsx", engine="iterparse") as reader:
+        assert reader.read_sheet("First") == [["name", "qty"], ["a", 1]]
+        assert isinstance(reader._sheets, excel_reader._OpenpyxlSheets)
+
+
+def test_sanitize_drops_drawings_and_copies_other_members_raw() -> None:
+    raw = _with_sheet_xml(
+        _two_sheet_workbook(),
+        "xl/worksheets/sheet1.xml",
+        lambda xml: xml.replace(b"</worksheet>", b'<drawing r:id="rIdDraw"/></worksheet>').replace(
+            b"<worksheet ", b'<worksheet xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships" ', 1
+        ),
+    )
+    out = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(raw)) as zin, zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zout:
+        for item in zin.infolist():
+            zout.writestr(item, zin.read(item))
+        zout.writestr("xl/drawings/drawing1.xml", b"<not-a-drawing")
+        zout.writestr(
+            "xl/worksheets/_rels/sheet1.xml.rels",
+            b'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            b'<Relationship Id="rIdDraw" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+            b'relationships/drawing" Target="../drawings/drawing1.xml"/></Relationships>',
+        )
+    out.seek(0)
+
+    sanitized = excel_reader._sanitize_openxml_for_data_read(out)
+
+    with zipfile.ZipFile(out) as before, zipfile.ZipFile(io.BytesIO(sanitized)) as after:
+        assert "xl/drawings/drawing1.xml" not in after.namelist()
+        assert b"rIdDraw" not in after.read("xl/worksheets/_rels/sheet1.xml.rels")
+        for name in ("xl/worksheets/sheet2.xml", "xl/styles.xml"):
+            old, new = before.getinfo(name), after.getinfo(name)
+            assert (new.CRC, new.compress_size) == (old.CRC, old.compress_size)
+    assert parse_excel_bytes(sanitized, "book.xlsx")["Second"][4] == [4, "row-4"]
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import datetime
+import io
+import os
+
+import openpyxl
+import pytest
+
+from app.services.excel_reader import parse_excel_bytes
+from app.services.excel_writer import WorkbookWriter
+from app.tools.split.split_sheet import _split_sheet
+
+_ROWS = [
+    ["a", "", None, 1],
+    [2],
+    [],
+    [None, datetime.datetime(2024, 1, 2), 3.5, "x"],
+]
+
+
+def _regular_workbook(titles: list[str], *, blank_none: bool) -> bytes:
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    for title in titles:
+        ws = wb.create_sheet(title)
+        for row in _ROWS:
+            ws.append(["" if v is None else v for v in row] if blank_none else row)
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def _cells(raw: bytes) -> list[tuple[str, str, list[list]]]:
+    wb = openpyxl.load_workbook(io.BytesIO(raw))
+    return [
+        (ws.title, ws.dimensions, [[c.value for c in row] for row in ws.iter_rows()])
+        for ws in wb.worksheets
+    ]
+
+
+@pytest.mark.parametrize("blank_none", [True, False])
+def test_writer_output_matches_a_regular_workbook(blank_none: bool) -> None:
+    titles = ["Data", "Data", "Other"]
+    with WorkbookWriter() as writer:
+        written = [writer.write_sheet(t, iter(_ROWS), blank_none=blank_none) for t in titles]
+        raw = writer.to_bytes()
+
+    expected = _regular_workbook(titles, blank_none=blank_none)
+    assert written == ["Data", "Data1", "Other"]
+    assert _cells(raw) == _cells(expected)
+    for engine in ("openpyxl", "iterparse"):
+        assert parse_excel_bytes(raw, "out.xlsx", engine=engine) == parse_excel_bytes(
+            expected, "out.xlsx", engine=engine
+        )
+
+
+def test_writer_without_sheets_saves_an_empty_sheet1() -> None:
+    with WorkbookWriter() as writer:
+        raw = writer.to_bytes()
+    assert parse_excel_bytes(raw, "out.xlsx") == {"Sheet1": []}
+
+
+def test_writer_removes_temp_files_when_a_tool_bails_out() -> None:
+    def failing_rows():
+        yield [1]
+        raise ValueError("bad row")
+
+    writer = WorkbookWriter()
+    with pytest.raises(ValueError), writer:
+        writer.write_sheet("Done", [[1]])
+        writer.write_sheet("Broken", failing_rows())
+
+    assert [os.path.exists(ws._writer.out) for ws in writer._wb.worksheets] == [False, False]
+
+
+def test_split_sheet_streams_parts_with_the_header() -> None:
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Data"
+    ws.append(["id", None])
+    for i in range(5):
+        ws.append([i, None])
+    buf = io.BytesIO()
+    wb.save(buf)
+
+    out = _split_sheet(
+        buf.getvalue(),
+        "book.xlsx",
+        "Data",
+        chunk_size=2,
+        part_base="part",
+        part_separator="_",
+        numbering_style="numeric",
+        custom_sequence="",
+    )
+
+    assert parse_excel_bytes(out, "out.xlsx") == {
+        "part_1": [["id", None], [0, None], [1, None]],
+        "part_2": [["id", None], [2, None], [3, None]],
+        "part_3": [["id", None], [4, None]],
+    }
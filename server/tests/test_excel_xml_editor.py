@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import io
+import zipfile
+
+import openpyxl
+import pytest
+from fastapi import HTTPException
+
+from app.services.excel_xml_editor import mutate_string_cells
+from app.tools.clean._utils import apply_value_mutation_inplace
+
+_SHEET1 = (
+    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    b"<sheetData>"
+    b'<row r="1"><c r="A1" t="s"><v>0</v></c><c r="B1" t="s"><v>1</v></c></row>'
+    b'<row r="2"><c r="A2" t="s" s="0"><v>2</v></c><c r="B2" t="s"><v>2</v></c></row>'
+    b'<row r="3"><c r="A3" t="n"><v>3</v></c><c r="B3" t="str"><f>a3</f><v> kept </v></c></row>'
+    b'<row r="4"><c r="A4" t="inlineStr"><is><t xml:space="preserve"> in&amp;line </t></is></c></row>'
+    b"</sheetData></worksheet>"
+)
+_STRINGS = (
+    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    b'<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" count="4" uniqueCount="3">'
+    b"<si><t>name</t></si><si><t>other</t></si><si><t xml:space=\"preserve\"> both </t></si></sst>"
+)
+_OPAQUE = bytes(range(256)) * 64
+
+
+def _package() -> bytes:
+    """An openpyxl workbook with Excel-style shared strings and a member openpyxl does not know."""
+    wb = openpyxl.Workbook()
+    wb.active.title = "Data"
+    wb.create_sheet("Untouched").append([" keep "])
+    buf = io.BytesIO()
+    wb.save(buf)
+
+    out = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(buf.getvalue())) as zin, zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zout:
+        for info in zin.infolist():
+            payload = zin.read(info)
+            if info.filename == "xl/worksheets/sheet1.xml":
+                payload = _SHEET1
+            elif info.filename == "[Content_Types].xml":
+                payload = payload.replace(
+                    b"</Types>",
+                    b'<Override PartName="/xl/sharedStrings.xml" ContentType="application/'
+                    b'vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/></Types>',
+                )
+            elif info.filename == "xl/_rels/workbook.xml.rels":
+                payload = payload.replace(
+                    b"</Relationships>",
+                    b'<Relationship Id="rIdSst" Type="http://schemas.openxmlformats.org/officeDocument/'
+                    b'2006/relationships/sharedStrings" Target="sharedStrings.xml"/></Relationships>',
+                )
+            zout.writestr(info, payload)
+        zout.writestr("xl/sharedStrings.xml", _STRINGS)
+        zout.writestr("xl/media/image1.bin", _OPAQUE)
+    return out.getvalue()
+
+
+def _strip(value):
+    return value.strip() if isinstance(value, str) else value
+
+
+def test_only_target_cells_change_and_other_members_are_copied_raw() -> None:
+    source = _package()
+    output = mutate_string_cells(
+        io.BytesIO(source), sheet="Data", all_sheets=False, selected_columns=["name"], mutate=_strip
+    )
+    assert output is not None
+
+    wb = openpyxl.load_workbook(io.BytesIO(output))
+    rows = [[cell.value for cell in row] for row in wb["Data"].iter_rows()]
+    # A2 shares its string with B2, which is not targeted.
+    assert rows == [["name", "other"], ["both", " both "], [3, "=a3"], ["in&line", None]]
+    assert wb["Untouched"]["A1"].value == " keep "
+
+    with zipfile.ZipFile(io.BytesIO(source)) as before, zipfile.ZipFile(io.BytesIO(output)) as after:
+        assert after.namelist() == before.namelist()
+        changed = {"xl/worksheets/sheet1.xml", "xl/sharedStrings.xml"}
+        for info in before.infolist():
+            if info.filename in changed:
+                continue
+            copied = after.getinfo(info.filename)
+            assert (copied.CRC, copied.compress_size) == (info.CRC, info.compress_size), info.filename
+        assert after.read("xl/media/image1.bin") == _OPAQUE
+        assert b'uniqueCount="4"' in after.read("xl/sharedStrings.xml")
+
+
+def test_nothing_to_change_returns_the_package_unchanged_and_errors_match_openpyxl_path() -> None:
+    source = _package()
+    output = mutate_string_cells(
+        io.BytesIO(source), sheet="Data", all_sheets=True, selected_columns=["name"], mutate=str
+    )
+    with zipfile.ZipFile(io.BytesIO(output)) as after, zipfile.ZipFile(io.BytesIO(source)) as before:
+        assert [(i.filename, i.CRC) for i in after.infolist()] == [(i.filename, i.CRC) for i in before.infolist()]
+
+    with pytest.raises(HTTPException) as missing_column:
+        mutate_string_cells(io.BytesIO(source), sheet="Data", all_sheets=False, selected_columns=["nope"], mutate=_strip)
+    assert missing_column.value.status_code == 400
+    with pytest.raises(HTTPException) as missing_sheet:
+        apply_value_mutation_inplace(
+            io.BytesIO(source), "book.xlsx", sheet="Nope", all_sheets=False, selected_columns=[], mutate=_strip
+        )
+    assert missing_sheet.value.status_code == 404
+
+
+def test_cells_without_references_fall_back_to_openpyxl() -> None:
+    source = _package()
+    with zipfile.ZipFile(io.BytesIO(source)) as zin:
+        members = {info.filename: zin.read(info) for info in zin.infolist()}
+    members["xl/worksheets/sheet1.xml"] = members["xl/worksheets/sheet1.xml"].replace(b' r="A2"', b"")
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zout:
+        for name, payload in members.items():
+            zout.writestr(name, payload)
+
+    assert mutate_string_cells(buf, sheet="Data", all_sheets=False, selected_columns=[], mutate=_strip) is None
+    output, _ = apply_value_mutation_inplace(
+        buf, "book.xlsx", sheet="Data", all_sheets=False, selected_columns=[], mutate=_strip
+    )
+    assert openpyxl.load_workbook(io.BytesIO(output))["Data"]["A2"].value == "both"
+
+
+def test_formula_cells_get_the_same_treatment_on_both_paths() -> None:
+    source = _package()
+
+    def upper(value):
+        return value.upper() if isinstance(value, str) else value
+
+    # A formula in a targeted column: the XML path declines so openpyxl, which
+    # passes formula text to ``mutate``, handles the whole edit.
+    assert mutate_string_cells(
+        io.BytesIO(source), sheet="Data", all_sheets=False, selected_columns=["other"], mutate=upper
+    ) is None
+    output, _ = apply_value_mutation_inplace(
+        io.BytesIO(source), "book.xlsx", sheet="Data", all_sheets=False, selected_columns=["other"], mutate=upper
+    )
+    ws = openpyxl.load_workbook(io.BytesIO(output))["Data"]
+    assert (ws["B2"].value, ws["B3"].value, ws["A2"].value) == (" BOTH ", "=A3", " both ")
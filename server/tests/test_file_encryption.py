@@ -0,0 +1,148 @@
+"""Tests for the envelope encryption in ``app.services.file_encryption``."""
+
+from __future__ import annotations
+
+import io
+import os
+
+import pytest
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from app.core.config import get_settings
+from app.services import file_encryption
+from app.services.file_encryption import (
+    CHUNK_SIZE,
+    StreamDecryptor,
+    StreamEncryptor,
+    decrypt_file,
+    encrypt_file,
+)
+
+_KEK = bytes(range(32))
+_RECORD = CHUNK_SIZE + 16
+
+
+@pytest.fixture(autouse=True)
+def _kek(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(get_settings(), "file_encryption_key", _KEK.hex())
+
+
+def _legacy_encrypt(plaintext: bytes) -> tuple[bytes, bytes]:
+    """The single-shot layout ``encrypt_file`` wrote before files were chunked."""
+    dek = AESGCM.generate_key(bit_length=256)
+    file_nonce = os.urandom(12)
+    dek_nonce = os.urandom(12)
+    ciphertext = AESGCM(dek).encrypt(file_nonce, plaintext, None)
+    encrypted_dek = AESGCM(_KEK).encrypt(dek_nonce, dek, None)
+    return ciphertext, dek_nonce + encrypted_dek + file_nonce
+
+
+def _stream(blob: bytes, ciphertext: bytes, piece: int) -> bytes:
+    decryptor = StreamDecryptor(blob)
+    out = [decryptor.update(ciphertext[i:i + piece]) for i in range(0, len(ciphertext), piece)]
+    return b"".join(out) + decryptor.finalize()
+
+
+@pytest.mark.parametrize("size", [0, 1, CHUNK_SIZE - 1, CHUNK_SIZE, CHUNK_SIZE + 1, 3 * CHUNK_SIZE + 5])
+def test_round_trip(size: int) -> None:
+    plaintext = os.urandom(size)
+    ciphertext, blob = encrypt_file(plaintext)
+
+    assert len(blob) == 73
+    assert len(ciphertext) == size + 16 * max(1, -(-size // CHUNK_SIZE))
+    assert decrypt_file(ciphertext, blob) == plaintext
+    assert _stream(blob, ciphertext, 1000) == plaintext
+
+
+def test_stream_releases_chunks_before_the_end() -> None:
+    plaintext = os.urandom(3 * CHUNK_SIZE)
+    ciphertext, blob = encrypt_file(plaintext)
+    decryptor = StreamDecryptor(blob)
+
+    assert decryptor.update(ciphertext[: 2 * _RECORD]) == plaintext[:CHUNK_SIZE]
+    assert decryptor.update(ciphertext[2 * _RECORD:]) == plaintext[CHUNK_SIZE: 2 * CHUNK_SIZE]
+    assert decryptor.finalize() == plaintext[2 * CHUNK_SIZE:]
+
+
+def test_legacy_blob_is_still_readable() -> None:
+    plaintext = os.urandom(CHUNK_SIZE + 100)
+    ciphertext, blob = _legacy_encrypt(plaintext)
+
+    assert decrypt_file(ciphertext, blob) == plaintext
+    assert _stream(blob, ciphertext, 4096) == plaintext
+
+
+def test_truncation_at_a_chunk_boundary_is_detected() -> None:
+    ciphertext, blob = encrypt_file(os.urandom(2 * CHUNK_SIZE + 10))
+
+    with pytest.raises(InvalidTag):
+        decrypt_file(ciphertext[: 2 * _RECORD], blob)
+
+
+def test_reordered_chunks_are_detected() -> None:
+    ciphertext, blob = encrypt_file(os.urandom(3 * CHUNK_SIZE))
+    swapped = ciphertext[_RECORD: 2 * _RECORD] + ciphertext[:_RECORD] + ciphertext[2 * _RECORD:]
+
+    with pytest.raises(InvalidTag):
+        decrypt_file(swapped, blob)
+
+
+def test_wrong_kek_fails_before_any_ciphertext(monkeypatch: pytest.MonkeyPatch) -> None:
+    _, blob = encrypt_file(b"data")
+    monkeypatch.setattr(get_settings(), "file_encryption_key", "cd" * 32)
+
+    with pytest.raises(InvalidTag):
+        StreamDecryptor(blob)
+
+
+def test_unknown_blob_layout_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        StreamDecryptor(b"\x00" * 50)
+    with pytest.raises(ValueError):
+        StreamDecryptor(b"\x07" + b"\x00" * 72)
+
+
+def test_chunk_size_comes_from_the_blob(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(file_encryption, "CHUNK_SIZE", 1000)
+    plaintext = os.urandom(2500)
+    ciphertext, blob = encrypt_file(plaintext)
+    monkeypatch.undo()
+    monkeypatch.setattr(get_settings(), "file_encryption_key", _KEK.hex())
+
+    assert len(ciphertext) == 2500 + 3 * 16
+    assert _stream(blob, ciphertext, 7) == plaintext
+
+
+class _ShortReads(io.BytesIO):
+    """A handle that returns at most 1000 bytes per ``read``, like a pipe or socket might."""
+
+    def read(self, size: int | None = -1) -> bytes:
+        return super().read(1000 if size is None or size < 0 else min(size, 1000))
+
+
+@pytest.mark.parametrize("size", [0, CHUNK_SIZE, 2 * CHUNK_SIZE + 7])
+def test_stream_encryptor_reads_a_handle_in_chunks(size: int) -> None:
+    plaintext = os.urandom(size)
+    source = _ShortReads(plaintext)
+    source.seek(size)  # encryption always starts from the beginning
+    encryptor = StreamEncryptor()
+
+    sealed = list(encryptor.encrypt_stream(source))
+
+    assert all(len(chunk) <= _RECORD for chunk in sealed)
+    ciphertext = b"".join(sealed)
+    assert len(ciphertext) == encryptor.ciphertext_size(size)
+    assert decrypt_file(ciphertext, encryptor.blob) == plaintext
+
+
+def test_kek_is_parsed_once_per_configured_value(monkeypatch: pytest.MonkeyPatch) -> None:
+    file_encryption._kek_cipher.cache_clear()
+    encrypt_file(b"a")
+    encrypt_file(b"b")
+    assert file_encryption._kek_cipher.cache_info().misses == 1
+
+    monkeypatch.setattr(get_settings(), "file_encryption_key", "cd" * 32)
+    ciphertext, blob = encrypt_file(b"c")
+    assert file_encryption._kek_cipher.cache_info().misses == 2
+    assert decrypt_file(ciphertext, blob) == b"c"
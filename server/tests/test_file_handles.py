@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import io
+import os
+
+import openpyxl
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.core.app_factory import create_app
+from app.core.limits import ANON_MAX_UPLOAD_BYTES
+from app.core.quota_guard import enforce_quota
+from app.services import file_handles
+from app.services.file_handles import FileHandleStore
+
+_XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _xlsx_bytes(*values: str) -> bytes:
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Sheet1"
+    ws.append(["name"])
+    for value in values:
+        ws.append([value])
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+async def _put(store: FileHandleStore, owner: str, data: bytes, max_handles: int = 10):
+    return await store.put(
+        owner=owner,
+        filename="book.xlsx",
+        content_type=_XLSX_MIME,
+        source=io.BytesIO(data),
+        max_handles=max_handles,
+    )
+
+
+@pytest.mark.asyncio
+async def test_store_expires_idle_handles_and_evicts_least_recently_used(tmp_path) -> None:
+    clock = _Clock()
+    store = FileHandleStore(str(tmp_path), ttl_seconds=60, max_total_bytes=25, clock=clock)
+
+    first = await _put(store, "ip:a", b"x" * 10, max_handles=2)
+    second = await _put(store, "ip:a", b"y" * 10, max_handles=2)
+    clock.now = 50
+    assert store.get(first.token, owner="ip:a") is first
+    assert store.get(first.token, owner="ip:b") is None
+
+    # Third handle for the same owner: the least recently used one (second) goes.
+    third = await _put(store, "ip:a", b"z" * 5, max_handles=2)
+    assert store.get(second.token, owner="ip:a") is None
+    assert not os.path.exists(second.path)
+
+    # Over the byte budget: evicted in LRU order regardless of owner.
+    other = await _put(store, "ip:b", b"w" * 12)
+    assert store.get(first.token, owner="ip:a") is None
+    assert store.get(third.token, owner="ip:a") is third
+
+    clock.now = 200
+    assert store.get(other.token, owner="ip:b") is None
+    assert store.stats() == {
+        "handles": 0,
+        "bytes": 0,
+        "max_bytes": 25,
+        "ttl_seconds": 60,
+        "expirations": 2,
+        "evictions": 2,
+    }
+    assert os.listdir(os.path.dirname(third.path)) == [".lock"]
+
+
+@pytest.mark.asyncio
+async def test_store_removes_spool_dirs_of_exited_workers_only(tmp_path) -> None:
+    stale = tmp_path / "proc-exited"
+    stale.mkdir()
+    (stale / ".lock").write_bytes(b"")
+    (stale / "fh-old").write_bytes(b"old")
+    starting = tmp_path / "proc-starting"  # no lock yet: not ours to judge
+    starting.mkdir()
+    (tmp_path / "unrelated.txt").write_bytes(b"keep")
+    live = FileHandleStore(str(tmp_path), ttl_seconds=60, max_total_bytes=100)
+    handle = await _put(live, "ip:a", b"data")
+
+    # A second worker sharing the directory leaves the live one's handles alone.
+    FileHandleStore(str(tmp_path), ttl_seconds=60, max_total_bytes=100)
+
+    assert not stale.exists()
+    assert starting.exists()
+    assert (tmp_path / "unrelated.txt").exists()
+    assert live.get(handle.token, owner="ip:a") is handle
+    assert open(handle.path, "rb").read() == b"data"
+    assert len([name for name in os.listdir(tmp_path) if name.startswith("proc-")]) == 3
+
+
+@pytest.fixture()
+async def client(tmp_path, monkeypatch):
+    store = FileHandleStore(str(tmp_path), ttl_seconds=60, max_total_bytes=10 * 1024 * 1024)
+    monkeypatch.setattr(file_handles, "_store", store)
+    app = create_app()
+    app.dependency_overrides[enforce_quota] = lambda: None
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+
+
+async def _upload(client: AsyncClient, data: bytes, **kwargs) -> str:
+    response = await client.post(
+        "/api/v1/tools/files",
+        files={"file": ("book.xlsx", data, _XLSX_MIME)},
+        **kwargs,
+    )
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["filename"] == "book.xlsx"
+    assert body["size"] == len(data)
+    assert body["expires_in"] == 60
+    return body["file_token"]
+
+
+@pytest.mark.asyncio
+async def test_tools_accept_a_file_token_instead_of_the_upload(client) -> None:
+    token = await _upload(client, _xlsx_bytes(" alice ", "bob"))
+
+    csv_response = await client.post(
+        "/api/v1/tools/convert/xlsx-to-csv",
+        params={"sheet": "Sheet1"},
+        data={"file_token": token},
+    )
+    assert csv_response.status_code == 200, csv_response.text
+    assert csv_response.text.splitlines() == ["name", " alice ", "bob"]
+
+    trimmed = await client.post(
+        "/api/v1/tools/clean/trim-spaces",
+        data={"file_token": token, "all_sheets": "true"},
+    )
+    assert trimmed.status_code == 200, trimmed.text
+    ws = openpyxl.load_workbook(io.BytesIO(trimmed.content)).active
+    assert [c.value for c in ws["A"]] == ["name", "alice", "bob"]
+
+    compared = await client.post(
+        "/api/v1/tools/analyze/compare-workbooks",
+        data={"file_a_token": token},
+        files={"file_b": ("b.xlsx", _xlsx_bytes("alice", "bob"), _XLSX_MIME)},
+    )
+    assert compared.status_code == 200, compared.text
+    assert compared.headers["X-Total-Changed"] == "1"
+
+
+@pytest.mark.asyncio
+async def test_file_tokens_are_private_to_the_uploader_and_can_be_deleted(client) -> None:
+    token = await _upload(client, _xlsx_bytes("a"), headers={"X-Forwarded-For": "10.0.0.1"})
+
+    stranger = await client.post(
+        "/api/v1/tools/inspect/preview",
+        data={"file_token": token},
+        headers={"X-Forwarded-For": "10.0.0.2"},
+    )
+    assert stranger.status_code == 404
+    assert stranger.json()["error_code"] == "FILE_TOKEN_NOT_FOUND"
+
+    deleted = await client.delete(
+        f"/api/v1/tools/files/{token}", headers={"X-Forwarded-For": "10.0.0.1"}
+    )
+    assert deleted.status_code == 204
+    gone = await client.post(
+        "/api/v1/tools/inspect/preview",
+        data={"file_token": token},
+        headers={"X-Forwarded-For": "10.0.0.1"},
+    )
+    assert gone.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_file_or_token_rejects_both_or_neither(client) -> None:
+    token = await _upload(client, _xlsx_bytes("a"))
+
+    neither = await client.post("/api/v1/tools/clean/trim-spaces", data={"all_sheets": "true"})
+    both = await client.post(
+        "/api/v1/tools/clean/trim-spaces",
+        data={"all_sheets": "true", "file_token": token},
+        files={"file": ("book.xlsx", _xlsx_bytes("a"), _XLSX_MIME)},
+    )
+    assert (neither.status_code, both.status_code) == (400, 400)
+
+
+@pytest.mark.asyncio
+async def test_file_handle_upload_enforces_the_tier_size_cap(client) -> None:
+    response = await client.post(
+        "/api/v1/tools/files",
+        files={"file": ("big.xlsx", b"x" * (ANON_MAX_UPLOAD_BYTES + 1), _XLSX_MIME)},
+    )
+    assert response.status_code == 413
+    assert response.json()["error_code"] == "ANON_FILE_TOO_LARGE"
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import io
+
+import openpyxl
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.core.app_factory import create_app
+from app.core.quota_guard import enforce_quota
+from app.services.workbook_cache import ParsedWorkbook
+from app.tools.inspect import preview as preview_module
+from app.tools.inspect._columnar import ColumnarSheet
+
+_XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def test_columnar_sheet_round_trips_values_types_and_ragged_rows() -> None:
+    rows = [
+        ["id", "price", "name", "flag", "when", "mixed"],
+        [1, 2.5, "a", True, datetime.datetime(2024, 1, 2), 1],
+        [2**70, None, "a", False, None, 1.0],
+        [None, float("inf"), None, True, datetime.date(2024, 5, 1), True],
+        [3],
+        [],
+        [4, 0.0, "b", None, None, "x", "extra"],
+    ]
+    sheet = ColumnarSheet(rows)
+
+    restored = sheet.rows()
+    assert restored == rows
+    assert [[type(v) for v in row] for row in restored] == [[type(v) for v in row] for row in rows]
+    assert sheet.rows(2, 4) == rows[2:4]
+    assert sheet.rows(5, 100) == rows[5:]
+    assert sheet.rows(100, 200) == []
+    assert sheet.row(0) == rows[0]
+    with pytest.raises(IndexError):
+        sheet.row(len(rows))
+
+
+def test_columnar_sheet_is_much_smaller_than_row_tuples() -> None:
+    rows = [["id", "amount", "status", "note"]] + [
+        [i, i * 1.5, ("open", "closed", "pending")[i % 3], None if i % 2 else f"n{i % 50}"]
+        for i in range(20_000)
+    ]
+    sheet = ColumnarSheet(rows)
+    assert sheet.nbytes * 4 < ParsedWorkbook.from_lists({"s": rows}).size
+
+
+@pytest.mark.asyncio
+async def test_page_sheet_slices_rows_from_the_stored_sheet() -> None:
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Data"
+    ws.append(["n", "label"])
+    for i in range(1, 8):
+        ws.append([i, f"row {i}" if i % 2 else None])
+    buf = io.BytesIO()
+    wb.save(buf)
+
+    app = create_app()
+    app.dependency_overrides[enforce_quota] = lambda: None
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        preview = await client.post(
+            "/api/v1/tools/inspect/preview",
+            params={"sample_rows": 2},
+            files={"file": ("book.xlsx", buf.getvalue(), _XLSX_MIME)},
+        )
+        assert preview.status_code == 200, preview.text
+        sheet = preview.json()["sheets"][0]
+        assert sheet["headers"] == ["n", "label"]
+        assert sheet["sample"] == [[1, "row 1"], [2, None]]
+
+        page = await client.get(
+            "/api/v1/tools/inspect/sheet",
+            params={"token": preview.json()["token"], "sheet": "Data", "offset": 5, "limit": 5},
+        )
+        await asyncio.gather(*preview_module._indexing_tasks)
+
+    body = page.json()
+    assert body["rows"] == [[6, None], [7, "row 7"]]
+    assert body["header"] == ["n", "label"]
+    assert (body["total_rows"], body["done"]) == (8, True)
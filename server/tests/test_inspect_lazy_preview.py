@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import asyncio
+import io
+
+import openpyxl
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.core.app_factory import create_app
+from app.core.quota_guard import enforce_quota
+from app.tools.inspect import _store
+from app.tools.inspect import preview as preview_module
+from app.tools.inspect._indexing import _CHUNK_ROWS, IndexingSheet
+
+_XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def _workbook(rows: int) -> bytes:
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Data"
+    ws.append(["n", "label"])
+    for i in range(1, rows + 1):
+        ws.append([i, f"row {i}"])
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+@pytest.mark.asyncio
+async def test_indexing_sheet_pages_across_chunks_and_waits_for_missing_rows() -> None:
+    loop = asyncio.get_running_loop()
+    sheet = IndexingSheet(loop)
+    rows = [[i, f"r{i}"] for i in range(_CHUNK_ROWS * 2 + 10)]
+    waiter = asyncio.ensure_future(sheet.wait_for(_CHUNK_ROWS + 5))
+    await asyncio.sleep(0)
+    assert not waiter.done()
+
+    await loop.run_in_executor(None, sheet.index_rows, iter(rows))
+    await waiter
+    await sheet.wait_for(len(rows) + 100)
+
+    assert sheet.complete and len(sheet) == len(rows)
+    assert sheet.rows(_CHUNK_ROWS - 2, _CHUNK_ROWS + 2) == rows[_CHUNK_ROWS - 2 : _CHUNK_ROWS + 2]
+    assert sheet.rows(len(rows) - 3, len(rows) + 50) == rows[-3:]
+    assert sheet.row(_CHUNK_ROWS * 2) == rows[_CHUNK_ROWS * 2]
+
+
+@pytest.mark.asyncio
+async def test_indexing_sheet_reraises_worker_errors_to_waiting_pages() -> None:
+    loop = asyncio.get_running_loop()
+    sheet = IndexingSheet(loop)
+    waiter = asyncio.ensure_future(sheet.wait_for(10))
+    await loop.run_in_executor(None, sheet.fail, ValueError("broken sheet"))
+    with pytest.raises(ValueError, match="broken sheet"):
+        await waiter
+
+
+@pytest.mark.asyncio
+async def test_preview_reports_dimension_totals_and_pages_wait_for_indexing() -> None:
+    app = create_app()
+    app.dependency_overrides[enforce_quota] = lambda: None
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        preview = await client.post(
+            "/api/v1/tools/inspect/preview",
+            params={"sample_rows": 3},
+            files={"file": ("book.xlsx", _workbook(_CHUNK_ROWS + 500), _XLSX_MIME)},
+        )
+        assert preview.status_code == 200, preview.text
+        sheet = preview.json()["sheets"][0]
+        assert sheet["headers"] == ["n", "label"]
+        assert sheet["sample"] == [[1, "row 1"], [2, "row 2"], [3, "row 3"]]
+        assert sheet["total_rows"] == _CHUNK_ROWS + 501
+
+        token = preview.json()["token"]
+        page = await client.get(
+            "/api/v1/tools/inspect/sheet",
+            params={"token": token, "sheet": "Data", "offset": _CHUNK_ROWS + 450, "limit": 100},
+        )
+        body = page.json()
+        assert body["rows"][0] == [_CHUNK_ROWS + 451, f"row {_CHUNK_ROWS + 451}"]
+        assert (len(body["rows"]), body["total_rows"], body["done"]) == (50, _CHUNK_ROWS + 501, True)
+
+        await asyncio.gather(*preview_module._indexing_tasks)
+        entry = _store._WORKBOOK_STORE.get(token)
+        assert entry is not None and entry.size > 0
+        assert entry.sheet_totals == {"Data": _CHUNK_ROWS + 501}
+
+
+@pytest.mark.asyncio
+async def test_preview_of_a_sheet_shorter_than_the_sample_is_complete_at_once() -> None:
+    app = create_app()
+    app.dependency_overrides[enforce_quota] = lambda: None
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        preview = await client.post(
+            "/api/v1/tools/inspect/preview",
+            params={"sample_rows": 10},
+            files={"file": ("book.xlsx", _workbook(4), _XLSX_MIME)},
+        )
+        await asyncio.gather(*preview_module._indexing_tasks)
+    sheet = preview.json()["sheets"][0]
+    assert (len(sheet["sample"]), sheet["total_rows"]) == (4, 5)
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import io
+import time
+from array import array
+
+import openpyxl
+import pytest
+from fastapi import HTTPException
+from httpx import ASGITransport, AsyncClient
+
+from app.core.app_factory import create_app
+from app.core.quota_guard import enforce_quota
+from app.tools.inspect import _query
+from app.tools.inspect import preview as preview_module
+from app.tools.inspect._columnar import ColumnarSheet
+from app.tools.inspect._query import SheetIndex, fetch_rows, parse_query
+
+_XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+_ROWS = [
+    ["id", "amount", "status", "when"],
+    [1, 10.5, "Open", datetime.datetime(2024, 3, 1)],
+    [2, None, "closed", datetime.datetime(2024, 1, 1)],
+    [3, 7, "open", None],
+    [4, "n/a", "Pending review", datetime.datetime(2024, 2, 1)],
+    [5, 10.5, None, datetime.datetime(2023, 12, 31)],
+    [6, -2],
+]
+
+
+def _run(index: SheetIndex, *, filters=None, sort=None, search=None, regex=False) -> list[int]:
+    return [i + 1 for i in index.run(parse_query(filters, sort, search, regex))]
+
+
+def test_filters_compare_within_their_kind_and_text_case_insensitively() -> None:
+    index = SheetIndex(ColumnarSheet(_ROWS))
+    assert _run(index, filters=["status=open"]) == [1, 3]
+    assert _run(index, filters=["amount>7"]) == [1, 5]
+    assert _run(index, filters=["amount<=7"]) == [3, 6]
+    assert _run(index, filters=["amount!=10.5"]) == [2, 3, 4, 6]
+    assert _run(index, filters=["when>=2024-01-15"]) == [1, 4]
+    assert _run(index, filters=["status~EN", "amount>0"]) == [1, 3]
+    assert _run(index, filters=["amount=n/a"]) == [4]
+
+
+def test_sort_keeps_blanks_last_in_both_directions_and_ties_stable() -> None:
+    index = SheetIndex(ColumnarSheet(_ROWS))
+    # Numbers, then text; blanks last.
+    assert _run(index, sort=["amount"]) == [6, 3, 1, 5, 4, 2]
+    assert _run(index, sort=["-amount"]) == [4, 1, 5, 3, 6, 2]
+    assert _run(index, sort=["-amount", "-id"]) == [4, 5, 1, 3, 6, 2]
+    assert _run(index, filters=["id>1"], sort=["-when"]) == [4, 2, 5, 3, 6]
+
+
+def test_search_matches_any_column_as_text_or_regex() -> None:
+    index = SheetIndex(ColumnarSheet(_ROWS))
+    assert _run(index, search="OPEN") == [1, 3]
+    assert _run(index, search="2024-02") == [4]
+    assert _run(index, search=r"^(closed|pending)", regex=True) == [2, 4]
+    assert _run(index, search=r"^10\.5$", regex=True) == [1, 5]
+
+
+def test_repeat_queries_reuse_the_built_indexes(monkeypatch) -> None:
+    rows = [["n", "label"]] + [[i % 97, f"label {i}"] for i in range(5000)]
+    sheet = ColumnarSheet(rows)
+    index = SheetIndex(sheet)
+    scans = []
+    original = SheetIndex._values
+    monkeypatch.setattr(SheetIndex, "_values", lambda self, column: scans.append(column) or original(self, column))
+
+    first = index.run(parse_query(["n>=90"], ["-label"], None, False))
+    again = index.run(parse_query(["n>=90"], ["-label"], None, False))
+    index.run(parse_query(["n<5"], ["label"], "label 4", False))
+    assert again is first
+    assert sorted(scans) == [0, 0, 1, 1]  # sort and search index per column, once each
+    assert fetch_rows(sheet, first[:3]) == [rows[1 + i] for i in first[:3]]
+    assert index.nbytes > 0
+
+
+def test_parse_query_rejects_malformed_parameters() -> None:
+    assert parse_query(None, None, "", False) is None
+    for args in ((["no operator"], None, None, False), (None, ["-"], None, False), (None, None, "(", True)):
+        with pytest.raises(HTTPException) as exc:
+            parse_query(*args)
+        assert exc.value.status_code == 400
+
+
+def test_regex_search_on_a_long_cell_stays_fast() -> None:
+    # Without the per-cell cap this is O(n^2) on 30k characters: tens of seconds.
+    index = SheetIndex(ColumnarSheet([["text"], ["a" * 30_000], ["b" + "a" * 30_000 + "x"]]))
+    query = parse_query(None, None, r".?.?.?.*x", True)
+    started = time.perf_counter()
+    assert index.run(query) == array("I")
+    assert time.perf_counter() - started < 2.0
+
+
+def test_regex_search_rejects_backtracking_patterns_and_stops_at_the_deadline(monkeypatch) -> None:
+    for pattern in (r"(a+)+$", r"(a|aa)*b", r"(x)\1", r"(?=a)b", r".*.*.*.*x", r"a+b*", r"x?x?x?x?x?"):
+        with pytest.raises(HTTPException, match="Unsupported search pattern") as exc:
+            parse_query(None, None, pattern, True)
+        assert exc.value.status_code == 400
+    assert parse_query(None, None, r"^[a-z.]+@example\.com$", True) is not None
+    assert parse_query(None, None, r"\d{3}-\d{4} ?ext", True) is not None
+
+    index = SheetIndex(ColumnarSheet([["text"]] + [["a" * 50 + "b"]] * 100))
+    monkeypatch.setattr(_query, "_REGEX_SEARCH_SECONDS", -1.0)
+    with pytest.raises(HTTPException, match="too slow") as exc:
+        index.run(parse_query(None, None, r"a*c", True))
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_page_sheet_filters_sorts_and_pages_through_the_result() -> None:
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Data"
+    ws.append(["n", "group"])
+    for i in range(1, 201):
+        ws.append([i, "even" if i % 2 == 0 else "odd"])
+    buf = io.BytesIO()
+    wb.save(buf)
+
+    app = create_app()
+    app.dependency_overrides[enforce_quota] = lambda: None
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        preview = await client.post(
+            "/api/v1/tools/inspect/preview",
+            files={"file": ("book.xlsx", buf.getvalue(), _XLSX_MIME)},
+        )
+        params = {
+            "token": preview.json()["token"],
+            "sheet": "Data",
+            "filter": ["group=EVEN", "n>100"],
+            "sort": "-n",
+            "limit": 30,
+        }
+        first = (await client.get("/api/v1/tools/inspect/sheet", params=params)).json()
+        last = (await client.get("/api/v1/tools/inspect/sheet", params={**params, "offset": 30})).json()
+        bad = await client.get("/api/v1/tools/inspect/sheet", params={**params, "sort": "-missing"})
+        await asyncio.gather(*preview_module._indexing_tasks)
+
+    assert first["rows"][:2] == [[200, "even"], [198, "even"]]
+    assert (first["matched_rows"], first["done"], first["total_rows"]) == (50, False, 201)
+    assert first["row_indexes"][0] == 199
+    assert last["rows"][-1] == [102, "even"]
+    assert (len(last["rows"]), last["done"]) == (20, True)
+    assert bad.status_code == 400
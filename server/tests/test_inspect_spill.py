@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import io
+import os
+import time
+
+import openpyxl
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.core.app_factory import create_app
+from app.core.quota_guard import enforce_quota
+from app.tools.inspect import _spill, _store
+from app.tools.inspect import preview as preview_module
+from app.tools.inspect._columnar import ColumnarSheet
+from app.tools.inspect._spill import SpilledSheet, SpillStore, write_sheet_file
+
+_XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def test_sheet_file_round_trips_rows_and_seeks_to_any_offset(tmp_path) -> None:
+    rows = [
+        ["id", "when", "ok", "note"],
+        [1, datetime.datetime(2024, 1, 2, 3, 4, 5), True, "héllo"],
+        [2**80, datetime.date(2024, 2, 29), False, None],
+        [-3.5, datetime.time(12, 30), None, ""],
+        [datetime.timedelta(days=1, microseconds=7)],
+        [],
+    ] + [[i, f"row {i}"] for i in range(5000)]
+    path = tmp_path / "0.rows"
+    with open(path, "wb") as out:
+        write_sheet_file(out, ColumnarSheet(rows))
+
+    sheet = SpilledSheet(str(path))
+    assert len(sheet) == len(rows)
+    assert sheet.rows(0, 6) == rows[:6]
+    assert sheet.rows(4000, 4003) == rows[4000:4003]
+    assert sheet.row(len(rows) - 1) == rows[-1]
+    assert sheet.rows() == rows
+    sheet.close()
+
+    with open(tmp_path / "empty.rows", "wb") as out:
+        write_sheet_file(out, ColumnarSheet([]))
+    assert SpilledSheet(str(tmp_path / "empty.rows")).rows() == []
+
+
+def test_spill_store_expires_and_keeps_under_its_byte_budget(tmp_path) -> None:
+    sheets = {"S": ColumnarSheet([["n"]] + [[i] for i in range(1000)])}
+    store = SpillStore(str(tmp_path), max_bytes=10**9, ttl_seconds=60)
+    store.save("token-old", sheets, {"S": 1001})
+    store.save("token-new", sheets, {"S": 1001})
+
+    loaded = store.load("token-new")
+    assert loaded is not None and loaded.sheet_totals == {"S": 1001}
+    assert loaded["S"].rows(1, 3) == [[0], [1]]
+    assert store.load("../token-new") is None
+
+    stale = time.time() - 120
+    os.utime(tmp_path / "token-old" / "meta.json", (stale, stale))
+    assert store.load("token-old") is None
+    store.cleanup()
+    assert sorted(os.listdir(tmp_path)) == ["token-new"]
+
+    one = sum(entry.stat().st_size for entry in os.scandir(tmp_path / "token-new"))
+    tight = SpillStore(str(tmp_path), max_bytes=one, ttl_seconds=60)
+    os.utime(tmp_path / "token-new" / "meta.json", (stale + 100, stale + 100))
+    tight.save("token-latest", sheets, {"S": 1001})
+    assert sorted(os.listdir(tmp_path)) == ["token-latest"]
+
+
+def test_spill_directory_is_private(tmp_path) -> None:
+    directory = tmp_path / "spill"
+    SpillStore(str(directory), max_bytes=10**9, ttl_seconds=60)
+
+    assert directory.stat().st_mode & 0o777 == 0o700
+
+
+@pytest.mark.asyncio
+async def test_page_sheet_falls_back_to_the_disk_tier(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(_spill, "_spill", SpillStore(str(tmp_path), max_bytes=10**9, ttl_seconds=60))
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Data"
+    ws.append(["n", "label"])
+    for i in range(1, 301):
+        ws.append([i, f"row {i}"])
+    buf = io.BytesIO()
+    wb.save(buf)
+
+    app = create_app()
+    app.dependency_overrides[enforce_quota] = lambda: None
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        preview = await client.post(
+            "/api/v1/tools/inspect/preview",
+            files={"file": ("book.xlsx", buf.getvalue(), _XLSX_MIME)},
+        )
+        token = preview.json()["token"]
+        await asyncio.gather(*preview_module._indexing_tasks)
+        # As if the page request landed on another worker, or memory evicted it.
+        _store._WORKBOOK_STORE._drop(token)
+        page = await client.get(
+            "/api/v1/tools/inspect/sheet",
+            params={"token": token, "sheet": "Data", "offset": 250, "limit": 100},
+        )
+
+    body = page.json()
+    assert body["header"] == ["n", "label"]
+    assert body["rows"][0] == [251, "row 251"]
+    assert (len(body["rows"]), body["total_rows"], body["done"]) == (50, 301, True)
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from app.tools.inspect._columnar import ColumnarSheet
+from app.tools.inspect._store import _WorkbookStore
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _sheets(rows: int) -> dict[str, ColumnarSheet]:
+    return {"Sheet1": ColumnarSheet([["n"]] + [[i] for i in range(rows)])}
+
+
+def _put(store: _WorkbookStore, token: str, rows: int, totals: dict[str, int]) -> None:
+    sheets = _sheets(rows)
+    store.put(token, sheets, totals, size=sheets["Sheet1"].nbytes)
+
+
+def test_store_evicts_least_recently_used_and_tracks_bytes() -> None:
+    clock = _Clock()
+    one = _sheets(10)["Sheet1"].nbytes
+    store = _WorkbookStore(max_entries=3, max_bytes=one * 3, ttl_seconds=60, clock=clock)
+
+    for token in ("a", "b", "c"):
+        _put(store, token, 10, {"Sheet1": 11})
+    assert store.get("a") is not None  # a becomes most recent
+
+    _put(store, "d", 10, {"Sheet1": 11})  # over the entry cap: b goes
+    assert [t for t in "abcd" if store.get(t)] == ["a", "c", "d"]
+
+    _put(store, "big", 1000, {})  # larger than the whole budget: everything else goes
+    assert len(store) == 1
+    assert store.total_bytes == store.get("big").size
+
+    _put(store, "big", 10, {})  # replacing a token does not leak its bytes
+    assert store.total_bytes == one
+
+
+def test_store_expires_idle_entries_and_reads_refresh_the_ttl() -> None:
+    clock = _Clock()
+    store = _WorkbookStore(max_entries=10, max_bytes=10**9, ttl_seconds=60, clock=clock)
+    _put(store, "kept", 5, {})
+    _put(store, "idle", 5, {})
+
+    clock.now = 50
+    assert store.get("kept") is not None
+    clock.now = 100
+    assert store.get("idle") is None
+    assert store.get("kept") is not None
+
+    clock.now = 200
+    _put(store, "new", 5, {})
+    assert len(store) == 1
+    assert store.total_bytes == store.get("new").size
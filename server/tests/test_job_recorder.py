@@ -0,0 +1,343 @@
+"""Tests for the background job-recording queue.
+
+Storage and the database are replaced by in-memory fakes: ``FakeStorage``
+keeps uploaded objects and can be made to fail or stall, and
+``FakeDatabase`` compiles each multi-row ``INSERT`` for PostgreSQL and keeps
+the rows it carries, so the tests can check how inserts were batched.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import uuid
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import BackgroundTasks
+from sqlalchemy.dialects import postgresql
+
+from app.core.config import get_settings
+from app.core.security import AuthenticatedPrincipal
+from app.services.file_encryption import decrypt_file
+from app.services.job_recorder import JobRecorder
+from app.services import job_recorder as job_recorder_module
+from app.tools._recording import record_and_respond
+
+
+@pytest.fixture(autouse=True)
+def _kek(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(get_settings(), "file_encryption_key", "ab" * 32)
+
+
+class FakeStorage:
+    def __init__(self, *, failures: int = 0, gate: asyncio.Event | None = None) -> None:
+        self.objects: dict[str, bytes] = {}
+        self.deleted: list[str] = []
+        self.uploads = 0
+        self.failures = failures
+        self.gate = gate
+
+    async def upload(self, *, object_path: str, content: Any, mime_type: str, content_length: int | None = None) -> str:
+        self.uploads += 1
+        if self.gate is not None:
+            await self.gate.wait()
+        body = b"".join([chunk async for chunk in content])
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("storage unavailable")
+        assert content_length == len(body)
+        self.objects[object_path] = body
+        return object_path
+
+    async def delete(self, object_path: str) -> None:
+        self.deleted.append(object_path)
+        self.objects.pop(object_path, None)
+
+
+class FakeDatabase:
+    def __init__(self, *, fail: bool = False, reject_user: uuid.UUID | None = None) -> None:
+        self.batches: list[list[dict[str, Any]]] = []
+        self.deleted_paths: set[str] = set()
+        self.fail = fail
+        self.reject_user = reject_user
+
+    def session(self) -> "FakeSession":
+        return FakeSession(self)
+
+
+class FakeSession:
+    def __init__(self, db: FakeDatabase) -> None:
+        self.db = db
+        self.rows: list[dict[str, Any]] = []
+
+    async def __aenter__(self) -> "FakeSession":
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        return None
+
+    async def execute(self, stmt: Any) -> Any:
+        params = stmt.compile(dialect=postgresql.dialect()).params
+        if "content_hash_1" in params:
+            # The stored-output lookup: the newest committed row with that digest.
+            match = next(
+                (
+                    SimpleNamespace(**row)
+                    for batch in reversed(self.db.batches)
+                    for row in batch
+                    if row["user_id"] == params["user_id_1"]
+                    and row["content_hash"] == params["content_hash_1"]
+                    and row["storage_path"] not in self.db.deleted_paths
+                ),
+                None,
+            )
+            return SimpleNamespace(scalar_one_or_none=lambda: match)
+        if "storage_path_1" in params:
+            # Claiming a reused object: any committed row still pointing at it.
+            path = params["storage_path_1"]
+            held = path not in self.db.deleted_paths and any(
+                row["storage_path"] == path for batch in self.db.batches for row in batch
+            )
+            return SimpleNamespace(scalar_one_or_none=lambda: uuid.uuid4() if held else None)
+        count = sum(1 for key in params if key.startswith("id_m"))
+        rows = [
+            {key[: -len(f"_m{index}")]: value for key, value in params.items() if key.endswith(f"_m{index}")}
+            for index in range(count)
+        ]
+        if self.db.fail or any(row["user_id"] == self.db.reject_user for row in rows):
+            raise RuntimeError("insert failed")
+        self.rows = rows
+
+    async def commit(self) -> None:
+        if self.rows:
+            self.db.batches.append(self.rows)
+            self.rows = []
+
+
+def _recorder(tmp_path, storage: FakeStorage, db: FakeDatabase, **kwargs: Any) -> JobRecorder:
+    options = {"workers": 2, "batch_size": 8, "batch_wait_seconds": 0.05, "retry_base_seconds": 0.0}
+    options.update(kwargs)
+    return JobRecorder(str(tmp_path), session_factory=db.session, storage=storage, **options)
+
+
+async def _submit(recorder: JobRecorder, output: bytes = b"output", user_id: uuid.UUID | None = None) -> uuid.UUID | None:
+    return await recorder.submit(
+        user_id=user_id or uuid.uuid4(),
+        tool_slug="trim-spaces",
+        tool_name="Trim Spaces",
+        original_filename="in.xlsx",
+        output_filename="out.xlsx",
+        output_bytes=output,
+        mime_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        success=True,
+        error_type=None,
+        duration_ms=42,
+    )
+
+
+def _spilled(tmp_path) -> list[str]:
+    return sorted(
+        name for folder in tmp_path.iterdir() for name in os.listdir(folder) if not name.startswith(".")
+    )
+
+
+async def test_burst_is_recorded_in_multi_row_batches(tmp_path) -> None:
+    storage, db = FakeStorage(), FakeDatabase()
+    recorder = _recorder(tmp_path, storage, db)
+    await recorder.start()
+
+    job_ids = await asyncio.gather(*(_submit(recorder, f"output-{i}".encode()) for i in range(30)))
+    await recorder.stop(drain_seconds=5)
+
+    rows = [row for batch in db.batches for row in batch]
+    assert sorted(row["id"] for row in rows) == sorted(job_ids)
+    assert len(db.batches) < 30 and max(len(batch) for batch in db.batches) > 1
+    for row in rows:
+        output = decrypt_file(storage.objects[row["storage_path"]], row["encryption_blob"])
+        assert output.startswith(b"output-") and row["output_size_bytes"] == len(output)
+    assert _spilled(tmp_path) == []
+    stats = recorder.stats()
+    assert stats["recorded"] == 30 and stats["pending"] == 0 and stats["dropped"] == 0
+    assert stats["batches"] == len(db.batches)
+
+
+async def test_uploads_are_retried_with_backoff(tmp_path) -> None:
+    storage, db = FakeStorage(failures=2), FakeDatabase()
+    recorder = _recorder(tmp_path, storage, db)
+    await recorder.start()
+
+    await _submit(recorder)
+    await recorder.stop(drain_seconds=5)
+
+    assert storage.uploads == 3
+    assert recorder.stats()["upload_retries"] == 2
+    assert recorder.recorded == 1
+
+
+async def test_outputs_are_dropped_once_the_queue_is_full(tmp_path) -> None:
+    gate = asyncio.Event()
+    storage, db = FakeStorage(gate=gate), FakeDatabase()
+    recorder = _recorder(tmp_path, storage, db, max_pending=2)
+    await recorder.start()
+
+    assert await _submit(recorder) is not None
+    assert await _submit(recorder) is not None
+    assert await _submit(recorder) is None
+    stats = recorder.stats()
+    assert stats["pending"] == 2 and stats["dropped"] == 1 and stats["oldest_pending_seconds"] >= 0
+
+    gate.set()
+    await recorder.stop(drain_seconds=5)
+    assert recorder.recorded == 2
+
+
+async def test_pending_entries_survive_a_restart(tmp_path) -> None:
+    storage, failing_db = FakeStorage(), FakeDatabase(fail=True)
+    first = _recorder(tmp_path, storage, failing_db, max_attempts=1000, retry_base_seconds=0.01)
+    await first.start()
+    job_ids = [await _submit(first), await _submit(first)]
+    while len(storage.objects) < 2:
+        await asyncio.sleep(0.01)
+    await first.stop(drain_seconds=0.05)
+    assert len(_spilled(tmp_path)) == 4  # an output and a description per entry
+
+    db = FakeDatabase()
+    second = _recorder(tmp_path, storage, db)
+    await second.start()
+    await second.stop(drain_seconds=5)
+
+    assert second.recovered == 2
+    # Already uploaded before the restart: only the rows were left to insert.
+    assert storage.uploads == 2
+    assert sorted(row["id"] for batch in db.batches for row in batch) == sorted(job_ids)
+    assert _spilled(tmp_path) == []
+
+
+async def test_a_live_recorders_directory_is_left_alone(tmp_path) -> None:
+    gate = asyncio.Event()
+    storage = FakeStorage(gate=gate)
+    owner = _recorder(tmp_path, storage, FakeDatabase())
+    await owner.start()
+    await _submit(owner)
+
+    other = _recorder(tmp_path, FakeStorage(), FakeDatabase())
+    await other.start()
+    assert other.recovered == 0
+
+    gate.set()
+    await owner.stop(drain_seconds=5)
+    await other.stop(drain_seconds=5)
+    assert owner.recorded == 1
+
+
+async def test_a_directory_without_a_lock_yet_is_not_taken(tmp_path) -> None:
+    # Another worker's directory caught before it is locked (the old
+    # makedirs-then-flock window) must not be adopted or removed.
+    unlocked = tmp_path / "rec-starting"
+    unlocked.mkdir()
+    staging = tmp_path / ".new-starting"
+    staging.mkdir()
+    recorder = _recorder(tmp_path, FakeStorage(), FakeDatabase())
+    await recorder.start()
+    await recorder.stop(drain_seconds=1)
+
+    assert unlocked.exists() and staging.exists()
+    assert sorted(name for name in os.listdir(tmp_path) if name.startswith("rec-")) == sorted(
+        ["rec-starting", os.path.basename(recorder._directory)]
+    )
+
+
+async def test_a_rejected_row_does_not_sink_its_batch(tmp_path) -> None:
+    bad_user = uuid.uuid4()
+    storage, db = FakeStorage(), FakeDatabase(reject_user=bad_user)
+    recorder = _recorder(tmp_path, storage, db, max_attempts=2, workers=1, batch_wait_seconds=0.2)
+    await recorder.start()
+
+    await _submit(recorder)
+    await _submit(recorder, user_id=bad_user)
+    await _submit(recorder)
+    await recorder.stop(drain_seconds=5)
+
+    assert recorder.recorded == 2 and recorder.failed == 1
+    assert len(storage.deleted) == 1 and storage.deleted[0].startswith(f"{bad_user}/")
+
+
+async def test_identical_outputs_share_one_object(tmp_path) -> None:
+    storage, db = FakeStorage(), FakeDatabase()
+    recorder = _recorder(tmp_path, storage, db, batch_wait_seconds=0.0)
+    await recorder.start()
+    user_id = uuid.uuid4()
+
+    await _submit(recorder, b"same output", user_id=user_id)
+    while not db.batches:
+        await asyncio.sleep(0.01)
+    await _submit(recorder, b"same output", user_id=user_id)
+    await _submit(recorder, b"same output")  # another user's copy is never shared
+    await recorder.stop(drain_seconds=5)
+
+    first, second, other = [row for batch in db.batches for row in batch]
+    assert storage.uploads == 2 and recorder.stats()["reused"] == 1
+    assert second["storage_path"] == first["storage_path"]
+    assert second["encryption_blob"] == first["encryption_blob"]
+    assert second["content_hash"] == first["content_hash"] != other["content_hash"]
+
+
+async def test_reuse_of_a_deleted_job_object_falls_back_to_an_upload(tmp_path) -> None:
+    storage, db = FakeStorage(), FakeDatabase()
+    recorder = _recorder(tmp_path, storage, db, batch_wait_seconds=0.0)
+    await recorder.start()
+    user_id = uuid.uuid4()
+
+    await _submit(recorder, b"same output", user_id=user_id)
+    while not db.batches:
+        await asyncio.sleep(0.01)
+    first = db.batches[0][0]
+    # The first job is deleted after the second run matched it, before its row is inserted.
+    original = recorder._insert_rows
+
+    async def delete_then_insert(batch):
+        db.deleted_paths.add(first["storage_path"])
+        return await original(batch)
+
+    recorder._insert_rows = delete_then_insert
+    await _submit(recorder, b"same output", user_id=user_id)
+    await recorder.stop(drain_seconds=5)
+
+    second = db.batches[-1][0]
+    assert recorder.recorded == 2 and storage.uploads == 2
+    assert second["storage_path"] != first["storage_path"]
+    assert second["storage_path"] in storage.objects
+
+
+async def test_record_and_respond_hands_off_to_a_running_recorder(tmp_path, monkeypatch) -> None:
+    storage, db = FakeStorage(), FakeDatabase()
+    recorder = _recorder(tmp_path, storage, db)
+    await recorder.start()
+    monkeypatch.setattr(job_recorder_module, "_recorder", recorder)
+    service = AsyncMock()
+    background_tasks = BackgroundTasks()
+
+    await record_and_respond(
+        principal=AuthenticatedPrincipal(
+            user_id=uuid.uuid4(), email="a@b.c", role=None, session_id=None, claims={}
+        ),
+        background_tasks=background_tasks,
+        jobs_service=service,
+        tool_slug="trim-spaces",
+        tool_name="Trim Spaces",
+        original_filename="in.xlsx",
+        output_bytes=b"hi",
+        output_filename="out.xlsx",
+        mime_type="x",
+        success=True,
+        error_type=None,
+        duration_ms=1,
+    )
+    await background_tasks()
+    await recorder.stop(drain_seconds=5)
+
+    service.record_authenticated_job.assert_not_awaited()
+    assert recorder.recorded == 1
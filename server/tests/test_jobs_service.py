@@ -12,13 +12,16 @@ from __future__ import annotations
 import uuid
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
+from io import BytesIO
 from types import SimpleNamespace
 from typing import Any
 from unittest.mock import AsyncMock
 
 import pytest
+from sqlalchemy.dialects import postgresql
 
 from app.db.models import ToolJob
+from app.services.file_encryption import content_digest, decrypt_file
 from app.services.jobs_service import (
     JobNotFoundError,
     JobsService,
@@ -103,8 +106,16 @@ def _make_tool_job(
 
 async def test_record_uploads_then_inserts_row_with_retention() -> None:
     user_id = uuid.uuid4()
+    uploaded: list[bytes] = []
+    commits_before_upload: list[int] = []
+
+    async def upload(*, content, **kwargs):
+        commits_before_upload.append(session.commits)
+        uploaded.append(b"".join([chunk async for chunk in content]))
+        return "ignored"
+
     storage = AsyncMock()
-    storage.upload = AsyncMock(return_value="ignored")
+    storage.upload = AsyncMock(side_effect=upload)
     session = RecordingSession()
 
     service = JobsService(session, storage)
@@ -126,10 +137,12 @@ async def test_record_uploads_then_inserts_row_with_retention() -> None:
     upload_kwargs = storage.upload.await_args.kwargs
     assert upload_kwargs["object_path"].startswith(f"{user_id}/")
     assert upload_kwargs["object_path"].endswith(".xlsx")
-    assert upload_kwargs["content"] == b"hello"
 
     assert len(session.added) == 1
     row: ToolJob = session.added[0]
+    # Stored encrypted, with the length announced up front.
+    assert upload_kwargs["content_length"] == len(uploaded[0])
+    assert decrypt_file(uploaded[0], row.encryption_blob) == b"hello"
     assert row.id == job_id
     assert row.user_id == user_id
     assert row.tool_slug == "trim-spaces"
@@ -143,8 +156,11 @@ async def test_record_uploads_then_inserts_row_with_retention() -> None:
     # commit here the background-task insert would be rolled back on
     # close and the tool_jobs table would stay empty — regression guard
     # for the bug observed in production after the first rollout.
-    assert session.commits == 1
+    assert session.commits == 2
     assert session.rollbacks == 0
+    # The reuse lookup's transaction is over before the upload starts, so
+    # no pooled connection sits idle in it for the whole upload.
+    assert commits_before_upload == [1]
 
 
 async def test_record_returns_none_and_skips_insert_on_upload_failure() -> None:
@@ -200,7 +216,8 @@ async def test_record_cleans_up_storage_when_db_insert_fails() -> None:
     storage.delete.assert_awaited_once()
     # DB insert blew up, so we must rollback and never commit partial
     # state — regression guard paired with the happy-path commit check.
-    assert session.commits == 0
+    # The one commit only ended the reuse lookup, before the upload.
+    assert session.commits == 1
     assert session.rollbacks == 1
 
 
@@ -264,24 +281,48 @@ async def test_get_returns_job_when_found() -> None:
     assert result is row
 
 
-async def test_download_and_decrypt_fetches_and_decrypts() -> None:
-    session = RecordingSession()
-    storage = AsyncMock()
-    storage.download = AsyncMock(return_value=b"ciphertext")
+async def test_open_download_streams_decrypted_chunks(monkeypatch: pytest.MonkeyPatch) -> None:
+    from app.core.config import get_settings
+    from app.services.file_encryption import CHUNK_SIZE, encrypt_file
 
-    service = JobsService(session, storage)
-    job = SimpleNamespace(
-        storage_path="u/abc.xlsx",
-        encryption_blob=b"x" * 72,
-    )
+    monkeypatch.setattr(get_settings(), "file_encryption_key", "ab" * 32)
+    plaintext = bytes(range(256)) * (CHUNK_SIZE // 100)
+    ciphertext, blob = encrypt_file(plaintext)
+    fetched: list[str] = []
+
+    async def iter_download(path: str):
+        fetched.append(path)
+        for i in range(0, len(ciphertext), 5000):
+            yield ciphertext[i:i + 5000]
 
-    # We can't easily test real decryption here without a valid blob,
-    # so just verify it calls storage.download and raises on bad blob
-    import pytest
-    with pytest.raises(Exception):
-        await service.download_and_decrypt(job)
+    storage = SimpleNamespace(iter_download=iter_download)
+    service = JobsService(RecordingSession(), storage)
+    job = SimpleNamespace(storage_path="u/abc.xlsx", encryption_blob=blob)
 
-    storage.download.assert_awaited_once_with("u/abc.xlsx")
+    stream = await service.open_download(job)
+    assert fetched == ["u/abc.xlsx"]
+    assert b"".join([chunk async for chunk in stream]) == plaintext
+
+
+async def test_open_download_raises_before_streaming_when_object_missing(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    from app.core.config import get_settings
+    from app.services.file_encryption import encrypt_file
+    from app.services.storage_service import StorageServiceError
+
+    monkeypatch.setattr(get_settings(), "file_encryption_key", "ab" * 32)
+    _, blob = encrypt_file(b"data")
+
+    async def iter_download(path: str):
+        raise StorageServiceError("Storage download failed (404): not found")
+        yield b""
+
+    service = JobsService(RecordingSession(), SimpleNamespace(iter_download=iter_download))
+    job = SimpleNamespace(storage_path="u/abc.xlsx", encryption_blob=blob)
+
+    with pytest.raises(StorageServiceError):
+        await service.open_download(job)
 
 
 async def test_delete_calls_storage_then_session_delete() -> None:
@@ -350,10 +391,10 @@ async def test_cleanup_removes_expired_storage_objects_and_prunes_old_rows() ->
     assert removed == 1
     storage.delete.assert_awaited_once_with("u/expired.xlsx")
     assert expired.storage_path is None
-    # Second executed statement should be the DELETE ... < now - 90d prune.
-    assert len(session.executed) == 2
+    # Select expired, check for live references, then the DELETE ... < now - 90d prune.
+    assert len(session.executed) == 3
     prune_sql = str(
-        session.executed[1].compile(compile_kwargs={"literal_binds": True})
+        session.executed[2].compile(compile_kwargs={"literal_binds": True})
     ).lower()
     assert "delete" in prune_sql
     assert "tool_jobs" in prune_sql
@@ -387,6 +428,138 @@ async def test_cleanup_counts_only_successful_storage_deletions() -> None:
     assert b.storage_path == "b.xlsx"  # retained because delete failed
 
 
+async def test_cleanup_keeps_objects_still_shared_with_live_jobs() -> None:
+    now = datetime.now(timezone.utc)
+    user_id = uuid.uuid4()
+    shared = _make_tool_job(
+        user_id=user_id, storage_path="u/shared.xlsx", expires_at=now - timedelta(days=1)
+    )
+    alone = _make_tool_job(
+        user_id=user_id, storage_path="u/alone.xlsx", expires_at=now - timedelta(days=1)
+    )
+    twin = _make_tool_job(
+        user_id=user_id, storage_path="u/alone.xlsx", expires_at=now - timedelta(days=2)
+    )
+    storage = AsyncMock()
+    storage.delete = AsyncMock()
+    session = RecordingSession(
+        results=[
+            _FakeScalarResult(values=[shared, alone, twin]),
+            _FakeScalarResult(values=["u/shared.xlsx"]),  # still referenced by a live row
+        ]
+    )
+
+    removed = await JobsService(session, storage).cleanup_expired(now)
+
+    assert removed == 1
+    storage.delete.assert_awaited_once_with("u/alone.xlsx")
+    assert shared.storage_path is alone.storage_path is twin.storage_path is None
+
+
+async def test_delete_keeps_an_object_other_jobs_share() -> None:
+    user_id = uuid.uuid4()
+    row = _make_tool_job(user_id=user_id, storage_path="u/shared.xlsx")
+    session = RecordingSession(
+        results=[
+            _FakeScalarResult(value=row),
+            _FakeScalarResult(),  # lock the object's references
+            _FakeScalarResult(value=uuid.uuid4()),
+        ]
+    )
+    storage = AsyncMock()
+
+    await JobsService(session, storage).delete_for_user(user_id, row.id)
+
+    storage.delete.assert_not_awaited()
+    assert session.deleted == [row]
+    assert session.commits == 1
+
+
+async def test_record_reuses_an_identical_stored_output() -> None:
+    user_id = uuid.uuid4()
+    existing = _make_tool_job(user_id=user_id, storage_path=f"{user_id}/first.xlsx")
+    existing.encryption_blob = b"b" * 73
+    existing.output_size_bytes = 5
+    session = RecordingSession(
+        results=[_FakeScalarResult(value=existing), _FakeScalarResult(value=existing.id)]
+    )
+    storage = AsyncMock()
+
+    job_id = await JobsService(session, storage).record_authenticated_job(
+        user_id=user_id,
+        tool_slug="trim-spaces",
+        tool_name="Trim Spaces",
+        original_filename="in.xlsx",
+        output_filename="out.xlsx",
+        output_bytes=b"hello",
+        mime_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        success=True,
+        error_type=None,
+        duration_ms=42,
+    )
+
+    assert job_id is not None
+    storage.upload.assert_not_awaited()
+    row: ToolJob = session.added[0]
+    assert row.storage_path == existing.storage_path
+    assert row.encryption_blob == existing.encryption_blob
+    assert row.content_hash == content_digest(user_id, BytesIO(b"hello"))
+    lookup_sql = str(session.executed[0].compile()).lower()
+    assert "content_hash" in lookup_sql and "user_id" in lookup_sql
+    # The object is claimed under a row lock in the transaction that inserts the row.
+    claim_sql = str(session.executed[1].compile(dialect=postgresql.dialect())).lower()
+    assert "storage_path" in claim_sql and claim_sql.endswith("for share")
+    assert session.commits == 2
+
+
+async def test_record_uploads_its_own_copy_when_the_matched_job_was_deleted() -> None:
+    user_id = uuid.uuid4()
+    existing = _make_tool_job(user_id=user_id, storage_path=f"{user_id}/first.xlsx")
+    existing.encryption_blob = b"b" * 73
+    session = RecordingSession(
+        results=[_FakeScalarResult(value=existing), _FakeScalarResult(value=None)]
+    )
+    storage = AsyncMock()
+
+    job_id = await JobsService(session, storage).record_authenticated_job(
+        user_id=user_id,
+        tool_slug="trim-spaces",
+        tool_name="Trim Spaces",
+        original_filename="in.xlsx",
+        output_filename="out.xlsx",
+        output_bytes=b"hello",
+        mime_type="application/octet-stream",
+        success=True,
+        error_type=None,
+        duration_ms=42,
+    )
+
+    assert job_id is not None
+    storage.upload.assert_awaited_once()
+    row: ToolJob = session.added[0]
+    assert row.storage_path == storage.upload.await_args.kwargs["object_path"] != existing.storage_path
+
+
+async def test_delete_locks_the_object_references_before_checking_them() -> None:
+    user_id = uuid.uuid4()
+    row = _make_tool_job(user_id=user_id, storage_path="u/shared.xlsx")
+    session = RecordingSession(results=[_FakeScalarResult(value=row)])
+
+    await JobsService(session, AsyncMock()).delete_for_user(user_id, row.id)
+
+    lock_sql = str(session.executed[1].compile(dialect=postgresql.dialect())).lower()
+    assert "storage_path" in lock_sql and lock_sql.endswith("for update")
+
+
+def test_content_digest_is_per_user() -> None:
+    first, second = uuid.uuid4(), uuid.uuid4()
+
+    assert content_digest(first, BytesIO(b"same")) == content_digest(first, BytesIO(b"same"))
+    assert content_digest(first, BytesIO(b"same")) != content_digest(second, BytesIO(b"same"))
+    assert content_digest(first, BytesIO(b"same")) != content_digest(first, BytesIO(b"other"))
+    assert len(content_digest(first, BytesIO(b""))) == 64
+
+
 @pytest.mark.parametrize(
     "filename, expected_suffix",
     [("out.xlsx", ".xlsx"), ("archive.zip", ".zip"), ("noext", ".bin")],
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import io
+import zipfile
+
+import openpyxl
+import pytest
+from openpyxl.worksheet.protection import SheetProtection
+
+from app.services import ooxml_patch
+from app.services.ooxml_patch import FreezeRows, SetSheetProtection, lock_structure, patch_workbook
+from app.tools.security.password_protect import _protect_workbook
+from app.tools.security.remove_password import _unprotect_workbook
+
+_OPAQUE = bytes(range(256)) * 64
+
+
+def _package(*, frozen: bool = False, protected: bool = False) -> bytes:
+    wb = openpyxl.Workbook()
+    first = wb.active
+    first.title = "Data"
+    for index in range(200):
+        first.append([f"row {index}", index, "</sheetData" if index == 7 else None])
+    second = wb.create_sheet("Other")
+    second.append(["x"])
+    if frozen:
+        first.freeze_panes = "B2"
+    if protected:
+        for ws in wb.worksheets:
+            ws.protection.sheet = True
+            ws.protection.password = "Secret-1"
+        wb.security.lockStructure = True
+    buf = io.BytesIO()
+    wb.save(buf)
+
+    out = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(buf.getvalue())) as zin, zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zout:
+        for info in zin.infolist():
+            zout.writestr(info, zin.read(info))
+        zout.writestr("xl/media/image1.bin", _OPAQUE)
+    return out.getvalue()
+
+
+def _raw_member(package: bytes, name: str) -> tuple[int, int]:
+    with zipfile.ZipFile(io.BytesIO(package)) as archive:
+        info = archive.getinfo(name)
+        return info.CRC, info.compress_size
+
+
+@pytest.mark.parametrize("frozen", [False, True])
+def test_freeze_rows_streams_rows_and_copies_other_parts(monkeypatch, frozen: bool) -> None:
+    # Tiny reads split ``</sheetData>`` across chunks.
+    monkeypatch.setattr(ooxml_patch, "_READ_CHUNK", 7)
+    source = _package(frozen=frozen)
+
+    output = patch_workbook(source, sheet_patch=FreezeRows(2))
+
+    assert output is not None
+    wb = openpyxl.load_workbook(io.BytesIO(output))
+    assert [ws.freeze_panes for ws in wb.worksheets] == ["A3", "A3"]
+    assert wb["Data"]["A200"].value == "row 199"
+    assert wb["Data"]["C8"].value == "</sheetData"
+    assert _raw_member(output, "xl/media/image1.bin") == _raw_member(source, "xl/media/image1.bin")
+    assert _raw_member(output, "xl/styles.xml") == _raw_member(source, "xl/styles.xml")
+
+
+def test_protect_selected_sheets_and_structure() -> None:
+    output, visual_lost = _protect_workbook(
+        _package(),
+        "book.xlsx",
+        password="Secret-1",
+        sheets="Other",
+        protect_structure=True,
+        protect_content=True,
+        protect_formatting=False,
+    )
+
+    assert visual_lost is False
+    wb = openpyxl.load_workbook(io.BytesIO(output))
+    assert not wb["Data"].protection.sheet
+    protection = wb["Other"].protection
+    assert protection.sheet
+    assert protection.password == SheetProtection(password="Secret-1").password
+    assert protection.formatCells
+    assert wb.security.lockStructure
+
+
+def test_remove_password_clears_sheets_and_structure() -> None:
+    output, visual_lost = _unprotect_workbook(_package(protected=True), "book.xlsx")
+
+    assert visual_lost is False
+    wb = openpyxl.load_workbook(io.BytesIO(output))
+    assert not any(ws.protection.sheet or ws.protection.password for ws in wb.worksheets)
+    assert not (wb.security and wb.security.lockStructure)
+
+
+def test_lock_structure_keeps_other_attributes() -> None:
+    xml = b'<workbook xmlns="m"><workbookProtection lockWindows="1" lockStructure="1"/><sheets/></workbook>'
+
+    assert lock_structure(False)(xml) == b'<workbook xmlns="m"><workbookProtection lockWindows="1"/><sheets/></workbook>'
+    assert lock_structure(True)(b'<workbook xmlns="m"><bookViews/></workbook>') == (
+        b'<workbook xmlns="m"><workbookProtection lockStructure="1"/><bookViews/></workbook>'
+    )
+
+
+def test_unreadable_package_falls_back() -> None:
+    assert patch_workbook(b"not a zip file", sheet_patch=SetSheetProtection(SheetProtection())) is None
@@ -159,8 +159,14 @@ async def test_download_returns_file_content(
     service: AsyncMock,
 ) -> None:
     job = _job_row(user_id=user_id, storage_path=f"{user_id}/job.xlsx")
+    job.output_size_bytes = len(b"decrypted-content")
     service.get_for_user = AsyncMock(return_value=job)
-    service.download_and_decrypt = AsyncMock(return_value=b"decrypted-content")
+
+    async def plaintext():
+        yield b"decrypted-"
+        yield b"content"
+
+    service.open_download = AsyncMock(return_value=plaintext())
 
     response = await client.get(
         f"/api/v1/me/jobs/{job.id}/download",
@@ -170,9 +176,10 @@ async def test_download_returns_file_content(
     assert response.status_code == 200
     assert response.content == b"decrypted-content"
     assert "attachment" in response.headers.get("content-disposition", "")
+    assert response.headers["content-length"] == str(len(b"decrypted-content"))
 
     service.get_for_user.assert_awaited_once_with(user_id, job.id)
-    service.download_and_decrypt.assert_awaited_once_with(job)
+    service.open_download.assert_awaited_once_with(job)
 
 
 @pytest.mark.asyncio
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.spool_dirs import claim_spool_dir, orphaned_spool_dirs
+
+
+def test_orphaned_dirs_are_yielded_once_and_removed(tmp_path) -> None:
+    exited = claim_spool_dir(str(tmp_path), "rec-")
+    exited.close()
+    live = claim_spool_dir(str(tmp_path), "rec-")
+
+    assert list(orphaned_spool_dirs(str(tmp_path), "rec-")) == [exited.path]
+    assert not os.path.exists(exited.path)
+    assert list(orphaned_spool_dirs(str(tmp_path), "rec-")) == []
+    assert os.listdir(live.path) == [".lock"]
+    live.close()
+
+
+def test_workers_starting_together_never_take_each_others_dirs(tmp_path) -> None:
+    def start(_: int) -> str:
+        spool = claim_spool_dir(str(tmp_path), "rec-")
+        for _orphan in orphaned_spool_dirs(str(tmp_path), "rec-"):
+            pass
+        return spool.path
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        claimed = list(pool.map(start, range(64)))
+
+    assert all(os.path.exists(os.path.join(path, ".lock")) for path in claimed)
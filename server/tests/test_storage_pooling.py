@@ -0,0 +1,176 @@
+"""StorageService against a local fake Storage server.
+
+Unlike ``test_storage_service.py`` this goes through a real
+``httpx.AsyncClient`` and real sockets, so it can check what the pooled
+client is for: requests share keep-alive connections, and uploads and
+downloads stream from and to file handles.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from io import BytesIO
+import tempfile
+import time
+
+import httpx
+import pytest
+
+from app.core.config import get_settings
+from app.services import storage_service as storage_module
+from app.services.storage_service import StorageService
+
+
+class FakeStorageServer:
+    """Just enough of the Storage object API over HTTP/1.1 keep-alive."""
+
+    def __init__(self) -> None:
+        self.objects: dict[str, bytes] = {}
+        self.connections = 0
+        self.chunked_uploads = 0
+        self._server: asyncio.Server | None = None
+
+    async def __aenter__(self) -> "FakeStorageServer":
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, *_exc) -> None:
+        assert self._server is not None
+        self._server.close()
+        await self._server.wait_closed()
+
+    @property
+    def url(self) -> str:
+        assert self._server is not None
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while request_line := await reader.readline():
+                method, target, _ = request_line.decode().split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b""):
+                    name, value = line.decode().split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+                body = await self._read_body(reader, headers)
+                status, payload = self._handle(method, target, body)
+                writer.write(
+                    f"HTTP/1.1 {status} X\r\ncontent-length: {len(payload)}\r\n\r\n".encode() + payload
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_body(self, reader: asyncio.StreamReader, headers: dict[str, str]) -> bytes:
+        if headers.get("transfer-encoding") == "chunked":
+            self.chunked_uploads += 1
+            parts = []
+            while size := int((await reader.readline()).strip(), 16):
+                parts.append(await reader.readexactly(size))
+                await reader.readline()
+            await reader.readline()
+            return b"".join(parts)
+        return await reader.readexactly(int(headers.get("content-length", "0")))
+
+    def _handle(self, method: str, target: str, body: bytes) -> tuple[int, bytes]:
+        key = target.split("/object/", 1)[1]
+        if method == "POST":
+            self.objects[key] = body
+            return 200, b"{}"
+        if method == "GET" and key in self.objects:
+            return 200, self.objects[key]
+        if method == "DELETE" and self.objects.pop(key, None) is not None:
+            return 200, b"{}"
+        return 404, b"not found"
+
+
+async def _download(service: StorageService, object_path: str) -> bytes:
+    buffer = BytesIO()
+    await service.download_to(object_path, buffer)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+async def server(monkeypatch):
+    async with FakeStorageServer() as fake:
+        monkeypatch.setattr(get_settings(), "supabase_url", fake.url)
+        yield fake
+        # Drop the keep-alive connection first; the server waits for it on close.
+        await storage_module.close_storage_client()
+
+
+async def test_shared_client_reuses_one_connection(server: FakeStorageServer) -> None:
+    service = StorageService()
+
+    for index in range(20):
+        await service.upload(object_path=f"u/{index}.bin", content=b"x" * 1024, mime_type="application/octet-stream")
+    assert await _download(service, "u/7.bin") == b"x" * 1024
+    await service.delete("u/7.bin")
+
+    assert server.connections == 1
+    assert len(server.objects) == 19
+
+
+async def test_upload_and_download_stream_file_handles(server: FakeStorageServer) -> None:
+    payload = os.urandom(8 * 1024 * 1024)
+    service = StorageService()
+
+    with tempfile.TemporaryFile() as source, tempfile.TemporaryFile() as target:
+        source.write(payload)
+        source.seek(123)  # upload always starts from the beginning
+        started = time.perf_counter()
+        await service.upload(object_path="u/big.bin", content=source, mime_type="application/octet-stream")
+        written = await service.download_to("u/big.bin", target)
+        elapsed = time.perf_counter() - started
+        target.seek(0)
+        assert target.read() == payload
+
+    assert written == len(payload)
+    assert server.chunked_uploads == 0  # content-length was sent
+    assert elapsed < 10  # 16 MiB over loopback; a regression to per-byte work would blow this
+
+
+async def test_client_per_call_would_open_a_connection_each_time(server: FakeStorageServer) -> None:
+    for index in range(5):
+        async with httpx.AsyncClient() as client:
+            await StorageService(client).upload(object_path=f"u/{index}", content=b"x", mime_type="x")
+
+    assert server.connections == 5
+
+
+async def test_upload_streams_an_async_iterable(server: FakeStorageServer) -> None:
+    service = StorageService()
+
+    async def chunks():
+        for index in range(4):
+            yield bytes([index]) * 1000
+
+    await service.upload(object_path="u/a.bin", content=chunks(), mime_type="x", content_length=4000)
+    await service.upload(object_path="u/b.bin", content=chunks(), mime_type="x")
+
+    expected = b"".join(bytes([index]) * 1000 for index in range(4))
+    assert await _download(service, "u/a.bin") == await _download(service, "u/b.bin") == expected
+    assert server.chunked_uploads == 1  # only the upload without a length
+
+
+def test_client_from_a_finished_loop_is_closed_when_replaced() -> None:
+    async def current_client() -> httpx.AsyncClient:
+        return storage_module.get_storage_client()
+
+    async def replace_and_settle() -> httpx.AsyncClient:
+        client = storage_module.get_storage_client()
+        await asyncio.gather(*storage_module._retiring)
+        return client
+
+    first = asyncio.run(current_client())
+    second = asyncio.run(replace_and_settle())
+    try:
+        assert second is not first
+        assert first.is_closed and not second.is_closed
+    finally:
+        asyncio.run(storage_module.close_storage_client())
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import io
+import random
+import statistics
+
+import openpyxl
+import pytest
+
+from app.tools.analyze import _column_stats
+from app.tools.analyze._column_stats import PERCENTILES, SheetAggregator
+from app.tools.analyze.summary_stats import _summary_stats_report
+
+
+def _rows() -> list[list]:
+    rng = random.Random(7)
+    rows = []
+    for index in range(501):
+        rows.append([
+            rng.gauss(1e6, 3.0),  # large offset: naive sum-of-squares variance loses digits here
+            str(rng.randint(0, 20)) if index % 7 else "  ",
+            "n/a" if index % 5 == 0 else rng.random(),
+        ][: 3 if index % 11 else 2])
+    return rows
+
+
+def _percentile(values: list[float], q: int) -> float:
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_aggregator_matches_statistics_module(monkeypatch: pytest.MonkeyPatch, use_numpy: bool) -> None:
+    if use_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(_column_stats, "np", None)
+    rows = _rows()
+    aggregator = SheetAggregator(["big", "text", None, "empty"])
+    aggregator.add_rows(iter(rows))
+
+    summaries = aggregator.summaries()
+
+    assert [s.name for s in summaries] == ["big", "text", "Column 3"]
+    for index, summary in enumerate(summaries):
+        cells = [row[index] if index < len(row) else None for row in rows]
+        numbers = []
+        for cell in cells:
+            try:
+                numbers.append(float(cell))
+            except (TypeError, ValueError):
+                pass
+        assert summary.count == len(numbers)
+        assert summary.blanks == sum(1 for c in cells if c is None or (isinstance(c, str) and not c.strip()))
+        assert (summary.minimum, summary.maximum) == (min(numbers), max(numbers))
+        assert summary.mean == pytest.approx(statistics.mean(numbers), rel=1e-12)
+        assert summary.median == pytest.approx(statistics.median(numbers))
+        assert summary.stdev == pytest.approx(statistics.stdev(numbers), rel=1e-9)
+        assert summary.total == pytest.approx(sum(numbers))
+        assert summary.distinct == len(set(numbers))
+        assert summary.percentiles == pytest.approx([_percentile(numbers, q) for q in PERCENTILES])
+
+
+def test_report_lists_numeric_columns_per_sheet() -> None:
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Sales"
+    ws.append(["region", "amount"])
+    for amount in (10, 20, 20, 40):
+        ws.append(["north", amount])
+    wb.create_sheet("Header only").append(["a", "b"])
+    buf = io.BytesIO()
+    wb.save(buf)
+
+    output, sheets, columns = _summary_stats_report(buf.getvalue(), "book.xlsx")
+
+    assert (sheets, columns) == (1, 1)
+    report = openpyxl.load_workbook(io.BytesIO(output))["Sales"]
+    rows = list(report.iter_rows(values_only=True))
+    assert rows[0] == (
+        "Column", "Count", "Min", "Max", "Mean", "Median", "Std Dev", "Sum", "Blanks", "Distinct",
+        "P10", "P25", "P75", "P90",
+    )
+    assert rows[1][:10] == ("amount", 4, 10, 40, 22.5, 20, round(statistics.stdev([10, 20, 20, 40]), 4), 90, 0, 3)
+    assert rows[1][10:] == (13, 17.5, 25, 34)
@@ -245,8 +245,19 @@ async def test_convert_tool_authenticated_schedules_recording(case: _Case) -> No
         session_id=None,
         claims={"sub": "user"},
     )
+    recorded: list[bytes] = []
+
+    async def record(**kwargs):
+        # Streamed outputs are handed over as their spool, which is closed afterwards.
+        output = kwargs["output_bytes"]
+        if not isinstance(output, bytes):
+            output.seek(0)
+            output = output.read()
+        recorded.append(output)
+        return uuid.uuid4()
+
     service = AsyncMock()
-    service.record_authenticated_job = AsyncMock(return_value=uuid.uuid4())
+    service.record_authenticated_job = AsyncMock(side_effect=record)
 
     app.dependency_overrides[get_current_user_optional] = lambda: principal
     app.dependency_overrides[jobs_service_dep] = lambda: service
@@ -274,4 +285,4 @@ async def test_convert_tool_authenticated_schedules_recording(case: _Case) -> No
     assert kwargs["success"] is True
     assert kwargs["error_type"] is None
     assert isinstance(kwargs["duration_ms"], int) and kwargs["duration_ms"] >= 0
-    assert isinstance(kwargs["output_bytes"], bytes) and len(kwargs["output_bytes"]) > 0
+    assert recorded == [response.content] and len(response.content) > 0
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.limits import Tier
+from app.core.security import AuthenticatedPrincipal
+from app.services import executor as executor_module
+from app.services.executor import ExecutorSaturatedError, ToolExecutor
+from app.tools._common import run_tool_work
+
+
+def _principal() -> AuthenticatedPrincipal:
+    return AuthenticatedPrincipal(
+        user_id=uuid.uuid4(), email="a@b.c", role=None, session_id=None, claims={},
+    )
+
+
+@pytest.fixture
+def small_executor(monkeypatch: pytest.MonkeyPatch):
+    ex = ToolExecutor(
+        max_workers=2,
+        tier_caps={Tier.ANON: 1, Tier.FREE: 2, Tier.PRO: 2},
+        max_queue=1,
+        retry_after_seconds=7,
+    )
+    monkeypatch.setattr(executor_module, "_executor", ex)
+    yield ex
+    ex.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_run_executes_off_the_event_loop(small_executor: ToolExecutor) -> None:
+    loop_thread = threading.get_ident()
+    worker_thread = await small_executor.run(Tier.ANON, threading.get_ident)
+    assert worker_thread != loop_thread
+    assert small_executor.stats()["tiers"]["anon"]["completed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_run_propagates_exceptions(small_executor: ToolExecutor) -> None:
+    def boom() -> None:
+        raise HTTPException(status_code=404, detail="Sheet not found")
+
+    with pytest.raises(HTTPException) as excinfo:
+        await small_executor.run(Tier.FREE, boom)
+    assert excinfo.value.status_code == 404
+    assert small_executor.stats()["running"] == 0
+
+
+@pytest.mark.asyncio
+async def test_tier_cap_queues_then_rejects(small_executor: ToolExecutor) -> None:
+    release = threading.Event()
+
+    running = asyncio.create_task(small_executor.run(Tier.ANON, release.wait, 5))
+    queued = asyncio.create_task(small_executor.run(Tier.ANON, release.wait, 5))
+    for _ in range(50):
+        await asyncio.sleep(0.01)
+        if small_executor.stats()["tiers"]["anon"]["queued"] == 1:
+            break
+
+    stats = small_executor.stats()["tiers"]["anon"]
+    assert stats["running"] == 1
+    assert stats["queued"] == 1
+
+    with pytest.raises(ExecutorSaturatedError) as excinfo:
+        await small_executor.run(Tier.ANON, release.wait, 5)
+    assert excinfo.value.retry_after_seconds == 7
+
+    # Another tier still has its own headroom.
+    assert await small_executor.run(Tier.FREE, lambda: "ok") == "ok"
+
+    release.set()
+    await asyncio.gather(running, queued)
+    stats = small_executor.stats()["tiers"]["anon"]
+    assert stats["completed"] == 2
+    assert stats["rejected"] == 1
+    assert stats["peak_queued"] == 1
+
+
+@pytest.mark.asyncio
+async def test_run_tool_work_maps_saturation_to_503(small_executor: ToolExecutor) -> None:
+    release = threading.Event()
+    running = asyncio.create_task(run_tool_work(None, release.wait, 5))
+    queued = asyncio.create_task(run_tool_work(None, release.wait, 5))
+    for _ in range(50):
+        await asyncio.sleep(0.01)
+        if small_executor.stats()["queued"] == 1:
+            break
+
+    with pytest.raises(HTTPException) as excinfo:
+        await run_tool_work(None, release.wait, 5)
+    assert excinfo.value.status_code == 503
+    assert excinfo.value.detail["error_code"] == "SERVER_BUSY"
+    assert excinfo.value.headers == {"Retry-After": "7"}
+
+    # Signed-in callers are on the FREE tier and are not affected.
+    assert await run_tool_work(_principal(), sum, [1, 2, 3]) == 6
+
+    release.set()
+    await asyncio.gather(running, queued)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_keeps_its_slot_until_the_thread_finishes(small_executor: ToolExecutor) -> None:
+    release = threading.Event()
+    task = asyncio.create_task(small_executor.run(Tier.ANON, release.wait, 5))
+    for _ in range(50):
+        await asyncio.sleep(0.01)
+        if small_executor.stats()["tiers"]["anon"]["running"] == 1:
+            break
+
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    await asyncio.sleep(0.02)
+    # The orphaned thread still occupies the ANON cap of 1.
+    assert small_executor.stats()["tiers"]["anon"]["running"] == 1
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(small_executor.run(Tier.ANON, lambda: "next"), 0.1)
+
+    release.set()
+    assert await small_executor.run(Tier.ANON, lambda: "next") == "next"
+
+
+@pytest.mark.asyncio
+async def test_work_waiting_for_a_pool_thread_counts_as_queued(small_executor: ToolExecutor) -> None:
+    release = threading.Event()
+    # FREE may use both pool threads, so PRO gets a slot but no thread.
+    busy = [asyncio.create_task(small_executor.run(Tier.FREE, release.wait, 5)) for _ in range(2)]
+    for _ in range(50):
+        await asyncio.sleep(0.01)
+        if small_executor.stats()["tiers"]["free"]["running"] == 2:
+            break
+    backlogged = asyncio.create_task(small_executor.run(Tier.PRO, lambda: "pro"))
+    await asyncio.sleep(0.02)
+
+    stats = small_executor.stats()
+    assert stats["tiers"]["pro"]["waiting_for_worker"] == 1
+    assert stats["queued"] == 1
+    with pytest.raises(ExecutorSaturatedError):
+        await small_executor.run(Tier.PRO, lambda: "pro")
+
+    release.set()
+    await asyncio.gather(*busy)
+    assert await backlogged == "pro"
+    assert small_executor.stats()["tiers"]["pro"]["queued"] == 0
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import io
+from tempfile import SpooledTemporaryFile
+
+import openpyxl
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from app.core.limits import ANON_MAX_UPLOAD_BYTES
+from app.services.excel_editor import load_workbook_for_edit
+from app.services.excel_reader import parse_excel_bytes
+from app.tools._common import (
+    has_visual_elements,
+    read_with_limit,
+    spool_upload_for_principal,
+    spool_with_limit,
+)
+
+
+def _xlsx_bytes() -> bytes:
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Data"
+    ws.append(["name", "qty"])
+    for i in range(200):
+        ws.append([f"row-{i}", i])
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+class _NonSeekable(io.RawIOBase):
+    def __init__(self, payload: bytes) -> None:
+        self._inner = io.BytesIO(payload)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def readinto(self, buffer) -> int:
+        chunk = self._inner.read(len(buffer))
+        buffer[: len(chunk)] = chunk
+        return len(chunk)
+
+
+@pytest.mark.asyncio
+async def test_seekable_upload_is_returned_without_copy() -> None:
+    handle = io.BytesIO(b"x" * 1000)
+    handle.seek(500)
+    upload = UploadFile(filename="input.xlsx", file=handle)
+
+    out = await spool_with_limit(upload, max_bytes=1000)
+
+    assert out is handle
+    assert out.tell() == 0
+
+
+@pytest.mark.asyncio
+async def test_seekable_upload_over_cap_is_rejected_before_reading() -> None:
+    upload = UploadFile(filename="input.xlsx", file=io.BytesIO(b"x" * 11))
+    with pytest.raises(HTTPException) as excinfo:
+        await spool_with_limit(upload, max_bytes=10)
+    assert excinfo.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_non_seekable_upload_is_spooled_with_cap() -> None:
+    upload = UploadFile(filename="input.xlsx", file=_NonSeekable(b"abc" * 100))
+    out = await spool_with_limit(upload, max_bytes=300)
+    assert out.read() == b"abc" * 100
+
+    upload = UploadFile(filename="input.xlsx", file=_NonSeekable(b"abc" * 100))
+    with pytest.raises(HTTPException):
+        await spool_with_limit(upload, max_bytes=299)
+
+
+@pytest.mark.asyncio
+async def test_read_with_limit_still_returns_bytes() -> None:
+    upload = UploadFile(filename="input.xlsx", file=io.BytesIO(b"payload"))
+    assert await read_with_limit(upload) == b"payload"
+
+
+@pytest.mark.asyncio
+async def test_spool_upload_for_principal_remaps_to_tier_413() -> None:
+    data = b"x" * (ANON_MAX_UPLOAD_BYTES + 1)
+    upload = UploadFile(filename="input.xlsx", file=io.BytesIO(data))
+    with pytest.raises(HTTPException) as excinfo:
+        await spool_upload_for_principal(upload, principal=None)
+    assert excinfo.value.status_code == 413
+    assert excinfo.value.detail["error_code"] == "ANON_FILE_TOO_LARGE"
+
+
+def test_readers_accept_rolled_over_spool() -> None:
+    raw = _xlsx_bytes()
+    spool = SpooledTemporaryFile(max_size=1024)
+    spool.write(raw)
+    assert spool._rolled
+
+    data = parse_excel_bytes(spool, "input.xlsx")
+    assert data == parse_excel_bytes(raw, "input.xlsx")
+    assert data["Data"][1] == ["row-0", 0]
+
+    loaded = load_workbook_for_edit(spool, "input.xlsx")
+    assert loaded.workbook["Data"]["A2"].value == "row-0"
+    assert has_visual_elements(spool) is False
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import io
+
+import openpyxl
+import pytest
+
+from app.services import excel_reader, workbook_cache
+from app.services.excel_reader import WorkbookReader, parse_excel_bytes
+from app.services.workbook_cache import ParsedWorkbook, WorkbookCache, workbook_cache_key
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _entry(cells: int) -> ParsedWorkbook:
+    return ParsedWorkbook({"S": tuple((f"v{i}",) for i in range(cells))})
+
+
+def test_cache_evicts_least_recently_used_within_the_byte_budget() -> None:
+    size = _entry(10).size
+    cache = WorkbookCache(max_bytes=size * 2, ttl_seconds=60)
+
+    cache.put(("a", "openpyxl"), _entry(10))
+    cache.put(("b", "openpyxl"), _entry(10))
+    assert cache.get(("a", "openpyxl")) is not None
+    cache.put(("c", "openpyxl"), _entry(10))
+
+    assert cache.get(("b", "openpyxl")) is None
+    assert cache.get(("a", "openpyxl")) is not None
+    cache.put(("huge", "openpyxl"), _entry(1000))
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["bytes"] == size * 2
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["oversized"]) == (2, 1, 1, 1)
+
+
+def test_cache_entries_expire_after_the_idle_ttl() -> None:
+    clock = _Clock()
+    cache = WorkbookCache(max_bytes=1 << 20, ttl_seconds=10, clock=clock)
+    cache.put(("a", "openpyxl"), _entry(1))
+    cache.put(("b", "openpyxl"), _entry(1))
+
+    clock.now = 8
+    assert cache.get(("a", "openpyxl")) is not None
+    clock.now = 15
+    assert cache.get(("b", "openpyxl")) is None
+    assert cache.get(("a", "openpyxl")) is not None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_repeat_uploads_skip_parsing(monkeypatch: pytest.MonkeyPatch) -> None:
+    cache = WorkbookCache(max_bytes=1 << 20, ttl_seconds=60)
+    monkeypatch.setattr(workbook_cache, "_cache", cache)
+    wb = openpyxl.Workbook()
+    wb.active.append(["a", None, 1])
+    buf = io.BytesIO()
+    wb.save(buf)
+    raw = buf.getvalue()
+
+    first = parse_excel_bytes(raw, "book.xlsx")
+    first["Sheet"][0][0] = "mutated"
+
+    def no_parse(_source):
+        raise AssertionError("cache hit must not parse")
+
+    monkeypatch.setattr(excel_reader, "_OpenpyxlSheets", no_parse)
+    with WorkbookReader(io.BytesIO(raw), "book.xlsx") as reader:
+        assert reader.cached
+        assert reader.read_sheet("Sheet") == [["a", None, 1]]
+        assert reader.materialize() == {"Sheet": [["a", None, 1]]}
+    assert cache.stats()["hits"] == 1
+
+    # The engine is part of the key.
+    assert workbook_cache_key(raw, "iterparse") not in cache._entries
+    assert parse_excel_bytes(raw, "book.xlsx", engine="iterparse") == {"Sheet": [["a", None, 1]]}
+
+
+def test_upload_is_hashed_only_when_the_cache_can_use_it(monkeypatch: pytest.MonkeyPatch) -> None:
+    cache = WorkbookCache(max_bytes=1 << 20, ttl_seconds=60)
+    monkeypatch.setattr(workbook_cache, "_cache", cache)
+    hashed: list[object] = []
+    real_sha256 = workbook_cache.hashlib.sha256
+
+    def counting_sha256(*args):
+        hashed.append(args)
+        return real_sha256(*args)
+
+    monkeypatch.setattr(workbook_cache.hashlib, "sha256", counting_sha256)
+    wb = openpyxl.Workbook()
+    wb.active.append(["a", 1])
+    buf = io.BytesIO()
+    wb.save(buf)
+    handle = io.BytesIO(buf.getvalue())
+
+    # Nothing cached yet and nothing stored: a streaming read never hashes.
+    with WorkbookReader(handle, "book.xlsx") as reader:
+        assert reader.read_sheet("Sheet") == [["a", 1]]
+    assert hashed == []
+
+    with WorkbookReader(handle, "book.xlsx") as reader:
+        reader.materialize()
+    with WorkbookReader(handle, "book.xlsx") as reader:
+        assert reader.cached
+    assert len(hashed) == 1  # the handle's digest is reused
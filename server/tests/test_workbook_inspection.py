@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import io
+import zipfile
+
+import openpyxl
+import pytest
+from fastapi import HTTPException
+
+from app.services import workbook_inspection
+from app.services.excel_reader import WorkbookReader
+from app.services.workbook_inspection import inspect_workbook
+from app.tools._common import has_visual_elements
+
+
+def _workbook(*, media: bool = False) -> bytes:
+    """An openpyxl workbook; ``media`` adds an image part and a (stub) shared string table."""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Data"
+    ws.append(["name", "qty"])
+    ws.append(["a", 1])
+    wb.create_sheet("Empty")
+    buf = io.BytesIO()
+    wb.save(buf)
+    if not media:
+        return buf.getvalue()
+    out = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(buf.getvalue())) as zin, zipfile.ZipFile(out, "w") as zout:
+        for item in zin.infolist():
+            payload = zin.read(item)
+            if item.filename == "xl/_rels/workbook.xml.rels":
+                payload = payload.replace(
+                    b"</Relationships>",
+                    b'<Relationship Id="rIdSst" Type="http://schemas.openxmlformats.org/officeDocument/'
+                    b'2006/relationships/sharedStrings" Target="sharedStrings.xml"/></Relationships>',
+                )
+            zout.writestr(item, payload)
+        zout.writestr("xl/media/image1.png", b"\x89PNG")
+        zout.writestr("xl/sharedStrings.xml", b'<sst xmlns="m" count="9" uniqueCount="4"></sst>')
+    return out.getvalue()
+
+
+def test_inspection_records_parts_and_outline() -> None:
+    inspection = inspect_workbook(_workbook(media=True))
+
+    assert inspection.container == "zip"
+    assert "xl/workbook.xml" in inspection.parts
+    assert inspection.has_visual_elements
+    assert inspection.sheet_dimensions == {"Data": "A1:B2", "Empty": "A1:A1"}
+    assert inspection.shared_string_count == 4
+    assert not inspect_workbook(_workbook()).has_visual_elements
+
+
+def test_upload_handle_is_inspected_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    handle = io.BytesIO(_workbook(media=True))
+    opened: list[object] = []
+    real_zipfile = zipfile.ZipFile
+
+    def counting_zipfile(*args, **kwargs):
+        opened.append(args[0])
+        return real_zipfile(*args, **kwargs)
+
+    monkeypatch.setattr(workbook_inspection.zipfile, "ZipFile", counting_zipfile)
+    with WorkbookReader(handle, "book.xlsx") as reader:
+        assert reader.read_sheet("Data") == [["name", "qty"], ["a", 1]]
+    assert has_visual_elements(handle)
+    assert has_visual_elements(handle)
+
+    assert inspect_workbook(handle) is inspect_workbook(handle)
+    assert len(opened) == 1
+
+
+def test_outline_is_only_read_when_asked_for(monkeypatch: pytest.MonkeyPatch) -> None:
+    handle = io.BytesIO(_workbook(media=True))
+    heads: list[str] = []
+    real_first_match = workbook_inspection._first_match
+
+    def counting_first_match(archive, name, pattern):
+        heads.append(name)
+        return real_first_match(archive, name, pattern)
+
+    monkeypatch.setattr(workbook_inspection, "_first_match", counting_first_match)
+    inspection = inspect_workbook(handle)
+    assert has_visual_elements(handle)
+    assert heads == []
+
+    assert inspection.shared_string_count == 4
+    assert inspection.sheet_dimensions == {"Data": "A1:B2", "Empty": "A1:A1"}
+    assert len(heads) == 3
+
+
+def test_non_zip_upload_has_no_parts() -> None:
+    inspection = inspect_workbook(b"\xd0\xcf\x11\xe0 legacy workbook")
+
+    assert inspection.container == "ole"
+    assert inspection.parts == ()
+    assert inspection.sheet_dimensions == {}
+    with pytest.raises(HTTPException) as excinfo:
+        WorkbookReader(b"\xd0\xcf\x11\xe0 legacy workbook", "book.xlsx")
+    assert excinfo.value.status_code == 400